@@ -11,6 +11,7 @@ from typing import Dict, Any, Optional
 
 from agents.agent_interface import AgentInterface, AnalystAgentInterface
 from core.version import VERSION
+from utils.config import load_cached_config
 
 # Set up logger
 logger = logging.getLogger("aGENtrader.agents.base")
@@ -49,11 +50,21 @@ class BaseAgent(AgentInterface):
         """Get the name of the agent."""
         return self._agent_name
     
+    @name.setter
+    def name(self, value: str) -> None:
+        """Set the display name of the agent."""
+        self._agent_name = value
+    
     @property
     def description(self) -> str:
         """Get the description of the agent."""
         return self._description
     
+    @description.setter
+    def description(self, value: str) -> None:
+        """Set the description of the agent."""
+        self._description = value
+    
     @property
     def version(self) -> str:
         """Get the version of the agent."""
@@ -124,9 +135,7 @@ class BaseAnalystAgent(BaseAgent, AnalystAgentInterface):
             yaml_config_path = os.path.join(self.config_dir, "settings.yaml")
             if os.path.exists(yaml_config_path):
                 try:
-                    import yaml
-                    with open(yaml_config_path, "r") as f:
-                        config = yaml.safe_load(f)
+                    config = load_cached_config(yaml_config_path)
                     # Get the 'agents' section from settings.yaml
                     return config.get("agents", {})
                 except ImportError:
@@ -156,9 +165,7 @@ class BaseAnalystAgent(BaseAgent, AnalystAgentInterface):
             yaml_config_path = os.path.join(self.config_dir, "settings.yaml")
             if os.path.exists(yaml_config_path):
                 try:
-                    import yaml
-                    with open(yaml_config_path, "r") as f:
-                        config = yaml.safe_load(f)
+                    config = load_cached_config(yaml_config_path)
                     # Get the 'trading' section from settings.yaml
                     return config.get("trading", {})
                 except ImportError:
@@ -12,6 +12,13 @@ import logging
 import urllib.parse
 from typing import Dict, List, Optional, Any, Union
 import requests
+import numpy as np
+
+from utils.tracing import traced, set_attributes, DATA_FETCH
+from utils.metrics import api_requests, record_api_response
+from utils.retry import RetryPolicy
+from utils.schema_validator import validate_kline_columns
+from data.klines import parse_klines, to_records
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
@@ -25,6 +32,11 @@ class BinanceDataProvider:
     error handling and rate limiting compliance.
     """
     
+    # Transient failures (timeouts, 429/418, 5xx) are retried with jitter;
+    # a 429/418 holds every Binance request for its Retry-After
+    RETRY_POLICY = RetryPolicy("binance", max_attempts=3, base_delay=0.25, max_delay=5.0, throttle_key="binance")
+    REQUEST_TIMEOUT = 10
+    
     BASE_URL = "https://api.binance.com"
     TESTNET_URL = "https://testnet.binance.vision"
     
@@ -118,13 +130,15 @@ class BinanceDataProvider:
             
         self.last_request_time = time.time()
     
+    @traced("binance.request", kind=DATA_FETCH)
     def _make_request(
         self, 
         endpoint: str, 
         method: str = "GET", 
         params: Optional[Dict[str, Any]] = None,
-        signed: bool = False
-    ) -> Union[Dict[str, Any], List[Any]]:
+        signed: bool = False,
+        raw: bool = False
+    ) -> Union[Dict[str, Any], List[Any], bytes]:
         """
         Make a request to the Binance API with error handling.
         
@@ -133,9 +147,11 @@ class BinanceDataProvider:
             method: HTTP method
             params: Request parameters
             signed: Whether request requires authentication
+            raw: Return the undecoded response body
             
         Returns:
-            API response as dictionary
+            API response as dictionary (the body as bytes if raw is set;
+            error fallbacks are always decoded values)
             
         Raises:
             Exception: If API request fails
@@ -148,31 +164,38 @@ class BinanceDataProvider:
         
         # Create full URL
         url = f"{self.base_url}{endpoint}"
+        set_attributes(endpoint=endpoint, symbol=params.get("symbol", ""))
         
         # Prepare headers
         headers = {}
         if self.api_key:
             headers["X-MBX-APIKEY"] = self.api_key
         
-        # Add signature for authenticated requests
-        if signed and self.api_secret:
-            params["timestamp"] = int(time.time() * 1000)
-            params["signature"] = self._generate_signature(params)
-        
-        try:
-            # Make the request
+        def send() -> requests.Response:
+            # Sign each attempt so retries carry a fresh timestamp
+            request_params = dict(params)
+            if signed and self.api_secret:
+                request_params["timestamp"] = int(time.time() * 1000)
+                request_params["signature"] = self._generate_signature(request_params)
+            
             if method == "GET":
-                response = requests.get(url, headers=headers, params=params)
+                response = requests.get(url, headers=headers, params=request_params, timeout=self.REQUEST_TIMEOUT)
             elif method == "POST":
-                response = requests.post(url, headers=headers, params=params)
+                response = requests.post(url, headers=headers, params=request_params, timeout=self.REQUEST_TIMEOUT)
             else:
                 raise ValueError(f"Unsupported HTTP method: {method}")
+            record_api_response("binance", endpoint, response, "spot")
             
             # Check for HTTP errors
             response.raise_for_status()
+            return response
+        
+        try:
+            # Make the request, retrying transient failures
+            response = self.RETRY_POLICY.run(send, budget_key=f"binance:{endpoint}")
             
             # Parse JSON response
-            return response.json()
+            return response.content if raw else response.json()
             
         except requests.exceptions.HTTPError as e:
             # Special handling for common errors
@@ -196,6 +219,7 @@ class BinanceDataProvider:
             raise Exception(f"Binance API request failed: {str(e)}")
             
         except requests.exceptions.RequestException as e:
+            api_requests.labels("binance", endpoint, "error").inc()
             logger.error(f"API request failed: {str(e)}")
             raise Exception(f"Binance API request failed: {str(e)}")
     
@@ -208,16 +232,19 @@ class BinanceDataProvider:
         """
         return self._make_request("/api/v3/exchangeInfo")
     
-    def fetch_ohlcv(
+    def fetch_klines(
         self, 
         symbol: str, 
         interval: str = "1h", 
         limit: int = 100,
         start_time: Optional[int] = None,
         end_time: Optional[int] = None
-    ) -> List[Dict[str, Any]]:
+    ) -> np.ndarray:
         """
-        Fetch OHLCV (candlestick) data for a trading pair.
+        Fetch OHLCV (candlestick) data as a structured array.
+        
+        The response body is decoded straight into columns (see
+        data.klines.KLINE_DTYPE) without building a record per candle.
         
         Args:
             symbol: Trading symbol (e.g., "BTCUSDT")
@@ -227,7 +254,7 @@ class BinanceDataProvider:
             end_time: End time in milliseconds
             
         Returns:
-            List of OHLCV records
+            Structured array of klines, oldest first
         """
         # Map interval if needed
         mapped_interval = self.INTERVAL_MAP.get(interval, interval)
@@ -249,26 +276,36 @@ class BinanceDataProvider:
             params["endTime"] = end_time
             
         # Make request
-        candlesticks = self._make_request("/api/v3/klines", params=params)
-        
-        # Format the response
-        formatted_candlesticks = []
-        for candle in candlesticks:
-            formatted_candlesticks.append({
-                "timestamp": candle[0],  # Changed "time" to "timestamp" to match expected format
-                "open": float(candle[1]),
-                "high": float(candle[2]),
-                "low": float(candle[3]),
-                "close": float(candle[4]),
-                "volume": float(candle[5]),
-                "close_time": candle[6],
-                "quote_asset_volume": float(candle[7]),
-                "number_of_trades": int(candle[8]),
-                "taker_buy_base_asset_volume": float(candle[9]),
-                "taker_buy_quote_asset_volume": float(candle[10])
-            })
+        klines = parse_klines(self._make_request("/api/v3/klines", params=params, raw=True))
+        
+        errors = validate_kline_columns(klines)
+        if errors:
+            logger.warning(f"Kline response for {formatted_symbol} {mapped_interval} failed validation: {errors[:3]}")
             
-        return formatted_candlesticks
+        return klines
+    
+    def fetch_ohlcv(
+        self, 
+        symbol: str, 
+        interval: str = "1h", 
+        limit: int = 100,
+        start_time: Optional[int] = None,
+        end_time: Optional[int] = None
+    ) -> List[Dict[str, Any]]:
+        """
+        Fetch OHLCV (candlestick) data for a trading pair.
+        
+        Args:
+            symbol: Trading symbol (e.g., "BTCUSDT")
+            interval: Time interval (e.g., "1h", "4h", "1d")
+            limit: Maximum number of records to return
+            start_time: Start time in milliseconds
+            end_time: End time in milliseconds
+            
+        Returns:
+            List of OHLCV records
+        """
+        return to_records(self.fetch_klines(symbol, interval, limit, start_time, end_time))
     
     def get_ticker(self, symbol: str) -> Dict[str, Any]:
         """
@@ -303,6 +340,29 @@ class BinanceDataProvider:
         ticker = self._make_request("/api/v3/ticker/price", params=params)
         return float(ticker["price"])
     
+    def get_current_prices(self, symbols: Optional[List[str]] = None) -> Dict[str, float]:
+        """
+        Get current prices for many symbols with a single request.
+        
+        Calls /api/v3/ticker/price without a symbol, which returns the latest
+        price for every trading pair, and filters the result locally.
+        
+        Args:
+            symbols: Trading symbols to return (e.g., ["BTCUSDT", "ETH/USDT"]).
+                If None, prices for all symbols are returned.
+            
+        Returns:
+            Dictionary of symbol (without "/") -> price
+        """
+        tickers = self._make_request("/api/v3/ticker/price")
+        all_prices = {ticker["symbol"]: float(ticker["price"]) for ticker in tickers}
+        
+        if symbols is None:
+            return all_prices
+        
+        wanted = {symbol.replace("/", "") for symbol in symbols}
+        return {symbol: price for symbol, price in all_prices.items() if symbol in wanted}
+    
     def get_account_info(self) -> Dict[str, Any]:
         """
         Get account information (authenticated endpoint).
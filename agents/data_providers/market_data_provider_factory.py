@@ -2,11 +2,15 @@
 aGENtrader v2 Market Data Provider Factory
 
 This module provides a factory for creating market data providers,
-using Binance as the primary source with fallback to CoinAPI.
+using Binance as the primary source with fallback to CoinAPI. Requests are
+routed by observed provider latency and error rate, and hedged to the
+fallback when the primary is slower than usual (see utils.provider_router).
 """
 import os
 import logging
-from typing import Optional, Dict, Any, Union, List
+from typing import Optional, Dict, Any, Union, List, Callable
+
+from utils.provider_router import ProviderRouter
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
@@ -17,8 +21,8 @@ class MarketDataProviderFactory:
     Factory class for creating market data providers.
     
     This factory attempts to use Binance as the primary data source,
-    with fallback to CoinAPI when Binance is unavailable or when specific
-    data is not available through Binance.
+    with fallback to CoinAPI when Binance is unavailable, fails, returns no
+    data or is slower than its p95 latency (hedged request).
     """
     
     def __init__(self):
@@ -74,6 +78,12 @@ class MarketDataProviderFactory:
             logger.info("Using CoinAPI as the primary data source (Binance not available)")
         else:
             logger.info("Using Binance as primary with CoinAPI fallback - optimal configuration")
+
+        self.router = ProviderRouter(hedge=os.environ.get("MARKET_DATA_HEDGING", "true").lower() == "true")
+        if self.binance_available:
+            self.router.register("binance", self.binance_provider)
+        if self.coinapi_available:
+            self.router.register("coinapi", self.coinapi_provider)
     
     def get_provider(self, preferred: str = "binance"):
         """
@@ -102,6 +112,49 @@ class MarketDataProviderFactory:
         logger.error("No market data providers available!")
         return None
     
+    def _route(
+        self,
+        method: str,
+        request: Callable[[Any], Any],
+        provider: str,
+        default: Any,
+        validate: Optional[Callable[[Any], bool]] = None,
+        requires: Optional[str] = None
+    ) -> Any:
+        """
+        Run a request on the best available provider.
+
+        Args:
+            method: Request name for logs and metrics
+            request: Function taking a provider and returning its result
+            provider: Preferred provider
+            default: Result when no provider succeeds
+            validate: Returns whether a result is usable (default: non-empty)
+            requires: Provider method the request needs
+
+        Returns:
+            Result of the winning provider, or default
+        """
+        kwargs = {"validate": validate} if validate is not None else {}
+        _, result = self.router.call(
+            request,
+            method=method,
+            preferred=provider.lower(),
+            default=default,
+            supports=(lambda p: hasattr(p, requires)) if requires else None,
+            **kwargs
+        )
+        return result
+
+    def provider_stats(self) -> Dict[str, Dict[str, Any]]:
+        """
+        Latency and error-rate statistics of the available providers.
+
+        Returns:
+            Dictionary of provider name -> statistics
+        """
+        return self.router.stats()
+
     def fetch_ohlcv(
         self, 
         symbol: str, 
@@ -121,39 +174,17 @@ class MarketDataProviderFactory:
         Returns:
             List of OHLCV records or empty list if fetch fails
         """
-        data_provider = self.get_provider(preferred=provider)
-        
-        if not data_provider:
+        if not self.router.providers:
             logger.error(f"No data provider available to fetch OHLCV data for {symbol}")
             return []
         
-        try:
-            # Format symbol if needed
-            if hasattr(data_provider, 'fetch_ohlcv'):
-                return data_provider.fetch_ohlcv(symbol, interval, limit)
-            else:
-                logger.error(f"Provider does not support fetch_ohlcv method")
-                return []
-        except Exception as e:
-            logger.error(f"Error fetching OHLCV data: {str(e)}")
-            
-            # Try fallback if primary provider fails
-            if provider.lower() == "binance" and self.coinapi_available:
-                logger.info(f"Trying CoinAPI fallback for OHLCV data")
-                try:
-                    return self.coinapi_provider.fetch_ohlcv(symbol, interval, limit)
-                except Exception as e2:
-                    logger.error(f"Fallback also failed: {str(e2)}")
-                    return []
-            elif provider.lower() == "coinapi" and self.binance_available:
-                logger.info(f"Trying Binance fallback for OHLCV data")
-                try:
-                    return self.binance_provider.fetch_ohlcv(symbol, interval, limit)
-                except Exception as e2:
-                    logger.error(f"Fallback also failed: {str(e2)}")
-                    return []
-            
-            return []
+        return self._route(
+            "fetch_ohlcv",
+            lambda p: p.fetch_ohlcv(symbol, interval, limit),
+            provider,
+            default=[],
+            requires="fetch_ohlcv"
+        )
     
     def get_current_price(self, symbol: str, provider: str = "binance") -> float:
         """
@@ -166,39 +197,45 @@ class MarketDataProviderFactory:
         Returns:
             Current price as float or 0.0 if fetch fails
         """
-        data_provider = self.get_provider(preferred=provider)
-        
-        if not data_provider:
+        if not self.router.providers:
             logger.error(f"No data provider available to fetch current price for {symbol}")
             return 0.0
         
-        try:
-            # Check method availability
-            if hasattr(data_provider, 'get_current_price'):
-                return data_provider.get_current_price(symbol)
-            else:
-                logger.error(f"Provider does not support get_current_price method")
-                return 0.0
-        except Exception as e:
-            logger.error(f"Error fetching current price: {str(e)}")
+        return self._route(
+            "get_current_price",
+            lambda p: p.get_current_price(symbol),
+            provider,
+            default=0.0,
+            requires="get_current_price"
+        )
+    
+    def get_current_prices(self, symbols: List[str], provider: str = "binance") -> Dict[str, float]:
+        """
+        Get current prices for many trading pairs with a single request.
+        
+        Args:
+            symbols: Trading symbols (e.g., ["BTC/USDT", "ETHUSDT"])
+            provider: Preferred provider to use
             
-            # Try fallback if primary provider fails
-            if provider.lower() == "binance" and self.coinapi_available:
-                logger.info(f"Trying CoinAPI fallback for current price")
-                try:
-                    return self.coinapi_provider.get_current_price(symbol)
-                except Exception as e2:
-                    logger.error(f"Fallback also failed: {str(e2)}")
-                    return 0.0
-            elif provider.lower() == "coinapi" and self.binance_available:
-                logger.info(f"Trying Binance fallback for current price")
-                try:
-                    return self.binance_provider.get_current_price(symbol)
-                except Exception as e2:
-                    logger.error(f"Fallback also failed: {str(e2)}")
-                    return 0.0
+        Returns:
+            Dictionary of symbol (without "/") -> price, or empty dict if fetch fails
+        """
+        if not self.router.providers:
+            logger.error("No data provider available to fetch current prices")
+            return {}
+        
+        def request(data_provider: Any) -> Dict[str, float]:
+            # Prefer the batched endpoint, otherwise price each symbol separately
+            if hasattr(data_provider, 'get_current_prices'):
+                return data_provider.get_current_prices(symbols)
             
-            return 0.0
+            prices = {}
+            for symbol in symbols:
+                formatted_symbol = symbol.replace("/", "")
+                prices[formatted_symbol] = data_provider.get_current_price(formatted_symbol)
+            return prices
+        
+        return self._route("get_current_prices", request, provider, default={})
     
     def fetch_market_depth(self, symbol: str, limit: int = 100, provider: str = "binance") -> Dict[str, Any]:
         """
@@ -212,40 +249,16 @@ class MarketDataProviderFactory:
         Returns:
             Dictionary containing bids and asks arrays or empty dict if fetch fails
         """
-        data_provider = self.get_provider(preferred=provider)
-        
-        if not data_provider:
+        empty = {"bids": [], "asks": [], "timestamp": 0, "bid_total": 0.0, "ask_total": 0.0}
+        if not self.router.providers:
             logger.error(f"No data provider available to fetch market depth for {symbol}")
-            return {"bids": [], "asks": [], "timestamp": 0, "bid_total": 0.0, "ask_total": 0.0}
+            return empty
         
-        try:
-            # Check method availability
-            if hasattr(data_provider, 'fetch_market_depth'):
-                return data_provider.fetch_market_depth(symbol, limit)
-            else:
-                logger.error(f"Provider does not support fetch_market_depth method")
-                return {"bids": [], "asks": [], "timestamp": 0, "bid_total": 0.0, "ask_total": 0.0}
-        except Exception as e:
-            logger.error(f"Error fetching market depth: {str(e)}")
-            
-            # Try fallback if primary provider fails
-            if provider.lower() == "binance" and self.coinapi_available:
-                logger.info(f"Trying CoinAPI fallback for market depth")
-                try:
-                    if hasattr(self.coinapi_provider, 'fetch_market_depth'):
-                        return self.coinapi_provider.fetch_market_depth(symbol, limit)
-                    else:
-                        logger.error("Fallback provider does not support fetch_market_depth method")
-                except Exception as e2:
-                    logger.error(f"Fallback also failed: {str(e2)}")
-            elif provider.lower() == "coinapi" and self.binance_available:
-                logger.info(f"Trying Binance fallback for market depth")
-                try:
-                    if hasattr(self.binance_provider, 'fetch_market_depth'):
-                        return self.binance_provider.fetch_market_depth(symbol, limit)
-                    else:
-                        logger.error("Fallback provider does not support fetch_market_depth method")
-                except Exception as e2:
-                    logger.error(f"Fallback also failed: {str(e2)}")
-            
-            return {"bids": [], "asks": [], "timestamp": 0, "bid_total": 0.0, "ask_total": 0.0}
\ No newline at end of file
+        return self._route(
+            "fetch_market_depth",
+            lambda p: p.fetch_market_depth(symbol, limit),
+            provider,
+            default=empty,
+            validate=lambda depth: bool(depth and (depth.get("bids") or depth.get("asks"))),
+            requires="fetch_market_depth"
+        )
\ No newline at end of file
@@ -8,7 +8,8 @@ import time
 import random
 import logging
 from typing import Dict, List, Optional, Any
-from datetime import datetime, timedelta
+
+from data.simulated.market_generator import MarketGenerator, to_records
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
@@ -19,15 +20,20 @@ class MockDataProvider:
     Mock data provider that generates synthetic market data for demo purposes.
     """
     
-    def __init__(self, symbol: str = "BTCUSDT"):
+    def __init__(self, symbol: str = "BTCUSDT", seed: Optional[int] = None):
         """
         Initialize the mock data provider.
         
         Args:
             symbol: Trading symbol to generate data for
+            seed: Random seed; the same seed yields the same sequence of
+                prices, candles and order books (benchmarks, reproducible tests)
         """
         self.symbol = symbol
         self.base_price = 50000.0 if symbol.startswith("BTC") else 3000.0
+        self.random = random.Random(seed)
+        self.generator = MarketGenerator(seed=seed)
+        self.last_prices: Dict[str, float] = {}
         logger.info(f"Initialized Mock Data Provider for {symbol}")
         
     def get_current_price(self, symbol: str) -> float:
@@ -41,12 +47,28 @@ class MockDataProvider:
             Simulated current price
         """
         # Create a realistic-looking price with some randomness
-        variation = self.base_price * 0.02 * random.random()
-        price = self.base_price + (variation if random.random() > 0.5 else -variation)
+        variation = self.base_price * 0.02 * self.random.random()
+        price = self.base_price + (variation if self.random.random() > 0.5 else -variation)
         
         logger.info(f"Mock price for {symbol}: {price:.2f}")
         return price
-    
+
+    def get_current_prices(self, symbols: Optional[List[str]] = None) -> Dict[str, float]:
+        """
+        Get simulated current prices for many symbols at once.
+
+        Args:
+            symbols: Trading symbols (e.g., ["BTCUSDT", "ETH/USDT"])
+
+        Returns:
+            Dictionary of symbol (without "/") -> simulated price
+        """
+        symbols = symbols or [self.symbol]
+        return {
+            symbol.replace("/", ""): self.get_current_price(symbol.replace("/", ""))
+            for symbol in symbols
+        }
+
     def fetch_ohlcv(
         self, 
         symbol: str, 
@@ -57,6 +79,9 @@ class MockDataProvider:
     ) -> List[Dict[str, Any]]:
         """
         Fetch simulated OHLCV data.
+
+        Candles follow a seeded GBM path starting at the base price; see
+        data.simulated.market_generator.
         
         Args:
             symbol: Trading symbol (e.g., "BTCUSDT")
@@ -68,57 +93,35 @@ class MockDataProvider:
         Returns:
             List of simulated OHLCV records
         """
-        now = datetime.now()
-        data = []
-        
-        # Convert interval to seconds (approximately)
-        if interval == "1m":
-            interval_seconds = 60
-        elif interval == "5m":
-            interval_seconds = 300
-        elif interval == "15m":
-            interval_seconds = 900
-        elif interval == "30m":
-            interval_seconds = 1800
-        elif interval == "1h":
-            interval_seconds = 3600
-        elif interval == "4h":
-            interval_seconds = 14400
-        elif interval == "1d":
-            interval_seconds = 86400
-        else:
-            interval_seconds = 3600  # Default to 1h
-        
-        # Generate data
-        for i in range(limit):
-            candle_time = now - timedelta(seconds=interval_seconds * (limit - i))
-            timestamp = int(candle_time.timestamp() * 1000)
-            
-            # Create realistic-looking price data
-            base = self.base_price + (self.base_price * 0.1 * (random.random() - 0.5))
-            price_range = base * 0.02
-            
-            open_price = base
-            close_price = base + (price_range * (random.random() - 0.5))
-            high_price = max(open_price, close_price) + (price_range * random.random())
-            low_price = min(open_price, close_price) - (price_range * random.random())
-            volume = self.base_price * 0.1 * random.random()
-            
-            data.append({
-                "time": timestamp,
-                "open": open_price,
-                "high": high_price,
-                "low": low_price,
-                "close": close_price,
-                "volume": volume,
-                "close_time": timestamp + interval_seconds * 1000 - 1,
-                "quote_asset_volume": volume * ((open_price + close_price) / 2),
-                "number_of_trades": int(100 * random.random()),
-                "taker_buy_base_asset_volume": volume * 0.6,
-                "taker_buy_quote_asset_volume": volume * 0.6 * ((open_price + close_price) / 2)
-            })
-        
-        return data
+        try:
+            candles = self.generator.generate_candles(
+                limit, interval, start_price=self.base_price,
+                start_time=start_time, end_time=end_time, symbol=symbol
+            )
+        except ValueError:
+            # Unknown interval: serve hourly candles
+            candles = self.generator.generate_candles(
+                limit, "1h", start_price=self.base_price,
+                start_time=start_time, end_time=end_time, symbol=symbol
+            )
+
+        if limit:
+            self.last_prices[symbol.replace("/", "")] = float(candles["close"][-1])
+        return to_records(candles)
+
+    def fetch_market_depth(self, symbol: str, limit: int = 100) -> Dict[str, Any]:
+        """
+        Fetch a simulated order book around the last generated close.
+
+        Args:
+            symbol: Trading symbol (e.g., "BTCUSDT")
+            limit: Number of price levels per side
+
+        Returns:
+            Order book in the BinanceDataProvider.fetch_market_depth format
+        """
+        price = self.last_prices.get(symbol.replace("/", ""), self.base_price)
+        return self.generator.order_book(price, levels=limit, symbol=symbol).to_dict()
     
     def get_ticker(self, symbol: str) -> Dict[str, Any]:
         """
@@ -134,21 +137,21 @@ class MockDataProvider:
         
         return {
             "symbol": symbol,
-            "priceChange": current_price * 0.01 * (random.random() - 0.5),
-            "priceChangePercent": 0.01 * 100 * (random.random() - 0.5),
-            "weightedAvgPrice": current_price * (1 + 0.005 * (random.random() - 0.5)),
-            "prevClosePrice": current_price * (1 - 0.01 * random.random()),
+            "priceChange": current_price * 0.01 * (self.random.random() - 0.5),
+            "priceChangePercent": 0.01 * 100 * (self.random.random() - 0.5),
+            "weightedAvgPrice": current_price * (1 + 0.005 * (self.random.random() - 0.5)),
+            "prevClosePrice": current_price * (1 - 0.01 * self.random.random()),
             "lastPrice": current_price,
-            "lastQty": 0.1 * random.random(),
-            "bidPrice": current_price * (1 - 0.001 * random.random()),
-            "bidQty": 0.5 * random.random(),
-            "askPrice": current_price * (1 + 0.001 * random.random()),
-            "askQty": 0.5 * random.random(),
-            "openPrice": current_price * (1 - 0.02 * random.random()),
-            "highPrice": current_price * (1 + 0.02 * random.random()),
-            "lowPrice": current_price * (1 - 0.02 * random.random()),
-            "volume": 100 * random.random(),
-            "quoteVolume": 100 * current_price * random.random(),
+            "lastQty": 0.1 * self.random.random(),
+            "bidPrice": current_price * (1 - 0.001 * self.random.random()),
+            "bidQty": 0.5 * self.random.random(),
+            "askPrice": current_price * (1 + 0.001 * self.random.random()),
+            "askQty": 0.5 * self.random.random(),
+            "openPrice": current_price * (1 - 0.02 * self.random.random()),
+            "highPrice": current_price * (1 + 0.02 * self.random.random()),
+            "lowPrice": current_price * (1 - 0.02 * self.random.random()),
+            "volume": 100 * self.random.random(),
+            "quoteVolume": 100 * current_price * self.random.random(),
             "openTime": int(time.time() * 1000) - 86400000,
             "closeTime": int(time.time() * 1000),
             "firstId": 123456789,
@@ -11,7 +11,6 @@ and applies decision rules to output a structured trading decision.
 import os
 import sys
 import json
-import yaml
 import logging
 import traceback
 from typing import Dict, List, Any, Optional, Union, Callable
@@ -25,6 +24,8 @@ sys.path.append(parent_dir)
 
 # Import required modules
 from models.llm_client import LLMClient
+from utils.config import load_cached_config
+from utils.tracing import traced, AGENT
 
 # Import error handling utilities
 from utils.error_handler import (
@@ -97,9 +98,7 @@ def load_config(config_path: str = "config/settings.yaml") -> Dict[str, Any]:
     config_path = os.path.join(parent_dir, config_path)
     
     try:
-        with open(config_path, 'r') as f:
-            config = yaml.safe_load(f)
-        return config
+        return load_cached_config(config_path)
     except Exception as e:
         logger.error(f"Failed to load config: {e}")
         # Return default config
@@ -150,6 +149,7 @@ class DecisionAgent:
         
         self.logger.info(f"Decision Agent initialized with confidence threshold={self.confidence_threshold}")
     
+    @traced(kind=AGENT)
     def make_decision(self, 
                      agent_analyses: Dict[str, Any], 
                      symbol: Optional[str] = None,
@@ -18,6 +18,8 @@ import random
 from datetime import datetime, timedelta
 from typing import Dict, List, Any, Optional, Union
 
+import numpy as np
+
 # Add parent directory to path to allow importing from other modules
 script_dir = os.path.dirname(os.path.abspath(__file__))
 parent_dir = os.path.dirname(script_dir)
@@ -26,7 +28,10 @@ sys.path.append(parent_dir)
 # Import required modules
 from models.llm_client import LLMClient
 from data.database import DatabaseConnector
+from data.derivatives_service import derivatives_data
 from agents.base_agent import BaseAnalystAgent
+from utils.tracing import traced, AGENT, COMPUTE
+from analytics.derivatives_analytics import to_matrix, series_lengths, latest_zscore, latest_percentile
 from market_data_provider_factory import MarketDataProviderFactory
 
 class FundingRateAnalystAgent(BaseAnalystAgent):
@@ -34,7 +39,7 @@ class FundingRateAnalystAgent(BaseAnalystAgent):
     Funding Rate Analyst Agent that analyzes futures market funding rates.
     
     This agent:
-    - Fetches funding rate data from Binance futures API
+    - Fetches funding rate data from the shared derivatives data cache
     - Analyzes funding rate trends and magnitudes
     - Identifies potential market bias from perpetual futures
     - Generates trading signals based on funding rate analysis
@@ -65,6 +70,7 @@ class FundingRateAnalystAgent(BaseAnalystAgent):
         
         self.logger.info(f"Funding Rate Analyst Agent initialized with timeframe {self.default_interval}")
         
+    @traced(kind=AGENT)
     def analyze(self, 
                symbol: Optional[str] = None, 
                interval: Optional[str] = None,
@@ -128,48 +134,31 @@ class FundingRateAnalystAgent(BaseAnalystAgent):
             
     def fetch_funding_rates(self, symbol: str) -> List[Dict[str, Any]]:
         """
-        Fetch funding rate data from Binance Futures API.
+        Fetch funding rate data from the shared derivatives data cache.
+        
+        Funding rates for all perpetuals are refreshed in bulk once per
+        funding epoch, so repeated calls do not hit the API.
         
         Args:
             symbol: Trading symbol (e.g., "BTCUSDT")
             
         Returns:
-            List of funding rate records
+            List of funding rate records, newest first
         """
         try:
             # Format symbol for API
             formatted_symbol = symbol.replace("/", "") if "/" in symbol else symbol
             
-            # Initialize data provider
             self.logger.info(f"Fetching funding rates for {formatted_symbol}")
+            funding_rates = derivatives_data.get_funding_rates(formatted_symbol, limit=self.lookback_periods)
             
-            # Create Binance provider directly to access futures API
-            from agents.data_providers.binance_data_provider import BinanceDataProvider
-            binance = BinanceDataProvider()
-            
-            try:
-                # Prepare API parameters
-                params = {
-                    "symbol": formatted_symbol,
-                    "limit": self.lookback_periods
-                }
-                
-                # Make API request to futures funding rate endpoint
-                url = "/fapi/v1/fundingRate"
-                funding_rates = binance._make_request(url, params=params)
+            # Verify we got valid data
+            if not funding_rates:
+                self.logger.warning(f"No funding rate data available for {formatted_symbol}")
+                return []
                 
-                # Verify we got valid data
-                if not funding_rates or not isinstance(funding_rates, list):
-                    self.logger.warning(f"Invalid funding rate data returned for {formatted_symbol}")
-                    return self._generate_mock_funding_data(formatted_symbol)
-                    
-                self.logger.info(f"Successfully fetched {len(funding_rates)} funding rate records")
-                return funding_rates
-                
-            except Exception as fetch_error:
-                self.logger.warning(f"Error accessing futures funding rate API: {str(fetch_error)}")
-                self.logger.warning("Generating simulated funding rate data for demo purposes")
-                return self._generate_mock_funding_data(formatted_symbol)
+            self.logger.info(f"Successfully fetched {len(funding_rates)} funding rate records")
+            return funding_rates
                 
         except Exception as e:
             self.logger.error(f"Error fetching funding rate data: {str(e)}", exc_info=True)
@@ -234,38 +223,70 @@ class FundingRateAnalystAgent(BaseAnalystAgent):
         Returns:
             Analysis result with trading signal
         """
+        return self.analyze_funding_universe({symbol: funding_data}, interval)[symbol]
+    
+    @traced(kind=COMPUTE)
+    def analyze_funding_universe(self,
+                                 funding_by_symbol: Dict[str, List[Dict[str, Any]]],
+                                 interval: str) -> Dict[str, Dict[str, Any]]:
+        """
+        Analyze funding rates for many symbols in one vectorized pass.
+        
+        Args:
+            funding_by_symbol: Funding rate records (newest first) per symbol
+            interval: Time interval
+            
+        Returns:
+            Analysis result per symbol
+        """
+        symbols = list(funding_by_symbol)
         try:
             # Extract funding rates as floats
-            rates = []
-            timestamps = []
+            rate_series = []
+            time_series = []
+            for symbol in symbols:
+                records = [item for item in funding_by_symbol[symbol] if "fundingRate" in item]
+                rate_series.append([float(item["fundingRate"]) for item in records])
+                time_series.append([item.get("fundingTime", 0) for item in records])
             
-            for item in funding_data:
-                if "fundingRate" in item:
-                    rate = float(item["fundingRate"])
-                    rates.append(rate)
-                    timestamps.append(item.get("fundingTime", 0))
+            rates = to_matrix(rate_series, max(1, max(map(len, rate_series), default=0)))
+            lengths = series_lengths(rates)
             
+            # Calculate metrics for all symbols at once
+            avg_rates = np.nansum(rates, axis=1) / np.maximum(lengths, 1)
+            last_rates = rates[np.arange(len(symbols)), np.maximum(lengths - 1, 0)]
+            zscores = latest_zscore(rates)
+            percentiles = latest_percentile(rates)
+        except Exception as e:
+            self.logger.error(f"Error analyzing funding rates: {str(e)}", exc_info=True)
+            return {
+                symbol: {
+                    "symbol": symbol,
+                    "interval": interval,
+                    "error": f"Analysis failed: {str(e)}",
+                    "signal": "NEUTRAL",
+                    "confidence": 50,
+                    "reason": "Error in funding rate analysis"
+                }
+                for symbol in symbols
+            }
+        
+        results = {}
+        for row, symbol in enumerate(symbols):
             # If no valid rates, return neutral signal
-            if not rates:
-                return {
+            if lengths[row] == 0:
+                results[symbol] = {
                     "symbol": symbol,
                     "interval": interval,
                     "signal": "NEUTRAL",
                     "confidence": 50,
                     "reason": "No valid funding rate data"
                 }
-                
-            # Get latest rate
-            latest_rate = rates[0]
+                continue
             
-            # Calculate additional metrics
-            avg_rate = sum(rates) / len(rates)
-            rate_trend = latest_rate - rates[-1] if len(rates) > 1 else 0
-            
-            # Default values
-            signal = "HOLD"
-            confidence = 50
-            reason = "Neutral funding rate conditions"
+            # Get latest rate
+            latest_rate = float(rates[row, 0])
+            rate_trend = latest_rate - float(last_rates[row]) if lengths[row] > 1 else 0
             
             # Signal generation logic based on funding rate
             if latest_rate > self.high_funding_threshold:
@@ -294,16 +315,18 @@ class FundingRateAnalystAgent(BaseAnalystAgent):
             # Create detailed funding rate metrics
             funding_metrics = {
                 "current_rate": latest_rate,
-                "average_rate": avg_rate,
+                "average_rate": float(avg_rates[row]),
                 "rate_trend": rate_trend,
-                "rate_history": list(zip(timestamps, rates)),
+                "rate_zscore": float(zscores[row]),
+                "rate_percentile": float(percentiles[row]),
+                "rate_history": list(zip(time_series[row], rate_series[row])),
                 "rate_status": "high_positive" if latest_rate > self.high_funding_threshold else 
                               "high_negative" if latest_rate < -self.high_funding_threshold else 
                               "normal"
             }
             
             # Prepare final result
-            result = {
+            results[symbol] = {
                 "symbol": symbol,
                 "interval": interval,
                 "signal": signal,
@@ -314,18 +337,8 @@ class FundingRateAnalystAgent(BaseAnalystAgent):
             }
             
             self.logger.info(f"Funding rate analysis complete for {symbol}: {signal} with {confidence}% confidence")
-            return result
-            
-        except Exception as e:
-            self.logger.error(f"Error analyzing funding rates: {str(e)}", exc_info=True)
-            return {
-                "symbol": symbol,
-                "interval": interval,
-                "error": f"Analysis failed: {str(e)}",
-                "signal": "NEUTRAL",
-                "confidence": 50,
-                "reason": "Error in funding rate analysis"
-            }
+        
+        return results
 
 # Example usage (for demonstration)
 if __name__ == "__main__":
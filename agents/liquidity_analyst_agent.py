@@ -27,7 +27,9 @@ sys.path.append(parent_dir)
 # Import required modules
 from models.llm_client import LLMClient
 from data.database import DatabaseConnector
+from data.order_book import OrderBook
 from agents.base_agent import BaseAnalystAgent
+from utils.tracing import traced, AGENT
 from market_data_provider_factory import MarketDataProviderFactory
 
 def json_serializable(obj):
@@ -184,12 +186,13 @@ class LiquidityAnalystAgent(BaseAnalystAgent):
         
         return result
     
-    def preprocess_data(self, data: Dict[str, pd.DataFrame]) -> Dict[str, Any]:
+    def preprocess_data(self, data: Dict[str, Any]) -> Dict[str, Any]:
         """
         Preprocess and transform raw data for analysis.
         
         Args:
-            data: Dictionary of DataFrames with raw data
+            data: Raw data from fetch_data (market depth records, volume
+                profile records and funding rates)
             
         Returns:
             Dictionary with preprocessed data
@@ -198,28 +201,42 @@ class LiquidityAnalystAgent(BaseAnalystAgent):
         result = {}
         
         try:
-            # Process market depth data
-            if "market_depth" in data and not data["market_depth"].empty:
-                md = data["market_depth"]
-                
+            # Process market depth data (fetch_market_depth records, newest first)
+            if "market_depth" in data and len(data["market_depth"]) > 0:
+                books = [OrderBook.from_depth(record) for record in data["market_depth"]]
+                bid_depth = np.array([book.bid_total for book in books])
+                ask_depth = np.array([book.ask_total for book in books])
+                bid_ask_ratio = np.divide(bid_depth, ask_depth, out=np.ones_like(bid_depth), where=ask_depth > 0)
+
                 # Calculate basic statistics
                 result["depth_stats"] = {
-                    "avg_bid_depth": md["bid_depth"].mean(),
-                    "avg_ask_depth": md["ask_depth"].mean(),
-                    "avg_bid_ask_ratio": md["bid_ask_ratio"].mean(),
-                    "max_bid_depth": md["bid_depth"].max(),
-                    "max_ask_depth": md["ask_depth"].max(),
-                    "min_bid_ask_ratio": md["bid_ask_ratio"].min(),
-                    "max_bid_ask_ratio": md["bid_ask_ratio"].max(),
-                    "current_bid_ask_ratio": md.iloc[0]["bid_ask_ratio"] if len(md) > 0 else None
+                    "avg_bid_depth": float(bid_depth.mean()),
+                    "avg_ask_depth": float(ask_depth.mean()),
+                    "avg_bid_ask_ratio": float(bid_ask_ratio.mean()),
+                    "max_bid_depth": float(bid_depth.max()),
+                    "max_ask_depth": float(ask_depth.max()),
+                    "min_bid_ask_ratio": float(bid_ask_ratio.min()),
+                    "max_bid_ask_ratio": float(bid_ask_ratio.max()),
+                    "current_bid_ask_ratio": float(bid_ask_ratio[0])
                 }
-                
+
                 # Extract time series for visualization
-                result["depth_time_series"] = md[["timestamp", "bid_depth", "ask_depth", "bid_ask_ratio"]].head(20).to_dict(orient="records")
+                result["depth_time_series"] = [
+                    {
+                        "timestamp": book.timestamp,
+                        "bid_depth": float(bid),
+                        "ask_depth": float(ask),
+                        "bid_ask_ratio": float(ratio)
+                    }
+                    for book, bid, ask, ratio in zip(books[:20], bid_depth, ask_depth, bid_ask_ratio)
+                ]
             
             # Process volume profile data
-            if "volume_profile" in data and not data["volume_profile"].empty:
+            if "volume_profile" in data and len(data["volume_profile"]) > 0:
                 vp = data["volume_profile"]
+                if not isinstance(vp, pd.DataFrame):
+                    # DatabaseConnector.get_volume_profile returns records
+                    vp = pd.DataFrame(vp)
                 
                 # Group by price level and aggregate volume
                 volume_by_price = vp.groupby("price_level").agg({"volume": "sum"}).reset_index()
@@ -418,6 +435,7 @@ class LiquidityAnalystAgent(BaseAnalystAgent):
             self.logger.error(f"Error getting LLM analysis: {e}")
             return {"error": f"Error generating LLM analysis: {str(e)}"}
     
+    @traced(kind=AGENT)
     def analyze(self, 
                symbol: Optional[str] = None, 
                interval: Optional[str] = None,
@@ -506,12 +524,11 @@ class LiquidityAnalystAgent(BaseAnalystAgent):
         
         # Step 2: Analyze market depth directly
         try:
-            # Extract key metrics from depth data
-            bids = depth_data.get("bids", [])
-            asks = depth_data.get("asks", [])
+            # Load the order book into contiguous arrays
+            book = OrderBook.from_depth(depth_data, symbol=symbol)
             
             # Ensure we have data to work with
-            if not bids or not asks:
+            if not len(book.bids) or not len(book.asks):
                 self.logger.warning(f"Empty bids or asks in market depth data for {display_symbol}")
                 return {
                     "symbol": display_symbol,
@@ -522,38 +539,15 @@ class LiquidityAnalystAgent(BaseAnalystAgent):
                     "reason": "Order book data contains empty bids or asks"
                 }
             
-            # Calculate key metrics
-            bid_total = depth_data.get("bid_total", 0)
-            ask_total = depth_data.get("ask_total", 0)
-            
-            # If totals not pre-calculated, calculate them
-            if bid_total == 0 and len(bids) > 0:
-                bid_total = sum(float(bid[0]) * float(bid[1]) for bid in bids)
-            
-            if ask_total == 0 and len(asks) > 0:
-                ask_total = sum(float(ask[0]) * float(ask[1]) for ask in asks)
-            
-            # Calculate top 5 volumes if not provided
-            top_5_bid_volume = depth_data.get("top_5_bid_volume", 0)
-            top_5_ask_volume = depth_data.get("top_5_ask_volume", 0)
-            
-            if top_5_bid_volume == 0 and len(bids) >= 5:
-                top_5_bid_volume = sum(float(bid[0]) * float(bid[1]) for bid in bids[:5])
-            
-            if top_5_ask_volume == 0 and len(asks) >= 5:
-                top_5_ask_volume = sum(float(ask[0]) * float(ask[1]) for ask in asks[:5])
-            
-            # Calculate mid price and spread
-            if len(bids) > 0 and len(asks) > 0:
-                best_bid = float(bids[0][0])
-                best_ask = float(asks[0][0])
-                mid_price = (best_bid + best_ask) / 2
-                spread = best_ask - best_bid
-                spread_percent = (spread / mid_price) * 100
-            else:
-                mid_price = 0
-                spread = 0
-                spread_percent = 0
+            # Calculate key metrics (vectorized over all levels)
+            bid_total = book.bid_total
+            ask_total = book.ask_total
+            top_5 = book.top_volumes(5)
+            top_5_bid_volume = top_5["bid"]
+            top_5_ask_volume = top_5["ask"]
+            mid_price = book.mid_price
+            spread = book.spread
+            spread_percent = book.spread_percent
             
             # Calculate bid/ask imbalance
             bid_ask_ratio = bid_total / ask_total if ask_total > 0 else 1.0
@@ -613,8 +607,10 @@ class LiquidityAnalystAgent(BaseAnalystAgent):
                 "mid_price": mid_price,
                 "spread": spread,
                 "spread_percent": spread_percent,
-                "bids_count": len(bids),
-                "asks_count": len(asks)
+                "imbalance": book.imbalance(),
+                "top_5_imbalance": book.imbalance(5),
+                "bids_count": len(book.bids),
+                "asks_count": len(book.asks)
             }
             
             # Prepare final result
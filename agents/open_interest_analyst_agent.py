@@ -28,7 +28,18 @@ sys.path.append(parent_dir)
 # Import required modules
 from models.llm_client import LLMClient
 from data.database import DatabaseConnector
+from data.derivatives_service import derivatives_data
 from agents.base_agent import BaseAnalystAgent
+from utils.tracing import traced, AGENT, COMPUTE
+from analytics.derivatives_analytics import (
+    to_matrix,
+    series_lengths,
+    linear_slope,
+    trend_labels,
+    pearson_correlation,
+    oi_price_divergence,
+    nearest_align
+)
 from market_data_provider_factory import MarketDataProviderFactory
 
 class OpenInterestAnalystAgent(BaseAnalystAgent):
@@ -36,7 +47,7 @@ class OpenInterestAnalystAgent(BaseAnalystAgent):
     Open Interest Analyst Agent that analyzes futures market open interest.
     
     This agent:
-    - Fetches open interest data from Binance futures API
+    - Fetches open interest data from the shared derivatives data cache
     - Analyzes open interest trends in relation to price movements
     - Identifies potential market continuation or reversal points
     - Generates trading signals based on OI and price correlation
@@ -67,6 +78,7 @@ class OpenInterestAnalystAgent(BaseAnalystAgent):
         
         self.logger.info(f"Open Interest Analyst Agent initialized with timeframe {self.default_interval}")
         
+    @traced(kind=AGENT)
     def analyze(self, 
                symbol: Optional[str] = None, 
                interval: Optional[str] = None,
@@ -130,7 +142,10 @@ class OpenInterestAnalystAgent(BaseAnalystAgent):
             
     def fetch_open_interest(self, symbol: str, interval: str) -> List[Dict[str, Any]]:
         """
-        Fetch open interest data from Binance Futures API.
+        Fetch open interest data from the shared derivatives data cache.
+        
+        Open interest history is cached per symbol and period and only the
+        records published since the last fetch are requested.
         
         Args:
             symbol: Trading symbol (e.g., "BTCUSDT")
@@ -143,59 +158,27 @@ class OpenInterestAnalystAgent(BaseAnalystAgent):
             # Format symbol for API
             formatted_symbol = symbol.replace("/", "") if "/" in symbol else symbol
             
-            # Initialize data provider
             self.logger.info(f"Fetching open interest for {formatted_symbol} at {interval} interval")
+            oi_history = derivatives_data.get_open_interest(
+                formatted_symbol,
+                interval=interval,
+                limit=self.lookback_periods
+            )
             
-            # Create Binance provider directly to access futures API with API keys
-            # Import from root directory as it's located there
-            import sys
-            import os
-            # Add project root to path
-            script_dir = os.path.dirname(os.path.abspath(__file__))
-            project_root = os.path.dirname(script_dir)
-            if project_root not in sys.path:
-                sys.path.append(project_root)
-            from binance_data_provider import BinanceDataProvider
-            
-            api_key = os.environ.get('BINANCE_API_KEY')
-            api_secret = os.environ.get('BINANCE_API_SECRET')
-            
-            if not api_key or not api_secret:
-                self.logger.warning("Binance API keys not found in environment, using unauthorized access")
-                binance = BinanceDataProvider()
-            else:
-                self.logger.info("Using Binance API with authentication")
-                binance = BinanceDataProvider(api_key=api_key, api_secret=api_secret)
-            
-            try:
-                # Use the specialized method to get futures open interest data
-                oi_history = binance.fetch_futures_open_interest(
-                    symbol=formatted_symbol,
-                    interval=interval,
-                    limit=self.lookback_periods
-                )
-                
-                # Verify we got valid data
-                if not oi_history or not isinstance(oi_history, list):
-                    self.logger.error(f"Invalid open interest data returned for {formatted_symbol}")
-                    self.logger.error("Unable to fetch authentic open interest data - returning empty dataset")
-                    # Return empty dataset rather than generating simulated data
-                    return []
-                
-                # Fetch price data to correlate with open interest
-                price_data = self.fetch_price_data(formatted_symbol, interval)
-                
-                # Merge open interest data with corresponding price data
-                merged_data = self.merge_oi_with_price(oi_history, price_data)
-                    
-                self.logger.info(f"Successfully fetched and merged {len(merged_data)} open interest records")
-                return merged_data
-                
-            except Exception as fetch_error:
-                self.logger.error(f"Error accessing futures open interest API: {str(fetch_error)}")
-                self.logger.error("Unable to fetch authentic open interest data - returning empty dataset")
-                # No simulated data - return empty dataset to maintain data integrity
+            # Verify we got valid data
+            if not oi_history:
+                self.logger.error(f"Unable to fetch authentic open interest data for {formatted_symbol} - returning empty dataset")
+                # Return empty dataset rather than generating simulated data
                 return []
+            
+            # Fetch price data to correlate with open interest
+            price_data = self.fetch_price_data(formatted_symbol, interval)
+            
+            # Merge open interest data with corresponding price data
+            merged_data = self.merge_oi_with_price(oi_history, price_data)
+                
+            self.logger.info(f"Successfully fetched and merged {len(merged_data)} open interest records")
+            return merged_data
                 
         except Exception as e:
             self.logger.error(f"Error fetching open interest data: {str(e)}", exc_info=True)
@@ -301,43 +284,28 @@ class OpenInterestAnalystAgent(BaseAnalystAgent):
         Returns:
             List of merged records
         """
-        merged_data = []
+        # Align each OI record with the price record nearest in time
+        priced = [record for record in price_data if record.get("timestamp")]
+        oi_records = [record for record in oi_data if record.get("timestamp")]
+        if not priced or not oi_records:
+            return []
         
-        # Create a dictionary of price data keyed by timestamp for quick lookup
-        price_dict = {}
-        for price_record in price_data:
-            timestamp = price_record.get("timestamp")
-            if timestamp:
-                price_dict[timestamp] = price_record
+        oi_times = np.array([record["timestamp"] for record in oi_records], dtype=np.float64)
+        closes = nearest_align(
+            oi_times,
+            np.array([record["timestamp"] for record in priced], dtype=np.float64),
+            np.array([record.get("close", 0) for record in priced], dtype=np.float64)
+        )
         
-        # For each OI record, find the closest price record by timestamp
-        for oi_record in oi_data:
-            oi_timestamp = oi_record.get("timestamp")
-            if not oi_timestamp:
-                continue
-                
-            # Find the closest price record (exact or nearest)
-            if oi_timestamp in price_dict:
-                price_record = price_dict[oi_timestamp]
-            else:
-                # Find the nearest timestamp
-                nearest_timestamp = min(price_dict.keys(), key=lambda x: abs(x - oi_timestamp), default=None)
-                if nearest_timestamp:
-                    price_record = price_dict[nearest_timestamp]
-                else:
-                    continue  # Skip if no price data found
-            
-            # Merge the records
-            merged_record = {
-                "timestamp": oi_timestamp,
+        return [
+            {
+                "timestamp": oi_record["timestamp"],
                 "open_interest": float(oi_record.get("sumOpenInterest", 0)),
                 "open_interest_value": float(oi_record.get("sumOpenInterestValue", 0)),
-                "price": price_record.get("close", 0)
+                "price": float(close)
             }
-            
-            merged_data.append(merged_record)
-        
-        return merged_data
+            for oi_record, close in zip(oi_records, closes)
+        ]
             
     def analyze_open_interest(self, 
                              oi_data: List[Dict[str, Any]],
@@ -354,54 +322,67 @@ class OpenInterestAnalystAgent(BaseAnalystAgent):
         Returns:
             Analysis result with trading signal
         """
+        return self.analyze_open_interest_universe({symbol: oi_data}, interval)[symbol]
+    
+    @traced(kind=COMPUTE)
+    def analyze_open_interest_universe(self,
+                                       oi_by_symbol: Dict[str, List[Dict[str, Any]]],
+                                       interval: str) -> Dict[str, Dict[str, Any]]:
+        """
+        Analyze open interest for many symbols in one vectorized pass.
+        
+        Args:
+            oi_by_symbol: Merged open interest/price records (newest first) per symbol
+            interval: Time interval
+            
+        Returns:
+            Analysis result per symbol
+        """
+        symbols = list(oi_by_symbol)
         try:
             # Extract data series
-            timestamps = []
-            oi_values = []
-            prices = []
-            
-            for item in oi_data:
-                timestamps.append(item.get("timestamp", 0))
-                oi_values.append(item.get("open_interest", 0))
-                prices.append(item.get("price", 0))
-            
-            # Calculate changes in OI and price
-            oi_changes = []
-            price_changes = []
-            
-            for i in range(1, len(oi_values)):
-                oi_change = (oi_values[i-1] - oi_values[i]) / oi_values[i] if oi_values[i] > 0 else 0
-                price_change = (prices[i-1] - prices[i]) / prices[i] if prices[i] > 0 else 0
-                
-                oi_changes.append(oi_change)
-                price_changes.append(price_change)
-            
+            timestamps = [[item.get("timestamp", 0) for item in oi_by_symbol[s]] for s in symbols]
+            oi_values = to_matrix([[item.get("open_interest", 0) for item in oi_by_symbol[s]] for s in symbols])
+            prices = to_matrix([[item.get("price", 0) for item in oi_by_symbol[s]] for s in symbols])
+            lengths = series_lengths(oi_values)
+            
+            # Trends over the first 5 points, changes between points 0 and 4,
+            # correlation over the first 10 points
+            oi_trends = trend_labels(linear_slope(oi_values[:, :5]))
+            price_trends = trend_labels(linear_slope(prices[:, :5]))
+            divergence = oi_price_divergence(oi_values, prices, 0, 4)
+            correlations = pearson_correlation(oi_values[:, :10], prices[:, :10])
+        except Exception as e:
+            self.logger.error(f"Error analyzing open interest: {str(e)}", exc_info=True)
+            return {
+                symbol: {
+                    "symbol": symbol,
+                    "interval": interval,
+                    "error": f"Analysis failed: {str(e)}",
+                    "signal": "NEUTRAL",
+                    "confidence": 50,
+                    "reason": "Error in open interest analysis"
+                }
+                for symbol in symbols
+            }
+        
+        results = {}
+        for row, symbol in enumerate(symbols):
             # If insufficient data, return neutral signal
-            if len(oi_changes) < 3 or len(price_changes) < 3:
-                return {
+            if lengths[row] < 4:
+                results[symbol] = {
                     "symbol": symbol,
                     "interval": interval,
                     "signal": "NEUTRAL",
                     "confidence": 50,
                     "reason": "Insufficient data points for meaningful analysis"
                 }
+                continue
             
-            # Determine trends
-            oi_trend = self.determine_trend(oi_values[:5])
-            price_trend = self.determine_trend(prices[:5])
-            
-            # Get latest values
-            latest_oi = oi_values[0] if oi_values else 0
-            latest_price = prices[0] if prices else 0
-            
-            # Calculate percentage changes for recent periods
-            recent_oi_change = (oi_values[0] - oi_values[min(4, len(oi_values)-1)]) / oi_values[min(4, len(oi_values)-1)] if len(oi_values) > 4 and oi_values[min(4, len(oi_values)-1)] > 0 else 0
-            recent_price_change = (prices[0] - prices[min(4, len(prices)-1)]) / prices[min(4, len(prices)-1)] if len(prices) > 4 and prices[min(4, len(prices)-1)] > 0 else 0
-            
-            # Default values
-            signal = "HOLD"
-            confidence = 50
-            reason = "Neutral open interest conditions"
+            oi_trend = str(oi_trends[row])
+            price_trend = str(price_trends[row])
+            recent_oi_change = float(divergence["oi_change"][row])
+            recent_price_change = float(divergence["price_change"][row])
             
             # Signal generation logic based on OI and price trends
             if oi_trend == "rising" and price_trend == "rising" and recent_oi_change > self.oi_change_threshold:
@@ -435,18 +416,21 @@ class OpenInterestAnalystAgent(BaseAnalystAgent):
                 reason = f"No significant correlation between open interest ({recent_oi_change:.2%}) and price ({recent_price_change:.2%})"
             
             # Create detailed metrics
+            n = int(lengths[row])
             oi_metrics = {
-                "current_oi": latest_oi,
+                "current_oi": float(oi_values[row, 0]),
                 "oi_trend": oi_trend,
                 "price_trend": price_trend,
                 "recent_oi_change": recent_oi_change,
                 "recent_price_change": recent_price_change,
-                "oi_price_correlation": self.calculate_correlation(oi_values[:min(10, len(oi_values))], prices[:min(10, len(prices))]),
-                "data_points": list(zip(timestamps, oi_values, prices))
+                "oi_price_correlation": float(correlations[row]),
+                "oi_price_divergence": bool(divergence["divergence"][row]),
+                "divergence_score": float(divergence["score"][row]),
+                "data_points": list(zip(timestamps[row], oi_values[row, :n].tolist(), prices[row, :n].tolist()))
             }
             
             # Prepare final result
-            result = {
+            results[symbol] = {
                 "symbol": symbol,
                 "interval": interval,
                 "signal": signal,
@@ -457,18 +441,8 @@ class OpenInterestAnalystAgent(BaseAnalystAgent):
             }
             
             self.logger.info(f"Open interest analysis complete for {symbol}: {signal} with {confidence}% confidence")
-            return result
-            
-        except Exception as e:
-            self.logger.error(f"Error analyzing open interest: {str(e)}", exc_info=True)
-            return {
-                "symbol": symbol,
-                "interval": interval,
-                "error": f"Analysis failed: {str(e)}",
-                "signal": "NEUTRAL",
-                "confidence": 50,
-                "reason": "Error in open interest analysis"
-            }
+        
+        return results
     
     def determine_trend(self, values: List[float]) -> str:
         """
@@ -482,38 +456,7 @@ class OpenInterestAnalystAgent(BaseAnalystAgent):
         """
         if not values or len(values) < 2:
             return "flat"
-            
-        # Simple linear regression to determine slope
-        x = list(range(len(values)))
-        y = values
-        
-        if len(x) != len(y):
-            return "flat"
-            
-        n = len(x)
-        
-        # Calculate slope using least squares method
-        if n < 2:
-            return "flat"
-            
-        sum_x = sum(x)
-        sum_y = sum(y)
-        sum_xy = sum(x_val * y_val for x_val, y_val in zip(x, y))
-        sum_xx = sum(x_val ** 2 for x_val in x)
-        
-        # Avoid division by zero
-        if (n * sum_xx - sum_x ** 2) == 0:
-            return "flat"
-            
-        slope = (n * sum_xy - sum_x * sum_y) / (n * sum_xx - sum_x ** 2)
-        
-        # Determine trend based on slope
-        if slope > 0.001:
-            return "rising"
-        elif slope < -0.001:
-            return "falling"
-        else:
-            return "flat"
+        return str(trend_labels(linear_slope(to_matrix([values])))[0])
     
     def calculate_correlation(self, series1: List[float], series2: List[float]) -> float:
         """
@@ -530,27 +473,7 @@ class OpenInterestAnalystAgent(BaseAnalystAgent):
         min_len = min(len(series1), len(series2))
         if min_len < 2:
             return 0.0
-            
-        series1 = series1[:min_len]
-        series2 = series2[:min_len]
-        
-        # Calculate means
-        mean1 = sum(series1) / min_len
-        mean2 = sum(series2) / min_len
-        
-        # Calculate correlation coefficient
-        numerator = sum((series1[i] - mean1) * (series2[i] - mean2) for i in range(min_len))
-        denominator1 = sum((x - mean1) ** 2 for x in series1)
-        denominator2 = sum((x - mean2) ** 2 for x in series2)
-        
-        # Avoid division by zero
-        if denominator1 == 0 or denominator2 == 0:
-            return 0.0
-            
-        correlation = numerator / ((denominator1 ** 0.5) * (denominator2 ** 0.5))
-        
-        # Clamp to [-1, 1] range
-        return max(-1.0, min(1.0, correlation))
+        return float(pearson_correlation(to_matrix([series1[:min_len]]), to_matrix([series2[:min_len]]))[0])
 
 # Example usage (for demonstration)
 if __name__ == "__main__":
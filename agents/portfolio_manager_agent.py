@@ -4,6 +4,18 @@ Portfolio Manager Agent Module
 This agent tracks portfolio allocations, open positions, and controls exposure risk
 for the aGENtrader v2 system. It validates trades against risk limits and provides
 portfolio state information.
+
+Positions, balances and realized PnL are kept in the shared PortfolioState
+(core/trading/portfolio_state.py), which the trade book and risk guard read
+as well. This agent's positions are owned by PORTFOLIO_BOOK, so its
+position counts and closes never touch the trade book's entries. The state
+maintains exposure totals incrementally, so exposure checks do not scan the
+open positions.
+
+Periodic snapshots are built from an immutable state snapshot, so taking
+one never waits on trade processing, and are appended to a binary
+SnapshotLog (core/trading/snapshot_log.py) whose index serves equity
+curves without parsing the snapshots.
 """
 
 import os
@@ -23,6 +35,12 @@ sys.path.append(parent_dir)
 
 # Import the base agent class
 from agents.base_agent import BaseAnalystAgent
+from core.trading.mark_to_market import MarkToMarketService, normalize_symbol
+from core.trading.portfolio_state import (
+    PortfolioState, PortfolioSnapshot, Book, PORTFOLIO_BOOK, portfolio_state as shared_portfolio_state
+)
+from core.trading.snapshot_log import SnapshotLog
+from utils.metrics import open_positions, unrealized_pnl
 
 class TradeValidationStatus(Enum):
     """Enum for trade validation status"""
@@ -41,9 +59,16 @@ class PortfolioManagerAgent(BaseAnalystAgent):
     - Logs portfolio state periodically
     """
     
-    def __init__(self):
-        """Initialize the Portfolio Manager Agent."""
+    def __init__(self, portfolio_state: Optional[PortfolioState] = None):
+        """
+        Initialize the Portfolio Manager Agent.
+        
+        Args:
+            portfolio_state: Portfolio state holding positions and balances
+                (default: the process-wide state shared with the other agents)
+        """
         super().__init__(agent_name="portfolio_manager")
+        self.state = portfolio_state or shared_portfolio_state
         
         # Get portfolio manager specific configuration
         self.portfolio_config = self.get_agent_config()
@@ -54,7 +79,6 @@ class PortfolioManagerAgent(BaseAnalystAgent):
         # Initialize portfolio state
         self.base_currency = self.portfolio_config.get("base_currency", "USDT")
         self.starting_balance = self.trading_config.get("starting_balance", 10000)
-        self.current_balance = self.starting_balance
         self.initial_portfolio_value = self.starting_balance
         
         # Risk limits
@@ -62,14 +86,6 @@ class PortfolioManagerAgent(BaseAnalystAgent):
         self.max_per_asset_exposure_pct = self.portfolio_config.get("max_per_asset_exposure_pct", 35)
         self.max_open_trades = self.portfolio_config.get("max_open_trades", 10)
         
-        # Initialize portfolio holdings
-        self.holdings = {
-            self.base_currency: self.current_balance
-        }
-        
-        # Track open positions
-        self.open_positions = {}  # trade_id -> position_data
-        
         # Track historical allocations for analysis
         self.allocation_history = []
         
@@ -85,7 +101,13 @@ class PortfolioManagerAgent(BaseAnalystAgent):
         
         # File paths
         self.trade_log_file = os.path.join(parent_dir, "trades", "trade_log.jsonl")
-        self.snapshot_file = os.path.join(self.portfolio_dir, "portfolio_snapshot.jsonl")
+        self.snapshot_log = SnapshotLog(
+            self.portfolio_dir,
+            retention_days=self.portfolio_config.get("snapshot_retention_days", 7),
+            resolution_minutes=self.portfolio_config.get("snapshot_compaction_minutes", 60),
+            compact_every=self.portfolio_config.get("snapshot_compact_every", 1000)
+        )
+        self.snapshot_file = self.snapshot_log.log_path
         
         # Load existing trades to initialize the portfolio state
         self._load_existing_trades()
@@ -98,6 +120,32 @@ class PortfolioManagerAgent(BaseAnalystAgent):
         self.logger.info(f"Max exposure limits: {self.max_total_exposure_pct}% total, {self.max_per_asset_exposure_pct}% per asset")
         self.logger.info(f"Max open trades: {self.max_open_trades}")
     
+    @property
+    def open_positions(self) -> Dict[str, Dict[str, Any]]:
+        """Open positions of this agent by trade id (from the current portfolio snapshot)."""
+        return {position['trade_id']: position for position in self.state.snapshot().open_positions(PORTFOLIO_BOOK)}
+    
+    @property
+    def holdings(self) -> Dict[str, float]:
+        """Asset balances, starting from the configured balance in the base currency."""
+        return self._holdings(self.state.snapshot())
+    
+    @property
+    def current_balance(self) -> float:
+        """Starting balance plus realized PnL."""
+        return self.starting_balance + self.state.snapshot().realized_pnl
+    
+    @staticmethod
+    def _position_id(trade_id: Any) -> str:
+        """Portfolio state id of this agent's position for a trade (kept apart from trade book ids)."""
+        return f"{PORTFOLIO_BOOK}:{trade_id}"
+    
+    def _holdings(self, snapshot: PortfolioSnapshot) -> Dict[str, float]:
+        """Asset balances in a snapshot."""
+        holdings = dict(snapshot.balances)
+        holdings[self.base_currency] = self.starting_balance + holdings.get(self.base_currency, 0.0)
+        return holdings
+    
     def _load_existing_trades(self) -> None:
         """
         Load existing trades from the trade log and initialize portfolio state.
@@ -108,7 +156,7 @@ class PortfolioManagerAgent(BaseAnalystAgent):
             self.logger.warning(f"Trade log file not found at {self.trade_log_file}")
             return
         
-        try:
+        def replay(book: Book) -> int:
             trades = []
             with open(self.trade_log_file, 'r') as f:
                 for line in f:
@@ -121,23 +169,30 @@ class PortfolioManagerAgent(BaseAnalystAgent):
             
             for trade in trades:
                 if trade.get('status') == 'open':
-                    self._add_open_position(trade)
+                    self._add_open_position(trade, book)
                 elif trade.get('status') == 'closed':
-                    self._process_closed_trade(trade)
+                    self._process_closed_trade(trade, book)
+            return len(trades)
+        
+        try:
+            # Another agent on the same portfolio state may already have replayed the log
+            if not self.state.load_journal(os.path.abspath(self.trade_log_file), replay):
+                self.logger.info("Trade log already loaded into the portfolio state")
             
-            self.logger.info(f"Loaded {len(trades)} trades from trade log")
-            self.logger.info(f"Current portfolio state: {len(self.open_positions)} open positions")
+            self.logger.info(f"Current portfolio state: {self.state.snapshot().count(PORTFOLIO_BOOK)} open positions")
             self.logger.info(f"Current balance: {self.current_balance} {self.base_currency}")
         
         except Exception as e:
             self.logger.error(f"Error loading trades: {e}")
     
-    def _add_open_position(self, trade: Dict[str, Any]) -> None:
+    def _add_open_position(self, trade: Dict[str, Any], book: Optional[Book] = None) -> None:
         """
         Add an open position to the portfolio.
         
         Args:
             trade: Trade data dictionary
+            book: Portfolio state book to apply the change to when already on
+                the state's writer (journal replay); otherwise a command is sent
         """
         trade_id = trade.get('trade_id')
         pair = trade.get('pair')
@@ -170,21 +225,18 @@ class PortfolioManagerAgent(BaseAnalystAgent):
         position_size = trade.get('position_size', 0)
         position_value = position_size * entry_price
         
-        # Update holdings
+        # Holdings changes
         if action == "BUY":
-            # Subtract quote currency (e.g., USDT)
-            self.holdings[quote] = self.holdings.get(quote, 0) - position_value
-            # Add base currency (e.g., BTC)
-            self.holdings[base] = self.holdings.get(base, 0) + position_size
-        
+            # Subtract quote currency (e.g., USDT), add base currency (e.g., BTC)
+            deltas = {quote: -position_value, base: position_size}
         elif action == "SELL":
-            # Add quote currency (e.g., USDT)
-            self.holdings[quote] = self.holdings.get(quote, 0) + position_value
-            # Subtract base currency (e.g., BTC)
-            self.holdings[base] = self.holdings.get(base, 0) - position_size
+            # Add quote currency (e.g., USDT), subtract base currency (e.g., BTC)
+            deltas = {quote: position_value, base: -position_size}
+        else:
+            deltas = {}
         
-        # Add to open positions
-        self.open_positions[trade_id] = {
+        position = {
+            'position_id': self._position_id(trade_id),
             'trade_id': trade_id,
             'pair': pair,
             'base': base,
@@ -198,14 +250,25 @@ class PortfolioManagerAgent(BaseAnalystAgent):
             'unrealized_pnl_pct': 0.0
         }
         
+        def apply(book: Book) -> None:
+            book.adjust(deltas)
+            book.open(position, PORTFOLIO_BOOK)
+        
+        if book is not None:
+            apply(book)
+        else:
+            self.state.execute(apply)
+        
         self.logger.info(f"Added open position: {action} {position_size} {base} at {entry_price} {quote}")
     
-    def _process_closed_trade(self, trade: Dict[str, Any]) -> None:
+    def _process_closed_trade(self, trade: Dict[str, Any], book: Optional[Book] = None) -> None:
         """
         Process a closed trade and update portfolio state.
         
         Args:
             trade: Trade data dictionary
+            book: Portfolio state book to apply the change to when already on
+                the state's writer (journal replay); otherwise a command is sent
         """
         trade_id = trade.get('trade_id')
         pair = trade.get('pair')
@@ -238,28 +301,31 @@ class PortfolioManagerAgent(BaseAnalystAgent):
         exit_price = trade.get('exit_price', 0)
         position_size = trade.get('position_size', 0)
         
-        # If this was previously an open position, remove it
-        if trade_id in self.open_positions:
-            self.open_positions.pop(trade_id)
-        
         # Update balance based on PnL
         pnl_percentage = trade.get('pnl_percentage', 0)
         position_value = position_size * entry_price
         pnl_value = position_value * (pnl_percentage / 100)
         
-        # Update current balance
-        self.current_balance += pnl_value
-        
         # Update holdings based on closing the position
         if action == "BUY":
             # Close a long position
-            self.holdings[base] = self.holdings.get(base, 0) - position_size
-            self.holdings[quote] = self.holdings.get(quote, 0) + (position_size * exit_price)
-        
+            deltas = {base: -position_size, quote: position_size * exit_price}
         elif action == "SELL":
             # Close a short position
-            self.holdings[base] = self.holdings.get(base, 0) + position_size
-            self.holdings[quote] = self.holdings.get(quote, 0) - (position_size * exit_price)
+            deltas = {base: position_size, quote: -(position_size * exit_price)}
+        else:
+            deltas = {}
+        
+        def apply(book: Book) -> None:
+            # If this was previously an open position, close it
+            book.close(self._position_id(trade_id), exit_price=exit_price, pnl_percentage=pnl_percentage)
+            book.realize(pnl_value)
+            book.adjust(deltas)
+        
+        if book is not None:
+            apply(book)
+        else:
+            self.state.execute(apply)
         
         self.logger.debug(f"Processed closed trade: {trade_id}, PnL: {pnl_percentage}%, Value: {pnl_value} {quote}")
     
@@ -287,7 +353,7 @@ class PortfolioManagerAgent(BaseAnalystAgent):
             }
         
         # Check max open trades limit
-        if len(self.open_positions) >= self.max_open_trades:
+        if self.state.snapshot().count(PORTFOLIO_BOOK) >= self.max_open_trades:
             return {
                 "status": TradeValidationStatus.REJECTED.value,
                 "reason": f"Maximum open trades limit ({self.max_open_trades}) reached"
@@ -350,32 +416,31 @@ class PortfolioManagerAgent(BaseAnalystAgent):
         Returns:
             Portfolio value in base currency
         """
-        # Start with base currency balance
-        total_value = self.holdings.get(self.base_currency, 0)
-        
-        # Add value of open positions
-        for position in self.open_positions.values():
-            total_value += position.get('position_value', 0)
-        
-        return total_value
+        return self._portfolio_value(self.state.snapshot())
+    
+    def _portfolio_value(self, snapshot: PortfolioSnapshot) -> float:
+        """Portfolio value in base currency for a snapshot."""
+        # Base currency balance plus the value of open positions
+        return self._holdings(snapshot).get(self.base_currency, 0) + snapshot.total_exposure
     
-    def get_total_exposure_pct(self) -> float:
+    def get_total_exposure_pct(self, snapshot: Optional[PortfolioSnapshot] = None) -> float:
         """
         Calculate the total portfolio exposure as a percentage.
         
+        Args:
+            snapshot: Portfolio snapshot to use (default: the current one)
+        
         Returns:
             Total exposure percentage
         """
-        portfolio_value = self.get_portfolio_value()
+        snapshot = snapshot or self.state.snapshot()
+        portfolio_value = self._portfolio_value(snapshot)
         
         if portfolio_value <= 0:
             return 0.0
         
-        # Sum the value of all open positions
-        total_position_value = sum(position.get('position_value', 0) for position in self.open_positions.values())
-        
-        # Calculate percentage
-        exposure_pct = (total_position_value / portfolio_value) * 100
+        # Calculate percentage of the value of all open positions
+        exposure_pct = (snapshot.total_exposure / portfolio_value) * 100
         
         return exposure_pct
     
@@ -389,36 +454,34 @@ class PortfolioManagerAgent(BaseAnalystAgent):
         Returns:
             Asset exposure percentage
         """
-        portfolio_value = self.get_portfolio_value()
+        snapshot = self.state.snapshot()
+        portfolio_value = self._portfolio_value(snapshot)
         
         if portfolio_value <= 0:
             return 0.0
         
-        # Sum the value of positions in this asset
-        asset_position_value = sum(
-            position.get('position_value', 0) 
-            for position in self.open_positions.values() 
-            if position.get('base') == asset
-        )
-        
-        # Calculate percentage
-        exposure_pct = (asset_position_value / portfolio_value) * 100
+        # Calculate percentage of the value of positions in this asset
+        exposure_pct = (snapshot.asset_exposure(asset) / portfolio_value) * 100
         
         return exposure_pct
     
-    def get_portfolio_summary(self) -> Dict[str, Any]:
+    def get_portfolio_summary(self, snapshot: Optional[PortfolioSnapshot] = None) -> Dict[str, Any]:
         """
-        Generate a summary of the current portfolio state.
+        Generate a summary of the portfolio state.
+        
+        Args:
+            snapshot: Portfolio snapshot to summarize (default: the current one)
         
         Returns:
             Dictionary with portfolio summary data
         """
-        portfolio_value = self.get_portfolio_value()
-        total_exposure = self.get_total_exposure_pct()
+        snapshot = snapshot or self.state.snapshot()
+        portfolio_value = self._portfolio_value(snapshot)
+        total_exposure = self.get_total_exposure_pct(snapshot)
         
         # Calculate asset allocations
         asset_allocations = {}
-        for asset, amount in self.holdings.items():
+        for asset, amount in self._holdings(snapshot).items():
             if asset == self.base_currency:
                 allocation_pct = (amount / portfolio_value) * 100
                 asset_allocations[asset] = {
@@ -427,7 +490,7 @@ class PortfolioManagerAgent(BaseAnalystAgent):
                 }
         
         # Add allocations for open positions
-        for position in self.open_positions.values():
+        for position in snapshot.open_positions(PORTFOLIO_BOOK):
             base = position.get('base')
             if base not in asset_allocations:
                 asset_allocations[base] = {
@@ -449,7 +512,7 @@ class PortfolioManagerAgent(BaseAnalystAgent):
             "portfolio_value": portfolio_value,
             "base_currency": self.base_currency,
             "total_exposure_pct": total_exposure,
-            "open_positions_count": len(self.open_positions),
+            "open_positions_count": snapshot.count(PORTFOLIO_BOOK),
             "asset_allocations": asset_allocations,
             "pnl": {
                 "value": pnl_value,
@@ -462,60 +525,84 @@ class PortfolioManagerAgent(BaseAnalystAgent):
             }
         }
     
-    def update_position_prices(self) -> None:
+    def update_position_prices(self, prices: Optional[Dict[str, float]] = None) -> None:
         """
         Update the prices of all open positions and calculate unrealized PnL.
+        
+        All symbols are priced with a single batched request through the
+        MarkToMarketService and PnL is computed for every position in one pass.
+        
+        Args:
+            prices: Optional pre-fetched mapping of symbol (without "/") -> price.
+                If omitted, prices are fetched from the agent's data provider.
         """
-        # This would normally fetch current market prices
-        # For now, we'll use a simplified approach
-        # In a full implementation, this would connect to the market data fetcher
         self.logger.debug("Updating position prices")
         
-        # For simplicity, we'll use a dummy approach to get market prices
-        # In a real implementation, this would use the proper MarketDataFetcher methods
+        # Positions opened by this agent
+        positions = self.state.snapshot().open_positions(PORTFOLIO_BOOK)
+        
+        if not positions:
+            open_positions.labels("portfolio").set(0)
+            unrealized_pnl.labels("portfolio").set(0.0)
+            self.state.record_equity(self.get_portfolio_value())
+            return
+        
+        mark_to_market = MarkToMarketService(self.data_provider)
+        
+        if prices is None:
+            prices = mark_to_market.fetch_prices(p.get('pair') for p in positions)
+        
+        # Fallback prices for symbols the provider could not price (or when no
+        # data provider is attached, e.g. in demo mode)
         default_prices = {
-            "BTC/USDT": 85000.0,
-            "ETH/USDT": 3500.0,
-            "BNB/USDT": 600.0,
-            "SOL/USDT": 160.0,
-            "DOGE/USDT": 0.1,
-            "XRP/USDT": 0.5
+            "BTCUSDT": 85000.0,
+            "ETHUSDT": 3500.0,
+            "BNBUSDT": 600.0,
+            "SOLUSDT": 160.0,
+            "DOGEUSDT": 0.1,
+            "XRPUSDT": 0.5
         }
+        prices = dict(prices)
+        for position in positions:
+            symbol = normalize_symbol(position.get('pair', ''))
+            if symbol not in prices:
+                entry_price = position.get('entry_price', 0)
+                prices[symbol] = default_prices.get(symbol, entry_price * 1.01)  # Default 1% up
+        
+        updates = mark_to_market.mark_positions(
+            positions, prices, symbol_key='pair', value_key='position_value'
+        )
         
-        for trade_id, position in self.open_positions.items():
-            pair = position.get('pair')
-            entry_price = position.get('entry_price', 0)
+        marks = {}
+        for position, update in zip(positions, updates):
+            if update is None:
+                continue
             
-            try:
-                # Get current price (using simple fallback for now)
-                # In a real implementation, this would call market_fetcher.get_ticker(pair)
-                current_price = default_prices.get(pair, entry_price * 1.01)  # Default 1% up
-                
-                if current_price:
-                    action = position.get('action')
-                    
-                    # Calculate unrealized PnL
-                    if action == "BUY":
-                        # Long position
-                        pnl_pct = ((current_price - entry_price) / entry_price) * 100
-                    elif action == "SELL":
-                        # Short position
-                        pnl_pct = ((entry_price - current_price) / entry_price) * 100
-                    else:
-                        pnl_pct = 0
-                    
-                    position_value = position.get('position_value', 0)
-                    unrealized_pnl = position_value * (pnl_pct / 100)
-                    
-                    # Update position data
-                    position['current_price'] = current_price
-                    position['unrealized_pnl'] = unrealized_pnl
-                    position['unrealized_pnl_pct'] = pnl_pct
-                    
-                    self.logger.debug(f"Updated position {trade_id}: Current price: {current_price}, Unrealized PnL: {pnl_pct:.2f}%")
+            marks[position['position_id']] = {
+                'current_price': update['current_price'],
+                'unrealized_pnl': update['unrealized_pnl'],
+                'unrealized_pnl_pct': update['pnl_pct']
+            }
             
-            except Exception as e:
-                self.logger.error(f"Error updating price for {pair}: {e}")
+            self.logger.debug(
+                f"Updated position {position.get('trade_id')}: Current price: {update['current_price']}, "
+                f"Unrealized PnL: {update['pnl_pct']:.2f}%"
+            )
+        
+        total_unrealized = sum(marks.get(p['position_id'], p).get('unrealized_pnl', 0.0) for p in positions)
+        equity = self.get_portfolio_value() + total_unrealized
+        
+        # Positions in published snapshots are never modified; replace them and
+        # record the marked equity (for drawdown tracking) in one command
+        def apply(book: Book) -> None:
+            for position_id, fields in marks.items():
+                book.mark(position_id, **fields)
+            book.record_equity(equity)
+        
+        self.state.execute(apply)
+        
+        open_positions.labels("portfolio").set(len(positions))
+        unrealized_pnl.labels("portfolio").set(total_unrealized)
     
     def _start_snapshot_thread(self) -> None:
         """
@@ -545,7 +632,7 @@ class PortfolioManagerAgent(BaseAnalystAgent):
     
     def take_portfolio_snapshot(self) -> Dict[str, Any]:
         """
-        Take a snapshot of the current portfolio state and save it to file.
+        Take a snapshot of the current portfolio state and save it to the snapshot log.
         
         Returns:
             Portfolio snapshot data
@@ -554,21 +641,20 @@ class PortfolioManagerAgent(BaseAnalystAgent):
             # Update position prices
             self.update_position_prices()
             
-            # Get portfolio summary
-            snapshot = self.get_portfolio_summary()
+            # Summarize one immutable state snapshot (positions and totals agree)
+            state = self.state.snapshot()
+            snapshot = self.get_portfolio_summary(state)
             
             # Add open positions details
-            snapshot['open_positions'] = list(self.open_positions.values())
+            snapshot['open_positions'] = state.open_positions(PORTFOLIO_BOOK)
             
-            # Add timestamp if not present
-            if 'timestamp' not in snapshot:
-                snapshot['timestamp'] = datetime.now().isoformat()
+            # Save to the snapshot log, keyed by time with the marked equity; the
+            # time lives in the index, so unchanged portfolios share one payload
+            equity = state.equity if state.equity is not None else snapshot['portfolio_value']
+            payload = {key: value for key, value in snapshot.items() if key != 'timestamp'}
+            self.snapshot_log.append(time.time(), equity, payload, version=state.version)
             
-            # Save to file
-            with open(self.snapshot_file, 'a') as f:
-                f.write(json.dumps(snapshot) + "\n")
-            
-            self.logger.info(f"Portfolio snapshot taken: {len(self.open_positions)} open positions, {snapshot['portfolio_value']:.2f} {self.base_currency}")
+            self.logger.info(f"Portfolio snapshot taken: {state.count(PORTFOLIO_BOOK)} open positions, {snapshot['portfolio_value']:.2f} {self.base_currency}")
             
             # Add to history
             self.allocation_history.append(snapshot)
@@ -579,6 +665,23 @@ class PortfolioManagerAgent(BaseAnalystAgent):
             self.logger.error(f"Error taking portfolio snapshot: {e}")
             return {}
     
+    def load_equity_curve(self, start=None, end=None) -> List[Dict[str, Any]]:
+        """
+        Load portfolio equity from the snapshot log index.
+        
+        Args:
+            start: First time to include (epoch seconds, datetime or ISO string)
+            end: Last time to include
+            
+        Returns:
+            List of {"timestamp", "equity"} points in time order
+        """
+        timestamps, equity = self.snapshot_log.equity_curve(start, end)
+        return [
+            {"timestamp": datetime.fromtimestamp(ts).isoformat(), "equity": value}
+            for ts, value in zip(timestamps.tolist(), equity.tolist())
+        ]
+    
     def analyze(self,
                symbol: Optional[str] = None,
                interval: Optional[str] = None,
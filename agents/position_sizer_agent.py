@@ -7,11 +7,11 @@ confidence level, market volatility, or a combination of both factors.
 """
 
 import logging
-import math
 import os
-import statistics
 from typing import Dict, Any, Optional, List
-import yaml
+
+from utils.config import load_cached_config
+from core.trading.volatility import VolatilityCache, VolatilityEstimator, CLOSE_TO_CLOSE, volatility_cache as shared_volatility_cache
 
 # Setup logger
 logger = logging.getLogger("aGENtrader.position_sizer")
@@ -26,12 +26,15 @@ class PositionSizerAgent:
     - Combined: Weighted combination of confidence and volatility
     """
     
-    def __init__(self, config_path: str = "config/settings.yaml"):
+    def __init__(self, config_path: str = "config/settings.yaml",
+                 volatility_cache: Optional[VolatilityCache] = None):
         """
         Initialize the position sizer agent.
         
         Args:
             config_path: Path to settings file
+            volatility_cache: Volatility estimates per symbol and interval
+                (default: the shared cache, unless the configured lookback differs)
         """
         self.config = self._load_config(config_path)
         
@@ -59,6 +62,14 @@ class PositionSizerAgent:
             "volatility_multiplier": 2.0,
             "max_volatility": 0.05
         })
+        self.volatility_model = self.volatility_settings.get("model", CLOSE_TO_CLOSE)
+        
+        # Share volatility estimates with the risk guard when the windows agree
+        lookback = self.volatility_settings.get("lookback_periods", 14)
+        if volatility_cache is None:
+            volatility_cache = (shared_volatility_cache if lookback == shared_volatility_cache.lookback
+                                else VolatilityCache(lookback))
+        self.volatility_cache = volatility_cache
         
         # Combined strategy weights
         self.combined_weights = self.config.get("position_sizing", {}).get("combined_weights", {
@@ -80,8 +91,7 @@ class PositionSizerAgent:
         """
         try:
             if os.path.exists(config_path):
-                with open(config_path, 'r') as file:
-                    return yaml.safe_load(file)
+                return load_cached_config(config_path)
             else:
                 logger.warning(f"Configuration file {config_path} not found. Using defaults.")
                 return {}
@@ -94,7 +104,8 @@ class PositionSizerAgent:
         symbol: str, 
         confidence: float, 
         volatility: Optional[float] = None,
-        price_data: Optional[List[Dict[str, float]]] = None
+        price_data: Optional[List[Dict[str, float]]] = None,
+        interval: Optional[str] = None
     ) -> float:
         """
         Calculate the appropriate position size based on the configured strategy.
@@ -104,6 +115,7 @@ class PositionSizerAgent:
             confidence: Confidence level (0-100)
             volatility: Pre-calculated volatility (optional)
             price_data: Historical price data for volatility calculation (optional)
+            interval: Candle interval of price_data (keys the volatility cache)
             
         Returns:
             Position size as a proportion of capital (0.01-1.0)
@@ -120,8 +132,8 @@ class PositionSizerAgent:
         
         elif self.strategy == "volatility":
             # Calculate volatility if not provided
-            if volatility is None and price_data is not None:
-                volatility = self._calculate_volatility(price_data)
+            if volatility is None:
+                volatility = self._calculate_volatility(price_data, symbol, interval)
             
             # Default volatility if still None
             volatility = volatility if volatility is not None else 0.02  # 2% default
@@ -131,8 +143,8 @@ class PositionSizerAgent:
         
         elif self.strategy == "combined":
             # Calculate volatility if not provided
-            if volatility is None and price_data is not None:
-                volatility = self._calculate_volatility(price_data)
+            if volatility is None:
+                volatility = self._calculate_volatility(price_data, symbol, interval)
             
             # Default volatility if still None
             volatility = volatility if volatility is not None else 0.02  # 2% default
@@ -222,13 +234,21 @@ class PositionSizerAgent:
         
         return position_size
     
-    def _calculate_volatility(self, price_data: List[Dict[str, float]]) -> float:
+    def _calculate_volatility(
+        self,
+        price_data: Optional[List[Dict[str, float]]],
+        symbol: Optional[str] = None,
+        interval: Optional[str] = None
+    ) -> float:
         """
-        Calculate market volatility from historical price data.
-        Uses standard deviation of log returns.
+        Look up market volatility in the volatility cache.
+        Uses the configured model (standard deviation of log returns by default).
         
         Args:
-            price_data: List of price dictionaries with 'close' key
+            price_data: List of price dictionaries with 'close' key, fed to the
+                cache first (optional when the cache already has the symbol)
+            symbol: Trading symbol
+            interval: Candle interval
             
         Returns:
             Volatility as a decimal (e.g., 0.02 for 2%)
@@ -236,23 +256,26 @@ class PositionSizerAgent:
         lookback = self.volatility_settings.get("lookback_periods", 14)
         
         # Ensure we have enough data
-        if len(price_data) < lookback + 1:
+        if price_data is not None and len(price_data) < lookback + 1:
             logger.warning(f"Insufficient price data for volatility calculation. Need {lookback + 1}, got {len(price_data)}")
             return 0.02  # Default 2% volatility
         
         try:
-            # Calculate daily log returns
-            closes = [candle["close"] for candle in price_data[-lookback-1:]]
-            log_returns = [math.log(closes[i] / closes[i-1]) for i in range(1, len(closes))]
-            
-            # Calculate standard deviation of log returns
-            volatility = statistics.stdev(log_returns)
-            
-            # Convert to annualized volatility if needed (for daily data: * sqrt(252))
-            # For hourly data: * sqrt(24 * 365)
-            # Here we're assuming the volatility is already properly scaled for the timeframe
-            
-            return volatility
+            # Volatility is per candle of the given interval (not annualized)
+            if symbol is not None:
+                volatility = self.volatility_cache.volatility(symbol, interval, price_data, self.volatility_model)
+            elif price_data is not None:
+                # Without a symbol there is nothing to cache under
+                estimator = VolatilityEstimator(lookback)
+                for candle in price_data[-lookback-1:]:
+                    estimator.add(candle)
+                volatility = estimator.estimate(self.volatility_model)
+            else:
+                volatility = None
         except Exception as e:
             logger.error(f"Error calculating volatility: {e}")
-            return 0.02  # Default 2% volatility
\ No newline at end of file
+            volatility = None
+        
+        if volatility is None:
+            return 0.02  # Default 2% volatility
+        return volatility
\ No newline at end of file
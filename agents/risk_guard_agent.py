@@ -4,6 +4,12 @@ RiskGuardAgent for aGENtrader v2.1
 
 This agent evaluates trading decisions for risk compliance before execution.
 It acts as a final safety check to prevent trades that exceed risk thresholds.
+
+Executed trades and open positions are read from the shared PortfolioState
+(core/trading/portfolio_state.py), so the checks see the same portfolio as
+the portfolio manager and the trade book. Trade frequency is checked against
+rolling 1h/24h/7d counters and drawdown against tracked peak equity, so every
+check is constant-time however many trades have been made.
 """
 
 import json
@@ -13,7 +19,9 @@ import time
 from datetime import datetime, timedelta
 from typing import Dict, Any, Tuple, Optional, List
 
-import yaml
+from utils.config import config_cache, load_cached_config
+from core.trading.portfolio_state import PortfolioState, TRADE_BOOK, trade_time, portfolio_state as shared_portfolio_state
+from core.trading.volatility import VolatilityCache, CLOSE_TO_CLOSE, volatility_cache as shared_volatility_cache
 
 # Setup logger
 logger = logging.getLogger("aGENtrader.risk_guard")
@@ -30,40 +38,62 @@ class RiskGuardAgent:
     - Tracking drawdown limits
     """
     
-    def __init__(self, config_path: str = "config/settings.yaml", trade_book_manager=None):
+    def __init__(self, config_path: str = "config/settings.yaml", trade_book_manager=None,
+                 portfolio_state: Optional[PortfolioState] = None,
+                 volatility_cache: Optional[VolatilityCache] = None):
         """
         Initialize the risk guard agent.
         
         Args:
             config_path: Path to settings file
             trade_book_manager: Optional TradeBookManager instance for checking open positions
+                (default: the open positions of the portfolio state)
+            portfolio_state: Portfolio state holding positions and trade history
+                (default: the process-wide state shared with the other agents)
+            volatility_cache: Volatility estimates used when a trade carries
+                no volatility (default: the shared cache)
         """
         self.config_path = config_path
         self.config = self._load_config(config_path)
         self.trade_book = trade_book_manager
+        self.state = portfolio_state or shared_portfolio_state
+        self.volatility_cache = volatility_cache or shared_volatility_cache
         
         # Setup rejected trades log
         self.rejected_log_path = "logs/rejected_trades.jsonl"
         os.makedirs(os.path.dirname(self.rejected_log_path), exist_ok=True)
         
-        # Initialize trade history tracking
-        self.trade_history = []
-        self.last_trade_time = 0
-        
         # Extract risk guard settings
         self.enabled = self.config.get("risk_guard", {}).get("enabled", True)
         self.max_position_size = self.config.get("risk_guard", {}).get("max_position_size", 0.30)
         self.max_confidence = self.config.get("risk_guard", {}).get("max_confidence", 95)
         self.min_confidence = self.config.get("risk_guard", {}).get("min_confidence", 40)
         self.max_volatility = self.config.get("risk_guard", {}).get("max_volatility", 0.07)
+        self.volatility_model = self.config.get("risk_guard", {}).get("volatility_model", CLOSE_TO_CLOSE)
         self.max_concurrent_positions = self.config.get("risk_guard", {}).get("max_concurrent_positions", 3)
+        self.max_hourly_trades = self.config.get("risk_guard", {}).get("max_hourly_trades")
         self.max_daily_trades = self.config.get("risk_guard", {}).get("max_daily_trades", 10)
+        self.max_weekly_trades = self.config.get("risk_guard", {}).get("max_weekly_trades")
         self.min_trade_interval = self.config.get("risk_guard", {}).get("min_trade_interval", 3600)
         self.max_drawdown = self.config.get("risk_guard", {}).get("max_drawdown", 0.15)
         self.restricted_symbols = self.config.get("risk_guard", {}).get("restricted_symbols", [])
         
+        # Pick up edits to the settings file without a restart
+        config_cache.subscribe(config_path, self.reload_config)
+        
         logger.info(f"RiskGuardAgent initialized (enabled: {self.enabled})")
     
+    @property
+    def trade_history(self) -> List[Dict[str, Any]]:
+        """Executed trades, oldest first (from the current portfolio snapshot)."""
+        return list(self.state.snapshot().history)
+    
+    @property
+    def last_trade_time(self) -> float:
+        """Epoch seconds of the most recent executed trade (0 if none)."""
+        history = self.state.snapshot().history
+        return trade_time(history[-1]) if history else 0
+    
     def _load_config(self, config_path: str) -> Dict[str, Any]:
         """
         Load configuration from YAML file.
@@ -76,8 +106,7 @@ class RiskGuardAgent:
         """
         try:
             if os.path.exists(config_path):
-                with open(config_path, 'r') as file:
-                    return yaml.safe_load(file)
+                return load_cached_config(config_path)
             else:
                 logger.warning(f"Configuration file {config_path} not found. Using defaults.")
                 return {}
@@ -97,7 +126,9 @@ class RiskGuardAgent:
                 - position_size: Position size (0.0-1.0)
                 - confidence: Confidence level (0-100)
                 Optional keys:
-                - volatility: Market volatility
+                - volatility: Market volatility (default: the cached
+                  estimate for the symbol and interval)
+                - interval: Candle interval of the volatility estimate
                 - timestamp: Trade timestamp
         
         Returns:
@@ -127,7 +158,7 @@ class RiskGuardAgent:
         checks = [
             self._check_position_size(position_size),
             self._check_confidence(confidence),
-            self._check_volatility(volatility),
+            self._check_volatility(volatility, symbol, trade_payload.get("interval")),
             self._check_concurrent_positions(symbol),
             self._check_trade_frequency(),
             self._check_restricted_symbols(symbol),
@@ -146,6 +177,56 @@ class RiskGuardAgent:
         logger.info(f"Trade accepted: {symbol} {action}")
         return True, None
     
+    def check_candidate(self, trade_payload: Dict[str, Any]) -> Tuple[bool, Optional[str]]:
+        """
+        Run the checks that depend only on the trade itself.
+        
+        Used by batch evaluation, which checks portfolio-wide limits (open
+        positions, trade frequency, drawdown) once per batch instead. The
+        trade is not logged when rejected.
+        
+        Args:
+            trade_payload: Dictionary with trade information (see evaluate_trade)
+        
+        Returns:
+            Tuple with (accepted, reason)
+        """
+        checks = [
+            self._check_position_size(trade_payload.get("position_size", 0.0)),
+            self._check_confidence(trade_payload.get("confidence", 0)),
+            self._check_volatility(trade_payload.get("volatility"), trade_payload.get("symbol"),
+                                   trade_payload.get("interval")),
+            self._check_restricted_symbols(trade_payload.get("symbol"))
+        ]
+        failures = [reason for accepted, reason in checks if not accepted and reason is not None]
+        return (False, "; ".join(failures)) if failures else (True, None)
+    
+    def check_portfolio(self) -> Tuple[bool, Optional[str]]:
+        """Run the checks that apply to every trade alike (currently drawdown)."""
+        return self._check_drawdown()
+    
+    def remaining_trades(self, now: Optional[float] = None) -> Optional[int]:
+        """
+        Trades still allowed by the frequency limits.
+        
+        Args:
+            now: Current time in epoch seconds (default: time.time())
+        
+        Returns:
+            Number of trades allowed now (None if unlimited); at most 1 while
+            a minimum trade interval is configured, since the next trade
+            restarts it
+        """
+        now = time.time() if now is None else now
+        if now - self.last_trade_time < self.min_trade_interval:
+            return 0
+        
+        limits = [("1h", self.max_hourly_trades), ("24h", self.max_daily_trades), ("7d", self.max_weekly_trades)]
+        remaining = [limit - self.state.trade_count(window, now) for window, limit in limits if limit is not None]
+        if self.min_trade_interval > 0:
+            remaining.append(1)
+        return max(0, min(remaining)) if remaining else None
+    
     def _check_position_size(self, position_size: float) -> Tuple[bool, Optional[str]]:
         """Check if position size exceeds maximum allowed."""
         if position_size > self.max_position_size:
@@ -168,8 +249,11 @@ class RiskGuardAgent:
             
         return True, None
     
-    def _check_volatility(self, volatility: Optional[float]) -> Tuple[bool, Optional[str]]:
-        """Check if volatility exceeds maximum allowed."""
+    def _check_volatility(self, volatility: Optional[float], symbol: Any = None,
+                          interval: Optional[str] = None) -> Tuple[bool, Optional[str]]:
+        """Check if volatility (given, or cached for the symbol) exceeds maximum allowed."""
+        if volatility is None and symbol:
+            volatility = self.volatility_cache.get(symbol, interval, self.volatility_model)
         if volatility is None:
             # If volatility isn't provided, we can't check it
             return True, None
@@ -182,18 +266,27 @@ class RiskGuardAgent:
     
     def _check_concurrent_positions(self, symbol: Any) -> Tuple[bool, Optional[str]]:
         """Check if adding this position would exceed max concurrent positions."""
-        if not self.trade_book or symbol is None:
-            # If no trade book manager is provided or no symbol, we can't check open positions
+        if symbol is None:
+            # Without a symbol we can't check open positions
             return True, None
-            
-        open_positions = self.trade_book.list_open_trades()
+        
+        if self.trade_book:
+            open_positions = self.trade_book.list_open_trades()
+            has_position = any(pos.get("symbol") == symbol for pos in open_positions)
+            open_count = len(open_positions)
+        else:
+            # Executed trades are the trade book's positions; the portfolio
+            # manager's entries for the same trades are not counted again
+            snapshot = self.state.snapshot()
+            has_position = snapshot.has_position(symbol, TRADE_BOOK)
+            open_count = snapshot.count(TRADE_BOOK)
         
         # If we already have a position for this symbol, it's a replacement, so no impact on count
-        if any(pos.get("symbol") == symbol for pos in open_positions):
+        if has_position:
             return True, None
             
-        if len(open_positions) >= self.max_concurrent_positions:
-            reason = f"Too many concurrent positions: {len(open_positions)} >= {self.max_concurrent_positions}"
+        if open_count >= self.max_concurrent_positions:
+            reason = f"Too many concurrent positions: {open_count} >= {self.max_concurrent_positions}"
             logger.warning(reason)
             return False, reason
         return True, None
@@ -208,17 +301,20 @@ class RiskGuardAgent:
             logger.warning(reason)
             return False, reason
             
-        # Count daily trades
-        today = datetime.now().date()
-        today_start_time = datetime.combine(today, datetime.min.time()).timestamp()
-        
-        daily_trades = len([t for t in self.trade_history 
-                           if t.get("timestamp", 0) >= today_start_time])
-        
-        if daily_trades >= self.max_daily_trades:
-            reason = f"Daily trade limit reached: {daily_trades} >= {self.max_daily_trades}"
-            logger.warning(reason)
-            return False, reason
+        # Count trades in the rolling windows
+        limits = [
+            ("1h", "Hourly", self.max_hourly_trades),
+            ("24h", "Daily", self.max_daily_trades),
+            ("7d", "Weekly", self.max_weekly_trades)
+        ]
+        for window, label, limit in limits:
+            if limit is None:
+                continue
+            trades = self.state.trade_count(window, current_time)
+            if trades >= limit:
+                reason = f"{label} trade limit reached: {trades} >= {limit} in the last {window}"
+                logger.warning(reason)
+                return False, reason
             
         return True, None
     
@@ -235,10 +331,22 @@ class RiskGuardAgent:
     
     def _check_drawdown(self) -> Tuple[bool, Optional[str]]:
         """Check if current drawdown exceeds maximum allowed."""
-        # This would need access to portfolio performance metrics
-        # Placeholder for now
+        drawdown = self.state.snapshot().drawdown
+        if drawdown > self.max_drawdown:
+            reason = f"Drawdown too deep: {drawdown:.2%} > {self.max_drawdown:.2%}"
+            logger.warning(reason)
+            return False, reason
         return True, None
     
+    def update_equity(self, equity: float) -> None:
+        """
+        Record the current portfolio equity for drawdown tracking.
+        
+        Args:
+            equity: Portfolio equity in quote currency
+        """
+        self.state.record_equity(equity)
+    
     def record_trade(self, trade_payload: Dict[str, Any]):
         """
         Record a trade that was executed.
@@ -250,15 +358,8 @@ class RiskGuardAgent:
         if "timestamp" not in trade_payload:
             trade_payload["timestamp"] = time.time()
             
-        # Update last trade time
-        self.last_trade_time = trade_payload["timestamp"]
-        
-        # Add to history
-        self.trade_history.append(trade_payload.copy())
-        
-        # Keep trade history manageable (retain last 100 trades)
-        if len(self.trade_history) > 100:
-            self.trade_history = self.trade_history[-100:]
+        # Add to the shared history (bounded by the portfolio state)
+        self.state.record_trade(trade_payload)
     
     def _log_rejected_trade(self, trade_payload: Dict[str, Any], reason: str):
         """
@@ -268,18 +369,30 @@ class RiskGuardAgent:
             trade_payload: Dictionary with trade information
             reason: Reason for rejection
         """
+        self.log_rejected_trades([(trade_payload, reason)])
+    
+    def log_rejected_trades(self, rejections: List[Tuple[Dict[str, Any], str]]):
+        """
+        Log rejected trades to the rejected trades log with a single write.
+        
+        Args:
+            rejections: List of (trade_payload, reason) tuples
+        """
         try:
-            # Create a log entry with rejection details
-            log_entry = trade_payload.copy()
-            log_entry["timestamp"] = log_entry.get("timestamp", datetime.now().isoformat())
-            log_entry["rejection_reason"] = reason
-            log_entry["rejection_time"] = datetime.now().isoformat()
+            lines = []
+            for trade_payload, reason in rejections:
+                # Create a log entry with rejection details
+                log_entry = trade_payload.copy()
+                log_entry["timestamp"] = log_entry.get("timestamp", datetime.now().isoformat())
+                log_entry["rejection_reason"] = reason
+                log_entry["rejection_time"] = datetime.now().isoformat()
+                lines.append(json.dumps(log_entry, default=str) + '\n')
+                
+                logger.info(f"Trade rejected: {log_entry.get('symbol')} - {reason}")
             
             # Append to the log file
             with open(self.rejected_log_path, 'a') as f:
-                f.write(json.dumps(log_entry) + '\n')
-                
-            logger.info(f"Trade rejected: {log_entry['symbol']} - {reason}")
+                f.writelines(lines)
                 
         except Exception as e:
             logger.error(f"Error logging rejected trade: {e}")
@@ -294,8 +407,11 @@ class RiskGuardAgent:
         self.max_confidence = self.config.get("risk_guard", {}).get("max_confidence", 95)
         self.min_confidence = self.config.get("risk_guard", {}).get("min_confidence", 40)
         self.max_volatility = self.config.get("risk_guard", {}).get("max_volatility", 0.07)
+        self.volatility_model = self.config.get("risk_guard", {}).get("volatility_model", CLOSE_TO_CLOSE)
         self.max_concurrent_positions = self.config.get("risk_guard", {}).get("max_concurrent_positions", 3)
+        self.max_hourly_trades = self.config.get("risk_guard", {}).get("max_hourly_trades")
         self.max_daily_trades = self.config.get("risk_guard", {}).get("max_daily_trades", 10)
+        self.max_weekly_trades = self.config.get("risk_guard", {}).get("max_weekly_trades")
         self.min_trade_interval = self.config.get("risk_guard", {}).get("min_trade_interval", 3600)
         self.max_drawdown = self.config.get("risk_guard", {}).get("max_drawdown", 0.15)
         self.restricted_symbols = self.config.get("risk_guard", {}).get("restricted_symbols", [])
@@ -16,6 +16,7 @@ from datetime import datetime
 from agents.base_agent import BaseAnalystAgent
 from core.logging.decision_logger import decision_logger
 from models.llm_client import LLMClient
+from utils.tracing import traced, AGENT
 
 # Configure logging
 logging.basicConfig(
@@ -70,6 +71,7 @@ class SentimentAggregatorAgent(BaseAnalystAgent):
         self.sentiment_log_path = os.path.join('logs', 'sentiment_feed.jsonl')
         os.makedirs(os.path.dirname(self.sentiment_log_path), exist_ok=True)
     
+    @traced(kind=AGENT)
     def analyze(self, symbol: Optional[str] = None, interval: Optional[str] = None, **kwargs) -> Dict[str, Any]:
         """
         Analyze market sentiment for a specific symbol.
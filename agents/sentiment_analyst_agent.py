@@ -28,8 +28,10 @@ sys.path.append(parent_dir)
 # Import required modules
 from models.llm_client import LLMClient
 from data.database import DatabaseConnector
+from data.sentiment_store import SentimentHistoryStore
 from utils.config import get_config
 from agents.base_agent import BaseAnalystAgent
+from utils.tracing import traced, AGENT
 
 # Define sentiment states as enum for type safety
 class SentimentState(Enum):
@@ -101,16 +103,10 @@ class SentimentAnalystAgent(BaseAnalystAgent):
             "Bearish": 0.6
         })
         
-        # Set up storage for recent sentiment data
-        self.sentiment_history = []
+        # Set up storage for recent sentiment data (bounded per symbol, indexed on disk)
         self.sentiment_log_file = os.path.join(parent_dir, "logs/sentiment_feed.jsonl")
         self.max_history_size = 100
-        
-        # Create logs directory if it doesn't exist
-        os.makedirs(os.path.dirname(self.sentiment_log_file), exist_ok=True)
-        
-        # Load existing sentiment history if available
-        self._load_sentiment_history()
+        self.sentiment_store = SentimentHistoryStore(self.sentiment_log_file, max_recent=self.max_history_size)
         
         # Set default parameters
         self.default_symbol = self.trading_config.get("default_pair", "BTC/USDT").replace("/", "")
@@ -118,24 +114,6 @@ class SentimentAnalystAgent(BaseAnalystAgent):
         
         self.logger.info(f"Sentiment Analyst Agent initialized with data mode: {self.data_mode}")
     
-    def _load_sentiment_history(self) -> None:
-        """Load sentiment history from the log file."""
-        if not os.path.exists(self.sentiment_log_file):
-            self.logger.info(f"No sentiment history found at {self.sentiment_log_file}")
-            return
-        
-        try:
-            with open(self.sentiment_log_file, 'r') as f:
-                self.sentiment_history = [json.loads(line) for line in f.readlines()]
-            
-            # Keep only the most recent entries
-            if len(self.sentiment_history) > self.max_history_size:
-                self.sentiment_history = self.sentiment_history[-self.max_history_size:]
-                
-            self.logger.info(f"Loaded {len(self.sentiment_history)} sentiment history records")
-        except Exception as e:
-            self.logger.error(f"Error loading sentiment history: {e}")
-    
     def _save_sentiment_data(self, data: Dict[str, Any]) -> None:
         """
         Save sentiment data to the history log file.
@@ -144,20 +122,11 @@ class SentimentAnalystAgent(BaseAnalystAgent):
             data: Sentiment data dictionary
         """
         try:
-            # Add the data to the history
-            self.sentiment_history.append(data)
-            
-            # Keep only the most recent entries
-            if len(self.sentiment_history) > self.max_history_size:
-                self.sentiment_history = self.sentiment_history[-self.max_history_size:]
-            
-            # Append to the log file
-            with open(self.sentiment_log_file, 'a') as f:
-                f.write(json.dumps(data) + '\n')
-                
+            self.sentiment_store.append(data)
         except Exception as e:
             self.logger.error(f"Error saving sentiment data: {e}")
     
+    @traced(kind=AGENT)
     def analyze(self, 
                symbol: Optional[str] = None, 
                interval: Optional[str] = None,
@@ -184,7 +153,7 @@ class SentimentAnalystAgent(BaseAnalystAgent):
         result = {
             "symbol": symbol_str,
             "interval": interval_str,
-            "timestamp": self.format_timestamp(),
+            "timestamp": datetime.datetime.now().isoformat(),
             "sentiment_source": self.data_mode,
             "sentiment_data": {},
             "analysis": {}
@@ -199,6 +168,11 @@ class SentimentAnalystAgent(BaseAnalystAgent):
             analysis = self.process_sentiment_data(sentiment_data, symbol_str)
             result["analysis"] = analysis
             
+            # Signal fields read by validate_result and the DecisionAgent
+            result["signal"] = analysis["action"]
+            result["confidence"] = analysis["confidence"]
+            result["reason"] = analysis["reason"]
+            
             # Validate the result
             result = self.validate_result(result)
             
@@ -331,7 +305,7 @@ class SentimentAnalystAgent(BaseAnalystAgent):
         
         # Return comprehensive mock sentiment data
         return {
-            "timestamp": self.format_timestamp(),
+            "timestamp": datetime.datetime.now().isoformat(),
             "symbol": symbol,
             "interval": interval,
             "sentiment": sentiment,
@@ -484,18 +458,7 @@ class SentimentAnalystAgent(BaseAnalystAgent):
         Returns:
             List of recent sentiment data dictionaries
         """
-        if not self.sentiment_history:
-            return []
-        
-        # Filter by symbol if specified
-        if symbol:
-            history = [item for item in self.sentiment_history if item.get("symbol") == symbol]
-        else:
-            history = self.sentiment_history.copy()
-        
-        # Sort by timestamp (newest first) and limit
-        history.sort(key=lambda x: x.get("timestamp", ""), reverse=True)
-        return history[:limit]
+        return self.sentiment_store.recent(symbol, limit)
     
     def get_sentiment_trend(self, 
                           symbol: str,
@@ -510,10 +473,10 @@ class SentimentAnalystAgent(BaseAnalystAgent):
         Returns:
             Dictionary with sentiment trend analysis
         """
-        # Get sentiment history for the symbol
-        history = self.get_recent_sentiment_history(symbol)
+        # Rolling per-day counts for the symbol
+        sentiment_counts = self.sentiment_store.sentiment_counts(symbol, days)
         
-        if not history:
+        if not any(sentiment_counts.values()):
             return {
                 "symbol": symbol,
                 "trend": "UNKNOWN",
@@ -524,18 +487,6 @@ class SentimentAnalystAgent(BaseAnalystAgent):
                 "neutral_count": 0
             }
         
-        # Count sentiment occurrences
-        sentiment_counts = {
-            "BULLISH": 0,
-            "BEARISH": 0,
-            "NEUTRAL": 0
-        }
-        
-        for item in history:
-            sentiment = item.get("analysis", {}).get("sentiment", "NEUTRAL").upper()
-            if sentiment in sentiment_counts:
-                sentiment_counts[sentiment] += 1
-        
         # Calculate the dominant sentiment
         max_sentiment = max(sentiment_counts.items(), key=lambda x: x[1])
         dominant_sentiment = max_sentiment[0]
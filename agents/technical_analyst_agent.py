@@ -11,11 +11,13 @@ import json
 import logging
 import numpy as np
 import pandas as pd
-from typing import Dict, Any, List, Optional, Tuple
+from typing import Dict, Any, List, Optional, Tuple, Union
 from datetime import datetime
 
 from agents.base_agent import BaseAnalystAgent
+from data.klines import to_frame as klines_to_frame
 from core.logging.decision_logger import decision_logger
+from utils.tracing import traced, AGENT, COMPUTE
 
 # Configure logging
 logging.basicConfig(
@@ -96,7 +98,12 @@ class TechnicalAnalystAgent(BaseAnalystAgent):
         # Set confidence thresholds
         self.strong_signal_threshold = 75  # Confidence above this is considered a strong signal
         self.weak_signal_threshold = 30    # Confidence below this is considered a weak signal
+        
+        # Optional indicator cache (e.g. core.backtest.indicator_cache.IndicatorCache)
+        # shared across runs that replay the same candles with different settings
+        self.indicator_cache = None
     
+    @traced(kind=AGENT)
     def analyze(
         self, 
         symbol: Optional[str] = None, 
@@ -134,20 +141,30 @@ class TechnicalAnalystAgent(BaseAnalystAgent):
                     "Data fetcher not provided"
                 )
             
-            # Get OHLCV data
-            ohlcv_data = self.data_fetcher.fetch_ohlcv(symbol, interval)
+            # Get OHLCV data, as a kline array when the fetcher can decode one
+            fetch_klines = getattr(self.data_fetcher, "fetch_klines", None)
+            if fetch_klines is not None:
+                ohlcv_data = fetch_klines(symbol, interval)
+            else:
+                ohlcv_data = self.data_fetcher.fetch_ohlcv(symbol, interval)
             
-            if not ohlcv_data or len(ohlcv_data) < 30:  # Need enough data for analysis
+            data_points = len(ohlcv_data) if ohlcv_data is not None else 0
+            if data_points < 30:  # Need enough data for analysis
                 return self.build_error_response(
                     "INSUFFICIENT_DATA",
-                    f"Insufficient data points for analysis. Got {len(ohlcv_data) if ohlcv_data else 0}, need at least 30."
+                    f"Insufficient data points for analysis. Got {data_points}, need at least 30."
                 )
                 
             # Convert data to DataFrame for easier analysis
             df = self._prepare_dataframe(ohlcv_data)
             
             # Calculate technical indicators
-            indicators_df = self._calculate_indicators(df)
+            if self.indicator_cache is not None:
+                indicators_df = self.indicator_cache.get_or_compute(
+                    symbol, interval, df, self.indicators, self._calculate_indicators
+                )
+            else:
+                indicators_df = self._calculate_indicators(df)
             
             # Generate trading signals from indicators
             signals, confidence, explanation = self._generate_signals(indicators_df)
@@ -204,16 +221,21 @@ class TechnicalAnalystAgent(BaseAnalystAgent):
                 f"Error performing technical analysis: {str(e)}"
             )
     
-    def _prepare_dataframe(self, ohlcv_data: List[Dict[str, Any]]) -> pd.DataFrame:
+    def _prepare_dataframe(self, ohlcv_data: Union[List[Dict[str, Any]], np.ndarray]) -> pd.DataFrame:
         """
         Convert OHLCV data to a pandas DataFrame.
         
         Args:
-            ohlcv_data: List of OHLCV data dictionaries
+            ohlcv_data: List of OHLCV data dictionaries, or a kline array
+                (see data.klines) whose columns are used as they are
             
         Returns:
             pandas DataFrame with OHLCV data
         """
+        # Kline arrays are already typed and named
+        if isinstance(ohlcv_data, np.ndarray) and ohlcv_data.dtype.names:
+            return klines_to_frame(ohlcv_data)
+        
         # Create DataFrame
         df = pd.DataFrame(ohlcv_data)
         
@@ -274,6 +296,7 @@ class TechnicalAnalystAgent(BaseAnalystAgent):
         logger.debug(f"Processed dataframe with columns: {df.columns.tolist()}")
         return df
     
+    @traced(kind=COMPUTE)
     def _calculate_indicators(self, df: pd.DataFrame) -> pd.DataFrame:
         """
         Calculate technical indicators from OHLCV data.
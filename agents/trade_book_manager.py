@@ -5,6 +5,12 @@ TradeBookManager for aGENtrader v2
 This module provides trade tracking and persistence functionality, allowing
 the system to track open positions, avoid redundant entries, and maintain
 a history of all trades for analysis.
+
+Open and closed trades live in the shared PortfolioState
+(core/trading/portfolio_state.py) as TRADE_BOOK positions, so the risk guard
+and the orchestrator see the same trades; this manager adds the
+one-position-per-symbol rules and the trade log file, and only ever looks up,
+replaces or closes its own positions (not the portfolio manager's).
 """
 
 import json
@@ -13,6 +19,11 @@ import os
 from datetime import datetime
 from typing import Dict, List, Optional, Any
 
+from core.trading.mark_to_market import normalize_symbol
+from core.trading.portfolio_state import (
+    PortfolioState, Book, TRADE_BOOK, position_symbol, portfolio_state as shared_portfolio_state
+)
+
 # Setup logger
 logger = logging.getLogger("aGENtrader.trade_book")
 
@@ -27,45 +38,64 @@ class TradeBookManager:
     - Prevent redundant trade entries
     """
     
-    def __init__(self, trade_log_path: str = "logs/trade_book.jsonl"):
+    def __init__(self, trade_log_path: str = "logs/trade_book.jsonl",
+                 portfolio_state: Optional[PortfolioState] = None):
         """
         Initialize the trade book manager.
         
         Args:
             trade_log_path: Path to the trade log file
+            portfolio_state: Portfolio state holding the trades (default: the
+                process-wide state shared with the other agents)
         """
         self.trade_log_path = trade_log_path
-        self.open_trades = {}  # Dict of symbol -> trade info
-        self.closed_trades = []  # List of closed trades
+        self.state = portfolio_state or shared_portfolio_state
         
         # Ensure the log directory exists
         os.makedirs(os.path.dirname(trade_log_path), exist_ok=True)
         
-        # Load existing trades from disk if available
+        # Load existing trades from disk unless another manager already did
         self._load_trades_from_disk()
         
         logger.info(f"TradeBookManager initialized with {len(self.open_trades)} open trades")
     
+    @property
+    def open_trades(self) -> Dict[str, Dict[str, Any]]:
+        """Open trades by symbol (from the current portfolio snapshot)."""
+        return {trade["symbol"]: trade for trade in self.state.snapshot().open_positions(TRADE_BOOK)}
+    
+    @property
+    def closed_trades(self) -> List[Dict[str, Any]]:
+        """Closed trades, oldest first (from the current portfolio snapshot)."""
+        return self.state.snapshot().closed_trades(TRADE_BOOK)
+    
     def _load_trades_from_disk(self) -> None:
-        """Load existing trades from the trade log file."""
+        """Load existing trades from the trade log file into the portfolio state."""
         if not os.path.exists(self.trade_log_path):
             logger.info(f"No existing trade log found at {self.trade_log_path}")
             return
         
-        try:
+        def replay(book: Book) -> None:
             with open(self.trade_log_path, 'r') as f:
                 for line in f:
                     try:
                         trade = json.loads(line.strip())
-                        if trade.get("status") == "open":
-                            self.open_trades[trade["symbol"]] = trade
-                        else:
-                            self.closed_trades.append(trade)
                     except json.JSONDecodeError:
                         logger.warning(f"Failed to parse trade log line: {line}")
                         continue
-            
-            logger.info(f"Loaded {len(self.open_trades)} open trades and {len(self.closed_trades)} closed trades")
+                    
+                    # Each update appends the whole record, so the latest line for a symbol wins
+                    existing = book.position_for(trade.get("symbol", ""), TRADE_BOOK)
+                    if existing is not None:
+                        book.remove(existing["position_id"])
+                    if trade.get("status") == "open":
+                        book.open(trade, TRADE_BOOK)
+                    else:
+                        book.archive(trade, TRADE_BOOK)
+        
+        try:
+            if self.state.load_journal(os.path.abspath(self.trade_log_path), replay):
+                logger.info(f"Loaded {len(self.open_trades)} open trades and {len(self.closed_trades)} closed trades")
         
         except Exception as e:
             logger.error(f"Error loading trades from disk: {e}")
@@ -96,22 +126,29 @@ class TradeBookManager:
         trade["position_size"] = trade.get("position_size", 1.0)
         
         # If we already have an open trade for this symbol, close it first
-        if trade["symbol"] in self.open_trades:
+        # (in the same command, so no other writer can slip in between)
+        def apply(book: Book):
+            replaced = book.position_for(trade["symbol"], TRADE_BOOK)
+            closed = None
+            if replaced is not None:
+                closed = book.close(
+                    replaced["position_id"],
+                    **self._closing_fields(replaced, trade["entry_price"], None, "Replaced by new trade")
+                )
+            return closed, book.open(trade, TRADE_BOOK)
+        
+        closed, opened = self.state.execute(apply)
+        trade["position_id"] = opened["position_id"]
+        
+        if closed is not None:
             logger.warning(
-                f"Already have an open {self.open_trades[trade['symbol']]['action']} trade for {trade['symbol']}. "
-                f"Closing it before opening a new {trade['action']} position."
+                f"Already had an open {closed['action']} trade for {trade['symbol']}. "
+                f"Closed it before opening a new {trade['action']} position."
             )
-            self.close_trade(
-                trade["symbol"], 
-                exit_price=trade["entry_price"],
-                reason="Replaced by new trade"
-            )
-        
-        # Store the trade
-        self.open_trades[trade["symbol"]] = trade
+            self._log_closed_trade(closed)
         
         # Persist to disk
-        self._append_trade_to_log(trade)
+        self._append_trade_to_log(opened)
         
         logger.info(
             f"Recorded new {trade['action']} trade for {trade['symbol']} "
@@ -137,42 +174,53 @@ class TradeBookManager:
         Returns:
             Closed trade information or None if no open trade found
         """
-        if symbol not in self.open_trades:
+        def apply(book: Book) -> Optional[Dict[str, Any]]:
+            trade = book.position_for(symbol, TRADE_BOOK)
+            if trade is None:
+                return None
+            return book.close(trade["position_id"], **self._closing_fields(trade, exit_price, pnl, reason))
+        
+        trade = self.state.execute(apply)
+        if trade is None:
             logger.warning(f"Cannot close trade - no open trade found for {symbol}")
             return None
         
-        # Get the open trade
-        trade = self.open_trades[symbol]
-        
-        # Update trade information
-        trade["status"] = "closed"
-        trade["exit_timestamp"] = datetime.utcnow().isoformat()
-        trade["exit_price"] = exit_price
-        trade["close_reason"] = reason
+        self._log_closed_trade(trade)
+        return trade
+    
+    def _closing_fields(
+        self,
+        trade: Dict[str, Any],
+        exit_price: Optional[float],
+        pnl: Optional[float],
+        reason: str
+    ) -> Dict[str, Any]:
+        """Fields set on a trade when it is closed."""
+        fields = {
+            "exit_timestamp": datetime.utcnow().isoformat(),
+            "exit_price": exit_price,
+            "close_reason": reason
+        }
         
         # Calculate P&L if possible
         if pnl is not None:
-            trade["pnl"] = pnl
+            fields["pnl"] = pnl
         elif exit_price is not None and "entry_price" in trade:
             direction = 1 if trade["action"] == "BUY" else -1
-            trade["pnl"] = direction * (exit_price - trade["entry_price"]) * trade["position_size"]
-        
-        # Move to closed trades
-        del self.open_trades[symbol]
-        self.closed_trades.append(trade)
-        
-        # Persist updated trade to disk
+            fields["pnl"] = direction * (exit_price - trade["entry_price"]) * trade["position_size"]
+        return fields
+    
+    def _log_closed_trade(self, trade: Dict[str, Any]) -> None:
+        """Persist and log a trade that was just closed."""
         self._append_trade_to_log(trade)
         
         logger.info(
-            f"Closed {trade['action']} trade for {symbol} "
-            f"with reason: {reason}"
+            f"Closed {trade['action']} trade for {trade['symbol']} "
+            f"with reason: {trade['close_reason']}"
         )
         
         if "pnl" in trade:
             logger.info(f"Trade P&L: {trade['pnl']:.4f}")
-        
-        return trade
     
     def get_open_trade(self, symbol: str) -> Optional[Dict[str, Any]]:
         """
@@ -184,7 +232,7 @@ class TradeBookManager:
         Returns:
             Dictionary with trade information or None if no open trade
         """
-        return self.open_trades.get(symbol)
+        return self.state.snapshot().position_for(symbol, TRADE_BOOK)
     
     def get_position_direction(self, symbol: str) -> Optional[str]:
         """
@@ -206,7 +254,7 @@ class TradeBookManager:
         Returns:
             List of open trade dictionaries
         """
-        return list(self.open_trades.values())
+        return self.state.snapshot().open_positions(TRADE_BOOK)
     
     def get_trade_history(self, symbol: Optional[str] = None) -> List[Dict[str, Any]]:
         """
@@ -218,10 +266,11 @@ class TradeBookManager:
         Returns:
             List of trade dictionaries (includes both open and closed trades)
         """
-        all_trades = list(self.open_trades.values()) + self.closed_trades
+        snapshot = self.state.snapshot()
+        all_trades = snapshot.open_positions(TRADE_BOOK) + snapshot.closed_trades(TRADE_BOOK)
         
         if symbol:
-            return [trade for trade in all_trades if trade["symbol"] == symbol]
+            return [trade for trade in all_trades if position_symbol(trade) == normalize_symbol(symbol)]
         else:
             return all_trades
     
@@ -245,10 +294,12 @@ class TradeBookManager:
         Returns:
             Dictionary with portfolio summary information
         """
+        snapshot = self.state.snapshot()
+        open_trades = snapshot.open_positions(TRADE_BOOK)
         return {
-            "open_positions": len(self.open_trades),
-            "total_trades": len(self.open_trades) + len(self.closed_trades),
-            "symbols": list(self.open_trades.keys()),
+            "open_positions": len(open_trades),
+            "total_trades": len(open_trades) + len(snapshot.closed_trades(TRADE_BOOK)),
+            "symbols": [trade["symbol"] for trade in open_trades],
         }
     
     def has_open_position(self, symbol: str) -> bool:
@@ -261,7 +312,7 @@ class TradeBookManager:
         Returns:
             True if an open position exists, False otherwise
         """
-        return symbol in self.open_trades
+        return self.state.snapshot().has_position(symbol, TRADE_BOOK)
     
     def should_hold(self, symbol: str, proposed_action: str) -> bool:
         """
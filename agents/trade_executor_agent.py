@@ -10,8 +10,10 @@ import logging
 from datetime import datetime
 from typing import Dict, Any, Optional, List
 
-from aGENtrader_v2.agents.trade_book_manager import TradeBookManager
-from aGENtrader_v2.data.feed.data_provider_factory import DataProviderFactory
+from agents.trade_book_manager import TradeBookManager
+from core.trading.mark_to_market import MarkToMarketService, normalize_symbol
+from core.trading.stop_engine import StopEngine
+from core.trading.volatility import volatility_cache
 
 # Setup logger
 logger = logging.getLogger("aGENtrader.trade_executor")
@@ -29,9 +31,9 @@ class TradeExecutorAgent:
     
     def __init__(
         self, 
-        config: Dict[str, Any],
+        config: Optional[Dict[str, Any]] = None,
         trade_book_manager: Optional[TradeBookManager] = None,
-        data_provider_factory: Optional[DataProviderFactory] = None,
+        data_provider_factory: Optional[Any] = None,
         risk_guard_agent=None,
         performance_tracker=None
     ):
@@ -39,12 +41,14 @@ class TradeExecutorAgent:
         Initialize the trade executor agent.
         
         Args:
-            config: Configuration dictionary with parameters for the agent
+            config: Configuration dictionary with parameters for the agent (default: empty)
             trade_book_manager: TradeBookManager instance (will create one if None)
-            data_provider_factory: DataProviderFactory instance (needed for real execution)
+            data_provider_factory: Market data provider, or a factory with
+                create_provider (needed for prices without market data)
             risk_guard_agent: RiskGuardAgent instance (will create one if None)
             performance_tracker: TradePerformanceTracker instance (will create one if None)
         """
+        config = config or {}
         self.config = config
         
         # Default risk parameters
@@ -53,16 +57,22 @@ class TradeExecutorAgent:
         self.max_position_size_pct = config.get("max_position_size_pct", 10.0)
         self.stop_loss_pct = config.get("stop_loss_pct", 5.0)
         self.take_profit_pct = config.get("take_profit_pct", 10.0)
+        self.trailing_stop_pct = config.get("trailing_stop_pct")
         
         # Create or use provided trade book manager
         self.trade_book = trade_book_manager or TradeBookManager()
         
+        # Vectorized stop engine over all open trades
+        self.stop_engine = StopEngine()
+        for open_trade in self.trade_book.list_open_trades():
+            self._register_stops(open_trade)
+        
         # Initialize risk guard if not provided
         if risk_guard_agent:
             self.risk_guard = risk_guard_agent
         else:
             # Import here to avoid circular dependencies
-            from aGENtrader_v2.agents.risk_guard_agent import RiskGuardAgent
+            from agents.risk_guard_agent import RiskGuardAgent
             self.risk_guard = RiskGuardAgent(trade_book_manager=self.trade_book)
             logger.info("Initialized RiskGuardAgent")
         
@@ -74,8 +84,8 @@ class TradeExecutorAgent:
             self.performance_tracker = performance_tracker
         else:
             # Import here to avoid circular dependencies
-            from aGENtrader_v2.analytics.trade_performance_tracker import TradePerformanceTracker
-            self.performance_tracker = TradePerformanceTracker(data_provider=data_provider_factory)
+            from analytics.trade_performance_tracker import TradePerformanceTracker
+            self.performance_tracker = TradePerformanceTracker()
             logger.info("Initialized TradePerformanceTracker")
         
         logger.info(f"TradeExecutorAgent initialized with confidence threshold {self.confidence_threshold}")
@@ -83,7 +93,8 @@ class TradeExecutorAgent:
     def execute_decision(
         self, 
         decision: Dict[str, Any], 
-        market_data: Optional[Dict[str, Any]] = None
+        market_data: Optional[Dict[str, Any]] = None,
+        pre_approved: bool = False
     ) -> Dict[str, Any]:
         """
         Execute a trading decision.
@@ -91,12 +102,15 @@ class TradeExecutorAgent:
         Args:
             decision: Trading decision from an analysis agent
             market_data: Current market data (for pricing info)
+            pre_approved: The decision was already sized and admitted by the
+                risk checks (BatchTradeEvaluator); its position_size is used
+                and the risk guard is not consulted or updated here
             
         Returns:
             Dictionary with execution results
         """
         # Extract key information
-        symbol = decision.get("symbol")
+        symbol = decision.get("symbol") or decision.get("pair")
         action = decision.get("action", "HOLD")
         confidence = decision.get("confidence", 0)
         
@@ -148,11 +162,14 @@ class TradeExecutorAgent:
             return {"status": "error", "message": "Failed to get current price"}
         
         # Calculate position size based on strategy (confidence, volatility, or combined)
-        position_size = self._calculate_position_size(
-            confidence=confidence,
-            symbol=symbol,
-            market_data=market_data
-        )
+        if pre_approved and decision.get("position_size") is not None:
+            position_size = decision["position_size"]
+        else:
+            position_size = self._calculate_position_size(
+                confidence=confidence,
+                symbol=symbol,
+                market_data=market_data
+            )
         
         # Calculate stop loss and take profit levels
         sl, tp = self._calculate_sl_tp(action, current_price)
@@ -170,31 +187,17 @@ class TradeExecutorAgent:
             "reason": decision.get("reason", "Based on analysis")
         }
         
-        # Extract volatility from market data if available
+        # Extract volatility from market data if available (cached per symbol and interval)
         volatility = None
         if market_data and "ohlcv" in market_data and market_data["ohlcv"]:
-            # Calculate volatility from price data if needed
-            # This is a simplified version - PositionSizerAgent has a more robust calculation
-            try:
-                import statistics
-                import math
-                
-                # Get last 14 prices
-                prices = [candle["close"] for candle in market_data["ohlcv"][-15:]]
-                if len(prices) > 1:
-                    # Calculate log returns
-                    returns = [math.log(prices[i] / prices[i-1]) for i in range(1, len(prices))]
-                    # Calculate standard deviation of returns
-                    volatility = statistics.stdev(returns)
-            except Exception as e:
-                logger.warning(f"Failed to calculate volatility: {e}")
+            volatility = volatility_cache.volatility(symbol, market_data.get("interval"), market_data["ohlcv"])
         
         # Add volatility to trade object if calculated
         if volatility is not None:
             trade["volatility"] = volatility
         
-        # Run the trade through the risk guard
-        accepted, rejection_reason = self.risk_guard.evaluate_trade(trade)
+        # Run the trade through the risk guard (unless the batch evaluation already did)
+        accepted, rejection_reason = (True, None) if pre_approved else self.risk_guard.evaluate_trade(trade)
         
         if not accepted:
             logger.warning(f"Trade rejected by risk guard: {rejection_reason}")
@@ -208,11 +211,14 @@ class TradeExecutorAgent:
                 "position_size": position_size
             }
         
-        # Record the trade if accepted
+        # Record the trade if accepted (replaces any open trade for the symbol)
+        self.stop_engine.remove_position(symbol)
         self.trade_book.record_trade(trade)
+        self._register_stops(trade)
         
-        # Update risk guard's trade history
-        self.risk_guard.record_trade(trade)
+        # Update risk guard's trade history (pre-approved trades are recorded by the batch)
+        if not pre_approved:
+            self.risk_guard.record_trade(trade)
         
         logger.info(
             f"Executed {action} for {symbol} at {current_price} "
@@ -221,6 +227,7 @@ class TradeExecutorAgent:
         
         return {
             "status": "success",
+            "trade_id": trade.get("position_id"),
             "trade": trade,
             "action": action,
             "symbol": symbol,
@@ -249,80 +256,105 @@ class TradeExecutorAgent:
         if symbol is None:
             logger.warning("Cannot check stops with None symbol")
             return None
+        
+        closed_trades = self.check_all_stops({normalize_symbol(symbol): current_price})
+        return closed_trades[0] if closed_trades else None
+    
+    def check_all_stops(
+        self,
+        prices: Optional[Dict[str, float]] = None
+    ) -> List[Dict[str, Any]]:
+        """
+        Check stop loss and take profit levels for every open position at once.
+        
+        All open symbols are priced with a single batched request and every
+        position is checked by the stop engine in one vectorized pass.
+        
+        Args:
+            prices: Optional pre-fetched mapping of symbol (without "/") -> price.
+                Positions whose symbol is missing from the mapping are not checked.
             
-        # Get open trade for this symbol
-        trade = self.trade_book.get_open_trade(symbol)
-        if not trade:
-            return None
+        Returns:
+            List of closed trades (empty if no stops were hit)
+        """
+        if not len(self.stop_engine):
+            return []
         
-        # Extract trade information
-        action = trade.get("action")
-        entry_price = trade.get("entry_price")
-        stop_loss = trade.get("stop_loss")
-        take_profit = trade.get("take_profit")
+        if prices is None:
+            mark_to_market = MarkToMarketService(self._get_price_provider())
+            prices = mark_to_market.fetch_prices(
+                trade.get("symbol") for trade in self.trade_book.list_open_trades()
+            )
         
-        # If no SL/TP set, nothing to check
-        if not stop_loss or not take_profit:
-            return None
+        return self._close_stopped_trades(self.stop_engine.evaluate(prices))
+    
+    def check_bar_stops(
+        self,
+        highs: Dict[str, float],
+        lows: Dict[str, float]
+    ) -> List[Dict[str, Any]]:
+        """
+        Check stops for every open position against intra-bar high/low ranges.
         
-        # Track if a stop was hit and the reason
-        closed_trade = None
+        Args:
+            highs: Mapping of symbol (without "/") -> bar high
+            lows: Mapping of symbol (without "/") -> bar low
+            
+        Returns:
+            List of closed trades (empty if no stops were hit)
+        """
+        return self._close_stopped_trades(self.stop_engine.evaluate_bars(highs, lows))
+    
+    def _close_stopped_trades(self, events: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """
+        Close the trades for a batch of stop engine events.
         
-        # Check for BUY positions
-        if action == "BUY":
-            # Check stop loss
-            if current_price <= stop_loss:
-                logger.info(f"Stop loss hit for {symbol} at {current_price}")
-                closed_trade = self.trade_book.close_trade(
-                    symbol, 
-                    exit_price=current_price,
-                    reason="Stop loss"
-                )
+        Args:
+            events: Close events emitted by the stop engine
             
-            # Check take profit
-            elif current_price >= take_profit:
-                logger.info(f"Take profit hit for {symbol} at {current_price}")
-                closed_trade = self.trade_book.close_trade(
-                    symbol, 
-                    exit_price=current_price,
-                    reason="Take profit"
-                )
-        
-        # Check for SELL positions
-        elif action == "SELL":
-            # Check stop loss
-            if current_price >= stop_loss:
-                logger.info(f"Stop loss hit for {symbol} at {current_price}")
-                closed_trade = self.trade_book.close_trade(
-                    symbol, 
-                    exit_price=current_price,
-                    reason="Stop loss"
-                )
+        Returns:
+            List of closed trades
+        """
+        closed_trades = []
+        for event in events:
+            symbol = event["position_id"]
+            logger.info(f"{event['reason']} hit for {symbol} at {event['exit_price']}")
             
-            # Check take profit
-            elif current_price <= take_profit:
-                logger.info(f"Take profit hit for {symbol} at {current_price}")
-                closed_trade = self.trade_book.close_trade(
-                    symbol, 
-                    exit_price=current_price,
-                    reason="Take profit"
-                )
-                
-        # Evaluate trade performance if a stop was hit
-        if closed_trade:
-            try:
-                # Evaluate the trade performance
-                evaluated_trade = self.performance_tracker.evaluate_trade(closed_trade)
-                logger.info(
-                    f"Trade performance evaluated: {symbol} {action} - "
-                    f"Return: {evaluated_trade.get('return_pct', 0):.2f}%, "
-                    f"Status: {evaluated_trade.get('status', 'UNKNOWN')}, "
-                    f"Reason: {closed_trade.get('reason', 'Unknown')}"
-                )
-            except Exception as e:
-                logger.error(f"Error evaluating trade performance: {e}")
-                
-        return closed_trade
+            closed_trade = self.trade_book.close_trade(
+                symbol,
+                exit_price=event["exit_price"],
+                reason=event["reason"]
+            )
+            if closed_trade:
+                self._evaluate_closed_trade(closed_trade)
+                closed_trades.append(closed_trade)
+        
+        return closed_trades
+    
+    def _register_stops(self, trade: Dict[str, Any]) -> None:
+        """
+        Register an open trade's stop levels with the stop engine.
+        
+        The trade book holds one open trade per symbol, so the symbol is used
+        as the position id.
+        
+        Args:
+            trade: Open trade from the trade book
+        """
+        symbol = trade.get("symbol")
+        if not symbol or trade.get("action") not in ("BUY", "SELL"):
+            return
+        
+        self.stop_engine.add_position(
+            position_id=symbol,
+            symbol=normalize_symbol(symbol),
+            action=trade["action"],
+            entry_price=trade.get("entry_price", 0),
+            stop_loss=trade.get("stop_loss"),
+            take_profit=trade.get("take_profit"),
+            size=trade.get("position_size", 1.0),
+            trailing_stop_pct=trade.get("trailing_stop_pct", self.trailing_stop_pct)
+        )
     
     def close_position(
         self, 
@@ -355,6 +387,7 @@ class TradeExecutorAgent:
             return None
         
         # Close the trade
+        self.stop_engine.remove_position(symbol)
         closed_trade = self.trade_book.close_trade(
             symbol,
             exit_price=current_price,
@@ -363,19 +396,29 @@ class TradeExecutorAgent:
         
         # If trade was closed successfully, evaluate its performance
         if closed_trade:
-            try:
-                # Evaluate the trade performance
-                evaluated_trade = self.performance_tracker.evaluate_trade(closed_trade)
-                logger.info(
-                    f"Trade performance evaluated: {symbol} {closed_trade.get('action')} - "
-                    f"Return: {evaluated_trade.get('return_pct', 0):.2f}%, "
-                    f"Status: {evaluated_trade.get('status', 'UNKNOWN')}"
-                )
-            except Exception as e:
-                logger.error(f"Error evaluating trade performance: {e}")
+            self._evaluate_closed_trade(closed_trade)
         
         return closed_trade
     
+    def _evaluate_closed_trade(self, closed_trade: Dict[str, Any]) -> None:
+        """
+        Evaluate the performance of a closed trade.
+        
+        Args:
+            closed_trade: Closed trade information from the trade book
+        """
+        try:
+            # Evaluate the trade performance
+            evaluated_trade = self.performance_tracker.evaluate_trade(closed_trade)
+            logger.info(
+                f"Trade performance evaluated: {closed_trade.get('symbol')} {closed_trade.get('action')} - "
+                f"Return: {evaluated_trade.get('return_pct', 0):.2f}%, "
+                f"Status: {evaluated_trade.get('status', 'UNKNOWN')}, "
+                f"Reason: {closed_trade.get('close_reason', 'Unknown')}"
+            )
+        except Exception as e:
+            logger.error(f"Error evaluating trade performance: {e}")
+    
     def get_open_positions(self) -> List[Dict[str, Any]]:
         """
         Get a list of all open positions.
@@ -419,7 +462,7 @@ class TradeExecutorAgent:
             Position size (0.0-1.0)
         """
         # Import here to avoid circular imports
-        from aGENtrader_v2.agents.position_sizer_agent import PositionSizerAgent
+        from agents.position_sizer_agent import PositionSizerAgent
         
         # If we already have a position sizer, use it
         if not hasattr(self, 'position_sizer'):
@@ -438,7 +481,8 @@ class TradeExecutorAgent:
             symbol=symbol if symbol is not None else "UNKNOWN",
             confidence=confidence,
             volatility=volatility,
-            price_data=price_data
+            price_data=price_data,
+            interval=(market_data or {}).get("interval")
         )
         
         logger.info(f"Position size calculated: {position_size:.2%} for confidence {confidence}")
@@ -502,14 +546,8 @@ class TradeExecutorAgent:
         # If not available from market data, try to fetch using the data provider
         if self.data_provider_factory:
             try:
-                # If the factory is already a provider, use it directly
-                if hasattr(self.data_provider_factory, 'fetch_ticker'):
-                    provider = self.data_provider_factory
-                # Otherwise, try to create a provider if it has a factory method
-                elif hasattr(self.data_provider_factory, 'create_provider'):
-                    provider = self.data_provider_factory.create_provider()
-                else:
-                    logger.error("Data provider factory cannot create a provider or be used as one")
+                provider = self._get_price_provider()
+                if provider is None:
                     return None
                 
                 # We know symbol is not None due to check at the beginning of the function
@@ -520,4 +558,25 @@ class TradeExecutorAgent:
                 logger.error(f"Error fetching price for {symbol}: {e}")
         
         logger.warning(f"Failed to get current price for {symbol}")
-        return None
\ No newline at end of file
+        return None
+    
+    def _get_price_provider(self):
+        """
+        Resolve a market data provider from the configured factory.
+        
+        Returns:
+            Provider instance or None if unavailable
+        """
+        if not self.data_provider_factory:
+            return None
+        
+        # If the factory is already a provider, use it directly
+        if hasattr(self.data_provider_factory, 'fetch_ticker'):
+            return self.data_provider_factory
+        
+        # Otherwise, try to create a provider if it has a factory method
+        if hasattr(self.data_provider_factory, 'create_provider'):
+            return self.data_provider_factory.create_provider()
+        
+        logger.error("Data provider factory cannot create a provider or be used as one")
+        return None
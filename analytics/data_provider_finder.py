@@ -3,21 +3,25 @@
 DataProviderFinder for aGENtrader v2.1
 
 A utility module to find the best available data provider for performance tracking.
-It tries different data providers in sequence until finding one that works.
+Providers are tried in order of observed latency and error rate, and a slow
+provider is hedged with the next one (see utils.provider_router).
 """
 
 import logging
 from typing import Optional, Dict, Any, List, Callable
 
+from utils.provider_router import ProviderRouter
+
 logger = logging.getLogger("aGENtrader.data_provider_finder")
 
 class DataProviderFinder:
     """
     Utility to find the best available data provider for performance tracking.
     
-    This class will try multiple data providers in sequence until finding one
-    that successfully returns price data. This is useful for trade performance
-    tracking where having access to current price data is essential.
+    This class will try multiple data providers, fastest and most reliable
+    first, until finding one that successfully returns price data. This is
+    useful for trade performance tracking where having access to current
+    price data is essential.
     """
     
     def __init__(self, providers: Optional[List[Any]] = None):
@@ -27,9 +31,12 @@ class DataProviderFinder:
         Args:
             providers: List of data provider instances to try
         """
-        self.providers = providers or []
+        self.providers = []
         self.active_provider = None
         self.last_success_index = -1
+        self.router = ProviderRouter()
+        for provider in providers or []:
+            self.add_provider(provider)
     
     def add_provider(self, provider: Any) -> None:
         """
@@ -38,9 +45,27 @@ class DataProviderFinder:
         Args:
             provider: Data provider instance
         """
+        name = provider.__class__.__name__
+        if name in self.router.providers:
+            name = f"{name}#{len(self.providers)}"
         self.providers.append(provider)
+        self.router.register(name, provider)
         logger.info(f"Added data provider: {provider.__class__.__name__}")
     
+    def _route(self, method: str, request: Callable[[Any], Any]) -> Any:
+        """Run a request through the router, remembering the provider that answered."""
+        preferred = None
+        if 0 <= self.last_success_index < len(self.providers):
+            preferred = list(self.router.providers)[self.last_success_index]
+
+        name, result = self.router.call(request, method=method, preferred=preferred)
+        if name is not None:
+            provider = self.router.providers[name]
+            self.last_success_index = self.providers.index(provider)
+            self.active_provider = provider
+            logger.debug(f"Fetched {method} using {name}")
+        return result
+
     def fetch_ticker(self, symbol: str) -> Dict[str, Any]:
         """
         Fetch ticker data for a symbol using the best available provider.
@@ -51,29 +76,11 @@ class DataProviderFinder:
         Returns:
             Dictionary with ticker data or empty dict if all providers fail
         """
-        # Try the last successful provider first
-        if self.last_success_index >= 0 and self.last_success_index < len(self.providers):
-            try:
-                provider = self.providers[self.last_success_index]
-                ticker = provider.fetch_ticker(symbol)
-                self.active_provider = provider
-                return ticker
-            except Exception as e:
-                logger.warning(f"Last successful provider failed: {e}")
-        
-        # Try all providers in sequence
-        for i, provider in enumerate(self.providers):
-            try:
-                ticker = provider.fetch_ticker(symbol)
-                logger.info(f"Successfully fetched ticker using {provider.__class__.__name__}")
-                self.last_success_index = i
-                self.active_provider = provider
-                return ticker
-            except Exception as e:
-                logger.warning(f"Provider {provider.__class__.__name__} failed: {e}")
-        
-        logger.error(f"All data providers failed to fetch ticker for {symbol}")
-        return {}
+        ticker = self._route("fetch_ticker", lambda provider: provider.fetch_ticker(symbol))
+        if ticker is None:
+            logger.error(f"All data providers failed to fetch ticker for {symbol}")
+            return {}
+        return ticker
     
     def fetch_ohlcv(self, symbol: str, timeframe: str = "1h", limit: int = 100) -> List[Dict[str, Any]]:
         """
@@ -87,29 +94,11 @@ class DataProviderFinder:
         Returns:
             List of OHLCV candles or empty list if all providers fail
         """
-        # Try the last successful provider first
-        if self.last_success_index >= 0 and self.last_success_index < len(self.providers):
-            try:
-                provider = self.providers[self.last_success_index]
-                ohlcv = provider.fetch_ohlcv(symbol, timeframe, limit)
-                self.active_provider = provider
-                return ohlcv
-            except Exception as e:
-                logger.warning(f"Last successful provider failed: {e}")
-        
-        # Try all providers in sequence
-        for i, provider in enumerate(self.providers):
-            try:
-                ohlcv = provider.fetch_ohlcv(symbol, timeframe, limit)
-                logger.info(f"Successfully fetched OHLCV using {provider.__class__.__name__}")
-                self.last_success_index = i
-                self.active_provider = provider
-                return ohlcv
-            except Exception as e:
-                logger.warning(f"Provider {provider.__class__.__name__} failed: {e}")
-        
-        logger.error(f"All data providers failed to fetch OHLCV for {symbol}")
-        return []
+        ohlcv = self._route("fetch_ohlcv", lambda provider: provider.fetch_ohlcv(symbol, timeframe, limit))
+        if ohlcv is None:
+            logger.error(f"All data providers failed to fetch OHLCV for {symbol}")
+            return []
+        return ohlcv
     
     def get_active_provider(self) -> Optional[Any]:
         """
@@ -0,0 +1,246 @@
+#!/usr/bin/env python
+"""
+Derivatives Analytics for aGENtrader v2
+
+This module provides array kernels for funding rate and open interest
+analysis. Every kernel works on a 2D array with one row per symbol, so a
+whole perpetuals universe is analyzed in one pass. Ragged series are padded
+with NaN on the right (see to_matrix) and the kernels ignore the padding.
+
+Rows keep the order the series were given in; kernels that talk about the
+"first" elements (slope over the first 5 values, change between index 0 and
+4) follow the conventions of the analyst agents, which receive data newest
+first.
+"""
+
+from itertools import chain
+from typing import Dict, Sequence, Optional
+
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+
+def to_matrix(series: Sequence[Sequence[float]], length: Optional[int] = None) -> np.ndarray:
+    """
+    Stack ragged series into a NaN-padded float64 matrix.
+
+    Args:
+        series: One sequence of values per symbol
+        length: Number of columns (default: longest series); longer series are truncated
+
+    Returns:
+        Array of shape (len(series), length)
+    """
+    lengths = np.fromiter((len(s) for s in series), dtype=np.int64, count=len(series))
+    if length is None:
+        length = int(lengths.max()) if len(lengths) else 0
+    lengths = np.minimum(lengths, length)
+
+    # One flat copy of all values, scattered into the padded rows (row-major order)
+    values = np.fromiter(chain.from_iterable(s[:length] for s in series), dtype=np.float64, count=int(lengths.sum()))
+    matrix = np.full((len(series), length), np.nan)
+    matrix[np.arange(length) < lengths[:, None]] = values
+    return matrix
+
+
+def series_lengths(matrix: np.ndarray) -> np.ndarray:
+    """Number of leading non-NaN values per row."""
+    if matrix.shape[1] == 0:
+        return np.zeros(matrix.shape[0], dtype=np.int64)
+    valid = ~np.isnan(matrix)
+    return np.where(valid.all(axis=1), matrix.shape[1], np.argmin(valid, axis=1))
+
+
+def linear_slope(matrix: np.ndarray) -> np.ndarray:
+    """
+    Least-squares slope of each row against its column index.
+
+    Returns:
+        Slope per row (NaN for rows with fewer than two values)
+    """
+    valid = ~np.isnan(matrix)
+    y = np.where(valid, matrix, 0.0)
+    x = np.where(valid, np.arange(matrix.shape[1], dtype=np.float64), 0.0)
+
+    n = valid.sum(axis=1)
+    sum_x = x.sum(axis=1)
+    sum_y = y.sum(axis=1)
+    sum_xy = (x * y).sum(axis=1)
+    sum_xx = (x * x).sum(axis=1)
+
+    denominator = n * sum_xx - sum_x ** 2
+    with np.errstate(divide="ignore", invalid="ignore"):
+        slope = (n * sum_xy - sum_x * sum_y) / denominator
+    return np.where((n >= 2) & (denominator != 0), slope, np.nan)
+
+
+def trend_labels(slopes: np.ndarray, threshold: float = 0.001) -> np.ndarray:
+    """Map slopes to "rising" / "falling" / "flat" (NaN slopes are flat)."""
+    return np.where(slopes > threshold, "rising", np.where(slopes < -threshold, "falling", "flat"))
+
+
+def pearson_correlation(a: np.ndarray, b: np.ndarray) -> np.ndarray:
+    """
+    Row-wise Pearson correlation over positions valid in both matrices.
+
+    Returns:
+        Correlation per row in [-1, 1] (0.0 when undefined)
+    """
+    valid = ~np.isnan(a) & ~np.isnan(b)
+    n = valid.sum(axis=1)
+    safe_n = np.maximum(n, 1)
+
+    a0 = np.where(valid, a, 0.0)
+    b0 = np.where(valid, b, 0.0)
+    da = np.where(valid, a0 - (a0.sum(axis=1) / safe_n)[:, None], 0.0)
+    db = np.where(valid, b0 - (b0.sum(axis=1) / safe_n)[:, None], 0.0)
+
+    numerator = (da * db).sum(axis=1)
+    denominator = np.sqrt((da * da).sum(axis=1)) * np.sqrt((db * db).sum(axis=1))
+    with np.errstate(divide="ignore", invalid="ignore"):
+        correlation = numerator / denominator
+    correlation = np.where((n >= 2) & (denominator > 0), correlation, 0.0)
+    return np.clip(correlation, -1.0, 1.0)
+
+
+def latest_zscore(matrix: np.ndarray, column: int = 0) -> np.ndarray:
+    """
+    Z-score of one column (default: the latest value) against its row.
+
+    Returns:
+        Z-score per row (0.0 for rows without dispersion)
+    """
+    valid = ~np.isnan(matrix)
+    n = np.maximum(valid.sum(axis=1), 1)
+    values = np.where(valid, matrix, 0.0)
+    mean = values.sum(axis=1) / n
+    std = np.sqrt((np.where(valid, values - mean[:, None], 0.0) ** 2).sum(axis=1) / n)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        z = (matrix[:, column] - mean) / std
+    return np.where(std > 0, z, 0.0)
+
+
+def latest_percentile(matrix: np.ndarray, column: int = 0) -> np.ndarray:
+    """
+    Percentile rank (0-100) of one column within its row's values.
+
+    Returns:
+        Share of valid values less than or equal to the column value, in percent
+    """
+    valid = ~np.isnan(matrix)
+    current = matrix[:, column][:, None]
+    with np.errstate(invalid="ignore"):
+        below = (valid & (matrix <= current)).sum(axis=1)
+    n = valid.sum(axis=1)
+    return np.where(n > 0, below / np.maximum(n, 1) * 100.0, np.nan)
+
+
+def rolling_zscore(matrix: np.ndarray, window: int) -> np.ndarray:
+    """
+    Z-score of each value against the trailing window ending at it.
+
+    Series must be in chronological order along the columns.
+
+    Returns:
+        Array shaped like matrix; the first window-1 columns are NaN
+    """
+    result = np.full(matrix.shape, np.nan)
+    if matrix.shape[1] < window:
+        return result
+
+    windows = sliding_window_view(matrix, window, axis=1)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        mean = np.nanmean(windows, axis=2)
+        std = np.nanstd(windows, axis=2)
+        z = (windows[:, :, -1] - mean) / std
+    result[:, window - 1:] = np.where(std > 0, z, 0.0)
+    return result
+
+
+def rolling_percentile(matrix: np.ndarray, window: int) -> np.ndarray:
+    """
+    Percentile rank (0-100) of each value within the trailing window ending at it.
+
+    Series must be in chronological order along the columns.
+
+    Returns:
+        Array shaped like matrix; the first window-1 columns are NaN
+    """
+    result = np.full(matrix.shape, np.nan)
+    if matrix.shape[1] < window:
+        return result
+
+    windows = sliding_window_view(matrix, window, axis=1)
+    valid = ~np.isnan(windows)
+    with np.errstate(invalid="ignore"):
+        below = (valid & (windows <= windows[:, :, -1:])).sum(axis=2)
+    n = valid.sum(axis=2)
+    ranks = np.where(n > 0, below / np.maximum(n, 1) * 100.0, np.nan)
+    result[:, window - 1:] = np.where(np.isnan(windows[:, :, -1]), np.nan, ranks)
+    return result
+
+
+def relative_change(matrix: np.ndarray, start: int = 0, end: int = 4) -> np.ndarray:
+    """
+    Relative change from column `end` to column `start`: (x[start] - x[end]) / x[end].
+
+    Returns:
+        Change per row (0.0 when the row is too short or x[end] <= 0)
+    """
+    if matrix.shape[1] <= max(start, end):
+        return np.zeros(matrix.shape[0])
+
+    base = matrix[:, end]
+    with np.errstate(divide="ignore", invalid="ignore"):
+        change = (matrix[:, start] - base) / base
+    ok = (series_lengths(matrix) > end) & (base > 0)
+    return np.where(ok, change, 0.0)
+
+
+def oi_price_divergence(oi: np.ndarray, prices: np.ndarray, start: int = 0, end: int = 4) -> Dict[str, np.ndarray]:
+    """
+    Compare open interest and price moves over the same span.
+
+    Args:
+        oi: Open interest matrix
+        prices: Price matrix aligned with oi
+        start, end: Columns compared (see relative_change)
+
+    Returns:
+        Dictionary with "oi_change", "price_change", "divergence" (moves in
+        opposite directions) and "score" (oi_change - price_change)
+    """
+    oi_change = relative_change(oi, start, end)
+    price_change = relative_change(prices, start, end)
+    return {
+        "oi_change": oi_change,
+        "price_change": price_change,
+        "divergence": np.sign(oi_change) * np.sign(price_change) < 0,
+        "score": oi_change - price_change
+    }
+
+
+def nearest_align(target_times: np.ndarray, source_times: np.ndarray, source_values: np.ndarray) -> np.ndarray:
+    """
+    Pick, for each target timestamp, the source value with the nearest timestamp.
+
+    Args:
+        target_times: Timestamps to align to
+        source_times: Timestamps of the source series (any order)
+        source_values: Source values
+
+    Returns:
+        Source values aligned with target_times (NaN if the source is empty)
+    """
+    target_times = np.asarray(target_times, dtype=np.float64)
+    if len(source_times) == 0:
+        return np.full(len(target_times), np.nan)
+
+    order = np.argsort(source_times, kind="stable")
+    times = np.asarray(source_times, dtype=np.float64)[order]
+    values = np.asarray(source_values, dtype=np.float64)[order]
+
+    right = np.clip(np.searchsorted(times, target_times), 0, len(times) - 1)
+    left = np.clip(right - 1, 0, len(times) - 1)
+    use_left = np.abs(target_times - times[left]) <= np.abs(times[right] - target_times)
+    return values[np.where(use_left, left, right)]
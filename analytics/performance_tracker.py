@@ -18,6 +18,8 @@ script_dir = os.path.dirname(os.path.abspath(__file__))
 parent_dir = os.path.dirname(script_dir)
 sys.path.append(parent_dir)
 
+from core.trading.mark_to_market import MarkToMarketService, normalize_symbol
+
 class PerformanceTracker:
     """
     Performance Tracker for real-time monitoring of trading decisions.
@@ -152,6 +154,13 @@ class PerformanceTracker:
         now = datetime.now()
         trades_to_remove = []
         
+        # Price every active symbol with a single batched request
+        mark_to_market = MarkToMarketService(market_data_provider)
+        prices = mark_to_market.fetch_prices(
+            trade["symbol"] for trade in self.active_trades.values()
+            if trade["status"] == "active"
+        )
+        
         for trade_id, trade in self.active_trades.items():
             try:
                 # Skip if trade is not active
@@ -172,11 +181,10 @@ class PerformanceTracker:
                 if max_hold_time and hold_time_minutes >= max_hold_time:
                     auto_close = True
                 
-                # Get current price from market data provider
-                try:
-                    current_price = market_data_provider.get_current_price(symbol)
-                except Exception as e:
-                    self.logger.warning(f"Couldn't get current price for {symbol}: {str(e)}")
+                # Get current price from the batched price snapshot
+                current_price = prices.get(normalize_symbol(symbol))
+                if current_price is None:
+                    self.logger.warning(f"Couldn't get current price for {symbol}")
                     continue
                 
                 # Calculate performance metrics
@@ -26,7 +26,6 @@ sys.path.append(parent_dir)
 # Import required modules
 from utils.logger import get_logger
 from utils.config import get_config
-from data.feed import MarketDataFetcher
 
 class TradePerformanceTracker:
     """
@@ -63,9 +62,6 @@ class TradePerformanceTracker:
         self.closed_trades_file = os.path.join(self.trades_dir, "closed_trades.jsonl")
         self.performance_report_file = os.path.join(self.reports_dir, "performance_report.json")
         
-        # Initialize the market data fetcher for price updates
-        self.market_fetcher = MarketDataFetcher()
-        
         # Initialize tracking data
         self.processed_trade_ids = set()
         self.active_trades = {}
@@ -13,6 +13,10 @@ import urllib.parse
 from typing import Dict, List, Optional, Any, Union
 import requests
 
+from utils.tracing import traced, set_attributes, DATA_FETCH
+from utils.metrics import api_requests, record_api_response
+from utils.retry import RetryPolicy
+
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger("BinanceDataProvider")
@@ -25,6 +29,11 @@ class BinanceDataProvider:
     error handling and rate limiting compliance.
     """
     
+    # Transient failures (timeouts, 429/418, 5xx) are retried with jitter;
+    # a 429/418 holds every Binance request for its Retry-After
+    RETRY_POLICY = RetryPolicy("binance", max_attempts=3, base_delay=0.25, max_delay=5.0, throttle_key="binance")
+    REQUEST_TIMEOUT = 10
+    
     BASE_URL = "https://api.binance.com"
     TESTNET_URL = "https://testnet.binance.vision"
     
@@ -126,6 +135,7 @@ class BinanceDataProvider:
             
         self.last_request_time = time.time()
     
+    @traced("binance.request", kind=DATA_FETCH)
     def _make_request(
         self, 
         endpoint: str, 
@@ -160,6 +170,7 @@ class BinanceDataProvider:
         
         # Create full URL
         url = f"{base}{endpoint}"
+        set_attributes(endpoint=endpoint, symbol=params.get("symbol", ""))
         
         logger.debug(f"Making request to URL: {url} with params: {params}")
         
@@ -168,22 +179,28 @@ class BinanceDataProvider:
         if self.api_key:
             headers["X-MBX-APIKEY"] = self.api_key
         
-        # Add signature for authenticated requests
-        if signed and self.api_secret:
-            params["timestamp"] = int(time.time() * 1000)
-            params["signature"] = self._generate_signature(params)
-        
-        try:
-            # Make the request
+        def send() -> requests.Response:
+            # Sign each attempt so retries carry a fresh timestamp
+            request_params = dict(params)
+            if signed and self.api_secret:
+                request_params["timestamp"] = int(time.time() * 1000)
+                request_params["signature"] = self._generate_signature(request_params)
+            
             if method == "GET":
-                response = requests.get(url, headers=headers, params=params)
+                response = requests.get(url, headers=headers, params=request_params, timeout=self.REQUEST_TIMEOUT)
             elif method == "POST":
-                response = requests.post(url, headers=headers, params=params)
+                response = requests.post(url, headers=headers, params=request_params, timeout=self.REQUEST_TIMEOUT)
             else:
                 raise ValueError(f"Unsupported HTTP method: {method}")
+            record_api_response("binance", endpoint, response, "futures" if use_futures_api else "spot")
             
             # Check for HTTP errors
             response.raise_for_status()
+            return response
+        
+        try:
+            # Make the request, retrying transient failures
+            response = self.RETRY_POLICY.run(send, budget_key=f"binance:{endpoint}")
             
             # Parse JSON response
             return response.json()
@@ -210,6 +227,7 @@ class BinanceDataProvider:
             raise Exception(f"Binance API request failed: {str(e)}")
             
         except requests.exceptions.RequestException as e:
+            api_requests.labels("binance", endpoint, "error").inc()
             logger.error(f"API request failed: {str(e)}")
             raise Exception(f"Binance API request failed: {str(e)}")
     
@@ -317,6 +335,29 @@ class BinanceDataProvider:
         ticker = self._make_request("/api/v3/ticker/price", params=params)
         return float(ticker["price"])
     
+    def get_current_prices(self, symbols: Optional[List[str]] = None) -> Dict[str, float]:
+        """
+        Get current prices for many symbols with a single request.
+        
+        Calls /api/v3/ticker/price without a symbol, which returns the latest
+        price for every trading pair, and filters the result locally.
+        
+        Args:
+            symbols: Trading symbols to return (e.g., ["BTCUSDT", "ETH/USDT"]).
+                If None, prices for all symbols are returned.
+            
+        Returns:
+            Dictionary of symbol (without "/") -> price
+        """
+        tickers = self._make_request("/api/v3/ticker/price")
+        all_prices = {ticker["symbol"]: float(ticker["price"]) for ticker in tickers}
+        
+        if symbols is None:
+            return all_prices
+        
+        wanted = {symbol.replace("/", "") for symbol in symbols}
+        return {symbol: price for symbol, price in all_prices.items() if symbol in wanted}
+    
     def get_account_info(self) -> Dict[str, Any]:
         """
         Get account information (authenticated endpoint).
@@ -0,0 +1,108 @@
+#!/usr/bin/env python
+"""
+AgentRegistry for aGENtrader v2
+
+This module provides lazy agent registration. Agents are registered by import
+path ("package.module:ClassName") and their modules are only imported, and the
+agents only constructed, the first time they are requested. One-shot runs and
+`--help` therefore skip pandas/numpy/requests imports, settings.yaml reads and
+LLMClient construction for agents they never use.
+"""
+
+import time
+import logging
+import importlib
+from typing import Dict, Any, List, Optional
+
+# Setup logger
+logger = logging.getLogger("aGENtrader.agent_registry")
+
+
+class AgentRegistry:
+    """
+    Registry of lazily constructed agents.
+
+    Each registered agent is built at most once; later requests return the
+    same instance.
+    """
+
+    def __init__(self):
+        """Initialize an empty registry."""
+        self._specs: Dict[str, Dict[str, Any]] = {}
+        self._instances: Dict[str, Any] = {}
+        self.load_times: Dict[str, float] = {}
+
+    def register(self, name: str, target: str, **default_kwargs) -> None:
+        """
+        Register an agent without importing it.
+
+        Args:
+            name: Registry name (e.g., "technical_analyst")
+            target: Import path in "package.module:ClassName" form
+            **default_kwargs: Constructor arguments used on first construction
+        """
+        module_name, _, class_name = target.partition(":")
+        if not module_name or not class_name:
+            raise ValueError(f"Agent target must look like 'package.module:ClassName', got '{target}'")
+
+        self._specs[name] = {
+            "module": module_name,
+            "class": class_name,
+            "kwargs": default_kwargs
+        }
+
+    def get(self, name: str, **kwargs) -> Any:
+        """
+        Get an agent, importing and constructing it on first use.
+
+        Args:
+            name: Registry name
+            **kwargs: Constructor arguments (only used on first construction)
+
+        Returns:
+            Agent instance
+
+        Raises:
+            KeyError: If no agent is registered under the name
+        """
+        agent = self._instances.get(name)
+        if agent is not None:
+            return agent
+
+        spec = self._specs.get(name)
+        if spec is None:
+            raise KeyError(f"No agent registered as '{name}'")
+
+        started = time.perf_counter()
+        module = importlib.import_module(spec["module"])
+        agent_class = getattr(module, spec["class"])
+        agent = agent_class(**{**spec["kwargs"], **kwargs})
+        self.load_times[name] = time.perf_counter() - started
+
+        self._instances[name] = agent
+        logger.debug(f"Loaded agent '{name}' in {self.load_times[name] * 1000:.1f} ms")
+        return agent
+
+    def is_loaded(self, name: str) -> bool:
+        """Whether an agent has already been constructed."""
+        return name in self._instances
+
+    def registered(self) -> List[str]:
+        """Names of all registered agents."""
+        return list(self._specs.keys())
+
+    def loaded(self) -> List[str]:
+        """Names of agents constructed so far."""
+        return list(self._instances.keys())
+
+    def reset(self, name: Optional[str] = None) -> None:
+        """
+        Drop constructed agents so they are rebuilt on next use.
+
+        Args:
+            name: Agent to drop (all agents if None)
+        """
+        if name is None:
+            self._instances.clear()
+        else:
+            self._instances.pop(name, None)
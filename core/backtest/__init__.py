@@ -0,0 +1,31 @@
+"""
+Backtest Package for aGENtrader v2
+
+This package contains the event-driven backtest engine that replays stored
+candles through the v2 agent pipeline, and the parallel parameter sweep
+runner built on top of it.
+"""
+
+from core.backtest.clock import SimulatedClock
+from core.backtest.replay_feed import ReplayDataFeed, load_candles
+from core.backtest.stub_llm import StubLLMClient
+from core.backtest.simulated_executor import SimulatedExecutor
+from core.backtest.backtest_engine import BacktestEngine
+from core.backtest.candle_store import CandleStore
+from core.backtest.indicator_cache import IndicatorCache
+from core.backtest.parameter_sweep import ParameterSweep, grid_search, random_search, rank_results
+
+__all__ = [
+    'SimulatedClock',
+    'ReplayDataFeed',
+    'load_candles',
+    'StubLLMClient',
+    'SimulatedExecutor',
+    'BacktestEngine',
+    'CandleStore',
+    'IndicatorCache',
+    'ParameterSweep',
+    'grid_search',
+    'random_search',
+    'rank_results'
+]
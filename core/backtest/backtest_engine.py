@@ -0,0 +1,335 @@
+#!/usr/bin/env python
+"""
+BacktestEngine for aGENtrader v2
+
+This module replays stored candles (plus order book, funding rate and open
+interest history where available) through the CoreOrchestrator, bar by bar,
+on a simulated clock:
+
+- Agents read market data from a ReplayDataFeed that hides future bars
+- LLM clients are replaced by deterministic StubLLMClient instances
+- The live execution pipeline is replaced by a SimulatedExecutor fill model
+
+The engine reports trading metrics and throughput in bars per second.
+"""
+
+import sys
+import time
+import logging
+from typing import Dict, Any, Optional, List, Union, Callable
+
+import numpy as np
+
+from core.backtest.clock import SimulatedClock
+from core.backtest.replay_feed import ReplayDataFeed, interval_to_ms, to_millis
+from core.backtest.stub_llm import StubLLMClient
+from core.backtest.simulated_executor import SimulatedExecutor
+
+# Setup logger
+logger = logging.getLogger("aGENtrader.backtest.engine")
+
+# Orchestrator agents that talk to live portfolio/exchange state
+LIVE_PIPELINE_AGENTS = ["portfolio_manager", "risk_guard", "position_sizer", "trade_executor"]
+
+
+def add_default_analyst(orchestrator) -> None:
+    """
+    Add the technical analyst to an orchestrator without analyst agents.
+
+    Without an analyst every decision would be the fallback HOLD. The
+    analyst's data fetcher is pointed at the replay feed by the engine.
+    """
+    if not any(name.endswith("_analyst") for name in orchestrator.agents):
+        from agents.technical_analyst_agent import TechnicalAnalystAgent
+        logger.info("No analyst agents configured, adding the technical analyst")
+        orchestrator.agents["technical_analyst"] = TechnicalAnalystAgent()
+
+
+class BacktestEngine:
+    """
+    Event-driven backtest engine for the v2 agent pipeline.
+
+    For every bar: pending orders fill at the open, stops are checked against
+    the high/low, equity is marked at the close, and then (after the warmup
+    period and every `decision_interval` bars) the market events of all
+    symbols are pushed through `CoreOrchestrator.process_market_events` as
+    one batch.
+    """
+
+    def __init__(
+        self,
+        candles: Dict[str, List[Dict[str, Any]]],
+        interval: str = "1h",
+        orchestrator=None,
+        depth: Optional[Dict[str, List[Dict[str, Any]]]] = None,
+        funding_rates: Optional[Dict[str, List[Dict[str, Any]]]] = None,
+        open_interest: Optional[Dict[str, List[Dict[str, Any]]]] = None,
+        executor_config: Optional[Dict[str, Any]] = None,
+        initial_capital: float = 10000.0,
+        warmup_bars: int = 50,
+        decision_interval: int = 1,
+        window_size: int = 100,
+        llm_response: Optional[Union[Dict[str, Any], str, Callable[[str], Any]]] = None,
+        risk_guard=None,
+        position_sizer=None,
+        start: Optional[Any] = None,
+        end: Optional[Any] = None
+    ):
+        """
+        Initialize the backtest engine.
+
+        Args:
+            candles: Symbol -> normalized candles (see replay_feed.load_candles), or
+                structured candle arrays such as a memory-mapped CandleStore's
+            interval: Candle interval of the stored data
+            orchestrator: CoreOrchestrator instance (created if None)
+            depth: Optional symbol -> order book snapshots
+            funding_rates: Optional symbol -> funding rate records
+            open_interest: Optional symbol -> open interest records
+            executor_config: SimulatedExecutor configuration
+            initial_capital: Starting balance in quote currency
+            warmup_bars: Bars replayed before the first decision
+            decision_interval: Run the agent pipeline every N bars
+            window_size: Number of candles included in each market event
+            llm_response: Response for the stub LLM clients (see StubLLMClient)
+            risk_guard: Optional RiskGuardAgent used by the simulated executor
+            position_sizer: Optional PositionSizerAgent used by the simulated executor
+            start: Optional first bar time (epoch ms/s or ISO string)
+            end: Optional last bar time (epoch ms/s or ISO string)
+        """
+        if not candles:
+            raise ValueError("No candles provided for backtest")
+
+        self.interval = interval
+        self.interval_ms = interval_to_ms(interval)
+        self.warmup_bars = max(0, warmup_bars)
+        self.decision_interval = max(1, decision_interval)
+        self.window_size = window_size
+        self.llm_response = llm_response
+        self.orchestrator = orchestrator
+
+        start_ms = to_millis(start) if start is not None else None
+        end_ms = to_millis(end) if end is not None else None
+
+        self.clock = SimulatedClock(0)
+        self.feed = ReplayDataFeed(
+            self.clock,
+            candles,
+            interval=interval,
+            depth=depth,
+            funding_rates=funding_rates,
+            open_interest=open_interest
+        )
+
+        # Bar open times of all symbols; each bar's candles are looked up in the
+        # feed when it is replayed, and symbols missing a bar are simply skipped
+        timestamps = np.unique(np.concatenate([self.feed.candle_times(s) for s in self.feed.symbols]))
+        if start_ms is not None:
+            timestamps = timestamps[timestamps >= start_ms]
+        if end_ms is not None:
+            timestamps = timestamps[timestamps <= end_ms]
+        self._timestamps = timestamps.astype(np.int64)
+
+        if not len(self._timestamps):
+            raise ValueError("No candles in the requested backtest range")
+        self.clock.advance_to(int(self._timestamps[0]))
+        self.executor = SimulatedExecutor(
+            self.clock,
+            config=executor_config,
+            initial_capital=initial_capital,
+            risk_guard=risk_guard,
+            position_sizer=position_sizer
+        )
+
+        self.decisions: List[Dict[str, Any]] = []
+
+    def run(self) -> Dict[str, Any]:
+        """
+        Replay all bars through the orchestrator.
+
+        Returns:
+            Backtest report (see _build_report)
+        """
+        orchestrator = self._prepare_orchestrator()
+        modules = self._clock_modules(orchestrator)
+
+        bars_processed = 0
+        pipeline_seconds = 0.0
+        started = time.perf_counter()
+
+        with self.clock.install(*modules):
+            for step, ts in enumerate(self._timestamps.tolist()):
+                bars = self.feed.candles_at(ts)
+
+                # Bar is complete once the clock reaches its close
+                self.clock.advance_to(ts + self.interval_ms)
+                self.executor.on_bars(ts, bars)
+                bars_processed += len(bars)
+
+                if step < self.warmup_bars or (step - self.warmup_bars) % self.decision_interval:
+                    continue
+
+                symbols = list(bars)
+                pipeline_started = time.perf_counter()
+                results = orchestrator.process_market_events([self._build_event(symbol) for symbol in symbols])
+                pipeline_seconds += time.perf_counter() - pipeline_started
+                for symbol, result in zip(symbols, results):
+                    self._record_decision(ts, symbol, result)
+
+            self.executor.close_all()
+
+        elapsed = time.perf_counter() - started
+        report = self._build_report(bars_processed, elapsed, pipeline_seconds)
+
+        logger.info(
+            f"Backtest finished: {bars_processed} bars in {elapsed:.2f}s "
+            f"({report['throughput']['bars_per_second']:.1f} bars/s), "
+            f"return {report['performance']['total_return_pct']:.2f}%"
+        )
+        return report
+
+    def _prepare_orchestrator(self):
+        """Wire the orchestrator's agents to the replay feed, stub LLMs and simulated executor."""
+        if self.orchestrator is None:
+            from core.core_orchestrator import CoreOrchestrator
+            self.orchestrator = CoreOrchestrator()
+
+        orchestrator = self.orchestrator
+        orchestrator.default_interval = self.interval
+
+        add_default_analyst(orchestrator)
+
+        for name, agent in orchestrator.agents.items():
+            if hasattr(agent, "llm_client"):
+                agent.llm_client = StubLLMClient(self.llm_response, agent_name=name)
+            for attr in ("data_fetcher", "data_provider"):
+                if hasattr(agent, attr):
+                    setattr(agent, attr, self.feed)
+
+        for name in LIVE_PIPELINE_AGENTS:
+            orchestrator.agents.pop(name, None)
+        orchestrator.agents["trade_executor"] = self.executor
+
+        # Without stored order books the liquidity analyst would call the live API
+        if "liquidity_analyst" in orchestrator.agents and not all(
+            self.feed.has_depth(symbol) for symbol in self.feed.symbols
+        ):
+            logger.warning("No stored market depth for every symbol, disabling liquidity analyst")
+            orchestrator.agents.pop("liquidity_analyst")
+
+        return orchestrator
+
+    def _clock_modules(self, orchestrator) -> List[Any]:
+        """Modules whose `time` import should follow the simulated clock."""
+        owners = [orchestrator, self.executor.risk_guard, self.executor.position_sizer]
+        owners.extend(orchestrator.agents.values())
+
+        modules = []
+        for owner in owners:
+            if owner is None:
+                continue
+            module = sys.modules.get(type(owner).__module__)
+            if module is not None and module not in modules:
+                modules.append(module)
+        return modules
+
+    def _build_event(self, symbol: str) -> Dict[str, Any]:
+        """Build the market event for a symbol at the current simulated time."""
+        ohlcv = self.feed.fetch_ohlcv(symbol, limit=self.window_size)
+        event = {
+            "symbol": symbol,
+            "interval": self.interval,
+            "timestamp": self.clock.isoformat(),
+            "price": ohlcv[-1]["close"],
+            "ohlcv": ohlcv
+        }
+
+        orderbook = self.feed.fetch_market_depth(symbol)
+        if orderbook:
+            event["orderbook"] = orderbook
+
+        funding_rates = self.feed.fetch_funding_rates(symbol)
+        if funding_rates:
+            event["funding_rates"] = funding_rates
+            event["funding_rate"] = funding_rates[-1]
+
+        open_interest = self.feed.fetch_open_interest(symbol)
+        if open_interest:
+            event["open_interest"] = open_interest
+
+        return event
+
+    def _record_decision(self, ts: int, symbol: str, result: Dict[str, Any]) -> None:
+        """Keep a compact record of each pipeline decision."""
+        decision = (result or {}).get("decision") or {}
+        execution = (result or {}).get("trade_execution") or {}
+        self.decisions.append({
+            "time": ts,
+            "symbol": symbol,
+            "action": decision.get("action", "HOLD"),
+            "confidence": decision.get("confidence", 0),
+            "execution_status": execution.get("status")
+        })
+
+    def _build_report(self, bars_processed: int, elapsed: float, pipeline_seconds: float) -> Dict[str, Any]:
+        """
+        Compute performance and throughput metrics.
+
+        Returns:
+            Dictionary with `performance`, `throughput` and `trades` sections
+        """
+        curve = self.executor.get_equity_curve()
+        equity = curve["equity"]
+        trades = self.executor.closed_trades
+        initial = self.executor.initial_capital
+        final = float(equity[-1]) if len(equity) else initial
+
+        # Max drawdown from the running equity peak
+        max_drawdown_pct = 0.0
+        if len(equity):
+            peaks = np.maximum.accumulate(equity)
+            max_drawdown_pct = float(np.max((peaks - equity) / peaks) * 100)
+
+        # Sharpe ratio from per-bar returns, annualized by bar length
+        sharpe = 0.0
+        if len(equity) > 2:
+            returns = np.diff(equity) / equity[:-1]
+            std = np.std(returns, ddof=1)
+            if std > 0:
+                bars_per_year = 365 * 86_400_000 / self.interval_ms
+                sharpe = float(np.mean(returns) / std * np.sqrt(bars_per_year))
+
+        pnls = np.array([t["pnl"] for t in trades], dtype=float)
+        wins = pnls[pnls > 0]
+        losses = pnls[pnls < 0]
+        profit_factor = float(wins.sum() / -losses.sum()) if len(losses) else (float("inf") if len(wins) else 0.0)
+
+        decisions = len(self.decisions)
+        return {
+            "interval": self.interval,
+            "symbols": self.feed.symbols,
+            "start": int(self._timestamps[0]),
+            "end": int(self._timestamps[-1]),
+            "performance": {
+                "initial_capital": initial,
+                "final_equity": final,
+                "total_pnl": final - initial,
+                "total_return_pct": (final - initial) / initial * 100,
+                "max_drawdown_pct": max_drawdown_pct,
+                "sharpe_ratio": sharpe,
+                "total_trades": len(trades),
+                "win_rate": float(len(wins) / len(trades) * 100) if trades else 0.0,
+                "profit_factor": profit_factor,
+                "total_fees": self.executor.total_fees,
+                "rejected_trades": self.executor.rejected_count
+            },
+            "throughput": {
+                "bars": bars_processed,
+                "decisions": decisions,
+                "elapsed_seconds": elapsed,
+                "bars_per_second": bars_processed / elapsed if elapsed > 0 else 0.0,
+                "pipeline_seconds": pipeline_seconds,
+                "avg_decision_ms": pipeline_seconds / decisions * 1000 if decisions else 0.0
+            },
+            "trades": trades
+        }
@@ -0,0 +1,154 @@
+#!/usr/bin/env python
+"""
+CandleStore for aGENtrader v2
+
+This module persists backtest candles as NumPy structured arrays (one `.npy`
+file per symbol plus a JSON manifest). Sweep workers open the files with
+`mmap_mode="r"`, so every process shares the same read-only pages from the
+OS page cache instead of holding its own copy of the dataset. The arrays are
+handed to the BacktestEngine as they are; candle dictionaries are only built
+for the window each bar needs (see candle_records).
+"""
+
+import os
+import json
+import logging
+from typing import Dict, Any, List
+
+import numpy as np
+
+# Setup logger
+logger = logging.getLogger("aGENtrader.backtest.candle_store")
+
+CANDLE_DTYPE = np.dtype([
+    ("time", np.int64),
+    ("open", np.float64),
+    ("high", np.float64),
+    ("low", np.float64),
+    ("close", np.float64),
+    ("volume", np.float64)
+])
+
+MANIFEST_FILE = "manifest.json"
+
+
+def candle_array(candles: List[Dict[str, Any]]) -> np.ndarray:
+    """
+    Convert candle dictionaries to a structured candle array.
+
+    Args:
+        candles: Normalized candles (see replay_feed.load_candles)
+
+    Returns:
+        Array of CANDLE_DTYPE sorted by time
+    """
+    array = np.empty(len(candles), dtype=CANDLE_DTYPE)
+    for field in CANDLE_DTYPE.names:
+        array[field] = [c[field] for c in candles]
+    array.sort(order="time", kind="stable")
+    return array
+
+
+def candle_records(array: np.ndarray) -> List[Dict[str, Any]]:
+    """
+    Convert (a slice of) a candle array to the agent OHLCV dictionary format.
+
+    Args:
+        array: Structured array of CANDLE_DTYPE
+
+    Returns:
+        List of candle dictionaries with `time` and `timestamp`
+    """
+    names = CANDLE_DTYPE.names
+    columns = [array[field].tolist() for field in names]
+    candles = []
+    for row in zip(*columns):
+        candle = dict(zip(names, row))
+        candle["timestamp"] = candle["time"]
+        candles.append(candle)
+    return candles
+
+
+class CandleStore:
+    """
+    Read-only, memory-mapped candle arrays keyed by symbol.
+    """
+
+    def __init__(self, directory: str, interval: str, arrays: Dict[str, np.ndarray]):
+        """
+        Initialize the store (use CandleStore.write / CandleStore.open).
+
+        Args:
+            directory: Store directory
+            interval: Candle interval of the stored data
+            arrays: Symbol -> structured candle array
+        """
+        self.directory = directory
+        self.interval = interval
+        self.arrays = arrays
+
+    @property
+    def symbols(self) -> List[str]:
+        """Stored symbols."""
+        return list(self.arrays.keys())
+
+    @classmethod
+    def write(cls, directory: str, candles: Dict[str, List[Dict[str, Any]]], interval: str) -> "CandleStore":
+        """
+        Write candles to a store directory.
+
+        Args:
+            directory: Target directory (created if missing)
+            candles: Symbol -> normalized candles (see replay_feed.load_candles)
+            interval: Candle interval
+
+        Returns:
+            The opened (memory-mapped) store
+        """
+        os.makedirs(directory, exist_ok=True)
+
+        files = {}
+        for symbol, symbol_candles in candles.items():
+            array = candle_array(symbol_candles)
+
+            filename = f"{symbol.replace('/', '').upper()}.npy"
+            np.save(os.path.join(directory, filename), array)
+            files[symbol.replace("/", "").upper()] = filename
+
+        with open(os.path.join(directory, MANIFEST_FILE), "w") as f:
+            json.dump({"interval": interval, "files": files}, f, indent=2)
+
+        logger.info(f"Wrote candle store for {len(files)} symbols to {directory}")
+        return cls.open(directory)
+
+    @classmethod
+    def open(cls, directory: str) -> "CandleStore":
+        """
+        Open a store directory with memory-mapped, read-only arrays.
+
+        Args:
+            directory: Store directory
+
+        Returns:
+            CandleStore instance
+        """
+        with open(os.path.join(directory, MANIFEST_FILE), "r") as f:
+            manifest = json.load(f)
+
+        arrays = {
+            symbol: np.load(os.path.join(directory, filename), mmap_mode="r")
+            for symbol, filename in manifest["files"].items()
+        }
+        return cls(directory, manifest["interval"], arrays)
+
+    def to_candles(self, symbol: str) -> List[Dict[str, Any]]:
+        """
+        Materialize a symbol's candles in the agent OHLCV dictionary format.
+
+        Args:
+            symbol: Trading symbol
+
+        Returns:
+            List of candle dictionaries
+        """
+        return candle_records(self.arrays[symbol.replace("/", "").upper()])
@@ -0,0 +1,91 @@
+#!/usr/bin/env python
+"""
+SimulatedClock for aGENtrader v2
+
+This module provides the clock used during backtests. The engine advances it
+bar by bar, the replay feed uses it to hide future candles, and it can stand
+in for the `time` module inside agent modules so that wall-clock checks (e.g.
+RiskGuardAgent's minimum trade interval) follow replayed time instead.
+"""
+
+import time as _time
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from typing import Any, Iterator, Optional
+
+
+class SimulatedClock:
+    """
+    Monotonic simulated clock measured in epoch milliseconds.
+
+    The clock exposes `time()` and `strftime()` with the same signatures as the
+    `time` module, so it can be installed in place of a module's `time` import.
+    """
+
+    def __init__(self, start_ms: int = 0):
+        """
+        Initialize the clock.
+
+        Args:
+            start_ms: Initial time in epoch milliseconds
+        """
+        self.now_ms = int(start_ms)
+
+    def advance_to(self, timestamp_ms: int) -> None:
+        """
+        Move the clock forward.
+
+        Args:
+            timestamp_ms: New time in epoch milliseconds
+
+        Raises:
+            ValueError: If the new time is before the current time
+        """
+        timestamp_ms = int(timestamp_ms)
+        if timestamp_ms < self.now_ms:
+            raise ValueError(f"Simulated clock cannot move backwards ({timestamp_ms} < {self.now_ms})")
+        self.now_ms = timestamp_ms
+
+    def time(self) -> float:
+        """Current simulated time in epoch seconds."""
+        return self.now_ms / 1000.0
+
+    def now(self) -> datetime:
+        """Current simulated time as a UTC datetime."""
+        return datetime.fromtimestamp(self.time(), tz=timezone.utc)
+
+    def isoformat(self) -> str:
+        """Current simulated time as an ISO 8601 string."""
+        return self.now().isoformat()
+
+    def strftime(self, fmt: str, t: Optional[Any] = None) -> str:
+        """Format the simulated time (or a given struct_time) like `time.strftime`."""
+        if t is None:
+            t = _time.gmtime(self.time())
+        return _time.strftime(fmt, t)
+
+    def __getattr__(self, name: str) -> Any:
+        # Everything else (sleep, perf_counter, gmtime, ...) comes from the real module
+        return getattr(_time, name)
+
+    @contextmanager
+    def install(self, *modules) -> Iterator["SimulatedClock"]:
+        """
+        Temporarily replace the `time` module used by the given modules.
+
+        Args:
+            *modules: Imported modules that use `import time`
+
+        Yields:
+            The clock itself
+        """
+        patched = []
+        try:
+            for module in modules:
+                if getattr(module, "time", None) is _time:
+                    module.time = self
+                    patched.append(module)
+            yield self
+        finally:
+            for module in patched:
+                module.time = _time
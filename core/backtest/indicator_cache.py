@@ -0,0 +1,113 @@
+#!/usr/bin/env python
+"""
+IndicatorCache for aGENtrader v2
+
+This module caches TechnicalAnalystAgent indicator frames. During a parameter
+sweep the same candle windows are analyzed once per parameter set; indicator
+values only depend on the window and the indicator periods, so runs that only
+differ in weights, thresholds or risk settings reuse the computed frame.
+"""
+
+from collections import OrderedDict
+from typing import Dict, Any, Callable, Tuple
+
+import pandas as pd
+
+# Indicator settings that only affect signal scoring, not the indicator values
+SCORING_KEYS = ("weight", "overbought", "oversold")
+
+
+def indicator_settings_key(indicators: Dict[str, Dict[str, Any]]) -> Tuple:
+    """
+    Build a hashable key from the settings that affect indicator values.
+
+    Args:
+        indicators: TechnicalAnalystAgent.indicators configuration
+
+    Returns:
+        Tuple of (indicator, setting, value) entries
+    """
+    return tuple(
+        (name, key, value)
+        for name in sorted(indicators)
+        for key, value in sorted(indicators[name].items())
+        if key not in SCORING_KEYS
+    )
+
+
+class IndicatorCache:
+    """
+    LRU cache of indicator frames keyed by candle window and indicator periods.
+    """
+
+    def __init__(self, max_entries: int = 20000):
+        """
+        Initialize the cache.
+
+        Args:
+            max_entries: Maximum number of cached frames
+        """
+        self.max_entries = max_entries
+        self._frames: "OrderedDict[Tuple, pd.DataFrame]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get_or_compute(
+        self,
+        symbol: str,
+        interval: str,
+        df: pd.DataFrame,
+        indicators: Dict[str, Dict[str, Any]],
+        compute: Callable[[pd.DataFrame], pd.DataFrame]
+    ) -> pd.DataFrame:
+        """
+        Return the cached indicator frame for a window, computing it on a miss.
+
+        Args:
+            symbol: Trading symbol
+            interval: Candle interval
+            df: Prepared OHLCV DataFrame (sorted by timestamp)
+            indicators: Indicator configuration used for the computation
+            compute: Function computing the indicator frame from df
+
+        Returns:
+            DataFrame with indicator columns
+        """
+        if df.empty:
+            return compute(df)
+
+        key = (
+            symbol,
+            interval,
+            len(df),
+            df["timestamp"].iloc[0],
+            df["timestamp"].iloc[-1],
+            indicator_settings_key(indicators)
+        )
+
+        frame = self._frames.get(key)
+        if frame is not None:
+            self.hits += 1
+            self._frames.move_to_end(key)
+            return frame
+
+        self.misses += 1
+        frame = compute(df)
+        self._frames[key] = frame
+        if len(self._frames) > self.max_entries:
+            self._frames.popitem(last=False)
+        return frame
+
+    def clear(self) -> None:
+        """Drop all cached frames."""
+        self._frames.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        """Cache hit/miss statistics."""
+        total = self.hits + self.misses
+        return {
+            "entries": len(self._frames),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / total if total else 0.0
+        }
@@ -0,0 +1,344 @@
+#!/usr/bin/env python
+"""
+ParameterSweep for aGENtrader v2
+
+This module runs grid or random searches over pipeline settings on a
+historical dataset using the BacktestEngine:
+
+- agent_weights.<Agent>          DecisionAgent weights (agent_weights_override)
+- technical.<indicator>.<key>    TechnicalAnalystAgent.indicators periods/weights
+- risk_guard.<attribute>         RiskGuardAgent thresholds
+- position_sizer.<attribute>     PositionSizerAgent settings
+- executor.<key>                 SimulatedExecutor settings (stop_loss_pct, ...)
+
+Parameter sets are spread over a process pool. Every worker memory-maps the
+same read-only CandleStore and replays the mapped arrays directly (candle
+dictionaries are built only for each bar's window), builds its orchestrator
+once, and keeps an IndicatorCache so parameter sets that share indicator periods reuse the
+indicator frames. Results are ranked by PnL, drawdown and Sharpe ratio.
+"""
+
+import os
+import copy
+import random
+import logging
+import itertools
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, Any, List, Optional, Callable
+
+import numpy as np
+
+from core.backtest.backtest_engine import BacktestEngine, add_default_analyst
+from core.backtest.candle_store import CandleStore
+from core.backtest.indicator_cache import IndicatorCache
+
+# Setup logger
+logger = logging.getLogger("aGENtrader.backtest.parameter_sweep")
+
+SECTIONS = ("agent_weights", "technical", "risk_guard", "position_sizer", "executor")
+
+# Ranking metrics and whether higher is better
+RANKING_METRICS = {
+    "total_pnl": True,
+    "max_drawdown_pct": False,
+    "sharpe_ratio": True
+}
+
+# Per-process state, populated by _init_worker
+_WORKER: Dict[str, Any] = {}
+
+
+def default_orchestrator_factory():
+    """Build the standard CoreOrchestrator, with the technical analyst if no analyst is configured."""
+    from core.core_orchestrator import CoreOrchestrator
+    orchestrator = CoreOrchestrator()
+    add_default_analyst(orchestrator)
+    return orchestrator
+
+
+def flatten_space(space: Dict[str, Any], prefix: str = "") -> Dict[str, Any]:
+    """
+    Flatten a nested search space into dotted parameter names.
+
+    Leaves are lists of candidate values or {"min": x, "max": y} ranges.
+
+    Args:
+        space: Nested search space (e.g. loaded from YAML)
+        prefix: Name prefix used during recursion
+
+    Returns:
+        Dictionary of dotted name -> candidates
+    """
+    flat = {}
+    for key, value in space.items():
+        name = f"{prefix}.{key}" if prefix else str(key)
+        if isinstance(value, dict) and not {"min", "max"} <= set(value):
+            flat.update(flatten_space(value, name))
+        else:
+            flat[name] = value if isinstance(value, (list, dict)) else [value]
+
+    for name in flat:
+        if name.split(".", 1)[0] not in SECTIONS:
+            raise ValueError(f"Unknown parameter section in '{name}' (expected one of {', '.join(SECTIONS)})")
+    return flat
+
+
+def grid_search(space: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """
+    Enumerate every combination of the search space.
+
+    Args:
+        space: Nested search space; ranges are not allowed in grid mode
+
+    Returns:
+        List of parameter sets (dotted name -> value)
+    """
+    flat = flatten_space(space)
+    for name, candidates in flat.items():
+        if isinstance(candidates, dict):
+            raise ValueError(f"Grid search needs explicit values for '{name}', got a range")
+
+    names = list(flat)
+    return [dict(zip(names, values)) for values in itertools.product(*(flat[n] for n in names))]
+
+
+def random_search(space: Dict[str, Any], n_samples: int, seed: Optional[int] = None) -> List[Dict[str, Any]]:
+    """
+    Sample parameter sets from the search space.
+
+    Lists are sampled uniformly; {"min", "max"} ranges are sampled uniformly
+    (as integers when both bounds are integers).
+
+    Args:
+        space: Nested search space
+        n_samples: Number of parameter sets
+        seed: Random seed for reproducible samples
+
+    Returns:
+        List of parameter sets (dotted name -> value)
+    """
+    flat = flatten_space(space)
+    rng = random.Random(seed)
+
+    samples = []
+    for _ in range(n_samples):
+        params = {}
+        for name, candidates in flat.items():
+            if isinstance(candidates, dict):
+                low, high = candidates["min"], candidates["max"]
+                if isinstance(low, int) and isinstance(high, int):
+                    params[name] = rng.randint(low, high)
+                else:
+                    params[name] = rng.uniform(low, high)
+            else:
+                params[name] = rng.choice(candidates)
+        samples.append(params)
+    return samples
+
+
+def rank_results(results: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """
+    Rank sweep results by PnL, drawdown and Sharpe ratio.
+
+    Each metric is ranked separately (1 = best) and results are ordered by
+    the mean of the three ranks. Failed runs are appended unranked.
+
+    Args:
+        results: Result dictionaries from the sweep workers
+
+    Returns:
+        Results ordered best first, with `rank` and `rank_score` fields
+    """
+    valid = [r for r in results if "error" not in r]
+    failed = [r for r in results if "error" in r]
+    if not valid:
+        return failed
+
+    metric_ranks = []
+    for metric, higher_is_better in RANKING_METRICS.items():
+        values = np.array([r.get(metric, 0.0) for r in valid], dtype=float)
+        order = np.argsort(-values if higher_is_better else values, kind="stable")
+        ranks = np.empty(len(values))
+        ranks[order] = np.arange(1, len(values) + 1)
+        metric_ranks.append(ranks)
+
+    scores = np.mean(metric_ranks, axis=0)
+    for result, score in zip(valid, scores):
+        result["rank_score"] = float(score)
+
+    valid.sort(key=lambda r: r["rank_score"])
+    for position, result in enumerate(valid, start=1):
+        result["rank"] = position
+
+    return valid + failed
+
+
+def _split_params(params: Dict[str, Any]) -> Dict[str, Dict[str, Any]]:
+    """Group dotted parameters by section."""
+    sections = {section: {} for section in SECTIONS}
+    for name, value in params.items():
+        section, _, key = name.partition(".")
+        sections[section][key] = value
+    return sections
+
+
+def _apply_attributes(target: Any, settings: Dict[str, Any]) -> None:
+    """Set agent attributes, merging into dictionary attributes for nested keys."""
+    for name, value in settings.items():
+        attr, _, nested = name.partition(".")
+        if nested:
+            merged = dict(getattr(target, attr, {}) or {})
+            merged[nested] = value
+            setattr(target, attr, merged)
+        else:
+            setattr(target, attr, value)
+
+
+def _indicator_group(params: Dict[str, Any]) -> tuple:
+    """Sort key grouping parameter sets with the same technical settings."""
+    return tuple(sorted((k, str(v)) for k, v in params.items() if k.startswith("technical.")))
+
+
+def _init_worker(store_dir: str, engine_options: Dict[str, Any], orchestrator_factory: Callable) -> None:
+    """Open the shared candle store and build this worker's orchestrator."""
+    store = CandleStore.open(store_dir)
+    orchestrator = orchestrator_factory()
+    cache = IndicatorCache()
+
+    technical = orchestrator.agents.get("technical_analyst")
+    if technical is not None:
+        technical.indicator_cache = cache
+
+    _WORKER.update({
+        "candles": dict(store.arrays),
+        "interval": store.interval,
+        "engine_options": engine_options,
+        "orchestrator": orchestrator,
+        "cache": cache,
+        "base_weights": dict(getattr(orchestrator, "agent_weights", {}) or {}),
+        "base_indicators": copy.deepcopy(getattr(technical, "indicators", None))
+    })
+
+
+def _run_param_set(params: Dict[str, Any]) -> Dict[str, Any]:
+    """Backtest one parameter set in a worker process."""
+    portfolio_state = None
+    try:
+        sections = _split_params(params)
+        orchestrator = _WORKER["orchestrator"]
+
+        orchestrator.agent_weights = {**_WORKER["base_weights"], **sections["agent_weights"]}
+
+        technical = orchestrator.agents.get("technical_analyst")
+        if technical is not None and _WORKER["base_indicators"] is not None:
+            indicators = copy.deepcopy(_WORKER["base_indicators"])
+            for name, value in sections["technical"].items():
+                indicator, _, key = name.partition(".")
+                indicators.setdefault(indicator, {})[key] = value
+            technical.indicators = indicators
+
+        risk_guard = None
+        if sections["risk_guard"]:
+            from agents.risk_guard_agent import RiskGuardAgent
+            from core.trading.portfolio_state import PortfolioState
+            # A private portfolio so trades of one run don't count against the next
+            portfolio_state = PortfolioState(name="sweep")
+            risk_guard = RiskGuardAgent(portfolio_state=portfolio_state)
+            _apply_attributes(risk_guard, sections["risk_guard"])
+
+        position_sizer = None
+        if sections["position_sizer"]:
+            from agents.position_sizer_agent import PositionSizerAgent
+            position_sizer = PositionSizerAgent()
+            _apply_attributes(position_sizer, sections["position_sizer"])
+
+        options = dict(_WORKER["engine_options"])
+        options["executor_config"] = {**options.get("executor_config", {}), **sections["executor"]}
+
+        engine = BacktestEngine(
+            _WORKER["candles"],
+            interval=_WORKER["interval"],
+            orchestrator=orchestrator,
+            risk_guard=risk_guard,
+            position_sizer=position_sizer,
+            **options
+        )
+        report = engine.run()
+
+        result = {"params": params}
+        result.update(report["performance"])
+        result["bars_per_second"] = report["throughput"]["bars_per_second"]
+        result["indicator_cache"] = _WORKER["cache"].stats()
+        result["worker"] = os.getpid()
+        return result
+    except Exception as e:
+        logger.error(f"Sweep run failed for {params}: {e}", exc_info=True)
+        return {"params": params, "error": str(e), "worker": os.getpid()}
+    finally:
+        if portfolio_state is not None:
+            portfolio_state.close()
+
+
+class ParameterSweep:
+    """
+    Process-pool runner for backtest parameter sweeps.
+    """
+
+    def __init__(
+        self,
+        store_dir: str,
+        engine_options: Optional[Dict[str, Any]] = None,
+        orchestrator_factory: Callable = default_orchestrator_factory,
+        max_workers: Optional[int] = None
+    ):
+        """
+        Initialize the sweep.
+
+        Args:
+            store_dir: CandleStore directory shared by all workers
+            engine_options: Extra BacktestEngine keyword arguments (warmup_bars,
+                decision_interval, initial_capital, executor_config, ...)
+            orchestrator_factory: Picklable top-level callable returning an orchestrator
+            max_workers: Number of worker processes (default: all cores)
+        """
+        self.store_dir = store_dir
+        self.engine_options = engine_options or {}
+        self.orchestrator_factory = orchestrator_factory
+        self.max_workers = max_workers or os.cpu_count() or 1
+
+    def run(self, param_sets: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """
+        Backtest every parameter set and rank the results.
+
+        Parameter sets with the same technical settings are submitted next to
+        each other so they land in the same worker chunk and share its
+        indicator cache.
+
+        Args:
+            param_sets: Parameter sets from grid_search / random_search
+
+        Returns:
+            Ranked results (see rank_results)
+        """
+        if not param_sets:
+            return []
+
+        ordered = sorted(param_sets, key=_indicator_group)
+        chunksize = max(1, len(ordered) // (self.max_workers * 4))
+
+        logger.info(
+            f"Running {len(ordered)} parameter sets on {self.max_workers} workers (chunksize {chunksize})"
+        )
+
+        with ProcessPoolExecutor(
+            max_workers=self.max_workers,
+            initializer=_init_worker,
+            initargs=(self.store_dir, self.engine_options, self.orchestrator_factory)
+        ) as pool:
+            results = list(pool.map(_run_param_set, ordered, chunksize=chunksize))
+
+        failed = sum(1 for r in results if "error" in r)
+        if failed:
+            logger.warning(f"{failed} of {len(results)} parameter sets failed")
+
+        return rank_results(results)
@@ -0,0 +1,388 @@
+#!/usr/bin/env python
+"""
+ReplayDataFeed for aGENtrader v2
+
+This module serves stored market data to agents during a backtest. It exposes
+the same methods as the live data providers (fetch_ohlcv, get_current_price,
+fetch_market_depth, ...) but only returns data that is visible at the current
+SimulatedClock time, so agents cannot look ahead.
+
+Candles, order book snapshots, funding rates and open interest are loaded from
+JSON, JSONL or CSV files, or candles from the `market_data` table. Candles can
+also be given as structured arrays (e.g. a memory-mapped CandleStore), which
+are converted to dictionaries only for the windows agents request.
+"""
+
+import os
+import csv
+import json
+import logging
+from datetime import datetime, timezone
+from typing import Dict, Any, List, Optional
+
+import numpy as np
+
+from core.backtest.clock import SimulatedClock
+from core.backtest.candle_store import candle_records
+
+# Setup logger
+logger = logging.getLogger("aGENtrader.backtest.replay_feed")
+
+INTERVAL_MS = {
+    "1m": 60_000,
+    "3m": 180_000,
+    "5m": 300_000,
+    "15m": 900_000,
+    "30m": 1_800_000,
+    "1h": 3_600_000,
+    "2h": 7_200_000,
+    "4h": 14_400_000,
+    "6h": 21_600_000,
+    "8h": 28_800_000,
+    "12h": 43_200_000,
+    "1d": 86_400_000,
+    "3d": 259_200_000,
+    "1w": 604_800_000
+}
+
+TIMESTAMP_KEYS = ("timestamp", "time", "open_time", "fundingTime")
+
+
+def interval_to_ms(interval: str) -> int:
+    """
+    Convert an interval string to milliseconds.
+
+    Args:
+        interval: Interval string (e.g., "1h", "4h", "1d")
+
+    Returns:
+        Interval length in milliseconds
+
+    Raises:
+        ValueError: If the interval is not supported
+    """
+    if interval not in INTERVAL_MS:
+        raise ValueError(f"Unsupported interval: {interval}")
+    return INTERVAL_MS[interval]
+
+
+def to_millis(value: Any) -> int:
+    """
+    Convert a timestamp (epoch seconds/milliseconds or ISO string) to epoch milliseconds.
+
+    Args:
+        value: Timestamp value
+
+    Returns:
+        Epoch milliseconds
+    """
+    if isinstance(value, datetime):
+        dt = value if value.tzinfo else value.replace(tzinfo=timezone.utc)
+        return int(dt.timestamp() * 1000)
+
+    if isinstance(value, str):
+        try:
+            value = float(value)
+        except ValueError:
+            dt = datetime.fromisoformat(value.replace("Z", "+00:00"))
+            return to_millis(dt)
+
+    value = float(value)
+    # Values below 1e11 are epoch seconds (1e11 ms is March 1973)
+    return int(value * 1000) if value < 1e11 else int(value)
+
+
+def record_millis(record: Dict[str, Any]) -> int:
+    """Get the timestamp of a record in epoch milliseconds."""
+    for key in TIMESTAMP_KEYS:
+        if record.get(key) is not None:
+            return to_millis(record[key])
+    raise ValueError(f"Record has no timestamp field: {record}")
+
+
+def load_records(path: str) -> List[Dict[str, Any]]:
+    """
+    Load records from a JSON, JSONL or CSV file.
+
+    Args:
+        path: File path
+
+    Returns:
+        List of record dictionaries
+    """
+    ext = os.path.splitext(path)[1].lower()
+
+    with open(path, "r") as f:
+        if ext == ".csv":
+            return [dict(row) for row in csv.DictReader(f)]
+
+        if ext == ".jsonl":
+            return [json.loads(line) for line in f if line.strip()]
+
+        data = json.load(f)
+
+    if isinstance(data, dict):
+        # Accept {"candles": [...]} / {"data": [...]} wrappers
+        for key in ("candles", "ohlcv", "data", "records"):
+            if isinstance(data.get(key), list):
+                return data[key]
+        raise ValueError(f"No record list found in {path}")
+
+    return data
+
+
+def normalize_candle(candle: Any) -> Dict[str, Any]:
+    """
+    Convert a candle (Binance kline list, DB row or dict) to the agent OHLCV format.
+
+    Args:
+        candle: Raw candle
+
+    Returns:
+        Candle dictionary with `time`, `timestamp`, open, high, low, close and volume
+    """
+    if isinstance(candle, (list, tuple)):
+        candle = {
+            "time": candle[0],
+            "open": candle[1],
+            "high": candle[2],
+            "low": candle[3],
+            "close": candle[4],
+            "volume": candle[5]
+        }
+
+    normalized = dict(candle)
+    timestamp = record_millis(candle)
+    normalized["time"] = timestamp
+    normalized["timestamp"] = timestamp
+    for key in ("open", "high", "low", "close", "volume"):
+        normalized[key] = float(candle.get(key) or 0.0)
+    return normalized
+
+
+def load_candles(path: str) -> List[Dict[str, Any]]:
+    """
+    Load candles from a file, normalized and sorted by time.
+
+    Args:
+        path: JSON, JSONL or CSV file with one candle per record
+
+    Returns:
+        List of candle dictionaries
+    """
+    candles = [normalize_candle(c) for c in load_records(path)]
+    candles.sort(key=lambda c: c["time"])
+    logger.info(f"Loaded {len(candles)} candles from {path}")
+    return candles
+
+
+def load_candles_from_db(db, symbol: str, interval: str, limit: int = 100000) -> List[Dict[str, Any]]:
+    """
+    Load stored candles from the `market_data` table.
+
+    Args:
+        db: DatabaseConnector instance
+        symbol: Trading symbol
+        interval: Candle interval
+        limit: Maximum number of (most recent) candles to load
+
+    Returns:
+        List of candle dictionaries sorted by time
+    """
+    rows = db.get_market_data(symbol, interval, limit)
+    candles = [normalize_candle(row) for row in rows]
+    candles.sort(key=lambda c: c["time"])
+    logger.info(f"Loaded {len(candles)} {interval} candles for {symbol} from database")
+    return candles
+
+
+class _TimeSeries:
+    """Sorted records with a timestamp index for as-of lookups."""
+
+    def __init__(self, records: List[Dict[str, Any]], visible_after_ms: int = 0):
+        records = sorted(records, key=record_millis)
+        self.records = records
+        self.record_times = np.array([record_millis(r) for r in records], dtype=np.int64)
+        self.visible_after_ms = visible_after_ms
+
+    def visible_count(self, now_ms: int) -> int:
+        return int(np.searchsorted(self.record_times, now_ms - self.visible_after_ms, side="right"))
+
+    def _records(self, start: int, end: int) -> List[Dict[str, Any]]:
+        return self.records[start:end]
+
+    def window(self, now_ms: int, limit: int) -> List[Dict[str, Any]]:
+        end = self.visible_count(now_ms)
+        return self._records(max(0, end - limit), end)
+
+    def latest(self, now_ms: int) -> Optional[Dict[str, Any]]:
+        end = self.visible_count(now_ms)
+        return self._records(end - 1, end)[0] if end else None
+
+    def at(self, timestamp_ms: int) -> Optional[Dict[str, Any]]:
+        """Record stamped exactly `timestamp_ms`, or None."""
+        index = int(np.searchsorted(self.record_times, timestamp_ms, side="left"))
+        if index < len(self.record_times) and self.record_times[index] == timestamp_ms:
+            return self._records(index, index + 1)[0]
+        return None
+
+
+class _CandleArray(_TimeSeries):
+    """Structured candle array; dictionaries are built per requested slice."""
+
+    def __init__(self, array: np.ndarray, visible_after_ms: int = 0):
+        self.records = array
+        self.record_times = array["time"]
+        self.visible_after_ms = visible_after_ms
+
+    def _records(self, start: int, end: int) -> List[Dict[str, Any]]:
+        return candle_records(self.records[start:end])
+
+
+class ReplayDataFeed:
+    """
+    Point-in-time market data provider for backtests.
+
+    A candle becomes visible once it has closed (open time + interval <= clock).
+    Order book, funding and open interest records become visible at their
+    timestamp. Symbols are accepted with or without "/".
+    """
+
+    def __init__(
+        self,
+        clock: SimulatedClock,
+        candles: Dict[str, List[Dict[str, Any]]],
+        interval: str = "1h",
+        depth: Optional[Dict[str, List[Dict[str, Any]]]] = None,
+        funding_rates: Optional[Dict[str, List[Dict[str, Any]]]] = None,
+        open_interest: Optional[Dict[str, List[Dict[str, Any]]]] = None
+    ):
+        """
+        Initialize the replay feed.
+
+        Args:
+            clock: Simulated clock driving visibility
+            candles: Symbol -> normalized candles (see load_candles), or
+                structured candle arrays sorted by time (see CandleStore)
+            interval: Candle interval of the stored data
+            depth: Optional symbol -> order book snapshots (with bids/asks)
+            funding_rates: Optional symbol -> funding rate records
+            open_interest: Optional symbol -> open interest records
+        """
+        self.clock = clock
+        self.interval = interval
+        self.interval_ms = interval_to_ms(interval)
+
+        self._candles = {
+            self._key(s): (_CandleArray if isinstance(c, np.ndarray) else _TimeSeries)(c, self.interval_ms)
+            for s, c in candles.items()
+        }
+        self._depth = {self._key(s): _TimeSeries(r) for s, r in (depth or {}).items()}
+        self._funding = {self._key(s): _TimeSeries(r) for s, r in (funding_rates or {}).items()}
+        self._open_interest = {self._key(s): _TimeSeries(r) for s, r in (open_interest or {}).items()}
+
+    @staticmethod
+    def _key(symbol: str) -> str:
+        return str(symbol).replace("/", "").upper()
+
+    @property
+    def symbols(self) -> List[str]:
+        """Symbols with candle data."""
+        return list(self._candles.keys())
+
+    def candle_times(self, symbol: str) -> np.ndarray:
+        """Open times (epoch ms) of a symbol's candles, ascending."""
+        series = self._candles.get(self._key(symbol))
+        return series.record_times if series else np.empty(0, dtype=np.int64)
+
+    def candles_at(self, open_ms: int) -> Dict[str, Dict[str, Any]]:
+        """
+        Candles opening at a time, regardless of the simulated clock.
+
+        Args:
+            open_ms: Candle open time in epoch milliseconds
+
+        Returns:
+            Symbol -> candle for the symbols with a candle at that time
+        """
+        bars = {}
+        for symbol, series in self._candles.items():
+            candle = series.at(open_ms)
+            if candle is not None:
+                bars[symbol] = candle
+        return bars
+
+    def has_depth(self, symbol: str) -> bool:
+        """Whether order book snapshots are available for a symbol."""
+        return self._key(symbol) in self._depth
+
+    def fetch_ohlcv(
+        self,
+        symbol: str,
+        interval: Optional[str] = None,
+        limit: int = 100,
+        start_time: Optional[int] = None,
+        end_time: Optional[int] = None
+    ) -> List[Dict[str, Any]]:
+        """
+        Get closed candles up to the current simulated time.
+
+        Args:
+            symbol: Trading symbol
+            interval: Requested interval (stored interval is always served)
+            limit: Maximum number of candles
+            start_time: Optional start time in milliseconds
+            end_time: Optional end time in milliseconds (capped at the clock)
+
+        Returns:
+            List of candle dictionaries, oldest first
+        """
+        series = self._candles.get(self._key(symbol))
+        if series is None:
+            return []
+
+        if interval and interval != self.interval:
+            logger.debug(f"Requested {interval} candles, serving stored {self.interval} candles")
+
+        now_ms = self.clock.now_ms if end_time is None else min(self.clock.now_ms, int(end_time))
+        candles = series.window(now_ms, limit)
+        if start_time is not None:
+            candles = [c for c in candles if c["time"] >= start_time]
+        return candles
+
+    def get_current_price(self, symbol: str) -> Optional[float]:
+        """Close of the last visible candle."""
+        series = self._candles.get(self._key(symbol))
+        latest = series.latest(self.clock.now_ms) if series else None
+        return latest["close"] if latest else None
+
+    def get_current_prices(self, symbols: Optional[List[str]] = None) -> Dict[str, float]:
+        """Closes of the last visible candles for many symbols."""
+        prices = {}
+        for symbol in (symbols or self.symbols):
+            price = self.get_current_price(symbol)
+            if price is not None:
+                prices[self._key(symbol)] = price
+        return prices
+
+    def fetch_market_depth(self, symbol: str, limit: int = 100) -> Optional[Dict[str, Any]]:
+        """Latest order book snapshot at or before the current simulated time."""
+        series = self._depth.get(self._key(symbol))
+        snapshot = series.latest(self.clock.now_ms) if series else None
+        if not snapshot:
+            return None
+
+        snapshot = dict(snapshot)
+        snapshot["bids"] = snapshot.get("bids", [])[:limit]
+        snapshot["asks"] = snapshot.get("asks", [])[:limit]
+        return snapshot
+
+    def fetch_funding_rates(self, symbol: str, limit: int = 100) -> List[Dict[str, Any]]:
+        """Funding rate records up to the current simulated time."""
+        series = self._funding.get(self._key(symbol))
+        return series.window(self.clock.now_ms, limit) if series else []
+
+    def fetch_open_interest(self, symbol: str, limit: int = 100) -> List[Dict[str, Any]]:
+        """Open interest records up to the current simulated time."""
+        series = self._open_interest.get(self._key(symbol))
+        return series.window(self.clock.now_ms, limit) if series else []
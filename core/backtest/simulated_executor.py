@@ -0,0 +1,357 @@
+#!/usr/bin/env python
+"""
+SimulatedExecutor for aGENtrader v2
+
+This module provides the fill model used during backtests. It takes the place
+of TradeExecutorAgent in the orchestrator's trade pipeline: decisions are
+queued and filled at the next bar's open (with slippage and fees), stop loss /
+take profit / trailing stops are checked against every bar's high/low through
+the StopEngine, and equity is marked at every bar close.
+"""
+
+import math
+import logging
+from typing import Dict, Any, Optional, List
+
+import numpy as np
+
+from core.backtest.clock import SimulatedClock
+from core.trading.mark_to_market import normalize_symbol
+from core.trading.stop_engine import StopEngine
+
+# Setup logger
+logger = logging.getLogger("aGENtrader.backtest.simulated_executor")
+
+
+class SimulatedExecutor:
+    """
+    Simulated trade executor with a next-bar-open fill model.
+
+    Uses the same configuration keys as TradeExecutorAgent (confidence_threshold,
+    stop_loss_pct, take_profit_pct, trailing_stop_pct) plus:
+    - default_position_size: fraction of equity per trade when no PositionSizer is given
+    - fee_pct: fee per fill in percent of notional
+    - slippage_pct: adverse slippage per market fill in percent
+    """
+
+    def __init__(
+        self,
+        clock: SimulatedClock,
+        config: Optional[Dict[str, Any]] = None,
+        initial_capital: float = 10000.0,
+        risk_guard=None,
+        position_sizer=None
+    ):
+        """
+        Initialize the simulated executor.
+
+        Args:
+            clock: Simulated clock of the backtest
+            config: Executor configuration
+            initial_capital: Starting balance in quote currency
+            risk_guard: Optional RiskGuardAgent to vet trades
+            position_sizer: Optional PositionSizerAgent to size trades
+        """
+        config = config or {}
+        self.clock = clock
+
+        self.confidence_threshold = config.get("confidence_threshold", 60)
+        self.stop_loss_pct = config.get("stop_loss_pct", 5.0)
+        self.take_profit_pct = config.get("take_profit_pct", 10.0)
+        self.trailing_stop_pct = config.get("trailing_stop_pct")
+        self.default_position_size = config.get("default_position_size", 0.1)
+        self.fee_pct = config.get("fee_pct", 0.1)
+        self.slippage_pct = config.get("slippage_pct", 0.05)
+
+        self.risk_guard = risk_guard
+        if self.risk_guard is not None and getattr(self.risk_guard, "trade_book", None) is None:
+            # Let the risk guard see the simulated book for concurrent position checks
+            self.risk_guard.trade_book = self
+        self.position_sizer = position_sizer
+
+        self.initial_capital = float(initial_capital)
+        self.balance = float(initial_capital)
+        self.total_fees = 0.0
+
+        self.stop_engine = StopEngine()
+        self.positions: Dict[str, Dict[str, Any]] = {}
+        self.pending_orders: Dict[str, Dict[str, Any]] = {}
+        self.closed_trades: List[Dict[str, Any]] = []
+        self.rejected_count = 0
+
+        self._last_close: Dict[str, float] = {}
+        self._equity_times: List[int] = []
+        self._equity_values: List[float] = []
+        self._trade_seq = 0
+
+    def execute_decision(
+        self,
+        decision: Dict[str, Any],
+        market_data: Optional[Dict[str, Any]] = None,
+        pre_approved: bool = False
+    ) -> Dict[str, Any]:
+        """
+        Queue a trading decision for execution at the next bar open.
+
+        Args:
+            decision: Trading decision (action, pair/symbol, confidence)
+            market_data: Market event the decision was made on
+            pre_approved: Whether the risk guard already admitted and recorded
+                the trade (the orchestrator's batched risk evaluation); the
+                decision's position_size is then used as is
+
+        Returns:
+            Dictionary with execution status
+        """
+        symbol = normalize_symbol(decision.get("symbol") or decision.get("pair") or "")
+        action = decision.get("action", "HOLD")
+        confidence = decision.get("confidence", 0) or 0
+
+        if not symbol:
+            return {"status": "error", "message": "Missing symbol in decision"}
+
+        if action not in ("BUY", "SELL"):
+            return {"status": "skipped", "message": f"No order for {action}"}
+
+        if confidence < self.confidence_threshold:
+            return {
+                "status": "skipped",
+                "message": f"Confidence {confidence} below threshold {self.confidence_threshold}"
+            }
+
+        position = self.positions.get(symbol)
+        if position and position["action"] == action:
+            return {"status": "hold", "message": f"Already have an open {action} position"}
+
+        ohlcv = (market_data or {}).get("ohlcv") or []
+        if pre_approved and decision.get("position_size") is not None:
+            position_size = float(decision["position_size"])
+        else:
+            position_size = self._position_size(symbol, confidence, ohlcv)
+
+        if self.risk_guard is not None and not pre_approved:
+            trade = {
+                "symbol": symbol,
+                "action": action,
+                "confidence": confidence,
+                "position_size": position_size
+            }
+            volatility = self._volatility(ohlcv)
+            if volatility is not None:
+                trade["volatility"] = volatility
+
+            accepted, reason = self.risk_guard.evaluate_trade(trade)
+            if not accepted:
+                self.rejected_count += 1
+                return {"status": "rejected", "message": f"Risk guard rejected: {reason}"}
+
+            trade["timestamp"] = self.clock.time()
+            self.risk_guard.record_trade(trade)
+
+        self._trade_seq += 1
+        trade_id = f"BT-{self._trade_seq:06d}"
+        self.pending_orders[symbol] = {
+            "trade_id": trade_id,
+            "symbol": symbol,
+            "action": action,
+            "confidence": confidence,
+            "position_size": position_size,
+            "decision_time": self.clock.now_ms,
+            "reason": decision.get("reason", "")
+        }
+
+        return {
+            "status": "success",
+            "trade_id": trade_id,
+            "message": f"{action} {symbol} queued for next bar open"
+        }
+
+    def on_bars(self, timestamp_ms: int, bars: Dict[str, Dict[str, Any]]) -> None:
+        """
+        Advance the simulation by one bar for every symbol.
+
+        Fills pending orders at the bar open, checks stops against the bar's
+        high/low and marks equity at the bar close.
+
+        Args:
+            timestamp_ms: Bar open time in epoch milliseconds
+            bars: Symbol -> candle for this timestamp
+        """
+        for symbol, bar in bars.items():
+            order = self.pending_orders.pop(symbol, None)
+            if order:
+                self._fill_order(order, bar["open"], timestamp_ms)
+
+        if len(self.stop_engine):
+            highs = {symbol: bar["high"] for symbol, bar in bars.items()}
+            lows = {symbol: bar["low"] for symbol, bar in bars.items()}
+            for event in self.stop_engine.evaluate_bars(highs, lows):
+                self._close_position(event["symbol"], event["exit_price"], timestamp_ms, event["reason"])
+
+        for symbol, bar in bars.items():
+            self._last_close[symbol] = bar["close"]
+
+        equity = self.get_equity()
+        self._equity_times.append(timestamp_ms)
+        self._equity_values.append(equity)
+
+        # Drawdown limits follow the simulated equity
+        if self.risk_guard is not None:
+            self.risk_guard.update_equity(equity)
+
+    def close_all(self, reason: str = "End of backtest") -> None:
+        """Close every open position at the last known close."""
+        for symbol in list(self.positions):
+            price = self._slipped(self._last_close[symbol], self.positions[symbol]["action"], closing=True)
+            self._close_position(symbol, price, self.clock.now_ms, reason)
+        self.pending_orders.clear()
+
+        if self._equity_values:
+            self._equity_values[-1] = self.get_equity()
+
+    def get_equity(self) -> float:
+        """Balance plus unrealized PnL at the last known closes."""
+        unrealized = 0.0
+        for symbol, position in self.positions.items():
+            price = self._last_close.get(symbol, position["entry_price"])
+            unrealized += self._pnl(position, price)
+        return self.balance + unrealized
+
+    def get_equity_curve(self) -> Dict[str, np.ndarray]:
+        """
+        Get the equity marked at every bar close.
+
+        Returns:
+            Dictionary with `time` (epoch ms) and `equity` arrays
+        """
+        return {
+            "time": np.array(self._equity_times, dtype=np.int64),
+            "equity": np.array(self._equity_values, dtype=float)
+        }
+
+    def list_open_trades(self) -> List[Dict[str, Any]]:
+        """Open positions (TradeBookManager-compatible for RiskGuardAgent)."""
+        return list(self.positions.values())
+
+    def get_open_positions(self) -> List[Dict[str, Any]]:
+        """Get a list of all open positions."""
+        return self.list_open_trades()
+
+    def get_portfolio_summary(self) -> Dict[str, Any]:
+        """Get a summary of the simulated portfolio."""
+        return {
+            "balance": self.balance,
+            "equity": self.get_equity(),
+            "open_positions": len(self.positions),
+            "closed_trades": len(self.closed_trades),
+            "total_fees": self.total_fees
+        }
+
+    def _fill_order(self, order: Dict[str, Any], open_price: float, timestamp_ms: int) -> None:
+        """Fill a queued order at the bar open, reversing any opposite position."""
+        symbol = order["symbol"]
+        action = order["action"]
+
+        existing = self.positions.get(symbol)
+        if existing:
+            if existing["action"] == action:
+                return
+            exit_price = self._slipped(open_price, existing["action"], closing=True)
+            self._close_position(symbol, exit_price, timestamp_ms, "Reversed by new signal")
+
+        entry_price = self._slipped(open_price, action, closing=False)
+        notional = self.get_equity() * order["position_size"]
+        if notional <= 0 or entry_price <= 0:
+            return
+
+        fee = notional * self.fee_pct / 100
+        self.balance -= fee
+        self.total_fees += fee
+
+        stop_loss, take_profit = self._calculate_sl_tp(action, entry_price)
+        position = {
+            "trade_id": order["trade_id"],
+            "symbol": symbol,
+            "action": action,
+            "entry_price": entry_price,
+            "quantity": notional / entry_price,
+            "notional": notional,
+            "confidence": order["confidence"],
+            "stop_loss": stop_loss,
+            "take_profit": take_profit,
+            "entry_time": timestamp_ms,
+            "fees": fee
+        }
+        self.positions[symbol] = position
+        self.stop_engine.add_position(
+            position_id=symbol,
+            symbol=symbol,
+            action=action,
+            entry_price=entry_price,
+            stop_loss=stop_loss,
+            take_profit=take_profit,
+            size=position["quantity"],
+            trailing_stop_pct=self.trailing_stop_pct
+        )
+
+    def _close_position(self, symbol: str, exit_price: float, timestamp_ms: int, reason: str) -> None:
+        """Realize PnL for an open position and move it to the closed trades."""
+        position = self.positions.pop(symbol, None)
+        if not position:
+            return
+        self.stop_engine.remove_position(symbol)
+
+        fee = position["quantity"] * exit_price * self.fee_pct / 100
+        gross_pnl = self._pnl(position, exit_price)
+        self.balance += gross_pnl - fee
+        self.total_fees += fee
+
+        closed = dict(position)
+        closed.update({
+            "exit_price": exit_price,
+            "exit_time": timestamp_ms,
+            "exit_reason": reason,
+            "fees": position["fees"] + fee,
+            "pnl": gross_pnl - position["fees"] - fee,
+            "pnl_pct": (gross_pnl - position["fees"] - fee) / position["notional"] * 100
+        })
+        self.closed_trades.append(closed)
+
+    def _position_size(self, symbol: str, confidence: float, ohlcv: List[Dict[str, Any]]) -> float:
+        """Fraction of equity to commit to a trade."""
+        if self.position_sizer is None:
+            return self.default_position_size
+        return self.position_sizer.calculate_position_size(
+            symbol=symbol,
+            confidence=confidence,
+            price_data=ohlcv or None
+        )
+
+    def _calculate_sl_tp(self, action: str, entry_price: float) -> tuple:
+        """Stop loss and take profit levels (same rules as TradeExecutorAgent)."""
+        if action == "BUY":
+            return (entry_price * (1 - self.stop_loss_pct / 100),
+                    entry_price * (1 + self.take_profit_pct / 100))
+        return (entry_price * (1 + self.stop_loss_pct / 100),
+                entry_price * (1 - self.take_profit_pct / 100))
+
+    def _slipped(self, price: float, action: str, closing: bool) -> float:
+        """Apply adverse slippage to a market fill."""
+        buying = (action == "BUY") != closing
+        factor = 1 + self.slippage_pct / 100 if buying else 1 - self.slippage_pct / 100
+        return price * factor
+
+    @staticmethod
+    def _pnl(position: Dict[str, Any], price: float) -> float:
+        direction = 1.0 if position["action"] == "BUY" else -1.0
+        return (price - position["entry_price"]) * position["quantity"] * direction
+
+    @staticmethod
+    def _volatility(ohlcv: List[Dict[str, Any]]) -> Optional[float]:
+        """Standard deviation of log returns over the last 15 closes."""
+        closes = np.array([c["close"] for c in ohlcv[-15:]], dtype=float)
+        if len(closes) < 3 or np.any(closes <= 0):
+            return None
+        returns = np.diff(np.log(closes))
+        volatility = float(np.std(returns, ddof=1))
+        return volatility if math.isfinite(volatility) else None
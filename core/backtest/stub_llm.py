@@ -0,0 +1,86 @@
+#!/usr/bin/env python
+"""
+StubLLMClient for aGENtrader v2
+
+This module provides a deterministic stand-in for models.llm_client.LLMClient.
+Backtests must be reproducible and fast, so agents that would normally query
+Ollama/Grok/OpenAI get fixed JSON responses instead of network calls.
+"""
+
+import json
+from typing import Dict, Any, Optional, Callable, Union
+
+DEFAULT_RESPONSE = {
+    "action": "HOLD",
+    "signal": "NEUTRAL",
+    "confidence": 50,
+    "reason": "Deterministic backtest stub response"
+}
+
+
+class StubLLMClient:
+    """
+    Deterministic LLM client with the same query/generate interface as LLMClient.
+
+    Responses can be a fixed dictionary/string or a callable receiving the
+    prompt, so tests can script LLM behaviour without randomness.
+    """
+
+    def __init__(
+        self,
+        response: Optional[Union[Dict[str, Any], str, Callable[[str], Any]]] = None,
+        agent_name: Optional[str] = None
+    ):
+        """
+        Initialize the stub client.
+
+        Args:
+            response: Fixed response (dict or string) or callable(prompt) -> response
+            agent_name: Name of the agent using this client
+        """
+        self.response = response if response is not None else DEFAULT_RESPONSE
+        self.agent_name = agent_name
+        self.provider = "stub"
+        self.model = "stub"
+        self.api_keys = {}
+        self.call_count = 0
+
+    def _respond(self, prompt: str) -> Any:
+        self.call_count += 1
+        return self.response(prompt) if callable(self.response) else self.response
+
+    def query(self, prompt: str, **kwargs) -> Dict[str, Any]:
+        """
+        Return the scripted response in LLMClient.query format.
+
+        Args:
+            prompt: User prompt
+            **kwargs: Ignored LLMClient.query parameters
+
+        Returns:
+            Dictionary containing response and metadata
+        """
+        return {
+            "status": "success",
+            "content": self._respond(prompt),
+            "provider": self.provider,
+            "model": self.model
+        }
+
+    def generate(self, prompt: str, **kwargs) -> str:
+        """
+        Return the scripted response as a string.
+
+        Args:
+            prompt: The prompt to send to the LLM
+            **kwargs: Ignored LLMClient.query parameters
+
+        Returns:
+            The response text (dict responses are JSON encoded)
+        """
+        content = self._respond(prompt)
+        return json.dumps(content) if isinstance(content, dict) else str(content)
+
+    def check_ollama_status(self) -> Dict[str, Any]:
+        """Report the stub as available."""
+        return {"status": "available", "message": "Stub LLM client", "models": []}
@@ -26,14 +26,17 @@ from agents.liquidity_analyst_agent import LiquidityAnalystAgent
 from agents.technical_analyst_agent import TechnicalAnalystAgent
 from agents.sentiment_analyst_agent import SentimentAnalystAgent
 from agents.decision_agent import DecisionAgent
-from agents.portfolio_manager_agent import PortfolioManagerAgent, TradeValidationStatus
-from agents.risk_guard_agent import RiskGuardAgent, RiskApprovalStatus
+from agents.portfolio_manager_agent import PortfolioManagerAgent
+from agents.risk_guard_agent import RiskGuardAgent
 from agents.position_sizer_agent import PositionSizerAgent
 from agents.trade_executor_agent import TradeExecutorAgent
+from core.trading.batch_evaluator import BatchTradeEvaluator, APPROVED, REJECTED, SKIPPED
+from core.trading.mark_to_market import normalize_symbol
 
 # Import utility modules
 from utils.config import get_config
 from utils.logger import get_logger
+from utils.tracing import traced, current_trace_id, set_attributes, CYCLE
 
 # Import error handling utilities
 from utils.error_handler import (
@@ -140,12 +143,14 @@ class CoreOrchestrator:
             self.agents["position_sizer"] = PositionSizerAgent()  # Always initialize for trade execution
             self.logger.info("Position Sizer Agent initialized (default)")
             
-        # Initialize Trade Executor Agent
+        # Initialize Trade Executor Agent (sharing the risk guard, which the batch evaluation already ran)
+        executor_config = self.agent_config.get("trade_executor", {})
         if "TradeExecutor" in active_agents and config.is_agent_active("trade_executor"):
-            self.agents["trade_executor"] = TradeExecutorAgent()
+            self.agents["trade_executor"] = TradeExecutorAgent(executor_config, risk_guard_agent=self.agents["risk_guard"])
             self.logger.info("Trade Executor Agent initialized")
         else:
-            self.agents["trade_executor"] = TradeExecutorAgent()  # Always initialize for trade execution
+            # Always initialize for trade execution
+            self.agents["trade_executor"] = TradeExecutorAgent(executor_config, risk_guard_agent=self.agents["risk_guard"])
             self.logger.info("Trade Executor Agent initialized (default)")
             
         # Future: Initialize other agents as they are implemented
@@ -184,6 +189,64 @@ class CoreOrchestrator:
         # Run analysis workflow with the market event data
         return self._run_analysis_workflow(results, market_event)
     
+    def process_market_events(self, market_events: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """
+        Process market events for several symbols as one trading cycle.
+        
+        Each event is analyzed as in process_market_event, but the resulting
+        decisions go through the trade execution pipeline together, ranked
+        against each other and sharing one set of portfolio budgets.
+        
+        Args:
+            market_events: Market event data dictionaries, one per symbol
+            
+        Returns:
+            Trading decision dictionaries, in the order of the events
+        """
+        self.logger.info(f"Processing {len(market_events)} market events")
+        
+        all_results = []
+        for market_event in market_events:
+            results = {
+                "symbol": market_event.get("symbol", self.default_symbol),
+                "interval": self.default_interval,
+                "timestamp": market_event.get("timestamp", time.strftime("%Y-%m-%d %H:%M:%S")),
+                "analyses": {},
+                "market_data": market_event,
+                "decision": None
+            }
+            all_results.append(self._run_analysis_workflow(results, market_event, execute_trades=False))
+        
+        # Collect the tradeable decisions of the cycle
+        pending = [
+            results for results in all_results
+            if isinstance(results.get("decision"), dict)
+            and not results["decision"].get("error", False)
+            and results["decision"].get("action") in ("BUY", "SELL")
+        ]
+        if not pending:
+            return all_results
+        
+        self.logger.info(f"Processing trade execution pipeline for {len(pending)} decisions")
+        decisions = [dict(results["decision"]) for results in pending]
+        events = {normalize_symbol(results["symbol"]): results["market_data"] for results in pending}
+        try:
+            trade_results = self._execute_trade_batch(decisions, events)
+        except Exception as e:
+            error_msg = f"Error in trade execution pipeline: {str(e)}"
+            self.logger.error(error_msg)
+            self.logger.error(f"Stack trace: {traceback.format_exc()}")
+            trade_results = [{
+                "status": "error",
+                "error": True,
+                "message": error_msg,
+                "timestamp": time.strftime("%Y-%m-%d %H:%M:%S")
+            } for _ in pending]
+        
+        for results, trade_result in zip(pending, trade_results):
+            results["trade_execution"] = trade_result
+        return all_results
+    
     def run_analysis(self, 
                    symbol: Optional[str] = None, 
                    interval: Optional[str] = None) -> Dict[str, Any]:
@@ -214,15 +277,19 @@ class CoreOrchestrator:
         # Run the core analysis workflow (without market event data)
         return self._run_analysis_workflow(results)
     
+    @traced("analysis_cycle", kind=CYCLE)
     def _run_analysis_workflow(self, 
                              results: Dict[str, Any], 
-                             market_event: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+                             market_event: Optional[Dict[str, Any]] = None,
+                             execute_trades: bool = True) -> Dict[str, Any]:
         """
         Internal method to run the core analysis workflow.
         
         Args:
             results: Partial results dictionary
             market_event: Optional market event data
+            execute_trades: Whether to run the trade execution pipeline on
+                the decision (process_market_events runs it per batch instead)
             
         Returns:
             Completed results dictionary with analysis and decision
@@ -237,6 +304,10 @@ class CoreOrchestrator:
             symbol = results.get("symbol", self.default_symbol)
             interval = results.get("interval", self.default_interval)
             
+            # Tag the cycle so its agent, data, LLM and DB spans can be found by trace id
+            results["trace_id"] = current_trace_id()
+            set_attributes(symbol=symbol, interval=interval)
+            
             # Ensure analyses dictionary exists
             if "analyses" not in results:
                 results["analyses"] = {}
@@ -414,10 +485,11 @@ class CoreOrchestrator:
             
             # Log completion and timing
             elapsed_time = time.time() - start_time
-            self.logger.info(f"Analysis workflow completed in {elapsed_time:.2f} seconds")
+            self.logger.info(f"Analysis workflow completed in {elapsed_time:.2f} seconds (trace {results['trace_id']})")
             
             # Step 3: Execute trade pipeline if we have a valid decision
-            if (results.get("decision") and 
+            if (execute_trades and 
+                results.get("decision") and 
                 isinstance(results["decision"], dict) and 
                 not results["decision"].get("error", False) and 
                 results["decision"].get("action") != "HOLD"):
@@ -500,163 +572,132 @@ class CoreOrchestrator:
                 
             self.logger.info(f"Starting trade execution pipeline for {decision.get('action')} {decision.get('pair')}")
             
-            # Initialize the result dictionary
-            result = {
-                "status": "initiated",
+            # Evaluate and execute as a batch of one
+            symbol = normalize_symbol(decision.get("pair"))
+            return self._execute_trade_batch([decision], {symbol: market_data} if market_data else None)[0]
+            
+        except ValidationError as e:
+            # Handle validation errors
+            self.logger.error(f"Validation error in trade pipeline: {str(e)}")
+            self.logger.error(f"Stack trace: {traceback.format_exc()}")
+            
+            # Return error result
+            return {
+                "status": "error_validation",
                 "timestamp": time.strftime("%Y-%m-%d %H:%M:%S"),
-                "decision": decision,
-                "pipeline_steps": [],
-                "trade_id": None
+                "reason": str(e),
+                "pipeline_steps": [{
+                    "step": "validation",
+                    "status": "error",
+                    "reason": str(e),
+                    "timestamp": time.strftime("%Y-%m-%d %H:%M:%S")
+                }]
             }
+        except Exception as e:
+            # Handle unexpected errors
+            self.logger.error(f"Unexpected error in trade pipeline: {str(e)}")
+            self.logger.error(f"Stack trace: {traceback.format_exc()}")
             
-            # Create a mock trade from the decision for use throughout the pipeline
-            mock_trade = {
-                "pair": decision.get("pair"),
-                "action": decision.get("action"),
-                "confidence": decision.get("confidence", 0),
-                "entry_price": 0.0,  # Will be populated by TradeExecutor if approved
-                "position_size": 0.0  # Will be determined by PositionSizer if approved
+            # Return error result
+            return {
+                "status": "error_unexpected",
+                "timestamp": time.strftime("%Y-%m-%d %H:%M:%S"),
+                "reason": str(e),
+                "pipeline_steps": [{
+                    "step": "unknown",
+                    "status": "error",
+                    "reason": str(e),
+                    "timestamp": time.strftime("%Y-%m-%d %H:%M:%S")
+                }]
             }
+    
+    def _execute_trade_batch(self, 
+                             decisions: List[Dict[str, Any]], 
+                             market_data: Optional[Dict[str, Dict[str, Any]]] = None) -> List[Dict[str, Any]]:
+        """
+        Evaluate trade decisions together and execute the approved ones.
+        
+        Portfolio validation, risk assessment and position sizing run as one
+        BatchTradeEvaluator pass, so candidates are ranked against each other
+        and portfolio budgets are computed once for the whole batch.
+        Approved trades are executed best-ranked first.
+        
+        Args:
+            decisions: Trading decision dictionaries
+            market_data: Optional normalized symbol -> market event
             
-            # Step 1: Portfolio validation
-            if "portfolio_manager" in self.agents:
-                self.logger.info("Step 1: Portfolio validation")
-                try:
-                    portfolio_manager = self.agents["portfolio_manager"]
-                    
-                    # Validate the trade against portfolio limits
-                    portfolio_validation = portfolio_manager.validate_trade(mock_trade)
-                    
-                    # Add to pipeline steps
-                    result["pipeline_steps"].append({
-                        "step": "portfolio_validation",
-                        "status": portfolio_validation.get("status"),
-                        "reason": portfolio_validation.get("reason"),
-                        "timestamp": time.strftime("%Y-%m-%d %H:%M:%S")
-                    })
-                    
-                    # Check if trade was rejected
-                    if portfolio_validation.get("status") == TradeValidationStatus.REJECTED.value:
-                        self.logger.warning(f"Trade rejected by Portfolio Manager: {portfolio_validation.get('reason')}")
-                        result["status"] = "rejected_by_portfolio_manager"
-                        result["reason"] = portfolio_validation.get("reason")
-                        return result
-                        
-                    self.logger.info(f"Portfolio validation passed: {portfolio_validation.get('reason')}")
-                except Exception as e:
-                    error_msg = f"Portfolio validation error: {str(e)}"
-                    self.logger.error(error_msg)
-                    self.logger.error(f"Stack trace: {traceback.format_exc()}")
-                    
-                    result["pipeline_steps"].append({
-                        "step": "portfolio_validation",
-                        "status": "error",
-                        "reason": error_msg,
-                        "timestamp": time.strftime("%Y-%m-%d %H:%M:%S")
-                    })
-                    
-                    result["status"] = "error_in_portfolio_validation"
-                    result["reason"] = error_msg
-                    return result
-            
-            # Step 2: Risk guard assessment
-            if "risk_guard" in self.agents:
-                self.logger.info("Step 2: Risk assessment")
-                try:
-                    risk_guard = self.agents["risk_guard"]
-                    
-                    # Evaluate trade risk
-                    risk_assessment = risk_guard.evaluate_trade_risk(mock_trade, market_data)
-                    
-                    # Add to pipeline steps
-                    result["pipeline_steps"].append({
-                        "step": "risk_assessment",
-                        "status": risk_assessment.get("status"),
-                        "reason": risk_assessment.get("reason"),
-                        "metrics": risk_assessment.get("risk_metrics", {}),
-                        "timestamp": time.strftime("%Y-%m-%d %H:%M:%S")
-                    })
-                    
-                    # Check if trade was rejected
-                    if risk_assessment.get("status") == RiskApprovalStatus.REJECTED.value:
-                        self.logger.warning(f"Trade rejected by Risk Guard: {risk_assessment.get('reason')}")
-                        result["status"] = "rejected_by_risk_guard"
-                        result["reason"] = risk_assessment.get("reason")
-                        return result
-                        
-                    self.logger.info(f"Risk assessment passed: {risk_assessment.get('reason')}")
-                except Exception as e:
-                    error_msg = f"Risk assessment error: {str(e)}"
-                    self.logger.error(error_msg)
-                    self.logger.error(f"Stack trace: {traceback.format_exc()}")
-                    
-                    result["pipeline_steps"].append({
-                        "step": "risk_assessment",
-                        "status": "error",
-                        "reason": error_msg,
-                        "timestamp": time.strftime("%Y-%m-%d %H:%M:%S")
-                    })
-                    
-                    result["status"] = "error_in_risk_assessment"
-                    result["reason"] = error_msg
-                    return result
+        Returns:
+            One trade execution result per decision, in input order
+        """
+        market_data = market_data or {}
+        evaluator = BatchTradeEvaluator(
+            portfolio_manager=self.agents.get("portfolio_manager"),
+            risk_guard=self.agents.get("risk_guard"),
+            position_sizer=self.agents.get("position_sizer")
+        )
+        evaluations = evaluator.evaluate(decisions, market_data)
+        
+        results = []
+        for decision, evaluation in zip(decisions, evaluations):
+            results.append({
+                "status": "initiated",
+                "timestamp": time.strftime("%Y-%m-%d %H:%M:%S"),
+                "decision": decision,
+                "pipeline_steps": [{
+                    "step": "batch_evaluation",
+                    "status": evaluation["status"],
+                    "reason": evaluation.get("reason"),
+                    "rank": evaluation.get("rank"),
+                    "timestamp": time.strftime("%Y-%m-%d %H:%M:%S")
+                }],
+                "trade_id": None
+            })
+        
+        # Execute approved trades in rank order
+        approved = sorted(
+            (index for index, evaluation in enumerate(evaluations) if evaluation["status"] == APPROVED),
+            key=lambda index: evaluations[index]["rank"]
+        )
+        for index, evaluation in enumerate(evaluations):
+            if evaluation["status"] == REJECTED:
+                self.logger.warning(f"Trade rejected by {evaluation['rejected_by']}: {evaluation['reason']}")
+                results[index]["status"] = f"rejected_by_{evaluation['rejected_by']}"
+                results[index]["reason"] = evaluation["reason"]
+            elif evaluation["status"] == SKIPPED:
+                results[index]["status"] = "skipped"
+                results[index]["reason"] = evaluation["reason"]
+        
+        for index in approved:
+            decision, evaluation, result = decisions[index], evaluations[index], results[index]
             
-            # Step 3: Position sizing
-            if "position_sizer" in self.agents:
-                self.logger.info("Step 3: Position sizing")
-                try:
-                    position_sizer = self.agents["position_sizer"]
-                    
-                    # Calculate position size
-                    position_data = position_sizer.calculate_position_size(decision, market_data)
-                    
-                    # Validate position size data
-                    if "position_size_usdt" not in position_data:
-                        raise ValidationError("Position sizer did not return a valid position size")
-                        
-                    # Add to pipeline steps
-                    result["pipeline_steps"].append({
-                        "step": "position_sizing",
-                        "status": "completed",
-                        "position_size_usdt": position_data.get("position_size_usdt", 0),
-                        "asset_quantity": position_data.get("asset_quantity", 0),
-                        "confidence_factor": position_data.get("confidence_factor", 0),
-                        "volatility_factor": position_data.get("volatility_factor", 0),
-                        "volatility_pct": position_data.get("volatility_pct", 0),
-                        "timestamp": time.strftime("%Y-%m-%d %H:%M:%S")
-                    })
-                    
-                    # Update the mock trade with position size
-                    mock_trade["position_size"] = position_data.get("position_size_usdt", 0)
-                    
-                    # Update the decision with position size for trade execution
-                    decision["position_size"] = position_data.get("position_size_usdt", 0)
-                    
-                    self.logger.info(f"Position sizing completed: {position_data.get('position_size_usdt', 0)} USDT")
-                except Exception as e:
-                    error_msg = f"Position sizing error: {str(e)}"
-                    self.logger.error(error_msg)
-                    self.logger.error(f"Stack trace: {traceback.format_exc()}")
-                    
-                    result["pipeline_steps"].append({
-                        "step": "position_sizing",
-                        "status": "error",
-                        "reason": error_msg,
-                        "timestamp": time.strftime("%Y-%m-%d %H:%M:%S")
-                    })
-                    
-                    result["status"] = "error_in_position_sizing"
-                    result["reason"] = error_msg
-                    return result
+            # Update the decision with symbol and position size for trade execution
+            decision["symbol"] = evaluation["symbol"]
+            decision["position_size"] = evaluation["position_size"]
+            if evaluation.get("position_value") is not None:
+                decision["position_value"] = evaluation["position_value"]
+            result["pipeline_steps"].append({
+                "step": "position_sizing",
+                "status": "completed",
+                "position_size": evaluation["position_size"],
+                "position_value": evaluation.get("position_value"),
+                "volatility": evaluation.get("volatility"),
+                "timestamp": time.strftime("%Y-%m-%d %H:%M:%S")
+            })
             
-            # Step 4: Trade execution
+            # Trade execution
             if "trade_executor" in self.agents:
-                self.logger.info("Step 4: Trade execution")
+                self.logger.info(f"Trade execution for {decision.get('action')} {evaluation['symbol']}")
                 try:
                     trade_executor = self.agents["trade_executor"]
                     
-                    # Execute the trade
-                    trade_result = trade_executor.process_decision(decision, market_data)
+                    # Execute the trade; when the batch evaluation ran the risk guard the
+                    # executor takes its sizing as is and does not check the trade again
+                    pre_approved = "risk_guard" in self.agents
+                    trade_result = trade_executor.execute_decision(
+                        decision, market_data.get(evaluation["symbol"]), pre_approved=pre_approved
+                    )
+                    if trade_result.get("status") == "success" and pre_approved:
+                        self.agents["risk_guard"].record_trade(dict(trade_result.get("trade") or decision))
                     
                     # Add to pipeline steps
                     result["pipeline_steps"].append({
@@ -690,45 +731,9 @@ class CoreOrchestrator:
                     result["status"] = "error_in_trade_execution"
                     result["reason"] = error_msg
             
-            # Final status and logging
             self.logger.info(f"Trade pipeline completed with status: {result['status']}")
-            
-            return result
-            
-        except ValidationError as e:
-            # Handle validation errors
-            self.logger.error(f"Validation error in trade pipeline: {str(e)}")
-            self.logger.error(f"Stack trace: {traceback.format_exc()}")
-            
-            # Return error result
-            return {
-                "status": "error_validation",
-                "timestamp": time.strftime("%Y-%m-%d %H:%M:%S"),
-                "reason": str(e),
-                "pipeline_steps": [{
-                    "step": "validation",
-                    "status": "error",
-                    "reason": str(e),
-                    "timestamp": time.strftime("%Y-%m-%d %H:%M:%S")
-                }]
-            }
-        except Exception as e:
-            # Handle unexpected errors
-            self.logger.error(f"Unexpected error in trade pipeline: {str(e)}")
-            self.logger.error(f"Stack trace: {traceback.format_exc()}")
-            
-            # Return error result
-            return {
-                "status": "error_unexpected",
-                "timestamp": time.strftime("%Y-%m-%d %H:%M:%S"),
-                "reason": str(e),
-                "pipeline_steps": [{
-                    "step": "unknown",
-                    "status": "error",
-                    "reason": str(e),
-                    "timestamp": time.strftime("%Y-%m-%d %H:%M:%S")
-                }]
-            }
+        
+        return results
     
     def save_results(self, results: Dict[str, Any], filepath: Optional[str] = None) -> str:
         """
@@ -25,7 +25,7 @@ logging.basicConfig(
 logger = logging.getLogger("example_pipeline")
 
 # Import modules
-from simulators.market_event_simulator import MarketEventSimulator
+from data.simulated.market_generator import MarketGenerator
 from orchestrator.core_orchestrator import CoreOrchestrator
 
 
@@ -61,7 +61,7 @@ def run_single_event(
     logger.info(f"Running pipeline for {symbol} at {interval} interval (event type: {event_type})")
     
     # Create simulator
-    simulator = MarketEventSimulator(seed=seed)
+    simulator = MarketGenerator(seed=seed)
     
     # Generate market event
     logger.info("Generating market event")
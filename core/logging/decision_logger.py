@@ -11,6 +11,8 @@ import logging
 from typing import Dict, Any, Optional
 from datetime import datetime
 
+from utils.tracing import traced, LOG
+
 # Set up logger
 logger = logging.getLogger("decision_logger")
 
@@ -42,6 +44,7 @@ class DecisionLogger:
         # Initialize
         logger.info(f"Decision logger initialized with log path: {log_path}")
         
+    @traced(kind=LOG)
     def log_decision(
         self,
         agent_name: str,
@@ -0,0 +1,264 @@
+#!/usr/bin/env python
+"""
+BatchTradeEvaluator for aGENtrader v2
+
+This module evaluates all candidate trades of a cycle together instead of
+pushing each through portfolio validation, risk assessment and position
+sizing on its own. With multi-symbol scanning a cycle can produce dozens of
+candidates; here they are:
+- ranked by expected value (or confidence) so the best use the budgets first
+- checked against the risk guard's per-trade rules (size, confidence,
+  volatility, restricted symbols), which depend only on the trade itself
+- sized by the position sizer
+- admitted against budgets computed once from a single portfolio snapshot:
+  open position slots, total and per-asset exposure, and the trade
+  frequency allowance; each admitted trade draws the budgets down
+
+A candidate that does not fit a budget is rejected without re-running any
+check, and rejections are logged with one write. Cost grows with the
+number of candidates; portfolio-wide checks (drawdown, trade frequency,
+exposure totals) are done once per batch.
+"""
+
+import logging
+from typing import Dict, Any, Optional, List, Tuple
+
+from core.trading.mark_to_market import normalize_symbol
+from core.trading.portfolio_state import PortfolioState, PortfolioSnapshot, TRADE_BOOK, PORTFOLIO_BOOK, portfolio_state as shared_portfolio_state
+from core.trading.volatility import volatility_cache
+
+# Setup logger
+logger = logging.getLogger("aGENtrader.batch_evaluator")
+
+# Ranking keys
+RANK_BY_CONFIDENCE = "confidence"
+RANK_BY_EXPECTED_VALUE = "expected_value"
+
+APPROVED = "approved"
+REJECTED = "rejected"
+SKIPPED = "skipped"
+
+
+def expected_value(decision: Dict[str, Any]) -> float:
+    """
+    Expected value used for ranking.
+
+    Uses the decision's "expected_value" when present; otherwise confidence as
+    a win probability times the reward/risk ratio of its take profit and stop
+    loss percentages (1:1 if they are not given).
+
+    Args:
+        decision: Candidate decision
+
+    Returns:
+        Expected value in units of the amount risked
+    """
+    if decision.get("expected_value") is not None:
+        return float(decision["expected_value"])
+
+    probability = min(max(float(decision.get("confidence", 0) or 0) / 100.0, 0.0), 1.0)
+    reward = float(decision.get("take_profit_pct") or 1.0)
+    risk = float(decision.get("stop_loss_pct") or 1.0)
+    return probability * (reward / risk) - (1.0 - probability)
+
+
+class BatchTradeEvaluator:
+    """
+    One-pass evaluation of a batch of candidate trades.
+
+    Each agent is optional: without a portfolio manager there are no exposure
+    budgets, without a risk guard no risk rules, and without a position sizer
+    candidates keep the position size they carry (or `default_position_size`).
+    """
+
+    def __init__(
+        self,
+        portfolio_manager=None,
+        risk_guard=None,
+        position_sizer=None,
+        portfolio_state: Optional[PortfolioState] = None,
+        rank_by: str = RANK_BY_EXPECTED_VALUE,
+        default_position_size: float = 0.1
+    ):
+        """
+        Initialize the evaluator.
+
+        Args:
+            portfolio_manager: PortfolioManagerAgent (exposure and open trade limits)
+            risk_guard: RiskGuardAgent (per-trade rules, concurrency and frequency limits)
+            position_sizer: PositionSizerAgent
+            portfolio_state: Portfolio state to budget against (default: the
+                portfolio manager's or risk guard's, else the shared state)
+            rank_by: "expected_value" or "confidence"
+            default_position_size: Fraction of the portfolio when no sizer is given
+        """
+        self.portfolio_manager = portfolio_manager
+        self.risk_guard = risk_guard
+        self.position_sizer = position_sizer
+        self.state = (portfolio_state
+                      or getattr(portfolio_manager, "state", None)
+                      or getattr(risk_guard, "state", None)
+                      or shared_portfolio_state)
+        self.rank_by = rank_by
+        self.default_position_size = default_position_size
+
+    def _score(self, decision: Dict[str, Any]) -> float:
+        if self.rank_by == RANK_BY_CONFIDENCE:
+            return float(decision.get("confidence", 0) or 0)
+        return expected_value(decision)
+
+    def _asset(self, symbol: str) -> str:
+        """Asset a symbol's exposure counts against (matches the portfolio manager's base asset)."""
+        quote = getattr(self.portfolio_manager, "base_currency", "")
+        return symbol[:-len(quote)] if quote and symbol.endswith(quote) and symbol != quote else symbol
+
+    def _position_size(self, symbol: str, decision: Dict[str, Any],
+                       market_data: Optional[Dict[str, Any]]) -> Tuple[float, Optional[float]]:
+        """Position size (fraction of the portfolio) and volatility of a candidate."""
+        ohlcv = (market_data or {}).get("ohlcv") or None
+        interval = (market_data or {}).get("interval")
+        volatility = decision.get("volatility")
+        if volatility is None:
+            volatility = volatility_cache.volatility(symbol, interval, ohlcv)
+        if self.position_sizer is None:
+            return float(decision.get("position_size") or self.default_position_size), volatility
+
+        size = self.position_sizer.calculate_position_size(
+            symbol=symbol,
+            confidence=decision.get("confidence", 0) or 0,
+            volatility=volatility,
+            price_data=ohlcv,
+            interval=interval
+        )
+        return size, volatility
+
+    def _slots(self, snapshot: PortfolioSnapshot) -> Optional[int]:
+        """Positions that may still be opened (None: no limit)."""
+        limits = []
+        if self.portfolio_manager is not None:
+            limits.append(self.portfolio_manager.max_open_trades - snapshot.count(PORTFOLIO_BOOK))
+        if self.risk_guard is not None:
+            limits.append(self.risk_guard.max_concurrent_positions - snapshot.count(TRADE_BOOK))
+        return max(0, min(limits)) if limits else None
+
+    def evaluate(
+        self,
+        decisions: List[Dict[str, Any]],
+        market_data: Optional[Dict[str, Dict[str, Any]]] = None
+    ) -> List[Dict[str, Any]]:
+        """
+        Rank, size and admit a batch of candidate decisions.
+
+        Args:
+            decisions: Candidate decisions (action, symbol or pair, confidence,
+                optional expected_value / volatility / position_size)
+            market_data: Optional normalized symbol -> market event (for
+                volatility and sizing)
+
+        Returns:
+            One result per decision, in input order, with:
+            - status: "approved", "rejected" or "skipped"
+            - reason: Why the candidate was rejected or skipped
+            - rejected_by: "portfolio_manager" or "risk_guard" for rejections
+            - rank: Position in the ranking (approved and rejected candidates)
+            - position_size / position_value: Size as a fraction of the
+              portfolio and in quote currency (approved candidates)
+        """
+        market_data = market_data or {}
+        results: List[Optional[Dict[str, Any]]] = [None] * len(decisions)
+        candidates = []
+
+        for index, decision in enumerate(decisions):
+            symbol = normalize_symbol(decision.get("symbol") or decision.get("pair") or "")
+            action = decision.get("action")
+            if not symbol or action not in ("BUY", "SELL"):
+                results[index] = {"decision": decision, "status": SKIPPED,
+                                  "reason": f"No trade for {action or 'missing action'}"}
+                continue
+            candidates.append((index, symbol, decision))
+
+        # Best candidates first; the sort is stable, so ties keep input order
+        candidates.sort(key=lambda c: self._score(c[2]), reverse=True)
+
+        # Budgets from one snapshot
+        snapshot = self.state.snapshot()
+        portfolio_value = None
+        total_budget = None
+        asset_limit = None
+        if self.portfolio_manager is not None:
+            portfolio_value = self.portfolio_manager.get_portfolio_value()
+            total_budget = (portfolio_value * self.portfolio_manager.max_total_exposure_pct / 100.0
+                            - snapshot.total_exposure)
+            asset_limit = portfolio_value * self.portfolio_manager.max_per_asset_exposure_pct / 100.0
+        slots = self._slots(snapshot)
+        asset_used: Dict[str, float] = {}
+        taken_symbols = set()
+
+        batch_reason = None
+        trades_left = None
+        if self.risk_guard is not None and self.risk_guard.enabled:
+            accepted, batch_reason = self.risk_guard.check_portfolio()
+            trades_left = self.risk_guard.remaining_trades()
+
+        rejections = []
+        for rank, (index, symbol, decision) in enumerate(candidates, start=1):
+            result = {"decision": decision, "rank": rank, "symbol": symbol}
+            results[index] = result
+
+            size, volatility = self._position_size(symbol, decision, market_data.get(symbol))
+            value = size * portfolio_value if portfolio_value is not None else None
+            # Executed trades land in the trade book, one position per symbol
+            replaces = snapshot.has_position(symbol, TRADE_BOOK)
+            asset = self._asset(symbol)
+
+            reason, rejected_by = None, "risk_guard"
+            if symbol in taken_symbols:
+                reason = f"A higher-ranked candidate for {symbol} was approved"
+            elif batch_reason:
+                reason = batch_reason
+            elif self.risk_guard is not None and self.risk_guard.enabled:
+                trade = {"symbol": symbol, "action": decision["action"],
+                         "confidence": decision.get("confidence", 0) or 0, "position_size": size}
+                if volatility is not None:
+                    trade["volatility"] = volatility
+                accepted, reason = self.risk_guard.check_candidate(trade)
+
+            if reason is None:
+                rejected_by = "portfolio_manager"
+                if slots is not None and not replaces and slots <= 0:
+                    reason = "No open position slots left in this batch"
+                elif trades_left is not None and trades_left <= 0:
+                    reason, rejected_by = "Trade frequency allowance used up", "risk_guard"
+                elif total_budget is not None and value > total_budget:
+                    reason = f"Total exposure budget exceeded: {value:.2f} > {max(total_budget, 0.0):.2f} remaining"
+                elif asset_limit is not None:
+                    used = asset_used.get(asset, snapshot.asset_exposure(asset))
+                    if used + value > asset_limit:
+                        reason = (f"Per-asset exposure budget exceeded for {asset}: "
+                                  f"{value:.2f} > {max(asset_limit - used, 0.0):.2f} remaining")
+
+            if reason is not None:
+                result.update(status=REJECTED, reason=reason, rejected_by=rejected_by)
+                rejections.append((dict(decision, symbol=symbol, position_size=size), reason))
+                continue
+
+            # Admit and draw down the budgets
+            taken_symbols.add(symbol)
+            if slots is not None and not replaces:
+                slots -= 1
+            if trades_left is not None:
+                trades_left -= 1
+            if total_budget is not None:
+                total_budget -= value
+                asset_used[asset] = asset_used.get(asset, snapshot.asset_exposure(asset)) + value
+            result.update(status=APPROVED, reason="Within portfolio and risk budgets",
+                          position_size=size, position_value=value)
+            if volatility is not None:
+                result["volatility"] = volatility
+
+        if rejections and self.risk_guard is not None:
+            self.risk_guard.log_rejected_trades(rejections)
+
+        approved = sum(1 for r in results if r["status"] == APPROVED)
+        logger.info(f"Evaluated {len(decisions)} candidates: {approved} approved, {len(rejections)} rejected")
+        return results
@@ -0,0 +1,166 @@
+#!/usr/bin/env python
+"""
+MarkToMarketService for aGENtrader v2
+
+This module provides batched price refresh for open positions. All symbols
+needed for a refresh are deduplicated and priced with a single provider call
+(Binance `/api/v3/ticker/price` without a symbol returns every ticker), then
+unrealized PnL is computed for every position in one vectorized pass instead
+of one request per trade. Stop loss / take profit checks live in the
+StopEngine (core/trading/stop_engine.py).
+"""
+
+import logging
+from typing import Dict, Any, Optional, List, Iterable, Tuple
+
+import numpy as np
+
+# Setup logger
+logger = logging.getLogger("aGENtrader.mark_to_market")
+
+
+def normalize_symbol(symbol: str) -> str:
+    """
+    Normalize a trading symbol to exchange format.
+
+    Args:
+        symbol: Trading symbol (e.g., "BTC/USDT" or "BTCUSDT")
+
+    Returns:
+        Symbol without separator (e.g., "BTCUSDT")
+    """
+    return str(symbol).replace("/", "").upper()
+
+
+class MarkToMarketService:
+    """
+    Batched mark-to-market service for open positions.
+
+    Responsibilities:
+    - Fetch prices for many symbols with one provider request
+    - Compute unrealized PnL for all positions in one pass
+    """
+
+    def __init__(self, data_provider=None):
+        """
+        Initialize the mark-to-market service.
+
+        Args:
+            data_provider: Market data provider (BinanceDataProvider, MockDataProvider
+                or MarketDataProviderFactory). Providers exposing `get_current_prices`
+                are priced in a single request; others fall back to per-symbol calls.
+        """
+        self.data_provider = data_provider
+
+    def fetch_prices(self, symbols: Iterable[str]) -> Dict[str, float]:
+        """
+        Fetch current prices for a set of symbols.
+
+        Args:
+            symbols: Trading symbols in any format (duplicates are ignored)
+
+        Returns:
+            Dictionary of normalized symbol -> price (symbols that could not be
+            priced are omitted)
+        """
+        unique_symbols = sorted({normalize_symbol(s) for s in symbols if s})
+        if not unique_symbols or self.data_provider is None:
+            return {}
+
+        # Single batched request when the provider supports it
+        if hasattr(self.data_provider, "get_current_prices"):
+            try:
+                prices = self.data_provider.get_current_prices(unique_symbols)
+                return {
+                    symbol: float(prices[symbol])
+                    for symbol in unique_symbols
+                    if prices.get(symbol)
+                }
+            except Exception as e:
+                logger.warning(f"Batched price fetch failed, falling back to per-symbol requests: {e}")
+
+        # Fallback: one request per unique symbol
+        prices = {}
+        for symbol in unique_symbols:
+            try:
+                price = self.data_provider.get_current_price(symbol)
+                if price:
+                    prices[symbol] = float(price)
+            except Exception as e:
+                logger.warning(f"Couldn't get current price for {symbol}: {e}")
+
+        return prices
+
+    def mark_positions(
+        self,
+        positions: List[Dict[str, Any]],
+        prices: Dict[str, float],
+        symbol_key: str = "symbol",
+        value_key: Optional[str] = None
+    ) -> List[Optional[Dict[str, float]]]:
+        """
+        Compute unrealized PnL for a list of positions.
+
+        Args:
+            positions: Position dictionaries with `action` and `entry_price`
+            prices: Normalized symbol -> price mapping (from fetch_prices)
+            symbol_key: Key holding the symbol in each position ("symbol" or "pair")
+            value_key: Optional key holding the position value for absolute PnL
+
+        Returns:
+            List aligned with `positions`. Each entry is a dict with `current_price`,
+            `pnl_pct` and (if value_key is given) `unrealized_pnl`, or None when the
+            position has no price or entry.
+        """
+        if not positions:
+            return []
+
+        current, entry, direction = self._position_arrays(positions, prices, symbol_key)
+        valid = np.isfinite(current) & (entry > 0) & (direction != 0)
+
+        pnl_pct = np.zeros(len(positions))
+        np.divide((current - entry) * direction * 100.0, entry, out=pnl_pct, where=valid)
+
+        values = None
+        if value_key:
+            values = np.array([float(p.get(value_key, 0) or 0) for p in positions])
+
+        results: List[Optional[Dict[str, float]]] = []
+        for i in range(len(positions)):
+            if not valid[i]:
+                results.append(None)
+                continue
+
+            update = {
+                "current_price": float(current[i]),
+                "pnl_pct": float(pnl_pct[i])
+            }
+            if values is not None:
+                update["unrealized_pnl"] = float(values[i] * pnl_pct[i] / 100.0)
+            results.append(update)
+
+        return results
+
+    @staticmethod
+    def _position_arrays(
+        positions: List[Dict[str, Any]],
+        prices: Dict[str, float],
+        symbol_key: str
+    ) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """
+        Build aligned price, entry and direction arrays for a list of positions.
+
+        Returns:
+            Tuple of (current_price, entry_price, direction) arrays; missing
+            prices are NaN and direction is +1 for BUY, -1 for SELL, 0 otherwise
+        """
+        current = np.array([
+            prices.get(normalize_symbol(p.get(symbol_key, "")), np.nan)
+            for p in positions
+        ], dtype=float)
+        entry = np.array([float(p.get("entry_price") or 0) for p in positions])
+        direction = np.array([
+            1.0 if p.get("action") == "BUY" else -1.0 if p.get("action") == "SELL" else 0.0
+            for p in positions
+        ])
+        return current, entry, direction
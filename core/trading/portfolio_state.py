@@ -0,0 +1,622 @@
+#!/usr/bin/env python
+"""
+PortfolioState for aGENtrader v2
+
+This module provides the single in-process owner of portfolio state: open
+positions, per-asset exposure, asset balances, realized PnL, equity and
+drawdown, and the history of executed and closed trades. PortfolioManagerAgent, TradeBookManager and RiskGuardAgent
+all read and write the same state instead of each keeping (and replaying
+from disk) its own copy.
+
+The state is an actor with a single writer:
+- writes are commands (functions of a mutable Book) put on a queue and
+  applied in order by one writer thread; commands queued together are
+  applied as one batch and published as one new snapshot
+- a command that raises leaves no changes: the batch is rebuilt from the
+  previous snapshot without it, re-running the commands that succeeded
+- each batch copies only the containers it changes, then publishes an
+  immutable PortfolioSnapshot by swapping one reference
+- reads take the current snapshot without any lock; a snapshot never
+  changes, so a reader always sees one consistent version of the portfolio
+
+Exposure totals and peak equity are maintained incrementally as positions
+open and close, and executed trades are counted in rolling 1h/24h/7d
+windows (core/trading/risk_counters.py), so exposure, drawdown and trade
+frequency checks are O(1) however large the book or history grows.
+
+Positions are owned by the manager that opened them (an "owner" field,
+TRADE_BOOK or PORTFOLIO_BOOK): each manager looks up, replaces and closes
+only its own positions, and keeps its own record schema, while trade
+history, equity and exposure totals are shared.
+
+A command returns once its batch is published, so a caller always reads its
+own writes. Journals (trade logs) are replayed into the state once per path,
+however many agents are constructed on top of it.
+
+Example:
+    from core.trading.portfolio_state import portfolio_state
+
+    portfolio_state.open_position({"symbol": "BTCUSDT", "action": "BUY", "entry_price": 85000.0})
+    snapshot = portfolio_state.snapshot()
+    snapshot.position_for("BTC/USDT")
+"""
+
+import time
+import queue
+import logging
+import threading
+import itertools
+from concurrent.futures import Future
+from types import MappingProxyType
+from datetime import datetime
+from typing import Dict, Any, Optional, List, Tuple, Callable, Iterator, TypeVar
+
+from core.trading.mark_to_market import normalize_symbol
+from core.trading.risk_counters import TradeRateCounter
+
+# Setup logger
+logger = logging.getLogger("aGENtrader.portfolio_state")
+
+T = TypeVar("T")
+
+# Executed and closed trades kept in snapshots (most recent last)
+HISTORY_LIMIT = 1000
+
+# Position owners: TradeBookManager (and run.py's trade book) and PortfolioManagerAgent
+TRADE_BOOK = "trade_book"
+PORTFOLIO_BOOK = "portfolio"
+
+
+def position_symbol(position: Dict[str, Any]) -> str:
+    """
+    Normalized symbol of a position or trade record.
+
+    Args:
+        position: Record with a "symbol" (trade book) or "pair" (portfolio manager)
+
+    Returns:
+        Symbol without separator (e.g., "BTCUSDT")
+    """
+    return normalize_symbol(position.get("symbol") or position.get("pair") or "")
+
+
+def position_owner(position: Dict[str, Any]) -> str:
+    """Manager owning a position or closed trade record (TRADE_BOOK if untagged)."""
+    return position.get("owner") or TRADE_BOOK
+
+
+def position_asset(position: Dict[str, Any]) -> str:
+    """Asset a position's exposure counts against: its base asset, else its symbol."""
+    return position.get("base") or position_symbol(position)
+
+
+def position_value(position: Dict[str, Any]) -> float:
+    """Value of a position in quote currency (0 if unknown)."""
+    try:
+        return float(position.get("position_value") or 0.0)
+    except (TypeError, ValueError):
+        return 0.0
+
+
+def trade_time(trade: Dict[str, Any]) -> float:
+    """Epoch seconds of a trade's timestamp (epoch seconds or ISO 8601; 0 if missing)."""
+    timestamp = trade.get("timestamp", 0)
+    if isinstance(timestamp, (int, float)):
+        return float(timestamp)
+    try:
+        return datetime.fromisoformat(str(timestamp)).timestamp()
+    except ValueError:
+        return 0.0
+
+
+def _first_owned(positions: Dict[str, Dict[str, Any]], ids: Tuple[str, ...],
+                 owner: Optional[str]) -> Optional[Dict[str, Any]]:
+    """First of the positions `ids` owned by `owner` (any owner if None)."""
+    for position_id in ids:
+        position = positions[position_id]
+        if owner is None or position_owner(position) == owner:
+            return position
+    return None
+
+
+class PortfolioSnapshot:
+    """
+    Immutable view of the portfolio at one version.
+
+    Containers are read-only mappings and tuples; the position dictionaries
+    they hold are shared with later snapshots and must not be modified.
+    """
+
+    __slots__ = ("version", "positions", "balances", "realized_pnl", "history", "closed", "exposure",
+                 "total_exposure", "equity", "peak_equity", "max_drawdown", "_by_symbol", "_counts")
+
+    def __init__(self,
+                 version: int = 0,
+                 positions: Optional[Dict[str, Dict[str, Any]]] = None,
+                 by_symbol: Optional[Dict[str, Tuple[str, ...]]] = None,
+                 counts: Optional[Dict[str, int]] = None,
+                 balances: Optional[Dict[str, float]] = None,
+                 realized_pnl: float = 0.0,
+                 history: Tuple[Dict[str, Any], ...] = (),
+                 closed: Tuple[Dict[str, Any], ...] = (),
+                 exposure: Optional[Dict[str, float]] = None,
+                 total_exposure: float = 0.0,
+                 equity: Optional[float] = None,
+                 peak_equity: Optional[float] = None,
+                 max_drawdown: float = 0.0):
+        self.version = version
+        self.positions = MappingProxyType(positions or {})
+        self.balances = MappingProxyType(balances or {})
+        self.realized_pnl = realized_pnl
+        self.history = history
+        self.closed = closed
+        self.exposure = MappingProxyType(exposure or {})
+        self.total_exposure = total_exposure
+        self.equity = equity
+        self.peak_equity = peak_equity
+        self.max_drawdown = max_drawdown
+        self._by_symbol = MappingProxyType(by_symbol or {})
+        self._counts = MappingProxyType(counts or {})
+
+    def __len__(self) -> int:
+        """Number of open positions."""
+        return len(self.positions)
+
+    def count(self, owner: Optional[str] = None) -> int:
+        """Number of open positions of an owner (of all owners if None)."""
+        return len(self.positions) if owner is None else self._counts.get(owner, 0)
+
+    def open_positions(self, owner: Optional[str] = None) -> List[Dict[str, Any]]:
+        """Open positions of an owner (of all owners if None) in the order they were opened."""
+        if owner is None:
+            return list(self.positions.values())
+        return [position for position in self.positions.values() if position_owner(position) == owner]
+
+    def closed_trades(self, owner: Optional[str] = None) -> List[Dict[str, Any]]:
+        """Closed trades of an owner (of all owners if None), oldest first."""
+        if owner is None:
+            return list(self.closed)
+        return [trade for trade in self.closed if position_owner(trade) == owner]
+
+    def positions_for(self, symbol: str, owner: Optional[str] = None) -> List[Dict[str, Any]]:
+        """
+        Open positions in a symbol.
+
+        Args:
+            symbol: Trading symbol in any format
+            owner: Only positions of this owner (default: all owners)
+
+        Returns:
+            Positions in the order they were opened
+        """
+        positions = (self.positions[position_id] for position_id in self._by_symbol.get(normalize_symbol(symbol), ()))
+        return [position for position in positions if owner is None or position_owner(position) == owner]
+
+    def position_for(self, symbol: str, owner: Optional[str] = None) -> Optional[Dict[str, Any]]:
+        """Oldest open position in a symbol (of an owner, if given), or None."""
+        return _first_owned(self.positions, self._by_symbol.get(normalize_symbol(symbol), ()), owner)
+
+    def has_position(self, symbol: str, owner: Optional[str] = None) -> bool:
+        """Whether any position in a symbol (of an owner, if given) is open."""
+        return self.position_for(symbol, owner) is not None
+
+    def symbols(self) -> List[str]:
+        """Normalized symbols with open positions."""
+        return list(self._by_symbol)
+
+    def asset_exposure(self, asset: str) -> float:
+        """Value of open positions in an asset (base asset, or symbol for positions without one)."""
+        return self.exposure.get(asset, 0.0)
+
+    @property
+    def drawdown(self) -> float:
+        """Current drawdown as a fraction of peak equity (0 before any equity is recorded)."""
+        if self.equity is None or not self.peak_equity or self.peak_equity <= 0:
+            return 0.0
+        return max(0.0, 1.0 - self.equity / self.peak_equity)
+
+
+class Book:
+    """
+    Mutable working copy of a snapshot, used by commands on the writer thread.
+
+    Containers are copied on first write, so a batch that only records a
+    trade does not copy the positions.
+    """
+
+    def __init__(self, snapshot: PortfolioSnapshot, ids: Iterator[str]):
+        self._base = snapshot
+        self._ids = ids
+        # Times of recorded trades, added to the rate windows once the batch is published
+        self.trade_times: List[float] = []
+        self.positions = snapshot.positions
+        self.by_symbol = snapshot._by_symbol
+        self.counts = snapshot._counts
+        self.balances = snapshot.balances
+        self.realized_pnl = snapshot.realized_pnl
+        self.history = snapshot.history
+        self.closed = snapshot.closed
+        self.exposure = snapshot.exposure
+        self.total_exposure = snapshot.total_exposure
+        self.equity = snapshot.equity
+        self.peak_equity = snapshot.peak_equity
+        self.max_drawdown = snapshot.max_drawdown
+        self._copied = set()
+
+    def _writable(self, name: str) -> Any:
+        """Container `name`, copied the first time it is written in this batch."""
+        if name not in self._copied:
+            self._copied.add(name)
+            current = getattr(self, name)
+            setattr(self, name, list(current) if isinstance(current, tuple) else dict(current))
+        return getattr(self, name)
+
+    def position_for(self, symbol: str, owner: Optional[str] = None) -> Optional[Dict[str, Any]]:
+        """Oldest open position in a symbol (of an owner, if given), or None."""
+        return _first_owned(self.positions, self.by_symbol.get(normalize_symbol(symbol), ()), owner)
+
+    def open(self, position: Dict[str, Any], owner: Optional[str] = None) -> Dict[str, Any]:
+        """
+        Add an open position.
+
+        The position is keyed by its "position_id", else its "trade_id", else
+        a generated id (unique across restarts, since ids are persisted in
+        journals); an open position with the same id is replaced.
+
+        Args:
+            position: Position record (copied)
+            owner: Manager owning the position (default: the record's
+                "owner", else TRADE_BOOK)
+
+        Returns:
+            The stored position (with "position_id" and "owner" set)
+        """
+        position = dict(position)
+        position_id = str(position.get("position_id") or position.get("trade_id") or next(self._ids))
+        position["position_id"] = position_id
+        position["owner"] = owner or position_owner(position)
+
+        if position_id in self.positions:
+            self._unindex(self.positions[position_id])
+        self._writable("positions")[position_id] = position
+        self._index(position)
+        return position
+
+    def close(self, position_id: str, **fields: Any) -> Optional[Dict[str, Any]]:
+        """
+        Close an open position and add it to the closed trades.
+
+        Args:
+            position_id: Position to close
+            **fields: Fields to set on the closed record (e.g. exit_price, pnl)
+
+        Returns:
+            The closed record, or None if the position is not open
+        """
+        position = self.remove(position_id)
+        if position is None:
+            return None
+
+        closed = dict(position, status="closed", **fields)
+        self._append("closed", closed)
+        return closed
+
+    def remove(self, position_id: str) -> Optional[Dict[str, Any]]:
+        """Drop an open position without recording it as closed; returns it, or None."""
+        position = self.positions.get(position_id)
+        if position is not None:
+            del self._writable("positions")[position_id]
+            self._unindex(position)
+        return position
+
+    def mark(self, position_id: str, **fields: Any) -> None:
+        """Replace an open position with a copy carrying updated fields."""
+        position = self.positions.get(position_id)
+        if position is not None:
+            marked = dict(position, **fields)
+            self._add_exposure(marked, position_value(marked) - position_value(position))
+            self._writable("positions")[position_id] = marked
+
+    def adjust(self, deltas: Dict[str, float]) -> None:
+        """Add amounts to asset balances."""
+        balances = self._writable("balances")
+        for asset, amount in deltas.items():
+            balances[asset] = balances.get(asset, 0.0) + amount
+
+    def realize(self, pnl: float) -> None:
+        """Add to realized PnL."""
+        self.realized_pnl += pnl
+
+    def record(self, trade: Dict[str, Any]) -> None:
+        """Append an executed trade to the trade history and the trade rate windows."""
+        self._append("history", dict(trade))
+        self.trade_times.append(trade_time(trade))
+
+    def record_equity(self, equity: float) -> None:
+        """Record the current portfolio equity, updating peak equity and drawdown."""
+        self.equity = float(equity)
+        if self.peak_equity is None or self.equity > self.peak_equity:
+            self.peak_equity = self.equity
+        if self.peak_equity > 0:
+            self.max_drawdown = max(self.max_drawdown, 1.0 - self.equity / self.peak_equity)
+
+    def archive(self, trade: Dict[str, Any], owner: Optional[str] = None) -> None:
+        """Append a closed trade record as is (journal replay), tagged with its owner."""
+        self._append("closed", dict(trade, owner=owner or position_owner(trade)))
+
+    def _append(self, name: str, record: Dict[str, Any]) -> None:
+        records = self._writable(name)
+        records.append(record)
+        if len(records) > HISTORY_LIMIT:
+            del records[:len(records) - HISTORY_LIMIT]
+
+    def _index(self, position: Dict[str, Any]) -> None:
+        by_symbol = self._writable("by_symbol")
+        symbol = position_symbol(position)
+        by_symbol[symbol] = by_symbol.get(symbol, ()) + (position["position_id"],)
+        counts = self._writable("counts")
+        owner = position_owner(position)
+        counts[owner] = counts.get(owner, 0) + 1
+        self._add_exposure(position, position_value(position))
+
+    def _add_exposure(self, position: Dict[str, Any], amount: float) -> None:
+        """Add to the exposure totals, dropping rounding residue once an asset's positions are gone."""
+        if not amount:
+            return
+        exposure = self._writable("exposure")
+        asset = position_asset(position)
+        total = exposure.get(asset, 0.0) + amount
+        if abs(total) < 1e-9:
+            exposure.pop(asset, None)
+        else:
+            exposure[asset] = total
+        self.total_exposure = self.total_exposure + amount if exposure else 0.0
+
+    def _unindex(self, position: Dict[str, Any]) -> None:
+        self._add_exposure(position, -position_value(position))
+        counts = self._writable("counts")
+        owner = position_owner(position)
+        if counts.get(owner, 0) > 1:
+            counts[owner] -= 1
+        else:
+            counts.pop(owner, None)
+        by_symbol = self._writable("by_symbol")
+        symbol = position_symbol(position)
+        remaining = tuple(i for i in by_symbol.get(symbol, ()) if i != position["position_id"])
+        if remaining:
+            by_symbol[symbol] = remaining
+        else:
+            by_symbol.pop(symbol, None)
+
+    def freeze(self, version: int) -> PortfolioSnapshot:
+        """Snapshot of the working copy."""
+        return PortfolioSnapshot(
+            version=version,
+            positions=self.positions if "positions" in self._copied else self._base.positions,
+            by_symbol=self.by_symbol if "by_symbol" in self._copied else self._base._by_symbol,
+            counts=self.counts if "counts" in self._copied else self._base._counts,
+            balances=self.balances if "balances" in self._copied else self._base.balances,
+            realized_pnl=self.realized_pnl,
+            history=tuple(self.history),
+            closed=tuple(self.closed),
+            exposure=self.exposure if "exposure" in self._copied else self._base.exposure,
+            total_exposure=self.total_exposure,
+            equity=self.equity,
+            peak_equity=self.peak_equity,
+            max_drawdown=self.max_drawdown
+        )
+
+
+class PortfolioState:
+    """
+    Single-writer owner of the portfolio.
+
+    Responsibilities:
+    - Apply position, balance, equity and trade history commands in order on one thread
+    - Publish an immutable snapshot after each batch of commands
+    - Count executed trades in rolling windows
+    - Replay each trade journal once
+
+    The writer thread starts with the first command and runs until close().
+    """
+
+    def __init__(self, name: str = "portfolio"):
+        """
+        Initialize an empty portfolio state.
+
+        Args:
+            name: Name used for the writer thread and logs
+        """
+        self.name = name
+        self._snapshot = PortfolioSnapshot()
+        self._queue: "queue.Queue[Tuple[Callable[[Book], Any], Future]]" = queue.Queue()
+        session = int(time.time() * 1000)
+        self._ids = (f"pos-{session}-{n}" for n in itertools.count(1))
+        self.trade_rate = TradeRateCounter()
+        self._journals = set()
+        self._journals_lock = threading.Lock()
+        self._writer: Optional[threading.Thread] = None
+        self._writer_lock = threading.Lock()
+        self._closed = False
+
+    def snapshot(self) -> PortfolioSnapshot:
+        """Current snapshot (lock-free)."""
+        return self._snapshot
+
+    def submit(self, command: Callable[[Book], T]) -> "Future[T]":
+        """
+        Queue a command for the writer thread.
+
+        Args:
+            command: Function applied to the working Book; it must not block
+
+        Returns:
+            Future resolved with the command's result once its batch is published
+
+        Raises:
+            RuntimeError: If the state is closed
+        """
+        future: Future = Future()
+        with self._writer_lock:
+            if self._closed:
+                raise RuntimeError(f"PortfolioState {self.name} is closed")
+            if self._writer is None:
+                self._writer = threading.Thread(target=self._run, name=f"{self.name}-state-writer", daemon=True)
+                self._writer.start()
+            self._queue.put((command, future))
+        return future
+
+    def close(self, timeout: Optional[float] = None) -> None:
+        """
+        Stop the writer thread once the commands already queued are applied.
+
+        The last snapshot stays readable; later commands raise RuntimeError.
+
+        Args:
+            timeout: Seconds to wait for the writer to finish (default: no limit)
+        """
+        with self._writer_lock:
+            if self._closed:
+                return
+            self._closed = True
+            writer = self._writer
+            if writer is not None:
+                self._queue.put(None)
+        if writer is not None and writer is not threading.current_thread():
+            writer.join(timeout)
+
+    def execute(self, command: Callable[[Book], T]) -> T:
+        """Run a command on the writer thread and wait for its result."""
+        if threading.current_thread() is self._writer:
+            raise RuntimeError("PortfolioState commands cannot be executed from inside another command")
+        return self.submit(command).result()
+
+    def open_position(self, position: Dict[str, Any], owner: Optional[str] = None) -> Dict[str, Any]:
+        """Add an open position (see Book.open)."""
+        return self.execute(lambda book: book.open(position, owner))
+
+    def close_position(self, position_id: str, **fields: Any) -> Optional[Dict[str, Any]]:
+        """Close an open position (see Book.close)."""
+        return self.execute(lambda book: book.close(position_id, **fields))
+
+    def mark_positions(self, updates: Dict[str, Dict[str, Any]]) -> None:
+        """
+        Update fields of many open positions in one command.
+
+        Args:
+            updates: Mapping of position id -> fields to set
+        """
+        def apply(book: Book) -> None:
+            for position_id, fields in updates.items():
+                book.mark(position_id, **fields)
+        self.execute(apply)
+
+    def record_trade(self, trade: Dict[str, Any]) -> None:
+        """Append an executed trade to the trade history and the trade rate windows."""
+        self.execute(lambda book: book.record(trade))
+
+    def record_equity(self, equity: float) -> None:
+        """Record the current portfolio equity (for drawdown tracking)."""
+        self.execute(lambda book: book.record_equity(equity))
+
+    def trade_count(self, window: str, now: float) -> int:
+        """
+        Executed trades in a rolling window.
+
+        Args:
+            window: Window name from risk_counters.TRADE_WINDOWS ("1h", "24h", "7d")
+            now: Current time in epoch seconds
+
+        Returns:
+            Number of trades recorded in the window ending at `now`
+        """
+        return self.trade_rate.count(window, now)
+
+    def load_journal(self, path: str, replay: Callable[[Book], Any]) -> bool:
+        """
+        Replay a trade journal into the state unless it was already replayed.
+
+        Args:
+            path: Journal path (the replay key)
+            replay: Command that reads the journal and applies it to the Book
+
+        Returns:
+            True if the journal was replayed by this call
+        """
+        with self._journals_lock:
+            if path in self._journals:
+                return False
+            self._journals.add(path)
+        try:
+            self.execute(replay)
+        except Exception:
+            with self._journals_lock:
+                self._journals.discard(path)
+            raise
+        return True
+
+    def _run(self) -> None:
+        """Writer loop: apply queued commands in batches and publish snapshots until closed."""
+        stopped = False
+        while not stopped:
+            batch = [self._queue.get()]
+            while True:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+
+            # None is the close() sentinel; it is always the last item queued
+            stopped = batch[-1] is None
+            if stopped:
+                batch.pop()
+            if not batch:
+                continue
+
+            book, outcomes = self._apply([(command, future) for command, future in batch
+                                          if future.set_running_or_notify_cancel()])
+
+            self._snapshot = book.freeze(self._snapshot.version + 1)
+            for timestamp in book.trade_times:
+                self.trade_rate.add(timestamp)
+
+            for future, result, error in outcomes:
+                if error is not None:
+                    future.set_exception(error)
+                else:
+                    future.set_result(result)
+
+    def _apply(self, batch: List[Tuple[Callable[[Book], Any], Future]]
+               ) -> Tuple[Book, List[Tuple[Future, Any, Optional[Exception]]]]:
+        """
+        Apply a batch of commands to a working copy of the current snapshot.
+
+        When a command raises, its partial changes are discarded by starting
+        over from the snapshot and re-running the other commands without it.
+
+        Args:
+            batch: Commands with their futures, in queue order
+
+        Returns:
+            The Book to publish and (future, result, error) per command
+        """
+        failed: Dict[Future, Exception] = {}
+        while True:
+            book = Book(self._snapshot, self._ids)
+            outcomes = []
+            for command, future in batch:
+                if future in failed:
+                    outcomes.append((future, None, failed[future]))
+                    continue
+                try:
+                    outcomes.append((future, command(book), None))
+                except Exception as e:
+                    logger.error(f"{self.name}: command failed: {str(e)}")
+                    failed[future] = e
+                    break
+            else:
+                return book, outcomes
+
+
+# Process-wide portfolio shared by the trading agents
+portfolio_state = PortfolioState()
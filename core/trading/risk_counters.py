@@ -0,0 +1,132 @@
+#!/usr/bin/env python
+"""
+Risk Counters for aGENtrader v2
+
+This module provides constant-time bookkeeping for risk checks:
+- SlidingWindowCounter counts events in a rolling window using a deque of
+  time buckets, so adding an event and reading the count cost O(1)
+  (amortized) however many trades were made
+- TradeRateCounter keeps one such counter per trade-frequency window
+  (1h, 24h and 7d)
+
+Counts are bucketed: a bucket leaves the window only once it has fully
+expired, so a count can include trades up to one bucket width older than
+the window. For a limit check this errs on the side of rejecting.
+"""
+
+import threading
+from collections import deque
+from typing import Dict, Optional
+
+# Rolling windows for trade frequency limits, in seconds
+TRADE_WINDOWS = {
+    "1h": 3600,
+    "24h": 24 * 3600,
+    "7d": 7 * 24 * 3600
+}
+
+# Buckets per window (the counting resolution)
+DEFAULT_BUCKETS = 60
+
+
+class SlidingWindowCounter:
+    """
+    Event count over a rolling time window.
+
+    Times are passed in explicitly (epoch seconds), so the counter follows
+    whatever clock the caller uses, including a simulated backtest clock.
+    """
+
+    def __init__(self, window_seconds: float, buckets: int = DEFAULT_BUCKETS):
+        """
+        Initialize the counter.
+
+        Args:
+            window_seconds: Length of the window
+            buckets: Number of buckets the window is divided into
+        """
+        self.window = float(window_seconds)
+        self.bucket_width = self.window / max(1, buckets)
+        self._buckets = deque()  # [bucket_start, count], oldest first
+        self._total = 0
+        self._lock = threading.Lock()
+
+    def add(self, timestamp: float, count: int = 1) -> None:
+        """
+        Count events at a time.
+
+        Args:
+            timestamp: Event time in epoch seconds
+            count: Number of events
+        """
+        start = timestamp - (timestamp % self.bucket_width)
+        with self._lock:
+            if not self._buckets or start > self._buckets[-1][0]:
+                self._buckets.append([start, count])
+            elif start == self._buckets[-1][0]:
+                self._buckets[-1][1] += count
+            else:
+                # Late event: find its bucket from the newest end (rare)
+                for i in range(len(self._buckets) - 1, -1, -1):
+                    if self._buckets[i][0] == start:
+                        self._buckets[i][1] += count
+                        break
+                    if self._buckets[i][0] < start:
+                        self._buckets.insert(i + 1, [start, count])
+                        break
+                else:
+                    self._buckets.appendleft([start, count])
+            self._total += count
+
+    def count(self, now: float) -> int:
+        """
+        Events in the window ending at `now`.
+
+        Args:
+            now: Current time in epoch seconds
+
+        Returns:
+            Number of events in buckets that have not fully expired
+        """
+        horizon = now - self.window
+        with self._lock:
+            while self._buckets and self._buckets[0][0] + self.bucket_width <= horizon:
+                self._total -= self._buckets.popleft()[1]
+            return self._total
+
+
+class TradeRateCounter:
+    """
+    Trade counts over the rolling windows in TRADE_WINDOWS.
+    """
+
+    def __init__(self, windows: Optional[Dict[str, float]] = None, buckets: int = DEFAULT_BUCKETS):
+        """
+        Initialize one counter per window.
+
+        Args:
+            windows: Window name -> length in seconds (default: TRADE_WINDOWS)
+            buckets: Buckets per window
+        """
+        self.counters = {
+            name: SlidingWindowCounter(seconds, buckets)
+            for name, seconds in (windows or TRADE_WINDOWS).items()
+        }
+
+    def add(self, timestamp: float) -> None:
+        """Count a trade made at `timestamp` (epoch seconds)."""
+        for counter in self.counters.values():
+            counter.add(timestamp)
+
+    def count(self, window: str, now: float) -> int:
+        """
+        Trades in a window.
+
+        Args:
+            window: Window name (e.g. "24h")
+            now: Current time in epoch seconds
+
+        Returns:
+            Number of trades in the window ending at `now`
+        """
+        return self.counters[window].count(now)
@@ -0,0 +1,320 @@
+#!/usr/bin/env python
+"""
+Portfolio Snapshot Log for aGENtrader v2
+
+This module stores portfolio snapshots in a compact append-only binary log
+instead of one JSON line per snapshot:
+- `<name>.snap` holds the snapshot payloads, each a zlib-compressed JSON
+  document behind a small fixed header; a payload identical to the previous
+  one is not written again
+- `<name>.idx` holds one fixed-width entry per snapshot (time, state
+  version, equity, payload offset), in time order
+
+The index doubles as the equity curve: loading equity over a time range
+memory-maps the index, finds the range by binary search and returns NumPy
+arrays without reading or parsing any payload. A single snapshot is one
+seek and one decompress.
+
+Compaction rewrites both files, keeping every entry from the retention
+period and one entry per resolution bucket before it, and drops payloads no
+entry refers to any more. It runs every `compact_every` appends (and on
+demand). Both file headers carry a compaction generation, so a crash
+between replacing the index and the log is completed on the next open, and
+a reader that opened the index and the log on either side of the swap sees
+the mismatch and opens them again.
+"""
+
+import os
+import json
+import time
+import zlib
+import struct
+import logging
+import threading
+from datetime import datetime
+from typing import Dict, Any, Optional, Tuple, Union, BinaryIO
+
+import numpy as np
+
+# Setup logger
+logger = logging.getLogger("aGENtrader.snapshot_log")
+
+LOG_MAGIC = b"AGSNAP01"
+INDEX_MAGIC = b"AGSIDX01"
+
+# File header: magic, compaction generation
+HEADER = struct.Struct("<8sQ")
+
+# Payload header: timestamp, state version, payload length
+RECORD = struct.Struct("<dQI")
+# Index entry: timestamp, state version, equity, payload offset
+INDEX = struct.Struct("<dQdQ")
+INDEX_DTYPE = np.dtype([("timestamp", "<f8"), ("version", "<u8"), ("equity", "<f8"), ("offset", "<u8")])
+
+# Attempts to open an index and log of the same generation while a compaction swaps them
+READ_ATTEMPTS = 100
+
+TimeLike = Union[float, int, str, datetime, None]
+
+
+def to_epoch(value: TimeLike) -> Optional[float]:
+    """Epoch seconds for a number, datetime or ISO 8601 string (None passes through)."""
+    if value is None or isinstance(value, (int, float)):
+        return value
+    if isinstance(value, str):
+        value = datetime.fromisoformat(value.replace("Z", "+00:00"))
+    return value.timestamp()
+
+
+class SnapshotLog:
+    """
+    Append-only binary portfolio snapshot log with a time index.
+
+    Appends and compaction are serialized by a lock. Readers take no lock:
+    they work on open files, which a compaction replaces but never changes,
+    and check that the index and log they opened are of one generation.
+    """
+
+    def __init__(self,
+                 directory: str,
+                 name: str = "portfolio_snapshot",
+                 retention_days: float = 7.0,
+                 resolution_minutes: float = 60.0,
+                 compact_every: int = 1000):
+        """
+        Open (or create) a snapshot log.
+
+        Args:
+            directory: Directory holding the log and index files
+            name: Base name of the files
+            retention_days: Age up to which compaction keeps every snapshot
+            resolution_minutes: Spacing of the snapshots compaction keeps beyond that
+            compact_every: Appends between automatic compactions (0: never)
+        """
+        os.makedirs(directory, exist_ok=True)
+        self.log_path = os.path.join(directory, f"{name}.snap")
+        self.index_path = os.path.join(directory, f"{name}.idx")
+        self.retention_seconds = retention_days * 86400
+        self.resolution_seconds = resolution_minutes * 60
+        self.compact_every = compact_every
+        self._lock = threading.Lock()
+        self._appends = 0
+        self._recover()
+
+    @staticmethod
+    def _generation(path: str, magic: bytes) -> int:
+        """Compaction generation in a file header (creating the file if missing)."""
+        if not os.path.exists(path) or os.path.getsize(path) < HEADER.size:
+            with open(path, "wb") as f:
+                f.write(HEADER.pack(magic, 0))
+            return 0
+        with open(path, "rb") as f:
+            found, generation = HEADER.unpack(f.read(HEADER.size))
+        if found != magic:
+            raise ValueError(f"Not a portfolio snapshot file: {path}")
+        return generation
+
+    def _recover(self) -> None:
+        """Create missing files, finish an interrupted compaction and drop a torn tail."""
+        index_generation = self._generation(self.index_path, INDEX_MAGIC)
+        log_generation = self._generation(self.log_path, LOG_MAGIC)
+        if index_generation != log_generation:
+            # Crashed after replacing the index: the compacted log is complete
+            if (os.path.exists(self.log_path + ".tmp")
+                    and self._generation(self.log_path + ".tmp", LOG_MAGIC) == index_generation):
+                os.replace(self.log_path + ".tmp", self.log_path)
+            else:
+                raise ValueError(f"Snapshot index {self.index_path} does not match its log")
+        for path in (self.log_path + ".tmp", self.index_path + ".tmp"):
+            if os.path.exists(path):
+                os.remove(path)
+        self._generation_number = index_generation
+
+        log_size = os.path.getsize(self.log_path)
+        with open(self.index_path, "rb") as index:
+            entries = self._map_entries(index)
+        valid = len(entries)
+        while valid and entries["offset"][valid - 1] >= log_size:
+            valid -= 1
+        index_size = HEADER.size + valid * INDEX.size
+        if os.path.getsize(self.index_path) != index_size:
+            logger.warning(f"Truncating torn snapshot index {self.index_path} to {valid} entries")
+            with open(self.index_path, "r+b") as f:
+                f.truncate(index_size)
+
+        self._last_payload = None
+        self._last_offset = None
+        if valid:
+            self._last_offset = int(entries["offset"][valid - 1])
+            with open(self.log_path, "rb") as log:
+                self._last_payload = self._read_payload(log, self._last_offset)
+
+    @staticmethod
+    def _map_entries(index: BinaryIO) -> np.ndarray:
+        """Memory-mapped entries of an open index file (read-only)."""
+        count = (os.fstat(index.fileno()).st_size - HEADER.size) // INDEX.size
+        if count <= 0:
+            return np.empty(0, dtype=INDEX_DTYPE)
+        return np.memmap(index, dtype=INDEX_DTYPE, mode="r", offset=HEADER.size, shape=(count,))
+
+    def _entries(self) -> np.ndarray:
+        """Memory-mapped index entries (read-only)."""
+        with open(self.index_path, "rb") as index:
+            return self._map_entries(index)
+
+    def _open_generation(self) -> Tuple[np.ndarray, BinaryIO]:
+        """
+        Index entries and the open log file they point into.
+
+        Raises:
+            ValueError: If the index and log stay of different generations
+        """
+        for _ in range(READ_ATTEMPTS):
+            with open(self.index_path, "rb") as index:
+                log = open(self.log_path, "rb")
+                index_generation = HEADER.unpack(index.read(HEADER.size))[1]
+                log_generation = HEADER.unpack(log.read(HEADER.size))[1]
+                if index_generation == log_generation:
+                    return self._map_entries(index), log
+                log.close()
+            # Opened between the index and the log being replaced
+            time.sleep(0.001)
+        raise ValueError(f"Snapshot index {self.index_path} does not match its log")
+
+    @staticmethod
+    def _read_payload(log: BinaryIO, offset: int) -> bytes:
+        log.seek(offset)
+        _, _, length = RECORD.unpack(log.read(RECORD.size))
+        return log.read(length)
+
+    def __len__(self) -> int:
+        """Number of snapshots in the index."""
+        return len(self._entries())
+
+    def append(self, timestamp: TimeLike, equity: float, snapshot: Dict[str, Any], version: int = 0) -> None:
+        """
+        Append a snapshot.
+
+        Args:
+            timestamp: Snapshot time (epoch seconds, datetime or ISO string)
+            equity: Portfolio equity at that time
+            snapshot: JSON-serializable snapshot document
+            version: Portfolio state version the snapshot was taken at
+        """
+        timestamp = to_epoch(timestamp)
+        payload = zlib.compress(json.dumps(snapshot, sort_keys=True, default=str).encode("utf-8"))
+
+        with self._lock:
+            if payload == self._last_payload:
+                offset = self._last_offset
+            else:
+                with open(self.log_path, "ab") as f:
+                    offset = f.tell()
+                    f.write(RECORD.pack(timestamp, version, len(payload)))
+                    f.write(payload)
+                self._last_payload = payload
+                self._last_offset = offset
+
+            # The index entry goes last, so it never points at a missing payload
+            with open(self.index_path, "ab") as f:
+                f.write(INDEX.pack(timestamp, version, float(equity), offset))
+
+            self._appends += 1
+            if self.compact_every and self._appends >= self.compact_every:
+                self._compact(timestamp)
+
+    def equity_curve(self, start: TimeLike = None, end: TimeLike = None) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Equity over a time range, read from the index alone.
+
+        Args:
+            start: First time to include (default: the beginning)
+            end: Last time to include (default: the end)
+
+        Returns:
+            Tuple of (timestamps in epoch seconds, equity) arrays
+        """
+        entries = self._entries()
+        timestamps = entries["timestamp"]
+        lo = 0 if start is None else int(np.searchsorted(timestamps, to_epoch(start), side="left"))
+        hi = len(entries) if end is None else int(np.searchsorted(timestamps, to_epoch(end), side="right"))
+        selected = entries[lo:max(lo, hi)]
+        return np.array(selected["timestamp"]), np.array(selected["equity"])
+
+    def snapshot_at(self, timestamp: TimeLike = None) -> Optional[Dict[str, Any]]:
+        """
+        Latest snapshot taken at or before a time.
+
+        Args:
+            timestamp: Time to look up (default: the latest snapshot)
+
+        Returns:
+            Snapshot document, or None if there is none that early
+        """
+        entries, log = self._open_generation()
+        with log:
+            if timestamp is None:
+                position = len(entries)
+            else:
+                position = int(np.searchsorted(entries["timestamp"], to_epoch(timestamp), side="right"))
+            if position == 0:
+                return None
+            payload = self._read_payload(log, int(entries["offset"][position - 1]))
+        return json.loads(zlib.decompress(payload).decode("utf-8"))
+
+    def compact(self, now: TimeLike = None) -> int:
+        """
+        Thin out snapshots older than the retention period.
+
+        Args:
+            now: Reference time for the retention period (default: the latest snapshot)
+
+        Returns:
+            Number of index entries removed
+        """
+        with self._lock:
+            return self._compact(to_epoch(now))
+
+    def _compact(self, now: Optional[float]) -> int:
+        self._appends = 0
+        entries = np.array(self._entries())
+        if not len(entries):
+            return 0
+        if now is None:
+            now = float(entries["timestamp"][-1])
+
+        # Keep the last entry of each resolution bucket before the retention period
+        cutoff = now - self.retention_seconds
+        old = entries["timestamp"] < cutoff
+        buckets = np.floor(entries["timestamp"] / max(self.resolution_seconds, 1e-9))
+        last_in_bucket = np.append(buckets[1:] != buckets[:-1], True)
+        kept = entries[~old | last_in_bucket]
+        removed = len(entries) - len(kept)
+        if not removed:
+            return 0
+
+        generation = self._generation_number + 1
+        log_tmp = self.log_path + ".tmp"
+        index_tmp = self.index_path + ".tmp"
+        offsets: Dict[int, int] = {}
+        with open(self.log_path, "rb") as src, open(log_tmp, "wb") as log, open(index_tmp, "wb") as index:
+            log.write(HEADER.pack(LOG_MAGIC, generation))
+            index.write(HEADER.pack(INDEX_MAGIC, generation))
+            for timestamp, version, equity, offset in kept.tolist():
+                if offset not in offsets:
+                    src.seek(offset)
+                    header = src.read(RECORD.size)
+                    payload = src.read(RECORD.unpack(header)[2])
+                    offsets[offset] = log.tell()
+                    log.write(header)
+                    log.write(payload)
+                index.write(INDEX.pack(timestamp, version, equity, offsets[offset]))
+
+        # Index first; a crash before the log follows is completed by _recover
+        os.replace(index_tmp, self.index_path)
+        os.replace(log_tmp, self.log_path)
+        self._generation_number = generation
+        self._last_offset = offsets[int(kept["offset"][-1])]
+
+        logger.info(f"Compacted snapshot log {self.log_path}: removed {removed} of {len(entries)} snapshots")
+        return removed
@@ -0,0 +1,326 @@
+#!/usr/bin/env python
+"""
+StopEngine for aGENtrader v2
+
+This module provides a vectorized stop loss / take profit engine. All open
+positions are held in contiguous NumPy arrays (entry, stop loss, take profit,
+direction, size, trailing distance) so a whole book can be checked against a
+price vector, or against intra-bar high/low ranges, in a single pass.
+
+Positions are keyed by position id rather than symbol, so any number of
+positions per symbol is supported.
+"""
+
+import logging
+from typing import Dict, Any, Optional, List
+
+import numpy as np
+
+# Setup logger
+logger = logging.getLogger("aGENtrader.stop_engine")
+
+
+class StopEngine:
+    """
+    Vectorized stop engine for open positions.
+
+    Features:
+    - Evaluate all positions against last prices or bar high/low in one pass
+    - Fixed stop loss and take profit levels per position
+    - Optional trailing stops (percentage distance from the best price seen)
+    - Multiple positions per symbol
+    """
+
+    def __init__(self, initial_capacity: int = 64):
+        """
+        Initialize the stop engine.
+
+        Args:
+            initial_capacity: Number of position slots to preallocate
+        """
+        capacity = max(1, initial_capacity)
+
+        self._entry = np.zeros(capacity)
+        self._stop_loss = np.zeros(capacity)
+        self._take_profit = np.zeros(capacity)
+        self._direction = np.zeros(capacity)
+        self._size = np.zeros(capacity)
+        self._trail_pct = np.zeros(capacity)
+        self._best_price = np.zeros(capacity)
+        self._symbol_idx = np.zeros(capacity, dtype=np.int64)
+        self._active = np.zeros(capacity, dtype=bool)
+
+        self._ids: List[Optional[str]] = [None] * capacity
+        self._slot_by_id: Dict[str, int] = {}
+        self._free_slots: List[int] = list(range(capacity - 1, -1, -1))
+
+        self._symbols: List[str] = []
+        self._symbol_index: Dict[str, int] = {}
+
+    def __len__(self) -> int:
+        """Number of open positions tracked by the engine."""
+        return len(self._slot_by_id)
+
+    def __contains__(self, position_id: str) -> bool:
+        return position_id in self._slot_by_id
+
+    def add_position(
+        self,
+        position_id: str,
+        symbol: str,
+        action: str,
+        entry_price: float,
+        stop_loss: Optional[float] = None,
+        take_profit: Optional[float] = None,
+        size: float = 1.0,
+        trailing_stop_pct: Optional[float] = None
+    ) -> None:
+        """
+        Register an open position.
+
+        Args:
+            position_id: Unique position identifier
+            symbol: Trading symbol
+            action: Position direction ('BUY' or 'SELL')
+            entry_price: Entry price
+            stop_loss: Stop loss level (None or 0 to disable)
+            take_profit: Take profit level (None or 0 to disable)
+            size: Position size
+            trailing_stop_pct: Trailing stop distance in percent (None to disable)
+        """
+        if action not in ("BUY", "SELL"):
+            raise ValueError(f"Unsupported position action: {action}")
+
+        if position_id in self._slot_by_id:
+            self.remove_position(position_id)
+
+        if not self._free_slots:
+            self._grow()
+
+        slot = self._free_slots.pop()
+        direction = 1.0 if action == "BUY" else -1.0
+
+        self._entry[slot] = entry_price
+        self._stop_loss[slot] = stop_loss or 0.0
+        self._take_profit[slot] = take_profit or 0.0
+        self._direction[slot] = direction
+        self._size[slot] = size
+        self._trail_pct[slot] = (trailing_stop_pct or 0.0) / 100.0
+        self._best_price[slot] = entry_price
+        self._symbol_idx[slot] = self._get_symbol_index(symbol)
+        self._active[slot] = True
+
+        self._ids[slot] = position_id
+        self._slot_by_id[position_id] = slot
+
+        # Trailing stops start at the trailing distance from entry if tighter
+        if self._trail_pct[slot] > 0:
+            self._update_trailing(np.array([slot]))
+
+    def remove_position(self, position_id: str) -> bool:
+        """
+        Stop tracking a position.
+
+        Args:
+            position_id: Position identifier
+
+        Returns:
+            True if the position was tracked, False otherwise
+        """
+        slot = self._slot_by_id.pop(position_id, None)
+        if slot is None:
+            return False
+
+        self._active[slot] = False
+        self._ids[slot] = None
+        self._free_slots.append(slot)
+        return True
+
+    def get_levels(self, position_id: str) -> Optional[Dict[str, float]]:
+        """
+        Get the current stop levels for a position.
+
+        Args:
+            position_id: Position identifier
+
+        Returns:
+            Dictionary with stop_loss, take_profit and best_price, or None
+        """
+        slot = self._slot_by_id.get(position_id)
+        if slot is None:
+            return None
+
+        return {
+            "stop_loss": float(self._stop_loss[slot]),
+            "take_profit": float(self._take_profit[slot]),
+            "best_price": float(self._best_price[slot])
+        }
+
+    def evaluate(self, prices: Dict[str, float]) -> List[Dict[str, Any]]:
+        """
+        Check every position against last traded prices.
+
+        Triggered positions are filled at the given price, so a price that
+        gaps through a level is reflected in the exit.
+
+        Args:
+            prices: Mapping of symbol -> last price
+
+        Returns:
+            List of close events (triggered positions are removed from the engine)
+        """
+        price_vector = self._price_vector(prices)
+        return self._evaluate(price_vector, price_vector, fill_at_price=True)
+
+    def evaluate_bars(
+        self,
+        highs: Dict[str, float],
+        lows: Dict[str, float]
+    ) -> List[Dict[str, Any]]:
+        """
+        Check every position against intra-bar high/low ranges.
+
+        Triggered positions are filled at their stop or target level. If both
+        fall inside the same bar, the stop loss is assumed to fill first.
+
+        Args:
+            highs: Mapping of symbol -> bar high
+            lows: Mapping of symbol -> bar low
+
+        Returns:
+            List of close events (triggered positions are removed from the engine)
+        """
+        return self._evaluate(self._price_vector(highs), self._price_vector(lows), fill_at_price=False)
+
+    def _evaluate(
+        self,
+        high_vec: np.ndarray,
+        low_vec: np.ndarray,
+        fill_at_price: bool
+    ) -> List[Dict[str, Any]]:
+        """
+        Evaluate all active positions against symbol-indexed high/low arrays.
+
+        Trailing stops are checked at their current level first and only then
+        ratcheted using the bar's favourable extreme.
+        """
+        if not self._slot_by_id:
+            return []
+
+        slots = np.flatnonzero(self._active)
+        sym = self._symbol_idx[slots]
+        high = high_vec[sym]
+        low = low_vec[sym]
+        priced = np.isfinite(high) & np.isfinite(low)
+
+        direction = self._direction[slots]
+        stop_loss = self._stop_loss[slots]
+        take_profit = self._take_profit[slots]
+        is_long = direction > 0
+
+        # Adverse and favourable extremes of the bar for each position
+        adverse = np.where(is_long, low, high)
+        favourable = np.where(is_long, high, low)
+
+        sl_hit = priced & (stop_loss > 0) & ((stop_loss - adverse) * direction >= 0)
+        tp_hit = priced & ~sl_hit & (take_profit > 0) & ((favourable - take_profit) * direction >= 0)
+
+        triggered = sl_hit | tp_hit
+        exit_price = np.where(sl_hit, stop_loss, take_profit)
+
+        if fill_at_price:
+            exit_price = np.where(triggered, high, exit_price)
+
+        events = []
+        for i in np.flatnonzero(triggered):
+            slot = slots[i]
+            entry = self._entry[slot]
+            pnl_pct = (exit_price[i] - entry) / entry * 100.0 * direction[i] if entry else 0.0
+            trailing = self._trail_pct[slot] > 0 and sl_hit[i]
+
+            events.append({
+                "position_id": self._ids[slot],
+                "symbol": self._symbols[sym[i]],
+                "action": "BUY" if is_long[i] else "SELL",
+                "entry_price": float(entry),
+                "exit_price": float(exit_price[i]),
+                "size": float(self._size[slot]),
+                "pnl_pct": float(pnl_pct),
+                "reason": "Trailing stop" if trailing else ("Stop loss" if sl_hit[i] else "Take profit")
+            })
+
+        for event in events:
+            self.remove_position(event["position_id"])
+
+        # Ratchet trailing stops for positions that survived this bar
+        survivors = slots[priced & ~triggered]
+        if len(survivors):
+            survivor_sym = self._symbol_idx[survivors]
+            survivor_long = self._direction[survivors] > 0
+            bar_best = np.where(survivor_long, high_vec[survivor_sym], low_vec[survivor_sym])
+            self._best_price[survivors] = np.where(
+                survivor_long,
+                np.maximum(self._best_price[survivors], bar_best),
+                np.minimum(self._best_price[survivors], bar_best)
+            )
+            self._update_trailing(survivors)
+
+        if events:
+            logger.info(f"Stop engine triggered {len(events)} close events")
+
+        return events
+
+    def _update_trailing(self, slots: np.ndarray) -> None:
+        """Move trailing stops toward the best price seen (never away from it)."""
+        trail = self._trail_pct[slots]
+        has_trail = trail > 0
+        if not has_trail.any():
+            return
+
+        slots = slots[has_trail]
+        trail = trail[has_trail]
+        is_long = self._direction[slots] > 0
+        best = self._best_price[slots]
+        current = self._stop_loss[slots]
+
+        candidate = np.where(is_long, best * (1 - trail), best * (1 + trail))
+        tighter = np.where(
+            is_long,
+            np.maximum(current, candidate),
+            np.where(current > 0, np.minimum(current, candidate), candidate)
+        )
+        self._stop_loss[slots] = tighter
+
+    def _price_vector(self, prices: Optional[Dict[str, float]]) -> np.ndarray:
+        """Build a symbol-indexed price array (NaN for symbols without a price)."""
+        vector = np.full(len(self._symbols), np.nan)
+        if prices:
+            for symbol, price in prices.items():
+                idx = self._symbol_index.get(symbol)
+                if idx is not None and price is not None:
+                    vector[idx] = price
+        return vector
+
+    def _get_symbol_index(self, symbol: str) -> int:
+        """Get (or assign) the integer index for a symbol."""
+        idx = self._symbol_index.get(symbol)
+        if idx is None:
+            idx = len(self._symbols)
+            self._symbols.append(symbol)
+            self._symbol_index[symbol] = idx
+        return idx
+
+    def _grow(self) -> None:
+        """Double the capacity of all position arrays."""
+        old_capacity = len(self._entry)
+        new_capacity = old_capacity * 2
+
+        for name in ("_entry", "_stop_loss", "_take_profit", "_direction",
+                     "_size", "_trail_pct", "_best_price", "_symbol_idx", "_active"):
+            old = getattr(self, name)
+            grown = np.zeros(new_capacity, dtype=old.dtype)
+            grown[:old_capacity] = old
+            setattr(self, name, grown)
+
+        self._ids.extend([None] * (new_capacity - old_capacity))
+        self._free_slots.extend(range(new_capacity - 1, old_capacity - 1, -1))
@@ -0,0 +1,281 @@
+#!/usr/bin/env python
+"""
+Volatility Cache for aGENtrader v2
+
+This module keeps realized volatility estimates per (symbol, interval) so
+position sizing and risk checks look volatility up instead of recomputing
+it from the candle list on every call:
+- VolatilityEstimator ingests candles one at a time, storing the per-candle
+  terms (log return, squared log range, Garman-Klass term) of a rolling
+  lookback window and an EWMA variance
+- VolatilityCache holds one estimator per (symbol, interval) and feeds it
+  only the candles it has not seen yet
+
+Estimates are per-candle (not annualized), the same scale as the standard
+deviation of log returns the agents used before:
+- close_to_close: sample standard deviation of log close-to-close returns
+- parkinson: high/low range estimator
+- garman_klass: open/high/low/close estimator
+- ewma: exponentially weighted (RiskMetrics) volatility of log returns
+
+A candle with the same open time as the last one seen replaces it, so a
+still-forming candle can be fed repeatedly. When the candles passed in do
+not continue what the estimator has seen (a gap, or an earlier start as in
+a new backtest), it is rebuilt from their tail, so an estimate always
+matches the candles it was last given.
+"""
+
+import math
+import logging
+import threading
+from collections import deque
+from typing import Dict, Any, Optional, List, Tuple
+
+from core.trading.mark_to_market import normalize_symbol
+
+# Setup logger
+logger = logging.getLogger("aGENtrader.volatility")
+
+CLOSE_TO_CLOSE = "close_to_close"
+PARKINSON = "parkinson"
+GARMAN_KLASS = "garman_klass"
+EWMA = "ewma"
+MODELS = (CLOSE_TO_CLOSE, PARKINSON, GARMAN_KLASS, EWMA)
+
+DEFAULT_LOOKBACK = 14
+DEFAULT_EWMA_LAMBDA = 0.94
+
+_PARKINSON_FACTOR = 1.0 / (4.0 * math.log(2.0))
+_GARMAN_KLASS_FACTOR = 2.0 * math.log(2.0) - 1.0
+
+
+def candle_time(candle: Dict[str, Any]) -> Optional[Any]:
+    """Open time of a candle ("time", "timestamp" or "open_time"), if present."""
+    for key in ("time", "timestamp", "open_time"):
+        value = candle.get(key)
+        if value is not None:
+            return value
+    return None
+
+
+class VolatilityEstimator:
+    """
+    Rolling volatility estimates for one candle series.
+
+    Not thread-safe on its own; VolatilityCache serializes access.
+    """
+
+    def __init__(self, lookback: int = DEFAULT_LOOKBACK, ewma_lambda: float = DEFAULT_EWMA_LAMBDA):
+        """
+        Initialize the estimator.
+
+        Args:
+            lookback: Number of returns (and candle ranges) in the window
+            ewma_lambda: Decay factor of the EWMA variance
+        """
+        self.lookback = lookback
+        self.ewma_lambda = ewma_lambda
+        self.reset()
+
+    def reset(self) -> None:
+        """Forget every candle."""
+        self.last_time = None
+        self._last_close = None
+        self._prev_close = None
+        self._returns = deque(maxlen=self.lookback)
+        self._ranges = deque(maxlen=self.lookback)
+        self._garman_klass = deque(maxlen=self.lookback)
+        self._ewma = None
+        self._prev_ewma = None
+        self._estimates: Dict[str, Optional[float]] = {}
+
+    def add(self, candle: Dict[str, Any]) -> None:
+        """
+        Ingest the next candle, or replace the last one if it has the same open time.
+
+        Args:
+            candle: Candle with open/high/low/close (and an open time)
+        """
+        opened = candle_time(candle)
+        if opened is not None and opened == self.last_time:
+            # Still-forming candle: undo the previous version of it
+            if self._prev_close is not None:
+                self._returns.pop()
+            self._ranges.pop()
+            self._garman_klass.pop()
+            self._ewma = self._prev_ewma
+            self._last_close = self._prev_close
+
+        close = float(candle["close"])
+        high = float(candle.get("high", close))
+        low = float(candle.get("low", close))
+        open_price = float(candle.get("open", close))
+
+        if self._last_close is not None:
+            ret = math.log(close / self._last_close)
+            self._returns.append(ret)
+            self._prev_ewma = self._ewma
+            if self._ewma is None:
+                self._ewma = ret * ret
+            else:
+                self._ewma = self.ewma_lambda * self._ewma + (1.0 - self.ewma_lambda) * ret * ret
+
+        log_range = math.log(high / low) if low > 0 else 0.0
+        log_body = math.log(close / open_price) if open_price > 0 else 0.0
+        self._ranges.append(log_range * log_range)
+        self._garman_klass.append(0.5 * log_range * log_range - _GARMAN_KLASS_FACTOR * log_body * log_body)
+
+        self._prev_close = self._last_close
+        self._last_close = close
+        self.last_time = opened
+        self._estimates = {}
+
+    def estimate(self, model: str = CLOSE_TO_CLOSE) -> Optional[float]:
+        """
+        Current volatility estimate.
+
+        Args:
+            model: One of MODELS
+
+        Returns:
+            Per-candle volatility, or None without enough candles
+        """
+        if model in self._estimates:
+            return self._estimates[model]
+
+        value = None
+        if model == CLOSE_TO_CLOSE:
+            n = len(self._returns)
+            if n >= 2:
+                mean = sum(self._returns) / n
+                value = math.sqrt(sum((r - mean) ** 2 for r in self._returns) / (n - 1))
+        elif model == PARKINSON:
+            if self._ranges:
+                value = math.sqrt(_PARKINSON_FACTOR * sum(self._ranges) / len(self._ranges))
+        elif model == GARMAN_KLASS:
+            if self._garman_klass:
+                value = math.sqrt(max(sum(self._garman_klass) / len(self._garman_klass), 0.0))
+        elif model == EWMA:
+            if self._ewma is not None:
+                value = math.sqrt(self._ewma)
+        else:
+            raise ValueError(f"Unknown volatility model: {model}")
+
+        self._estimates[model] = value
+        return value
+
+
+class VolatilityCache:
+    """
+    Volatility estimates per (symbol, interval), updated as candles arrive.
+    """
+
+    def __init__(self, lookback: int = DEFAULT_LOOKBACK, ewma_lambda: float = DEFAULT_EWMA_LAMBDA):
+        """
+        Initialize the cache.
+
+        Args:
+            lookback: Returns per rolling window
+            ewma_lambda: Decay factor of the EWMA variance
+        """
+        self.lookback = lookback
+        self.ewma_lambda = ewma_lambda
+        self._estimators: Dict[Tuple[str, str], VolatilityEstimator] = {}
+        self._lock = threading.Lock()
+
+    def _estimator(self, symbol: str, interval: Optional[str]) -> VolatilityEstimator:
+        key = (normalize_symbol(symbol), interval or "")
+        estimator = self._estimators.get(key)
+        if estimator is None:
+            estimator = self._estimators[key] = VolatilityEstimator(self.lookback, self.ewma_lambda)
+        return estimator
+
+    def _ingest(self, estimator: VolatilityEstimator, candles: List[Dict[str, Any]]) -> None:
+        """Feed the candles the estimator has not seen, rebuilding it if they do not follow on."""
+        last_time = estimator.last_time
+        newest = candle_time(candles[-1])
+        if last_time is not None and newest is not None and newest >= last_time:
+            # Walk back to the last candle already seen
+            start = len(candles) - 1
+            while start > 0:
+                previous = candle_time(candles[start - 1])
+                if previous is None or previous < last_time:
+                    break
+                start -= 1
+            if candle_time(candles[start]) == last_time:
+                for candle in candles[start:]:
+                    estimator.add(candle)
+                return
+
+        estimator.reset()
+        for candle in candles[-(self.lookback + 1):]:
+            estimator.add(candle)
+
+    def update(self, symbol: str, interval: Optional[str], candles: List[Dict[str, Any]]) -> None:
+        """
+        Feed candles for a symbol and interval.
+
+        Args:
+            symbol: Trading symbol
+            interval: Candle interval (e.g. "1h")
+            candles: Candles in time order; may overlap candles fed before
+        """
+        if not candles:
+            return
+        with self._lock:
+            self._ingest(self._estimator(symbol, interval), candles)
+
+    def get(self, symbol: str, interval: Optional[str] = None, model: str = CLOSE_TO_CLOSE) -> Optional[float]:
+        """
+        Cached volatility of a symbol.
+
+        Args:
+            symbol: Trading symbol
+            interval: Candle interval
+            model: One of MODELS
+
+        Returns:
+            Per-candle volatility, or None if not enough candles were fed
+        """
+        with self._lock:
+            estimator = self._estimators.get((normalize_symbol(symbol), interval or ""))
+            return estimator.estimate(model) if estimator is not None else None
+
+    def volatility(
+        self,
+        symbol: str,
+        interval: Optional[str] = None,
+        candles: Optional[List[Dict[str, Any]]] = None,
+        model: str = CLOSE_TO_CLOSE
+    ) -> Optional[float]:
+        """
+        Feed candles (if given) and return the volatility in one step.
+
+        Args:
+            symbol: Trading symbol
+            interval: Candle interval
+            candles: Optional candles to feed first
+            model: One of MODELS
+
+        Returns:
+            Per-candle volatility, or None if not enough candles were fed
+        """
+        with self._lock:
+            estimator = self._estimator(symbol, interval)
+            if candles:
+                try:
+                    self._ingest(estimator, candles)
+                except (KeyError, TypeError, ValueError, ZeroDivisionError) as e:
+                    logger.warning(f"Invalid candles for {symbol} volatility: {e}")
+                    estimator.reset()
+                    return None
+            return estimator.estimate(model)
+
+    def clear(self) -> None:
+        """Drop every estimator."""
+        with self._lock:
+            self._estimators.clear()
+
+
+# Shared cache used by the position sizer, risk guard and trade executor
+volatility_cache = VolatilityCache()
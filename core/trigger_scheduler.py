@@ -13,6 +13,8 @@ import os
 from datetime import datetime, timedelta
 from typing import Dict, Any, Optional, Union, Tuple
 
+from utils.metrics import trigger_delay
+
 # Configure logging
 logger = logging.getLogger("aGENtrader.scheduler")
 
@@ -232,6 +234,7 @@ class DecisionTriggerScheduler:
         # Record the actual trigger time
         trigger_time = datetime.utcnow()
         delay = (trigger_time - self.next_trigger_time).total_seconds()
+        trigger_delay.labels(self.interval_str).observe(max(delay, 0.0))
         
         # Log the trigger
         logger.info(
@@ -6,5 +6,7 @@ data fetchers, and data processing utilities.
 """
 
 from data.database import DatabaseConnector
+from data.order_book import OrderBook
+from data.derivatives_service import DerivativesDataService, derivatives_data
 
-__all__ = ['DatabaseConnector']
\ No newline at end of file
+__all__ = ['DatabaseConnector', 'OrderBook', 'DerivativesDataService', 'derivatives_data']
\ No newline at end of file
@@ -13,6 +13,10 @@ import psycopg2
 from typing import Dict, Any, List, Optional, Tuple, Union
 from datetime import datetime, timedelta
 
+from data.order_book import OrderBook
+from data.volume_profile import VolumeProfile, VolumeProfileEngine, parse_duration
+from utils.tracing import traced, DB
+
 # Configure logging
 logging.basicConfig(
     level=logging.INFO,
@@ -46,6 +50,10 @@ class DatabaseConnector:
         self.conn = None
         self.initialized = False
         
+        # Incrementally maintained volume profiles and the last market_data id folded into each
+        self.volume_profiles = VolumeProfileEngine()
+        self._volume_profile_cursors: Dict[Tuple[str, str, str], int] = {}
+        
         # Connect to database
         try:
             self.connect()
@@ -110,11 +118,42 @@ class DatabaseConnector:
                     low REAL NOT NULL,
                     close REAL NOT NULL,
                     volume REAL NOT NULL,
+                    taker_buy_volume REAL,
                     data_source TEXT,
                     created_at TEXT NOT NULL
                 )
             ''')
             
+            # Tables created before volume profiles lack the taker buy volume
+            if self.db_type == 'sqlite':
+                columns = {row[1] for row in cursor.execute("PRAGMA table_info(market_data)").fetchall()}
+                if "taker_buy_volume" not in columns:
+                    cursor.execute("ALTER TABLE market_data ADD COLUMN taker_buy_volume REAL")
+            
+            cursor.execute('''
+                CREATE INDEX IF NOT EXISTS idx_market_data_symbol_time
+                ON market_data (symbol, interval, timestamp)
+            ''')
+            
+            # Create volume profile cache table
+            cursor.execute('''
+                CREATE TABLE IF NOT EXISTS volume_profile (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    symbol TEXT NOT NULL,
+                    interval TEXT NOT NULL,
+                    time_frame TEXT NOT NULL,
+                    price_level REAL NOT NULL,
+                    buy_volume REAL NOT NULL,
+                    sell_volume REAL NOT NULL,
+                    last_candle_id INTEGER NOT NULL,
+                    updated_at TEXT NOT NULL
+                )
+            ''')
+            cursor.execute('''
+                CREATE INDEX IF NOT EXISTS idx_volume_profile_key
+                ON volume_profile (symbol, interval, time_frame)
+            ''')
+            
             # Create trades table
             cursor.execute('''
                 CREATE TABLE IF NOT EXISTS trades (
@@ -150,11 +189,15 @@ class DatabaseConnector:
             
             # Commit changes
             self.conn.commit()
+            
+            # Order book snapshots
+            self._create_market_depth_table()
             logger.info("Database schema initialized")
             
         except Exception as e:
             logger.error(f"Error initializing schema: {str(e)}", exc_info=True)
             
+    @traced(kind=DB)
     def execute(self, query: str, params: Tuple = ()) -> Optional[Any]:
         """
         Execute a query and return the result.
@@ -229,6 +272,7 @@ class DatabaseConnector:
             columns = [desc[0] for desc in cursor.description]
             return [dict(zip(columns, row)) for row in rows]
             
+    @traced(kind=DB)
     def insert(self, table: str, data: Dict[str, Any]) -> Optional[int]:
         """
         Insert data into a table.
@@ -265,6 +309,7 @@ class DatabaseConnector:
             logger.error(f"Error inserting data: {str(e)}", exc_info=True)
             return None
             
+    @traced(kind=DB)
     def update(self, table: str, data: Dict[str, Any], condition: str, params: Tuple = ()) -> Optional[int]:
         """
         Update data in a table.
@@ -300,6 +345,7 @@ class DatabaseConnector:
             logger.error(f"Error updating data: {str(e)}", exc_info=True)
             return None
             
+    @traced(kind=DB)
     def delete(self, table: str, condition: str, params: Tuple = ()) -> Optional[int]:
         """
         Delete data from a table.
@@ -352,6 +398,7 @@ class DatabaseConnector:
         
         return self.fetch_all(query, (symbol, interval, limit))
         
+    @traced(kind=DB)
     def save_market_data(self, data: List[Dict[str, Any]]) -> bool:
         """
         Save market data to the database.
@@ -392,6 +439,7 @@ class DatabaseConnector:
                             'low': record['low'],
                             'close': record['close'],
                             'volume': record['volume'],
+                            'taker_buy_volume': record.get('taker_buy_base_asset_volume'),
                             'data_source': record.get('data_source', 'unknown')
                         },
                         condition='id = ?',
@@ -410,6 +458,7 @@ class DatabaseConnector:
                             'low': record['low'],
                             'close': record['close'],
                             'volume': record['volume'],
+                            'taker_buy_volume': record.get('taker_buy_base_asset_volume'),
                             'data_source': record.get('data_source', 'unknown'),
                             'created_at': datetime.now().isoformat()
                         }
@@ -474,22 +523,16 @@ class DatabaseConnector:
             limit: Maximum number of records to return
             
         Returns:
-            List of market depth records
+            List of market depth records (newest first) in the
+            fetch_market_depth format; get_order_books returns the snapshots
         """
         try:
             # First, check if we have data in the database
-            query = """
-                SELECT * FROM market_depth
-                WHERE symbol = ? AND interval = ?
-                ORDER BY timestamp DESC
-                LIMIT ?
-            """
-            
-            rows = self.fetch_all(query, (symbol, interval, limit))
+            books = self.get_order_books(symbol, interval, limit)
             
-            if rows and len(rows) > 0:
-                logger.info(f"Retrieved {len(rows)} market depth records from database for {symbol}")
-                return rows
+            if books:
+                logger.info(f"Retrieved {len(books)} market depth records from database for {symbol}")
+                return [book.to_dict() for book in books]
             else:
                 # No data in database, fetch from Binance API
                 logger.info(f"No market depth data in database for {symbol}, fetching from Binance...")
@@ -502,36 +545,11 @@ class DatabaseConnector:
                     depth_data = factory.fetch_market_depth(symbol, limit)
                     
                     if depth_data and "bids" in depth_data and depth_data["bids"]:
-                        # Convert to database format
-                        timestamp = depth_data.get("timestamp", int(time.time() * 1000))
+                        book = OrderBook.from_depth(depth_data, symbol=symbol)
                         
-                        # Prepare for database storage
-                        record = {
-                            "symbol": symbol,
-                            "interval": interval,
-                            "timestamp": timestamp,
-                            "bid_total": depth_data.get("bid_total", 0.0),
-                            "ask_total": depth_data.get("ask_total", 0.0),
-                            "spread": depth_data.get("spread", 0.0),
-                            "mid_price": depth_data.get("mid_price", 0.0),
-                            "top_5_bid_volume": depth_data.get("top_5_bid_volume", 0.0),
-                            "top_5_ask_volume": depth_data.get("top_5_ask_volume", 0.0),
-                            "bids_json": json.dumps(depth_data.get("bids", [])),
-                            "asks_json": json.dumps(depth_data.get("asks", [])),
-                            "created_at": time.time() * 1000
-                        }
-                        
-                        # Store in database (if we have a table)
+                        # Store in database
                         try:
-                            # Check if the table exists
-                            check_query = "SELECT name FROM sqlite_master WHERE type='table' AND name='market_depth'"
-                            if self.fetch_one(check_query):
-                                # Table exists, insert the record
-                                self.insert("market_depth", record)
-                            else:
-                                # Table doesn't exist, create it first
-                                self._create_market_depth_table()
-                                self.insert("market_depth", record)
+                            self.save_order_book(book, interval)
                         except Exception as db_e:
                             logger.warning(f"Could not store market depth data: {db_e}")
                         
@@ -550,6 +568,76 @@ class DatabaseConnector:
         except Exception as e:
             logger.error(f"Error getting market depth: {str(e)}", exc_info=True)
             return []
+    
+    @traced(kind=DB)
+    def save_order_book(self, book: OrderBook, interval: str) -> Optional[int]:
+        """
+        Store an order book snapshot in the market_depth table.
+        
+        The levels are stored as a single binary blob (see OrderBook.to_bytes)
+        next to the precomputed scalar metrics, so snapshots can be recorded
+        every few seconds per symbol.
+        
+        Args:
+            book: Order book snapshot (book.symbol must be set)
+            interval: Time interval the snapshot belongs to
+            
+        Returns:
+            ID of inserted row or None if error
+        """
+        summary = book.summary()
+        return self.insert("market_depth", {
+            "symbol": book.symbol,
+            "interval": interval,
+            "timestamp": book.timestamp,
+            "bid_total": summary["bid_total"],
+            "ask_total": summary["ask_total"],
+            "spread": summary["spread"],
+            "mid_price": summary["mid_price"],
+            "top_5_bid_volume": summary["top_5_bid_volume"],
+            "top_5_ask_volume": summary["top_5_ask_volume"],
+            "book_blob": book.to_bytes(),
+            "created_at": int(time.time() * 1000)
+        })
+    
+    def get_order_books(self, symbol: str, interval: str, limit: int = 100) -> List[OrderBook]:
+        """
+        Get stored order book snapshots for a symbol.
+        
+        Args:
+            symbol: Trading symbol
+            interval: Time interval
+            limit: Maximum number of snapshots to return
+            
+        Returns:
+            List of OrderBook snapshots, newest first
+        """
+        rows = self.fetch_all(
+            """
+                SELECT * FROM market_depth
+                WHERE symbol = ? AND interval = ?
+                ORDER BY timestamp DESC
+                LIMIT ?
+            """,
+            (symbol, interval, limit)
+        )
+        
+        books = []
+        for row in rows:
+            try:
+                if row.get("book_blob") is not None:
+                    books.append(OrderBook.from_bytes(row["book_blob"], symbol=symbol))
+                elif row.get("bids_json") is not None:
+                    # Rows written before the binary format
+                    books.append(OrderBook(
+                        json.loads(row["bids_json"]),
+                        json.loads(row.get("asks_json") or "[]"),
+                        timestamp=row.get("timestamp"),
+                        symbol=symbol
+                    ))
+            except (ValueError, TypeError) as e:
+                logger.warning(f"Skipping unreadable market depth row {row.get('id')}: {e}")
+        return books
             
     def _create_market_depth_table(self):
         """Create the market_depth table if it doesn't exist."""
@@ -571,13 +659,23 @@ class DatabaseConnector:
                     mid_price REAL,
                     top_5_bid_volume REAL,
                     top_5_ask_volume REAL,
-                    bids_json TEXT,
-                    asks_json TEXT,
+                    book_blob BLOB,
                     created_at INTEGER NOT NULL
                 )
             ''')
+            
+            # Tables created before the binary format only have bids_json/asks_json
+            if self.db_type == 'sqlite':
+                columns = {row[1] for row in cursor.execute("PRAGMA table_info(market_depth)").fetchall()}
+                if "book_blob" not in columns:
+                    cursor.execute("ALTER TABLE market_depth ADD COLUMN book_blob BLOB")
+                    logger.info("Added book_blob column to market_depth table")
+            
+            cursor.execute('''
+                CREATE INDEX IF NOT EXISTS idx_market_depth_symbol_time
+                ON market_depth (symbol, interval, timestamp)
+            ''')
             self.conn.commit()
-            logger.info("Created market_depth table")
         except Exception as e:
             logger.error(f"Error creating market_depth table: {str(e)}", exc_info=True)
     
@@ -585,24 +683,134 @@ class DatabaseConnector:
         """
         Get volume profile data for a symbol.
         
+        The profile is built from stored klines and updated incrementally:
+        only market_data rows added since the last call are binned, and
+        candles older than the time frame are subtracted. The result is
+        written to the volume_profile table, which also serves the first
+        call of a new process when no candles arrived in between.
+        
         Args:
             symbol: Trading symbol
             interval: Time interval
             time_frame: Time frame to analyze (e.g., "24h", "7d")
-            limit: Maximum number of records to return
+            limit: Maximum number of price levels (highest volume first)
             
         Returns:
-            List of volume profile records
+            List of volume profile records (price_level, volume, is_buying),
+            one buying and one selling record per price level
         """
         try:
-            # In a real implementation, this would calculate volume by price levels
-            # For now, we'll just return an empty list
-            logger.warning(f"get_volume_profile not fully implemented yet for {symbol}")
-            return []
+            key = (symbol, interval, time_frame)
+            last_row = self.fetch_one(
+                "SELECT MAX(id) AS last_id FROM market_data WHERE symbol = ? AND interval = ?",
+                (symbol, interval)
+            )
+            last_id = last_row.get("last_id") if last_row else None
+            if last_id is None:
+                logger.warning(f"No market data to build a volume profile for {symbol} {interval}")
+                return []
+            
+            profile = self.volume_profiles.get(*key)
+            if profile is None:
+                cached = self._get_cached_volume_profile(symbol, interval, time_frame, last_id, limit)
+                if cached:
+                    return cached
+                
+                # Build from the candles inside the time frame
+                window = parse_duration(time_frame) // parse_duration(interval) + 1
+                rows = self.fetch_all(
+                    """
+                        SELECT * FROM market_data
+                        WHERE symbol = ? AND interval = ?
+                        ORDER BY timestamp DESC
+                        LIMIT ?
+                    """,
+                    (symbol, interval, window)
+                )
+            elif last_id > self._volume_profile_cursors.get(key, 0):
+                # New rows, plus the last folded row in case it was updated in place
+                rows = self.fetch_all(
+                    "SELECT * FROM market_data WHERE symbol = ? AND interval = ? AND id >= ? ORDER BY id",
+                    (symbol, interval, self._volume_profile_cursors[key])
+                )
+            else:
+                return self.volume_profiles.to_records(profile, limit)
+            
+            candles = [
+                {
+                    "timestamp": row["timestamp"],
+                    "open": row["open"],
+                    "high": row["high"],
+                    "low": row["low"],
+                    "close": row["close"],
+                    "volume": row["volume"],
+                    "taker_buy_base_asset_volume": row.get("taker_buy_volume")
+                }
+                for row in rows
+            ]
+            profile = self.volume_profiles.update(symbol, interval, time_frame, candles)
+            self._volume_profile_cursors[key] = last_id
+            self._save_volume_profile(symbol, interval, time_frame, profile, last_id)
+            
+            logger.info(
+                f"Volume profile for {symbol} {interval} ({time_frame}) updated with {len(rows)} candles, "
+                f"{profile.candle_count} in window"
+            )
+            return self.volume_profiles.to_records(profile, limit)
         except Exception as e:
             logger.error(f"Error getting volume profile: {str(e)}", exc_info=True)
             return []
     
+    def _get_cached_volume_profile(self, symbol: str, interval: str, time_frame: str,
+                                   last_id: int, limit: int) -> List[Dict[str, Any]]:
+        """Read a volume profile from the cache table if it is up to date with market_data."""
+        rows = self.fetch_all(
+            """
+                SELECT price_level, buy_volume, sell_volume, last_candle_id FROM volume_profile
+                WHERE symbol = ? AND interval = ? AND time_frame = ?
+                ORDER BY buy_volume + sell_volume DESC
+                LIMIT ?
+            """,
+            (symbol, interval, time_frame, limit)
+        )
+        if not rows or rows[0]["last_candle_id"] != last_id:
+            return []
+        
+        records = []
+        for row in sorted(rows, key=lambda r: r["price_level"]):
+            records.append({"price_level": row["price_level"], "volume": row["buy_volume"], "is_buying": True})
+            records.append({"price_level": row["price_level"], "volume": row["sell_volume"], "is_buying": False})
+        return records
+    
+    def _save_volume_profile(self, symbol: str, interval: str, time_frame: str,
+                             profile: VolumeProfile, last_id: int) -> None:
+        """Replace the cached volume profile for a (symbol, interval, time_frame)."""
+        if not self.conn:
+            return
+            
+        try:
+            levels = profile.levels()
+            updated_at = datetime.now().isoformat()
+            cursor = self.conn.cursor()
+            cursor.execute(
+                "DELETE FROM volume_profile WHERE symbol = ? AND interval = ? AND time_frame = ?",
+                (symbol, interval, time_frame)
+            )
+            cursor.executemany(
+                """
+                    INSERT INTO volume_profile
+                    (symbol, interval, time_frame, price_level, buy_volume, sell_volume, last_candle_id, updated_at)
+                    VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+                """,
+                [
+                    (symbol, interval, time_frame, float(price), float(buy), float(sell), last_id, updated_at)
+                    for price, buy, sell in zip(levels["price_level"], levels["buy_volume"], levels["sell_volume"])
+                ]
+            )
+            self.conn.commit()
+        except Exception as e:
+            logger.warning(f"Could not cache volume profile: {e}")
+    
     def get_funding_rates(self, symbol: str, limit: int = 100) -> List[Dict[str, Any]]:
         """
         Get funding rates for a symbol.
@@ -0,0 +1,489 @@
+"""
+aGENtrader v2 Derivatives Data Service
+
+This module serves funding rate and open interest data for Binance USD-M
+perpetuals from a shared cache, so scanning many symbols does not cost one
+or two requests per symbol:
+
+- Premium index (mark price, predicted funding, next funding time) for all
+  symbols comes from a single /fapi/v1/premiumIndex call.
+- Settled funding rates for all symbols are fetched in bulk from
+  /fapi/v1/fundingRate (no symbol filter), only once per funding epoch and
+  only for rates newer than the ones already cached.
+- Open interest history is cached per (symbol, period) and extended with
+  the records published since the last fetch, at most once per period.
+  Records from the provider's fallback (e.g. the current value repeated
+  when the history endpoint is unavailable) are served but marked
+  degraded, and replaced by a full history fetch at the next period.
+
+Refreshes follow the funding schedule (every 8 hours at 00:00, 08:00 and
+16:00 UTC, or the next funding time the exchange reports); an optional
+background scheduler refreshes the cache right after each epoch.
+"""
+
+import os
+import time
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Any, List, Optional, Iterable
+
+from utils.tracing import propagate
+from utils.metrics import queue_depth, track_cache
+
+# Setup logger
+logger = logging.getLogger("aGENtrader.derivatives_service")
+
+FUNDING_EPOCH_MS = 8 * 3_600_000
+
+# Settled rates are published shortly after the funding time
+FUNDING_SETTLE_MS = 60_000
+
+FUNDING_PAGE_LIMIT = 1000
+OI_PAGE_LIMIT = 500
+
+# Periods supported by /futures/data/openInterestHist
+OI_PERIODS_MS = {
+    "5m": 300_000,
+    "15m": 900_000,
+    "30m": 1_800_000,
+    "1h": 3_600_000,
+    "2h": 7_200_000,
+    "4h": 14_400_000,
+    "6h": 21_600_000,
+    "12h": 43_200_000,
+    "1d": 86_400_000
+}
+DEFAULT_OI_PERIOD = "4h"
+
+
+def _now_ms() -> int:
+    """Current time in milliseconds."""
+    return int(time.time() * 1000)
+
+
+def next_funding_epoch(timestamp: int) -> int:
+    """Start of the funding epoch following `timestamp` (ms)."""
+    return (timestamp // FUNDING_EPOCH_MS + 1) * FUNDING_EPOCH_MS
+
+
+class DerivativesDataService:
+    """
+    Shared, incrementally refreshed cache of perpetual futures data.
+    """
+
+    def __init__(self,
+                 provider: Optional[Any] = None,
+                 funding_lookback: int = 30,
+                 oi_lookback: int = 200,
+                 premium_ttl: float = 300.0,
+                 max_workers: int = 8):
+        """
+        Initialize the service.
+
+        Args:
+            provider: Binance provider with futures API access (default: a
+                root BinanceDataProvider created on first request)
+            funding_lookback: Funding epochs kept per symbol
+            oi_lookback: Open interest records kept per (symbol, period)
+            premium_ttl: Seconds before the premium index snapshot is refetched
+            max_workers: Concurrent open interest requests in prefetch_open_interest
+        """
+        self._provider = provider
+        self.funding_lookback = funding_lookback
+        self.oi_lookback = oi_lookback
+        self.premium_ttl = premium_ttl
+        self.max_workers = max_workers
+
+        self._lock = threading.RLock()
+
+        self._premium: Dict[str, Dict[str, Any]] = {}
+        self._premium_fetched_at = 0.0
+        self._next_funding_time = 0
+
+        # symbol -> {fundingTime: record}
+        self._funding: Dict[str, Dict[int, Dict[str, Any]]] = {}
+        self._funding_cursor: Optional[int] = None
+        self._funding_due = 0
+
+        # (symbol, period) -> {"records": {timestamp: record}, "period_index": int, "limit": int,
+        #                      "degraded": bool}
+        self._open_interest: Dict[tuple, Dict[str, Any]] = {}
+
+        self._scheduler: Optional[threading.Thread] = None
+        self._stop_event = threading.Event()
+        self.stats = {"requests": 0, "errors": 0, "funding_refreshes": 0, "oi_fetches": 0, "oi_hits": 0}
+
+    @property
+    def provider(self) -> Any:
+        """Binance provider, created on first use."""
+        if self._provider is None:
+            from binance_data_provider import BinanceDataProvider
+            self._provider = BinanceDataProvider(
+                api_key=os.environ.get('BINANCE_API_KEY'),
+                api_secret=os.environ.get('BINANCE_API_SECRET')
+            )
+        return self._provider
+
+    def _count(self, name: str) -> None:
+        """Increment a stats counter (requests also run on the scheduler and prefetch threads)."""
+        with self._lock:
+            self.stats[name] += 1
+
+    def _request(self, endpoint: str, params: Optional[Dict[str, Any]] = None) -> Any:
+        """Make a futures API request."""
+        self._count("requests")
+        try:
+            return self.provider._make_request(endpoint, params=params or {}, use_futures_api=True)
+        except Exception:
+            self._count("errors")
+            raise
+
+    # Premium index
+
+    def refresh_premium_index(self, force: bool = False) -> Dict[str, Dict[str, Any]]:
+        """
+        Fetch mark price and predicted funding for all symbols in one request.
+
+        Skipped while the snapshot is younger than premium_ttl and no funding
+        time has passed since it was taken.
+
+        Args:
+            force: Refetch regardless of age
+
+        Returns:
+            Premium index records keyed by symbol
+        """
+        now = _now_ms()
+        with self._lock:
+            fresh = (time.time() - self._premium_fetched_at < self.premium_ttl
+                     and now < self._next_funding_time)
+            if fresh and not force:
+                return dict(self._premium)
+
+        try:
+            data = self._request("/fapi/v1/premiumIndex")
+        except Exception as e:
+            logger.warning(f"Error fetching premium index, serving cached snapshot: {str(e)}")
+            with self._lock:
+                return dict(self._premium)
+
+        if isinstance(data, dict):
+            data = [data]
+        premium = {}
+        for item in data or []:
+            symbol = item.get("symbol")
+            if not symbol:
+                continue
+            premium[symbol] = {
+                "symbol": symbol,
+                "mark_price": float(item.get("markPrice") or 0),
+                "index_price": float(item.get("indexPrice") or 0),
+                "funding_rate": float(item.get("lastFundingRate") or 0),
+                "interest_rate": float(item.get("interestRate") or 0),
+                "next_funding_time": int(item.get("nextFundingTime") or 0),
+                "timestamp": int(item.get("time") or now)
+            }
+
+        upcoming = [p["next_funding_time"] for p in premium.values() if p["next_funding_time"] > now]
+        with self._lock:
+            self._premium = premium
+            self._premium_fetched_at = time.time()
+            self._next_funding_time = min(upcoming) if upcoming else next_funding_epoch(now)
+        logger.info(f"Fetched premium index for {len(premium)} symbols")
+        return dict(premium)
+
+    def get_premium_index(self, symbol: str) -> Optional[Dict[str, Any]]:
+        """
+        Get the premium index record of a symbol.
+
+        Args:
+            symbol: Trading symbol (e.g., "BTCUSDT")
+
+        Returns:
+            Premium index record or None if the symbol is not listed
+        """
+        return self.refresh_premium_index().get(symbol.replace("/", ""))
+
+    @property
+    def next_funding_time(self) -> int:
+        """Next funding time in milliseconds (epoch schedule until the premium index is known)."""
+        with self._lock:
+            return self._next_funding_time or next_funding_epoch(_now_ms())
+
+    # Funding rates
+
+    def refresh_funding_history(self, force: bool = False) -> int:
+        """
+        Fetch settled funding rates for all symbols since the last refresh.
+
+        Runs at most once per funding epoch unless forced; the first refresh
+        backfills funding_lookback epochs.
+
+        Args:
+            force: Refresh even if no funding time has passed
+
+        Returns:
+            Number of new funding records
+        """
+        now = _now_ms()
+        with self._lock:
+            if not force and now < self._funding_due:
+                return 0
+            start = self._funding_cursor
+        if start is None:
+            start = now - self.funding_lookback * FUNDING_EPOCH_MS
+
+        added = 0
+        latest = start
+        try:
+            while True:
+                page = self._request("/fapi/v1/fundingRate", {"startTime": start, "limit": FUNDING_PAGE_LIMIT})
+                if not isinstance(page, list):
+                    raise ValueError(f"Unexpected funding rate response: {page}")
+                added += self._merge_funding(page)
+                if page:
+                    latest = max(latest, max(int(item.get("fundingTime", 0)) for item in page))
+                if len(page) < FUNDING_PAGE_LIMIT:
+                    break
+                # Records sharing the last page's funding time may continue on
+                # the next page, so restart at that time (duplicates are merged)
+                start = latest if latest > start else start + 1
+        except Exception as e:
+            logger.warning(f"Error fetching funding rates, serving cached history: {str(e)}")
+            return added
+
+        with self._lock:
+            self._funding_cursor = latest
+            next_time = self._next_funding_time if self._next_funding_time > now else next_funding_epoch(now)
+            self._funding_due = next_time + FUNDING_SETTLE_MS
+            self.stats["funding_refreshes"] += 1
+        logger.info(f"Fetched {added} new funding rate records across {len(self._funding)} symbols")
+        return added
+
+    def _merge_funding(self, records: List[Dict[str, Any]]) -> int:
+        """Add funding records to the per-symbol history, keeping funding_lookback epochs."""
+        added = 0
+        with self._lock:
+            touched = set()
+            for item in records:
+                symbol = item.get("symbol")
+                if not symbol or "fundingRate" not in item:
+                    continue
+                history = self._funding.setdefault(symbol, {})
+                funding_time = int(item.get("fundingTime", 0))
+                if funding_time not in history:
+                    added += 1
+                history[funding_time] = {
+                    "symbol": symbol,
+                    "fundingTime": funding_time,
+                    "fundingRate": item["fundingRate"]
+                }
+                touched.add(symbol)
+
+            for symbol in touched:
+                history = self._funding[symbol]
+                if len(history) > self.funding_lookback:
+                    for funding_time in sorted(history)[:-self.funding_lookback]:
+                        del history[funding_time]
+        return added
+
+    def get_funding_rates(self, symbol: str, limit: Optional[int] = None) -> List[Dict[str, Any]]:
+        """
+        Get settled funding rates of a symbol from the cache.
+
+        Args:
+            symbol: Trading symbol (e.g., "BTCUSDT")
+            limit: Maximum number of records
+
+        Returns:
+            Funding rate records (symbol, fundingTime, fundingRate), newest first
+        """
+        self.refresh_funding_history()
+        with self._lock:
+            history = self._funding.get(symbol.replace("/", ""), {})
+            records = [history[t] for t in sorted(history, reverse=True)]
+        return records[:limit] if limit is not None else records
+
+    # Open interest
+
+    def _oi_due(self, symbol: str, period: str, now: int, limit: int) -> bool:
+        """Whether a period has closed since the last fetch or more history is needed."""
+        with self._lock:
+            entry = self._open_interest.get((symbol, period))
+        return entry is None or now // OI_PERIODS_MS[period] > entry["period_index"] or limit > entry["limit"]
+
+    def _fetch_open_interest(self, symbol: str, period: str, limit: int) -> None:
+        """Fetch open interest records published since the cached ones (all of them if degraded)."""
+        now = _now_ms()
+        with self._lock:
+            entry = self._open_interest.get((symbol, period))
+            incremental = (entry is not None and entry["records"] and not entry["degraded"]
+                           and limit <= entry["limit"])
+            last = max(entry["records"]) if incremental else None
+
+        params = {"symbol": symbol, "period": period, "limit": min(max(limit, 1), OI_PAGE_LIMIT)}
+        if last is not None:
+            params["startTime"] = last
+        degraded = False
+        try:
+            data = self._request("/futures/data/openInterestHist", params)
+            if not isinstance(data, list):
+                raise ValueError(f"Unexpected open interest response: {data}")
+        except Exception as e:
+            if entry is not None and not entry["degraded"]:
+                logger.warning(f"Error fetching open interest for {symbol}, serving cached history: {str(e)}")
+                return
+            # Testnet and restricted regions lack the history endpoint; serve the
+            # provider's fallback for now, but not as history to extend later
+            logger.warning(f"Open interest history unavailable for {symbol} ({str(e)}), "
+                           f"serving degraded provider fallback until the next period")
+            data = self.provider.fetch_futures_open_interest(symbol=symbol, interval=period, limit=limit)
+            degraded = True
+
+        with self._lock:
+            entry = self._open_interest.setdefault((symbol, period), {"records": {}, "period_index": 0, "limit": 0,
+                                                                     "degraded": False})
+            if degraded or entry["degraded"]:
+                # Fallback records are never merged with other records
+                entry["records"] = {}
+                entry["limit"] = 0
+            entry["degraded"] = degraded
+            records = entry["records"]
+            for item in data:
+                timestamp = int(item.get("timestamp", 0))
+                records[timestamp] = {
+                    "symbol": item.get("symbol", symbol),
+                    "sumOpenInterest": float(item.get("sumOpenInterest", 0)),
+                    "sumOpenInterestValue": float(item.get("sumOpenInterestValue", 0)),
+                    "timestamp": timestamp
+                }
+                if degraded:
+                    records[timestamp]["degraded"] = True
+            if len(records) > self.oi_lookback:
+                for timestamp in sorted(records)[:-self.oi_lookback]:
+                    del records[timestamp]
+            entry["period_index"] = now // OI_PERIODS_MS[period]
+            entry["limit"] = max(entry["limit"], limit)
+            self.stats["oi_fetches"] += 1
+
+    def get_open_interest(self, symbol: str, interval: str = DEFAULT_OI_PERIOD,
+                          limit: int = 30) -> List[Dict[str, Any]]:
+        """
+        Get open interest history of a symbol, fetching only what is new.
+
+        Args:
+            symbol: Trading symbol (e.g., "BTCUSDT")
+            interval: Period (unsupported values fall back to 4h)
+            limit: Maximum number of records
+
+        Returns:
+            Open interest records (symbol, sumOpenInterest,
+            sumOpenInterestValue, timestamp), newest first; records from
+            the provider fallback also carry "degraded": True
+        """
+        symbol = symbol.replace("/", "")
+        period = interval if interval in OI_PERIODS_MS else DEFAULT_OI_PERIOD
+        limit = min(limit, self.oi_lookback)
+
+        if self._oi_due(symbol, period, _now_ms(), limit):
+            self._fetch_open_interest(symbol, period, limit)
+        else:
+            self._count("oi_hits")
+        return self._cached_open_interest(symbol, period)[:limit]
+
+    def _cached_open_interest(self, symbol: str, period: str) -> List[Dict[str, Any]]:
+        """Cached open interest records, newest first."""
+        with self._lock:
+            entry = self._open_interest.get((symbol, period))
+            if entry is None:
+                return []
+            records = entry["records"]
+            return [records[t] for t in sorted(records, reverse=True)]
+
+    def prefetch_open_interest(self, symbols: Iterable[str], interval: str = DEFAULT_OI_PERIOD,
+                               limit: int = 30) -> int:
+        """
+        Bring open interest up to date for many symbols concurrently.
+
+        Only symbols whose period has closed since their last fetch (or with
+        less cached history than limit) are requested.
+
+        Args:
+            symbols: Trading symbols
+            interval: Period
+            limit: Records needed per symbol
+
+        Returns:
+            Number of symbols fetched
+        """
+        period = interval if interval in OI_PERIODS_MS else DEFAULT_OI_PERIOD
+        now = _now_ms()
+        limit = min(limit, self.oi_lookback)
+        due = [s.replace("/", "") for s in symbols if self._oi_due(s.replace("/", ""), period, now, limit)]
+        if not due:
+            return 0
+
+        # Each task runs in a copy of the caller's context so its requests join the current trace
+        pending = queue_depth.labels("oi_prefetch")
+        pending.inc(len(due))
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            futures = [executor.submit(propagate(self._fetch_open_interest), symbol, period, limit) for symbol in due]
+            for future in futures:
+                future.add_done_callback(lambda _: pending.dec())
+            for future in futures:
+                future.result()
+        logger.info(f"Prefetched {period} open interest for {len(due)} symbols")
+        return len(due)
+
+    # Scheduling
+
+    def refresh(self, symbols: Optional[Iterable[str]] = None, interval: Optional[str] = None) -> None:
+        """
+        Refresh premium index and funding history, and optionally open interest.
+
+        Args:
+            symbols: Symbols whose open interest should be prefetched
+            interval: Open interest period
+        """
+        self.refresh_premium_index(force=True)
+        self.refresh_funding_history(force=True)
+        if symbols:
+            self.prefetch_open_interest(symbols, interval or DEFAULT_OI_PERIOD)
+
+    def start_scheduler(self, symbols: Optional[Iterable[str]] = None, interval: Optional[str] = None) -> None:
+        """
+        Refresh the cache after every funding time in a daemon thread.
+
+        Args:
+            symbols: Symbols whose open interest is refreshed with each epoch
+            interval: Open interest period
+        """
+        if self._scheduler is not None and self._scheduler.is_alive():
+            return
+
+        symbols = list(symbols) if symbols else None
+        self._stop_event.clear()
+
+        def run():
+            while True:
+                self.refresh(symbols, interval)
+                delay = max(self.next_funding_time + FUNDING_SETTLE_MS - _now_ms(), FUNDING_SETTLE_MS) / 1000
+                if self._stop_event.wait(delay):
+                    break
+
+        self._scheduler = threading.Thread(target=run, name="derivatives-scheduler", daemon=True)
+        self._scheduler.start()
+        logger.info("Scheduled derivatives data refreshes at funding epochs")
+
+    def stop_scheduler(self) -> None:
+        """Stop the scheduler thread."""
+        self._stop_event.set()
+        if self._scheduler is not None:
+            self._scheduler.join(timeout=5)
+            self._scheduler = None
+
+
+# Process-wide derivatives data cache shared by the analyst agents
+derivatives_data = DerivativesDataService()
+track_cache("open_interest", lambda: derivatives_data.stats, hits="oi_hits", misses="oi_fetches")
@@ -0,0 +1,339 @@
+"""
+aGENtrader v2 Candle Resampler
+
+This module derives every agent's timeframe from one stream of base
+interval candles. CandleResampler wraps a data provider and keeps only the
+base interval klines per symbol (e.g. 1h); a request for 4h, 8h, 12h or 1d
+candles is answered by aggregating them:
+- open of the first, high/low extremes, close of the last base candle in
+  each bucket, with volumes and trade counts summed
+- buckets are aligned like the exchange's: on the epoch, and on Mondays for
+  weekly intervals
+
+Base candles are refreshed once the last stored candle has closed (or the
+stored data is older than `max_age_seconds`), fetching only the candles
+since then. Derived candles are cached per (symbol, interval); after a
+refresh only the buckets from the last cached one onward are recomputed.
+
+Requests the base stream cannot answer (explicit start/end times, intervals
+that are not a multiple of the base interval, months) go to the provider.
+"""
+
+import time
+import logging
+import threading
+from typing import Dict, Any, List, Optional, Tuple, Callable
+
+import numpy as np
+
+from data.klines import KLINE_DTYPE, from_records, to_records
+from data.volume_profile import parse_duration
+
+# Setup logger
+logger = logging.getLogger("aGENtrader.resampler")
+
+# Most klines a provider returns per request (Binance /api/v3/klines)
+MAX_PAGE_SIZE = 1000
+
+# Weekly candles open on Monday; the epoch was a Thursday
+WEEK_MS = 7 * 86_400_000
+WEEK_ORIGIN_MS = 4 * 86_400_000
+
+# Columns summed over a bucket
+SUM_FIELDS = ("volume", "quote_asset_volume", "number_of_trades",
+              "taker_buy_base_asset_volume", "taker_buy_quote_asset_volume")
+
+
+def bucket_origin(interval_ms: int) -> int:
+    """Open time (ms) of a reference bucket of an interval."""
+    return WEEK_ORIGIN_MS if interval_ms % WEEK_MS == 0 else 0
+
+
+def _symbol_key(symbol: str) -> str:
+    """Symbol without "/" in upper case (one stored series per market)."""
+    return symbol.replace("/", "").upper()
+
+
+def resample_klines(klines: np.ndarray, interval_ms: int) -> np.ndarray:
+    """
+    Aggregate klines into a longer interval.
+
+    Args:
+        klines: Array of KLINE_DTYPE in time order
+        interval_ms: Target interval in milliseconds
+
+    Returns:
+        Array of KLINE_DTYPE with one kline per bucket that has candles
+    """
+    if not len(klines):
+        return np.empty(0, dtype=KLINE_DTYPE)
+
+    origin = bucket_origin(interval_ms)
+    buckets = (klines["timestamp"] - origin) // interval_ms
+    starts = np.flatnonzero(np.r_[True, buckets[1:] != buckets[:-1]])
+    ends = np.r_[starts[1:], len(klines)] - 1
+
+    resampled = np.empty(len(starts), dtype=KLINE_DTYPE)
+    resampled["timestamp"] = buckets[starts] * interval_ms + origin
+    resampled["close_time"] = resampled["timestamp"] + (interval_ms - 1)
+    resampled["open"] = klines["open"][starts]
+    resampled["close"] = klines["close"][ends]
+    resampled["high"] = np.maximum.reduceat(klines["high"], starts)
+    resampled["low"] = np.minimum.reduceat(klines["low"], starts)
+    for name in SUM_FIELDS:
+        resampled[name] = np.add.reduceat(klines[name], starts)
+    return resampled
+
+
+class _BaseSeries:
+    """Stored base interval klines of one symbol."""
+
+    __slots__ = ("klines", "capacity", "exhausted", "generation", "version", "fetched_at")
+
+    def __init__(self, capacity: int):
+        self.klines = np.empty(0, dtype=KLINE_DTYPE)
+        self.capacity = capacity
+        self.exhausted = False  # the provider has no older candles
+        self.generation = 0  # bumped when the series is replaced
+        self.version = 0     # bumped on every change
+        self.fetched_at = 0.0
+
+
+class CandleResampler:
+    """
+    Data provider wrapper serving every timeframe from base interval candles.
+
+    Methods other than fetch_ohlcv and fetch_klines are passed through to
+    the wrapped provider, so the resampler can be handed to agents as their
+    data fetcher.
+    """
+
+    def __init__(
+        self,
+        provider: Any,
+        base_interval: str = "1h",
+        max_base_candles: int = 2000,
+        max_age_seconds: float = 60.0,
+        clock: Callable[[], float] = time.time
+    ):
+        """
+        Initialize the resampler.
+
+        Args:
+            provider: Data provider with fetch_ohlcv (and optionally fetch_klines)
+            base_interval: Interval stored and fetched from the provider
+            max_base_candles: Base candles kept per symbol (grown when a
+                request needs more)
+            max_age_seconds: Age after which the still-forming base candle
+                is refreshed
+            clock: Time source in epoch seconds
+        """
+        self.provider = provider
+        self.base_interval = base_interval
+        self.base_ms = parse_duration(base_interval)
+        self.max_base_candles = max_base_candles
+        self.max_age_seconds = max_age_seconds
+        self.clock = clock
+        self._series: Dict[str, _BaseSeries] = {}
+        self._derived: Dict[Tuple[str, str], Tuple[int, int, np.ndarray]] = {}
+        self._lock = threading.Lock()
+        logger.info(f"Candle resampler serving all timeframes from {base_interval} candles")
+
+    def __getattr__(self, name: str) -> Any:
+        # Only called for attributes not found on the resampler
+        provider = self.__dict__.get("provider")
+        if provider is None:
+            raise AttributeError(name)
+        return getattr(provider, name)
+
+    def _ratio(self, interval: str) -> Optional[int]:
+        """Base candles per candle of an interval (None if it cannot be derived)."""
+        try:
+            interval_ms = parse_duration(interval)
+        except ValueError:
+            return None
+        if interval_ms < self.base_ms or interval_ms % self.base_ms:
+            return None
+        return interval_ms // self.base_ms
+
+    def _request(self, symbol: str, interval: str, limit: int,
+                 start_time: Optional[int] = None, end_time: Optional[int] = None) -> np.ndarray:
+        """Fetch klines from the provider as an array."""
+        kwargs = {}
+        if start_time is not None:
+            kwargs["start_time"] = start_time
+        if end_time is not None:
+            kwargs["end_time"] = end_time
+        fetch_klines = getattr(self.provider, "fetch_klines", None)
+        if fetch_klines is not None:
+            return fetch_klines(symbol, interval, limit, **kwargs)
+        return from_records(self.provider.fetch_ohlcv(symbol, interval, limit, **kwargs))
+
+    def _fetch_history(self, symbol: str, count: int, end_time: Optional[int] = None) -> np.ndarray:
+        """Fetch the latest `count` base candles up to `end_time` (default: now), paging back."""
+        pages = []
+        remaining = count
+        while remaining > 0:
+            page_size = min(remaining, MAX_PAGE_SIZE)
+            page = self._request(symbol, self.base_interval, page_size, end_time=end_time)
+            if len(page):
+                pages.append(page)
+                remaining -= len(page)
+            if len(page) < page_size:
+                break  # No older history
+            end_time = int(page["timestamp"][0]) - 1
+        if not pages:
+            return np.empty(0, dtype=KLINE_DTYPE)
+        return np.concatenate(pages[::-1])
+
+    def _refresh(self, symbol: str, key: str, needed: int) -> _BaseSeries:
+        """Bring a symbol's base candles up to date and long enough for a request."""
+        series = self._series.get(key)
+        if series is None:
+            series = self._series[key] = _BaseSeries(self.max_base_candles)
+        series.capacity = max(series.capacity, needed)
+
+        now = self.clock()
+        now_ms = int(now * 1000)
+        klines = series.klines
+        stale = now - series.fetched_at >= self.max_age_seconds
+
+        if not len(klines):
+            if series.fetched_at and not stale:
+                return series  # Nothing to serve for this symbol, checked recently
+            series.klines = self._load(symbol, series, needed)
+            series.fetched_at = now
+            return series
+
+        if len(klines) < needed and not series.exhausted:
+            # Extend the stored candles backwards
+            older = self._fetch_history(symbol, needed - len(klines), end_time=int(klines["timestamp"][0]) - 1)
+            series.exhausted = len(older) < needed - len(klines)
+            series.klines = klines = np.concatenate((older, klines))
+            series.generation += 1
+
+        last_open = int(klines["timestamp"][-1])
+        if not stale and now_ms < last_open + self.base_ms:
+            return series  # The last candle is still forming and was fetched recently
+
+        missing = (now_ms - last_open) // self.base_ms + 1
+        update = None
+        if missing <= MAX_PAGE_SIZE:
+            update = self._request(symbol, self.base_interval, missing, start_time=last_open)
+        if update is None or (len(update) and update["timestamp"][0] < klines["timestamp"][0]):
+            # Too far behind, or the provider's history moved: start over
+            series.klines = self._load(symbol, series, max(needed, len(klines)))
+        elif len(update):
+            # Replace the candles the update covers (the formerly forming one) and append
+            keep = int(np.searchsorted(klines["timestamp"], update["timestamp"][0], side="left"))
+            series.klines = np.concatenate((klines[:keep], update))[-series.capacity:]
+            series.version += 1
+        series.fetched_at = now
+        return series
+
+    def _load(self, symbol: str, series: _BaseSeries, count: int) -> np.ndarray:
+        """Replace a symbol's base candles with the latest `count` from the provider."""
+        klines = self._fetch_history(symbol, count)
+        series.exhausted = len(klines) < count
+        series.generation += 1
+        return klines
+
+    def _derive(self, key: str, interval: str, ratio: int, series: _BaseSeries) -> np.ndarray:
+        """Candles of an interval from a symbol's base candles, updating the cached ones."""
+        base = series.klines
+        if ratio == 1:
+            return base
+
+        cache_key = (key, interval)
+        cached = self._derived.get(cache_key)
+        if cached is not None and cached[0] == series.generation:
+            if cached[1] == series.version:
+                return cached[2]
+            previous = cached[2]
+            start = 0
+            if len(previous):
+                start = int(np.searchsorted(base["timestamp"], previous["timestamp"][-1], side="left"))
+            if start > 0:
+                # Recompute from the last cached bucket, which may have been forming
+                derived = np.concatenate((previous[:-1], resample_klines(base[start:], ratio * self.base_ms)))
+                derived = derived[-(len(base) // ratio + 1):]
+                self._derived[cache_key] = (series.generation, series.version, derived)
+                return derived
+
+        derived = resample_klines(base, ratio * self.base_ms)
+        if len(derived) > 1 and derived["timestamp"][0] != base["timestamp"][0]:
+            derived = derived[1:]  # The stored candles start mid-bucket
+        self._derived[cache_key] = (series.generation, series.version, derived)
+        return derived
+
+    def fetch_klines(
+        self,
+        symbol: str,
+        interval: str = "1h",
+        limit: int = 100,
+        start_time: Optional[int] = None,
+        end_time: Optional[int] = None
+    ) -> np.ndarray:
+        """
+        Fetch OHLCV (candlestick) data as a structured array.
+
+        Args:
+            symbol: Trading symbol (e.g., "BTCUSDT")
+            interval: Time interval (e.g., "1h", "4h", "1d")
+            limit: Maximum number of records to return
+            start_time: Start time in milliseconds (fetched from the provider)
+            end_time: End time in milliseconds (fetched from the provider)
+
+        Returns:
+            Array of KLINE_DTYPE, oldest first; the last kline may still be forming
+        """
+        ratio = self._ratio(interval)
+        if ratio is None or start_time is not None or end_time is not None:
+            return self._request(symbol, interval, limit, start_time, end_time)
+
+        key = _symbol_key(symbol)
+        with self._lock:
+            # Enough base candles for `limit` buckets plus one starting mid-bucket
+            series = self._refresh(symbol, key, (limit + 1) * ratio - 1)
+            derived = self._derive(key, interval, ratio, series)
+            return derived[len(derived) - min(limit, len(derived)):].copy()
+
+    def fetch_ohlcv(
+        self,
+        symbol: str,
+        interval: str = "1h",
+        limit: int = 100,
+        start_time: Optional[int] = None,
+        end_time: Optional[int] = None
+    ) -> List[Dict[str, Any]]:
+        """
+        Fetch OHLCV (candlestick) data for a trading pair.
+
+        Args:
+            symbol: Trading symbol (e.g., "BTCUSDT")
+            interval: Time interval (e.g., "1h", "4h", "1d")
+            limit: Maximum number of records to return
+            start_time: Start time in milliseconds
+            end_time: End time in milliseconds
+
+        Returns:
+            List of OHLCV records
+        """
+        return to_records(self.fetch_klines(symbol, interval, limit, start_time, end_time))
+
+    def invalidate(self, symbol: Optional[str] = None) -> None:
+        """
+        Drop stored candles.
+
+        Args:
+            symbol: Symbol to drop (default: all)
+        """
+        with self._lock:
+            if symbol is None:
+                self._series.clear()
+                self._derived.clear()
+                return
+            key = _symbol_key(symbol)
+            self._series.pop(key, None)
+            for cache_key in [k for k in self._derived if k[0] == key]:
+                del self._derived[cache_key]
@@ -0,0 +1,139 @@
+"""
+aGENtrader v2 Kline Batches
+
+This module decodes exchange kline (candlestick) responses straight into a
+NumPy structured array, one field per column (timestamps as int64, prices
+and volumes as float64), instead of one dictionary per candle. Agents can
+build their DataFrames or indicator inputs from the columns directly.
+
+The response body is decoded with orjson when it is installed and the
+standard json module otherwise; the price strings of each column are then
+converted in a single pass.
+"""
+
+import json
+from typing import Dict, Any, List, Union
+
+import numpy as np
+import pandas as pd
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# One kline per element, in the field order of the Binance /api/v3/klines rows
+KLINE_DTYPE = np.dtype([
+    ("timestamp", "<i8"),
+    ("open", "<f8"),
+    ("high", "<f8"),
+    ("low", "<f8"),
+    ("close", "<f8"),
+    ("volume", "<f8"),
+    ("close_time", "<i8"),
+    ("quote_asset_volume", "<f8"),
+    ("number_of_trades", "<i8"),
+    ("taker_buy_base_asset_volume", "<f8"),
+    ("taker_buy_quote_asset_volume", "<f8"),
+])
+
+# Columns of the DataFrame handed to the analysis agents
+OHLCV_FIELDS = ("timestamp", "open", "high", "low", "close", "volume")
+
+
+def loads(payload: Union[bytes, str]) -> Any:
+    """Decode a JSON document, with orjson if available."""
+    if orjson is not None:
+        return orjson.loads(payload)
+    return json.loads(payload)
+
+
+def parse_klines(payload: Union[bytes, str, List[List[Any]]]) -> np.ndarray:
+    """
+    Convert a klines response to a structured array.
+
+    Args:
+        payload: Raw response body, or the already decoded list of rows
+            ([open_time, open, high, low, close, volume, close_time, ...])
+
+    Returns:
+        Array of KLINE_DTYPE, in response order
+
+    Raises:
+        ValueError: If a row is too short or a value is not numeric
+    """
+    rows = loads(payload) if isinstance(payload, (bytes, bytearray, str)) else payload
+    count = len(rows)
+    klines = np.empty(count, dtype=KLINE_DTYPE)
+    if not count:
+        return klines
+
+    columns = list(zip(*rows))
+    if len(columns) < len(KLINE_DTYPE.names):
+        raise ValueError(f"Kline rows have {len(columns)} fields, expected {len(KLINE_DTYPE.names)}")
+
+    for name, column in zip(KLINE_DTYPE.names, columns):
+        dtype = KLINE_DTYPE.fields[name][0]
+        if dtype.kind == "f":
+            # Prices and volumes arrive as strings
+            klines[name] = np.fromiter(map(float, column), dtype=np.float64, count=count)
+        else:
+            klines[name] = np.fromiter(column, dtype=np.int64, count=count)
+    return klines
+
+
+def from_records(records: List[Dict[str, Any]]) -> np.ndarray:
+    """
+    Convert fetch_ohlcv dictionaries to a kline array.
+
+    Args:
+        records: Candle dictionaries with an open time ("timestamp", "time"
+            or "open_time") and OHLCV values; other columns default to 0
+
+    Returns:
+        Array of KLINE_DTYPE, in record order
+    """
+    klines = np.zeros(len(records), dtype=KLINE_DTYPE)
+    if not records:
+        return klines
+
+    first = records[0]
+    time_key = next((key for key in ("timestamp", "time", "open_time") if key in first), None)
+    if time_key is None:
+        raise ValueError(f"Candle record has no open time: {first}")
+    klines["timestamp"] = [record[time_key] for record in records]
+    for name in KLINE_DTYPE.names[1:]:
+        if name in first:
+            klines[name] = [record[name] for record in records]
+    return klines
+
+
+def to_records(klines: np.ndarray) -> List[Dict[str, Any]]:
+    """
+    Convert a kline array to fetch_ohlcv dictionaries.
+
+    Args:
+        klines: Array of KLINE_DTYPE
+
+    Returns:
+        List of candle dictionaries, oldest first
+    """
+    names = klines.dtype.names
+    columns = [klines[name].tolist() for name in names]
+    return [dict(zip(names, row)) for row in zip(*columns)]
+
+
+def to_frame(klines: np.ndarray) -> pd.DataFrame:
+    """
+    OHLCV DataFrame of a kline array, sorted by timestamp.
+
+    Args:
+        klines: Structured array with at least the OHLCV_FIELDS
+
+    Returns:
+        DataFrame with timestamp, open, high, low, close and volume columns
+    """
+    timestamps = klines["timestamp"]
+    if len(timestamps) > 1 and (np.diff(timestamps) < 0).any():
+        klines = klines[np.argsort(timestamps, kind="stable")]
+    return pd.DataFrame({name: klines[name] for name in OHLCV_FIELDS})
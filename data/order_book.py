@@ -0,0 +1,258 @@
+"""
+aGENtrader v2 Order Book
+
+This module provides a compact order book snapshot backed by contiguous
+float64 NumPy arrays, with vectorized depth metrics and a binary encoding
+used for the market_depth table.
+"""
+
+import struct
+import time
+from typing import Dict, Any, Optional
+
+import numpy as np
+
+# Binary layout: magic, version, timestamp (ms), bid levels, ask levels,
+# followed by the bid and ask arrays as little-endian float64 (price, qty)
+BLOB_MAGIC = b"OBK"
+BLOB_VERSION = 1
+BLOB_HEADER = struct.Struct("<3sBqII")
+
+
+def _as_levels(levels: Any) -> np.ndarray:
+    """Convert [[price, qty], ...] (strings or numbers) to an (n, 2) float64 array."""
+    if isinstance(levels, np.ndarray) and levels.dtype == np.float64 and levels.ndim == 2:
+        return np.ascontiguousarray(levels)
+    if levels is None or len(levels) == 0:
+        return np.empty((0, 2), dtype=np.float64)
+    array = np.asarray(levels, dtype=np.float64)
+    return np.ascontiguousarray(array.reshape(-1, 2))
+
+
+class OrderBook:
+    """
+    Order book snapshot.
+
+    Bids are sorted by price descending and asks ascending (the exchange
+    order); each side is an (n, 2) float64 array of [price, quantity].
+    Volumes are quote notional (price * quantity), matching the
+    bid_total / top_5_*_volume fields of the data providers.
+    """
+
+    __slots__ = ("symbol", "timestamp", "bids", "asks")
+
+    def __init__(self, bids: Any, asks: Any, timestamp: Optional[int] = None, symbol: Optional[str] = None):
+        """
+        Initialize an order book snapshot.
+
+        Args:
+            bids: Bid levels as [[price, qty], ...] or an (n, 2) array
+            asks: Ask levels as [[price, qty], ...] or an (n, 2) array
+            timestamp: Snapshot time in milliseconds (default: now)
+            symbol: Trading symbol
+        """
+        self.symbol = symbol
+        self.timestamp = int(timestamp) if timestamp is not None else int(time.time() * 1000)
+        self.bids = _as_levels(bids)
+        self.asks = _as_levels(asks)
+
+    @classmethod
+    def from_depth(cls, depth_data: Dict[str, Any], symbol: Optional[str] = None) -> "OrderBook":
+        """
+        Build a snapshot from a fetch_market_depth or get_market_depth record.
+
+        Args:
+            depth_data: Dictionary with "bids", "asks" and optionally "timestamp"
+            symbol: Trading symbol
+
+        Returns:
+            OrderBook instance
+        """
+        return cls(
+            depth_data.get("bids", []),
+            depth_data.get("asks", []),
+            timestamp=depth_data.get("timestamp"),
+            symbol=symbol or depth_data.get("symbol")
+        )
+
+    @classmethod
+    def from_bytes(cls, blob: bytes, symbol: Optional[str] = None) -> "OrderBook":
+        """
+        Decode a snapshot written by to_bytes.
+
+        Args:
+            blob: Binary snapshot
+            symbol: Trading symbol
+
+        Returns:
+            OrderBook instance
+
+        Raises:
+            ValueError: If the blob is not an order book snapshot
+        """
+        blob = bytes(blob)
+        magic, version, timestamp, n_bids, n_asks = BLOB_HEADER.unpack_from(blob)
+        if magic != BLOB_MAGIC or version != BLOB_VERSION:
+            raise ValueError(f"Unsupported order book blob (magic={magic!r}, version={version})")
+
+        levels = np.frombuffer(blob, dtype="<f8", offset=BLOB_HEADER.size).reshape(-1, 2)
+        if len(levels) != n_bids + n_asks:
+            raise ValueError(f"Truncated order book blob: expected {n_bids + n_asks} levels, got {len(levels)}")
+
+        return cls(levels[:n_bids], levels[n_bids:], timestamp=timestamp, symbol=symbol)
+
+    def to_bytes(self) -> bytes:
+        """Encode the snapshot as a compact binary blob (16 bytes per level)."""
+        header = BLOB_HEADER.pack(BLOB_MAGIC, BLOB_VERSION, self.timestamp, len(self.bids), len(self.asks))
+        return header + self.bids.astype("<f8", copy=False).tobytes() + self.asks.astype("<f8", copy=False).tobytes()
+
+    @property
+    def best_bid(self) -> float:
+        """Highest bid price (0.0 if there are no bids)."""
+        return float(self.bids[0, 0]) if len(self.bids) else 0.0
+
+    @property
+    def best_ask(self) -> float:
+        """Lowest ask price (0.0 if there are no asks)."""
+        return float(self.asks[0, 0]) if len(self.asks) else 0.0
+
+    @property
+    def mid_price(self) -> float:
+        """Mid price between the best bid and ask."""
+        if not len(self.bids) or not len(self.asks):
+            return 0.0
+        return (self.best_bid + self.best_ask) / 2
+
+    @property
+    def spread(self) -> float:
+        """Absolute spread between the best ask and bid."""
+        if not len(self.bids) or not len(self.asks):
+            return 0.0
+        return self.best_ask - self.best_bid
+
+    @property
+    def spread_percent(self) -> float:
+        """Spread as a percentage of the mid price."""
+        mid_price = self.mid_price
+        return self.spread / mid_price * 100 if mid_price > 0 else 0.0
+
+    @staticmethod
+    def _notional(levels: np.ndarray, n: Optional[int] = None) -> float:
+        """Quote notional of the first n levels of one side."""
+        if n is not None:
+            levels = levels[:n]
+        return float(levels[:, 0] @ levels[:, 1]) if len(levels) else 0.0
+
+    @property
+    def bid_total(self) -> float:
+        """Total bid notional."""
+        return self._notional(self.bids)
+
+    @property
+    def ask_total(self) -> float:
+        """Total ask notional."""
+        return self._notional(self.asks)
+
+    def top_volumes(self, n: int = 5) -> Dict[str, float]:
+        """
+        Notional of the top n levels on each side.
+
+        Args:
+            n: Number of levels
+
+        Returns:
+            Dictionary with "bid" and "ask" notional
+        """
+        return {"bid": self._notional(self.bids, n), "ask": self._notional(self.asks, n)}
+
+    def imbalance(self, n: Optional[int] = None) -> float:
+        """
+        Order book imbalance in [-1, 1]: (bid - ask) / (bid + ask) notional.
+
+        Args:
+            n: Only use the top n levels (default: whole book)
+
+        Returns:
+            Imbalance (positive when bids dominate)
+        """
+        bid, ask = self._notional(self.bids, n), self._notional(self.asks, n)
+        total = bid + ask
+        return (bid - ask) / total if total > 0 else 0.0
+
+    def depth_within(self, pct: float) -> Dict[str, float]:
+        """
+        Notional resting within pct percent of the mid price.
+
+        Args:
+            pct: Distance from mid in percent (e.g., 0.5)
+
+        Returns:
+            Dictionary with "bid" and "ask" notional
+        """
+        mid_price = self.mid_price
+        if mid_price <= 0:
+            return {"bid": 0.0, "ask": 0.0}
+
+        low, high = mid_price * (1 - pct / 100), mid_price * (1 + pct / 100)
+        bids = self.bids[self.bids[:, 0] >= low]
+        asks = self.asks[self.asks[:, 0] <= high]
+        return {"bid": self._notional(bids), "ask": self._notional(asks)}
+
+    def cumulative_depth(self) -> Dict[str, np.ndarray]:
+        """
+        Cumulative notional by level on each side (for depth charts).
+
+        Returns:
+            Dictionary with "bid" and "ask" arrays
+        """
+        return {
+            "bid": np.cumsum(self.bids[:, 0] * self.bids[:, 1]),
+            "ask": np.cumsum(self.asks[:, 0] * self.asks[:, 1])
+        }
+
+    def summary(self, top_n: int = 5) -> Dict[str, Any]:
+        """
+        Scalar metrics in the market_depth record format.
+
+        Args:
+            top_n: Levels used for the top-N volumes
+
+        Returns:
+            Dictionary of depth metrics
+        """
+        top = self.top_volumes(top_n)
+        return {
+            "timestamp": self.timestamp,
+            "bid_total": self.bid_total,
+            "ask_total": self.ask_total,
+            "spread": self.spread,
+            "spread_percent": self.spread_percent,
+            "mid_price": self.mid_price,
+            f"top_{top_n}_bid_volume": top["bid"],
+            f"top_{top_n}_ask_volume": top["ask"],
+            "imbalance": self.imbalance()
+        }
+
+    def to_dict(self) -> Dict[str, Any]:
+        """
+        Convert to the fetch_market_depth dictionary format.
+
+        Returns:
+            JSON-serializable dictionary with the bids/asks lists and the
+            summary metrics
+        """
+        result = self.summary()
+        result.update({
+            "bids": self.bids.tolist(),
+            "asks": self.asks.tolist()
+        })
+        return result
+
+    def __len__(self) -> int:
+        """Total number of price levels."""
+        return len(self.bids) + len(self.asks)
+
+    def __repr__(self) -> str:
+        """String representation."""
+        return (f"OrderBook(symbol={self.symbol!r}, timestamp={self.timestamp}, "
+                f"bids={len(self.bids)}, asks={len(self.asks)})")
@@ -0,0 +1,298 @@
+"""
+aGENtrader v2 Sentiment History Store
+
+This module stores sentiment analysis results with bounded memory use:
+
+- The JSONL sentiment feed stays the on-disk record (one result per line).
+- A fixed-width binary index next to it (<feed>.idx) holds the timestamp,
+  byte offset, symbol and sentiment of every line, so older entries are
+  read by seeking instead of loading the whole feed.
+- Recent results are kept in per-symbol ring buffers.
+- Per-symbol daily sentiment counts answer trend queries over N days
+  without touching the individual results.
+
+Lines appended to the feed by other writers (e.g. SentimentAggregatorAgent)
+are indexed the next time the store is used.
+"""
+
+import os
+import json
+import time
+import logging
+from datetime import datetime
+from collections import defaultdict, deque
+from typing import Dict, Any, List, Optional, Tuple
+
+import numpy as np
+
+# Setup logger
+logger = logging.getLogger("aGENtrader.sentiment_store")
+
+INDEX_DTYPE = np.dtype([
+    ("timestamp", "<i8"),
+    ("offset", "<i8"),
+    ("length", "<i4"),
+    ("sentiment", "i1"),
+    ("symbol", "S19")
+])
+
+SENTIMENTS = ("BULLISH", "BEARISH", "NEUTRAL")
+SENTIMENT_CODES = {name: code for code, name in enumerate(SENTIMENTS)}
+UNKNOWN_SENTIMENT = -1
+
+DAY_MS = 86_400_000
+
+
+def _record_timestamp(record: Dict[str, Any]) -> int:
+    """Timestamp of a sentiment record in milliseconds (now if missing or unparseable)."""
+    value = record.get("timestamp")
+    try:
+        if isinstance(value, (int, float)):
+            return int(value if value > 1e11 else value * 1000)
+        return int(datetime.fromisoformat(str(value).replace("Z", "+00:00")).timestamp() * 1000)
+    except (TypeError, ValueError):
+        return int(time.time() * 1000)
+
+
+def _record_sentiment(record: Dict[str, Any]) -> int:
+    """Sentiment code of a record (UNKNOWN_SENTIMENT if it has no analysis.sentiment)."""
+    analysis = record.get("analysis")
+    if not isinstance(analysis, dict):
+        return UNKNOWN_SENTIMENT
+    return SENTIMENT_CODES.get(str(analysis.get("sentiment", "")).upper(), UNKNOWN_SENTIMENT)
+
+
+class SentimentHistoryStore:
+    """
+    Bounded, time-indexed sentiment history.
+    """
+
+    def __init__(self, log_file: str, max_recent: int = 100, max_days: int = 90):
+        """
+        Initialize the store and index any unindexed feed lines.
+
+        Args:
+            log_file: JSONL sentiment feed path
+            max_recent: Results kept in memory per symbol
+            max_days: Days of rolling sentiment counts kept per symbol
+        """
+        self.log_file = log_file
+        self.index_file = os.path.splitext(log_file)[0] + ".idx"
+        self.max_recent = max_recent
+        self.max_days = max_days
+
+        self._recent: Dict[str, deque] = defaultdict(lambda: deque(maxlen=self.max_recent))
+        self._daily: Dict[str, Dict[int, List[int]]] = defaultdict(dict)
+        self._indexed_bytes = 0
+
+        os.makedirs(os.path.dirname(os.path.abspath(log_file)), exist_ok=True)
+        self._load()
+
+    def _read_index(self) -> np.ndarray:
+        """Memory-map the index file (empty array if there is none)."""
+        if not os.path.exists(self.index_file) or os.path.getsize(self.index_file) < INDEX_DTYPE.itemsize:
+            return np.zeros(0, dtype=INDEX_DTYPE)
+        count = os.path.getsize(self.index_file) // INDEX_DTYPE.itemsize
+        return np.memmap(self.index_file, dtype=INDEX_DTYPE, mode="r", shape=(count,))
+
+    def _read_lines(self, entries: np.ndarray) -> List[Dict[str, Any]]:
+        """Read the feed lines referenced by index entries."""
+        records = []
+        with open(self.log_file, "rb") as f:
+            for entry in entries:
+                f.seek(int(entry["offset"]))
+                try:
+                    records.append(json.loads(f.read(int(entry["length"]))))
+                except ValueError:
+                    continue
+        return records
+
+    def _load(self) -> None:
+        """Restore in-memory state from the index, rebuilding it if the feed changed under it."""
+        log_size = os.path.getsize(self.log_file) if os.path.exists(self.log_file) else 0
+        index = self._read_index()
+
+        if len(index):
+            last = index[-1]
+            self._indexed_bytes = int(last["offset"]) + int(last["length"]) + 1
+        if self._indexed_bytes > log_size:
+            logger.warning(f"Sentiment feed {self.log_file} is shorter than its index; rebuilding the index")
+            del index
+            os.remove(self.index_file)
+            index = np.zeros(0, dtype=INDEX_DTYPE)
+            self._indexed_bytes = 0
+
+        if len(index):
+            # Rolling daily counts
+            cutoff = int(index["timestamp"].max()) - self.max_days * DAY_MS
+            window = index[(index["timestamp"] > cutoff) & (index["sentiment"] >= 0)]
+            symbols = window["symbol"]
+            for symbol in np.unique(symbols):
+                mask = symbols == symbol
+                sym_keys, sym_counts = np.unique(
+                    np.stack([window["timestamp"][mask] // DAY_MS, window["sentiment"][mask].astype(np.int64)], axis=1),
+                    axis=0, return_counts=True
+                )
+                daily = self._daily[symbol.decode()]
+                for (day, code), count in zip(sym_keys, sym_counts):
+                    daily.setdefault(int(day), [0] * len(SENTIMENTS))[int(code)] += int(count)
+
+            # Ring buffers of the newest results per symbol
+            for symbol in np.unique(index["symbol"]):
+                positions = np.flatnonzero(index["symbol"] == symbol)[-self.max_recent:]
+                entries = index[positions]
+                for entry, record in zip(entries, self._read_lines(entries)):
+                    self._recent[symbol.decode()].append((int(entry["timestamp"]), record))
+
+        del index
+        self._sync()
+
+        total = sum(len(buffer) for buffer in self._recent.values())
+        logger.info(f"Loaded sentiment history: {total} recent records across {len(self._recent)} symbols")
+
+    def _sync(self) -> None:
+        """Index feed lines appended since the last sync (by this or another writer)."""
+        if not os.path.exists(self.log_file) or os.path.getsize(self.log_file) <= self._indexed_bytes:
+            return
+
+        entries = []
+        with open(self.log_file, "rb") as f:
+            f.seek(self._indexed_bytes)
+            offset = self._indexed_bytes
+            for line in f:
+                if not line.endswith(b"\n"):
+                    break  # Partially written line; index it next time
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    record = None
+                if isinstance(record, dict):
+                    entries.append(self._index_entry(record, offset, len(line) - 1))
+                    self._remember(record, entries[-1])
+                offset += len(line)
+
+        self._write_index(entries)
+        self._indexed_bytes = offset
+
+    def _index_entry(self, record: Dict[str, Any], offset: int, length: int) -> Tuple:
+        """Build an index entry for a feed line."""
+        symbol = str(record.get("symbol") or "").encode()[:INDEX_DTYPE["symbol"].itemsize]
+        return (_record_timestamp(record), offset, length, _record_sentiment(record), symbol)
+
+    def _write_index(self, entries: List[Tuple]) -> None:
+        """Append entries to the index file."""
+        if entries:
+            with open(self.index_file, "ab") as f:
+                f.write(np.array(entries, dtype=INDEX_DTYPE).tobytes())
+
+    def _remember(self, record: Dict[str, Any], entry: Tuple) -> None:
+        """Add a record to the ring buffer and daily counts of its symbol."""
+        timestamp, _, _, sentiment, symbol = entry
+        symbol = symbol.decode()
+        self._recent[symbol].append((timestamp, record))
+
+        if sentiment == UNKNOWN_SENTIMENT:
+            return
+        day = timestamp // DAY_MS
+        daily = self._daily[symbol]
+        if day not in daily:
+            daily[day] = [0] * len(SENTIMENTS)
+            for old_day in [d for d in daily if d <= day - self.max_days]:
+                del daily[old_day]
+        daily[day][sentiment] += 1
+
+    def append(self, record: Dict[str, Any]) -> None:
+        """
+        Append a sentiment result to the feed and index it.
+
+        Args:
+            record: Sentiment result (symbol, timestamp, analysis.sentiment, ...)
+        """
+        self._sync()
+        line = json.dumps(record).encode() + b"\n"
+        with open(self.log_file, "ab") as f:
+            offset = f.seek(0, os.SEEK_END)
+            f.write(line)
+
+        entry = self._index_entry(record, offset, len(line) - 1)
+        self._write_index([entry])
+        self._remember(record, entry)
+        self._indexed_bytes = offset + len(line)
+
+    def recent(self, symbol: Optional[str] = None, limit: int = 10) -> List[Dict[str, Any]]:
+        """
+        Get the newest results.
+
+        Served from the ring buffers; requests beyond max_recent for a symbol
+        fall back to the index.
+
+        Args:
+            symbol: Trading symbol (all symbols if None)
+            limit: Maximum number of results
+
+        Returns:
+            Results, newest first
+        """
+        self._sync()
+        if symbol is None:
+            items = [item for buffer in self._recent.values() for item in buffer]
+            items.sort(key=lambda item: item[0], reverse=True)
+            return [record for _, record in items[:limit]]
+
+        buffer = self._recent.get(symbol)
+        if buffer is not None and (limit <= len(buffer) or len(buffer) < self.max_recent):
+            return [record for _, record in list(buffer)[::-1][:limit]]
+        return self.history(symbol, limit=limit)
+
+    def history(self, symbol: str, start: Optional[int] = None, end: Optional[int] = None,
+                limit: Optional[int] = None) -> List[Dict[str, Any]]:
+        """
+        Read results for a symbol from disk by time range.
+
+        Args:
+            symbol: Trading symbol
+            start: Earliest timestamp in milliseconds (inclusive)
+            end: Latest timestamp in milliseconds (inclusive)
+            limit: Maximum number of results (the newest ones)
+
+        Returns:
+            Results, newest first
+        """
+        self._sync()
+        index = self._read_index()
+        if not len(index):
+            return []
+
+        mask = index["symbol"] == symbol.encode()
+        if start is not None:
+            mask &= index["timestamp"] >= start
+        if end is not None:
+            mask &= index["timestamp"] <= end
+
+        positions = np.flatnonzero(mask)
+        positions = positions[np.argsort(index["timestamp"][positions], kind="stable")[::-1]]
+        if limit is not None:
+            positions = positions[:limit]
+        return self._read_lines(index[positions])
+
+    def sentiment_counts(self, symbol: str, days: int = 7, now: Optional[int] = None) -> Dict[str, int]:
+        """
+        Count results per sentiment over the last N days.
+
+        Args:
+            symbol: Trading symbol
+            days: Number of days to look back (at most max_days)
+            now: Reference time in milliseconds (default: current time)
+
+        Returns:
+            Dictionary of sentiment -> count
+        """
+        self._sync()
+        today = (now if now is not None else int(time.time() * 1000)) // DAY_MS
+        totals = [0] * len(SENTIMENTS)
+        daily = self._daily.get(symbol, {})
+        for day in range(today - min(days, self.max_days) + 1, today + 1):
+            counts = daily.get(day)
+            if counts:
+                totals = [a + b for a, b in zip(totals, counts)]
+        return dict(zip(SENTIMENTS, totals))
@@ -0,0 +1,521 @@
+"""
+aGENtrader v2 Synthetic Market Generator
+
+This module generates reproducible synthetic market data with NumPy. Prices
+follow geometric Brownian motion with optional Merton jumps and Markov
+regime switching between presets; each candle's high and low are drawn from
+the exact distribution of a Brownian bridge between its open and close, so
+wicks scale with volatility. Order books, funding rates and open interest
+are derived from the same price path, and market events use the presets of
+core/example_pipeline.py (normal, bullish, bearish, volatile, low_liquidity).
+
+Everything is generated column-wise from a seeded numpy Generator, so a
+seed always yields the same data and millions of candles take well under a
+second; to_records() converts the columns to the agent OHLCV format.
+"""
+
+import os
+import json
+import time
+import logging
+from datetime import datetime
+from typing import Dict, Any, List, Optional, Sequence, Union
+
+import numpy as np
+
+from data.order_book import OrderBook
+from data.volume_profile import VolumeProfile, parse_duration, _nice_step
+
+# Setup logger
+logger = logging.getLogger("aGENtrader.market_generator")
+
+MS_PER_YEAR = 365 * 86_400_000
+FUNDING_EPOCH_MS = 8 * 3_600_000
+
+# Quote notional traded per hour and resting within the order book at a
+# liquidity of 1.0 (the scale of a large-cap USDT perpetual)
+HOURLY_QUOTE_VOLUME = 50_000_000.0
+BOOK_LEVEL_NOTIONAL = 250_000.0
+AVERAGE_TRADE_NOTIONAL = 2_500.0
+OPEN_INTEREST_NOTIONAL = 5_000_000_000.0
+
+BASE_PRICES = {
+    "BTCUSDT": 65000.0,
+    "ETHUSDT": 3500.0,
+    "SOLUSDT": 150.0,
+    "BNBUSDT": 600.0,
+    "XRPUSDT": 0.6
+}
+DEFAULT_BASE_PRICE = 100.0
+
+# Annualized drift/volatility, jumps per day with their log-size mean/std,
+# volume and book liquidity multipliers, order book shape, funding rate per
+# 8h and the sensitivity of open interest to price moves. "random_trend"
+# flips the sign of drift and funding with equal probability.
+PRESETS: Dict[str, Dict[str, Any]] = {
+    "normal": {
+        "drift": 0.0, "volatility": 0.6,
+        "jump_intensity": 0.2, "jump_mean": 0.0, "jump_std": 0.02,
+        "volume": 1.0, "liquidity": 1.0, "depth": "balanced",
+        "funding": 0.0001, "oi_beta": 0.2, "random_trend": False
+    },
+    "bullish": {
+        "drift": 4.0, "volatility": 0.72,
+        "jump_intensity": 0.3, "jump_mean": 0.01, "jump_std": 0.02,
+        "volume": 1.3, "liquidity": 1.0, "depth": "bid_wall",
+        "funding": 0.0004, "oi_beta": 1.0, "random_trend": False
+    },
+    "bearish": {
+        "drift": -4.0, "volatility": 0.72,
+        "jump_intensity": 0.3, "jump_mean": -0.01, "jump_std": 0.02,
+        "volume": 1.3, "liquidity": 1.0, "depth": "ask_wall",
+        "funding": -0.0002, "oi_beta": -1.0, "random_trend": False
+    },
+    "volatile": {
+        "drift": 4.0, "volatility": 1.2,
+        "jump_intensity": 2.0, "jump_mean": 0.0, "jump_std": 0.04,
+        "volume": 2.0, "liquidity": 0.7, "depth": "balanced",
+        "funding": 0.0004, "oi_beta": 0.5, "random_trend": True
+    },
+    "low_liquidity": {
+        "drift": 0.0, "volatility": 0.9,
+        "jump_intensity": 0.5, "jump_mean": 0.0, "jump_std": 0.03,
+        "volume": 0.4, "liquidity": 0.35, "depth": "thin",
+        "funding": 0.0001, "oi_beta": 0.2, "random_trend": False
+    }
+}
+
+# Candle columns in the fetch_ohlcv record format
+KLINE_FIELDS = (
+    "time", "open", "high", "low", "close", "volume", "close_time",
+    "quote_asset_volume", "number_of_trades",
+    "taker_buy_base_asset_volume", "taker_buy_quote_asset_volume"
+)
+
+PresetSpec = Union[str, Dict[str, Any]]
+
+
+def base_price_for(symbol: Optional[str]) -> float:
+    """Typical price of a symbol (accepts "BTC/USDT" and "BTCUSDT")."""
+    return BASE_PRICES.get(str(symbol or "").replace("/", "").upper(), DEFAULT_BASE_PRICE)
+
+
+def to_records(candles: Dict[str, np.ndarray]) -> List[Dict[str, Any]]:
+    """
+    Convert generated candle columns to fetch_ohlcv dictionaries.
+
+    Args:
+        candles: Columns returned by MarketGenerator.generate_candles
+
+    Returns:
+        List of candle dictionaries, oldest first
+    """
+    columns = [candles[field].tolist() for field in KLINE_FIELDS]
+    return [dict(zip(KLINE_FIELDS, row)) for row in zip(*columns)]
+
+
+class MarketGenerator:
+    """
+    Seeded generator of candles, order books, funding rates and open
+    interest.
+    """
+
+    def __init__(self, seed: Optional[int] = None):
+        """
+        Initialize the generator.
+
+        Args:
+            seed: Random seed; the same seed yields the same sequence of
+                generated data
+        """
+        self.seed = seed
+        self.rng = np.random.default_rng(seed)
+
+    def resolve_preset(self, preset: PresetSpec) -> Dict[str, Any]:
+        """
+        Get concrete parameters for a preset.
+
+        Args:
+            preset: Preset name or a dictionary overriding "normal"
+
+        Returns:
+            Parameter dictionary with any random trend resolved
+
+        Raises:
+            ValueError: If the preset name is unknown
+        """
+        if isinstance(preset, dict):
+            params = dict(PRESETS["normal"], **preset)
+        elif preset in PRESETS:
+            params = dict(PRESETS[preset])
+        else:
+            raise ValueError(f"Unknown market preset: {preset} (expected one of {', '.join(PRESETS)})")
+
+        if params.get("random_trend"):
+            if self.rng.random() < 0.5:
+                params["drift"] = -params["drift"]
+                params["funding"] = -params["funding"]
+                params["oi_beta"] = -params["oi_beta"]
+                params["jump_mean"] = -params["jump_mean"]
+            params["random_trend"] = False
+        return params
+
+    def regime_path(self, n: int, count: int, switch_probability: float) -> np.ndarray:
+        """
+        Markov chain of regime indices with equal-probability switches.
+
+        Run lengths are geometric, so the whole path is drawn at once.
+
+        Args:
+            n: Number of steps
+            count: Number of regimes
+            switch_probability: Probability of leaving the current regime per step
+
+        Returns:
+            Array of regime indices in [0, count)
+        """
+        if count <= 1 or switch_probability <= 0.0 or n == 0:
+            start = int(self.rng.integers(count)) if count > 1 else 0
+            return np.full(n, start, dtype=np.int8)
+
+        lengths = []
+        total = 0
+        while total < n:
+            batch = self.rng.geometric(min(switch_probability, 1.0), size=int(n * switch_probability * 1.2) + 16)
+            lengths.append(batch)
+            total += int(batch.sum())
+        runs = np.concatenate(lengths)
+
+        offsets = self.rng.integers(1, count, size=len(runs))
+        offsets[0] = self.rng.integers(count)
+        states = np.cumsum(offsets) % count
+        return np.repeat(states.astype(np.int8), runs)[:n]
+
+    def generate_candles(
+        self,
+        n: int,
+        interval: str = "1h",
+        start_price: Optional[float] = None,
+        preset: PresetSpec = "normal",
+        regimes: Optional[Sequence[PresetSpec]] = None,
+        switch_probability: float = 0.01,
+        start_time: Optional[int] = None,
+        end_time: Optional[int] = None,
+        symbol: Optional[str] = None
+    ) -> Dict[str, np.ndarray]:
+        """
+        Generate a candle path.
+
+        Args:
+            n: Number of candles
+            interval: Candle interval (e.g., "1m", "1h", "1d")
+            start_price: Open of the first candle (default: typical price of symbol)
+            preset: Market preset for the whole path
+            regimes: Presets to switch between (overrides preset)
+            switch_probability: Per-candle probability of a regime switch
+            start_time: Open time of the first candle in milliseconds
+            end_time: Close time of the last candle in milliseconds
+                (default: now; ignored if start_time is given)
+            symbol: Trading symbol (used for the default start price)
+
+        Returns:
+            Dictionary of column arrays: the KLINE_FIELDS plus "regime",
+            the index into regimes (or 0) for each candle
+        """
+        interval_ms = parse_duration(interval)
+        dt = interval_ms / MS_PER_YEAR
+        price = float(start_price) if start_price is not None else base_price_for(symbol)
+
+        specs = list(regimes) if regimes else [preset]
+        params = [self.resolve_preset(spec) for spec in specs]
+        states = self.regime_path(n, len(params), switch_probability if regimes else 0.0)
+
+        def per_candle(key: str) -> np.ndarray:
+            return np.array([p[key] for p in params], dtype=np.float64)[states]
+
+        sigma = per_candle("volatility")
+        variance = sigma * sigma * dt
+
+        # Log returns: GBM diffusion plus compound Poisson jumps
+        returns = (per_candle("drift") - 0.5 * sigma * sigma) * dt + np.sqrt(variance) * self.rng.standard_normal(n)
+        jumps = self.rng.poisson(per_candle("jump_intensity") * interval_ms / 86_400_000)
+        if jumps.any():
+            returns += jumps * per_candle("jump_mean") + np.sqrt(jumps) * per_candle("jump_std") * self.rng.standard_normal(n)
+
+        log_close = np.log(price) + np.cumsum(returns)
+        log_open = np.empty(n)
+        log_open[:1] = np.log(price)
+        log_open[1:] = log_close[:-1]
+
+        # Extremes of a Brownian bridge between open and close
+        move = log_close - log_open
+        log_high = 0.5 * (log_open + log_close + np.sqrt(move * move - 2.0 * variance * np.log1p(-self.rng.random(n))))
+        log_low = 0.5 * (log_open + log_close - np.sqrt(move * move - 2.0 * variance * np.log1p(-self.rng.random(n))))
+
+        open_ = np.exp(log_open)
+        close = np.exp(log_close)
+        high = np.exp(log_high)
+        low = np.exp(log_low)
+
+        # Volume grows with the size of the move; takers lean with its direction
+        shock = np.abs(move) / np.sqrt(variance)
+        typical = (open_ + high + low + close) / 4.0
+        quote_volume = (HOURLY_QUOTE_VOLUME * interval_ms / 3_600_000 * per_candle("volume")
+                        * (0.6 + 0.4 * shock) * self.rng.lognormal(0.0, 0.3, n))
+        volume = quote_volume / typical
+        taker_share = np.clip(0.5 + 0.15 * np.tanh(move / np.sqrt(variance)) + 0.05 * self.rng.standard_normal(n),
+                              0.05, 0.95)
+        trades = np.maximum(quote_volume / AVERAGE_TRADE_NOTIONAL, 1.0).astype(np.int64)
+
+        if start_time is not None:
+            first = -(-int(start_time) // interval_ms) * interval_ms
+        else:
+            last_close = int(end_time) if end_time is not None else int(time.time() * 1000)
+            first = (last_close // interval_ms - n) * interval_ms
+        open_time = first + np.arange(n, dtype=np.int64) * interval_ms
+
+        return {
+            "time": open_time,
+            "open": open_,
+            "high": high,
+            "low": low,
+            "close": close,
+            "volume": volume,
+            "close_time": open_time + (interval_ms - 1),
+            "quote_asset_volume": volume * typical,
+            "number_of_trades": trades,
+            "taker_buy_base_asset_volume": volume * taker_share,
+            "taker_buy_quote_asset_volume": volume * taker_share * typical,
+            "regime": states
+        }
+
+    def order_book(
+        self,
+        price: float,
+        levels: int = 100,
+        preset: PresetSpec = "normal",
+        timestamp: Optional[int] = None,
+        symbol: Optional[str] = None
+    ) -> OrderBook:
+        """
+        Generate an order book around a price.
+
+        Levels are one basis point apart outside a spread that widens as
+        liquidity falls; resting size grows away from the touch, with walls
+        at levels 5-7 for the bid_wall/ask_wall shapes.
+
+        Args:
+            price: Mid price
+            levels: Levels per side
+            preset: Market preset (liquidity and depth shape)
+            timestamp: Snapshot time in milliseconds (default: now)
+            symbol: Trading symbol
+
+        Returns:
+            OrderBook snapshot
+        """
+        params = self.resolve_preset(preset)
+        liquidity = params["liquidity"]
+        half_spread = price * 0.00005 / liquidity
+        tick = price * 0.0001
+        steps = np.arange(levels, dtype=np.float64)
+
+        def side(shape_wall: bool) -> np.ndarray:
+            notional = BOOK_LEVEL_NOTIONAL * liquidity * (1.0 + 0.05 * steps) * self.rng.gamma(2.0, 0.5, levels)
+            if shape_wall:
+                notional[4:7] *= 2.75
+            return notional
+
+        bid_prices = price - half_spread - tick * steps
+        ask_prices = price + half_spread + tick * steps
+        bids = np.column_stack((bid_prices, side(params["depth"] == "bid_wall") / bid_prices))
+        asks = np.column_stack((ask_prices, side(params["depth"] == "ask_wall") / ask_prices))
+        return OrderBook(bids, asks, timestamp=timestamp, symbol=symbol)
+
+    def funding_rates(
+        self,
+        candles: Dict[str, np.ndarray],
+        symbol: str = "BTCUSDT",
+        preset: PresetSpec = "normal"
+    ) -> List[Dict[str, Any]]:
+        """
+        Funding rates at each 8h funding time covered by a candle path.
+
+        The rate is the preset's base rate plus a premium that follows the
+        price change over the preceding funding period.
+
+        Args:
+            candles: Columns returned by generate_candles
+            symbol: Trading symbol
+            preset: Market preset (base funding rate)
+
+        Returns:
+            Funding records (symbol, fundingTime, fundingRate, markPrice), oldest first
+        """
+        close_times = candles["close_time"] + 1
+        if len(close_times) == 0:
+            return []
+        params = self.resolve_preset(preset)
+
+        epochs = np.arange(-(-int(close_times[0]) // FUNDING_EPOCH_MS) * FUNDING_EPOCH_MS,
+                           int(close_times[-1]) + 1, FUNDING_EPOCH_MS, dtype=np.int64)
+        if len(epochs) == 0:
+            return []
+
+        closes = candles["close"]
+        at = np.clip(np.searchsorted(close_times, epochs, side="right") - 1, 0, len(closes) - 1)
+        before = np.clip(np.searchsorted(close_times, epochs - FUNDING_EPOCH_MS, side="right") - 1, 0, len(closes) - 1)
+        premium = np.log(closes[at] / closes[before])
+        rates = np.clip(params["funding"] + 0.02 * premium + 0.00005 * self.rng.standard_normal(len(epochs)),
+                        -0.0075, 0.0075)
+
+        return [
+            {"symbol": symbol, "fundingTime": t, "fundingRate": rate, "markPrice": mark}
+            for t, rate, mark in zip(epochs.tolist(), rates.tolist(), closes[at].tolist())
+        ]
+
+    def open_interest(
+        self,
+        candles: Dict[str, np.ndarray],
+        symbol: str = "BTCUSDT",
+        period: str = "1h",
+        preset: PresetSpec = "normal"
+    ) -> List[Dict[str, Any]]:
+        """
+        Open interest sampled every period over a candle path.
+
+        Log open interest moves with price (scaled by the preset's oi_beta)
+        plus independent noise, so trends build or unwind positioning.
+
+        Args:
+            candles: Columns returned by generate_candles
+            symbol: Trading symbol
+            period: Sampling period (e.g., "5m", "1h", "4h")
+            preset: Market preset (price sensitivity of open interest)
+
+        Returns:
+            Records (symbol, sumOpenInterest, sumOpenInterestValue, timestamp), oldest first
+        """
+        close_times = candles["close_time"] + 1
+        if len(close_times) == 0:
+            return []
+        params = self.resolve_preset(preset)
+        period_ms = parse_duration(period)
+
+        times = np.arange(-(-int(close_times[0]) // period_ms) * period_ms,
+                          int(close_times[-1]) + 1, period_ms, dtype=np.int64)
+        if len(times) == 0:
+            return []
+
+        closes = candles["close"]
+        at = np.clip(np.searchsorted(close_times, times, side="right") - 1, 0, len(closes) - 1)
+        prices = closes[at]
+        price_moves = np.diff(np.log(prices), prepend=np.log(prices[0]))
+        log_oi = (np.log(OPEN_INTEREST_NOTIONAL * self.rng.uniform(0.5, 1.5) / prices[0])
+                  + np.cumsum(params["oi_beta"] * price_moves + 0.01 * self.rng.standard_normal(len(times))))
+        oi = np.exp(log_oi)
+
+        return [
+            {"symbol": symbol, "sumOpenInterest": amount, "sumOpenInterestValue": value, "timestamp": t}
+            for amount, value, t in zip(oi.tolist(), (oi * prices).tolist(), times.tolist())
+        ]
+
+    def volume_profile(self, candles: Dict[str, np.ndarray], bin_pct: float = 0.1) -> VolumeProfile:
+        """
+        Volume-by-price profile of a candle path.
+
+        Args:
+            candles: Columns returned by generate_candles
+            bin_pct: Bin width as a percentage of the median close
+
+        Returns:
+            VolumeProfile covering all candles
+        """
+        reference = float(np.median(candles["close"])) if len(candles["close"]) else 1.0
+        window_ms = int(candles["close_time"][-1] - candles["time"][0] + 1) if len(candles["time"]) else 1
+        profile = VolumeProfile(window_ms, _nice_step(reference * bin_pct / 100))
+        profile.update(candles["time"].tolist(), candles["low"], candles["high"],
+                       candles["volume"], candles["taker_buy_base_asset_volume"])
+        return profile
+
+    def generate_market_event(
+        self,
+        symbol: Optional[str] = None,
+        interval: Optional[str] = None,
+        event_type: Optional[str] = None,
+        num_candles: int = 200,
+        depth_levels: int = 20
+    ) -> Dict[str, Any]:
+        """
+        Generate a complete market event with price action, depth, funding,
+        open interest and volume profile.
+
+        Args:
+            symbol: Trading symbol (if None, randomly selected)
+            interval: Time interval (if None, randomly selected)
+            event_type: Preset name (if None, randomly selected)
+            num_candles: Candles of price action
+            depth_levels: Order book levels per side
+
+        Returns:
+            Dictionary with complete market event data
+        """
+        symbol = symbol or str(self.rng.choice(list(BASE_PRICES)))
+        interval = interval or str(self.rng.choice(["1m", "5m", "15m", "1h", "4h", "1d"]))
+        event_type = event_type or str(self.rng.choice(list(PRESETS)))
+        params = self.resolve_preset(event_type)
+
+        candles = self.generate_candles(num_candles, interval, preset=params, symbol=symbol)
+        price_action = to_records(candles)
+        for candle in price_action:
+            candle["timestamp"] = candle["time"]
+        now = int(candles["close_time"][-1]) + 1
+
+        market_depth = self.order_book(float(candles["close"][-1]), depth_levels, params,
+                                       timestamp=now, symbol=symbol).to_dict()
+        market_depth["symbol"] = symbol
+
+        oi_period = interval if parse_duration(interval) >= 300_000 else "5m"
+        profile = self.volume_profile(candles)
+        levels = profile.levels()
+        order = np.argsort(levels["volume"])[::-1]
+        in_value_area = order[:int(np.searchsorted(np.cumsum(levels["volume"][order]),
+                                                    0.7 * levels["volume"].sum())) + 1]
+
+        return {
+            "symbol": symbol,
+            "interval": interval,
+            "timestamp": datetime.now().isoformat(),
+            "event_type": event_type,
+            "parameters": params,
+            "price_action": price_action,
+            "market_depth": market_depth,
+            "funding_rates": self.funding_rates(candles, symbol, params),
+            "open_interest": self.open_interest(candles, symbol, oi_period, params),
+            "volume_profile": {
+                "symbol": symbol,
+                "timestamp": now,
+                "price_levels": levels["price_level"].tolist(),
+                "volumes": levels["volume"].tolist(),
+                "point_of_control": profile.point_of_control(),
+                "value_area_low": float(levels["price_level"][in_value_area].min()),
+                "value_area_high": float(levels["price_level"][in_value_area].max())
+            }
+        }
+
+    def save_to_file(self, data: Dict[str, Any], filename: str) -> None:
+        """
+        Save data to a JSON file.
+
+        Args:
+            data: Data to save
+            filename: Filename to save to
+        """
+        directory = os.path.dirname(filename)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        with open(filename, "w") as f:
+            json.dump(data, f, indent=2)
+
+        logger.info(f"Saved data to: {filename}")
@@ -0,0 +1,323 @@
+"""
+aGENtrader v2 Volume Profile
+
+This module builds volume-by-price histograms from klines. Each candle's
+volume is spread evenly over the price bins between its low and high, and
+split into buy/sell volume using taker_buy_base_asset_volume. Profiles are
+kept per (symbol, interval, time_frame) and updated incrementally: new
+candles are added and candles leaving the time frame are subtracted, so a
+7d profile does not re-bin a week of candles on every call.
+"""
+
+import math
+import logging
+from datetime import datetime
+from typing import Dict, Any, List, Optional, Tuple, Sequence
+
+import numpy as np
+
+# Setup logger
+logger = logging.getLogger("aGENtrader.volume_profile")
+
+DURATION_UNITS_MS = {
+    "m": 60_000,
+    "h": 3_600_000,
+    "d": 86_400_000,
+    "w": 604_800_000
+}
+
+# Candles spanning more bins than this (bad ticks) are clipped to the top of their range
+MAX_BINS_PER_CANDLE = 1000
+
+
+def parse_duration(value: str) -> int:
+    """
+    Convert an interval or time frame ("15m", "4h", "24h", "7d") to milliseconds.
+
+    Raises:
+        ValueError: If the value is not a number followed by m/h/d/w
+    """
+    value = str(value).strip()
+    unit = value[-1:].lower()
+    if unit not in DURATION_UNITS_MS or not value[:-1].isdigit():
+        raise ValueError(f"Invalid duration '{value}' (expected e.g. 15m, 4h, 7d)")
+    return int(value[:-1]) * DURATION_UNITS_MS[unit]
+
+
+def _to_millis(value: Any) -> int:
+    """Convert a stored candle timestamp (ms, seconds, numeric string or ISO string) to ms."""
+    if isinstance(value, datetime):
+        return int(value.timestamp() * 1000)
+    try:
+        number = float(value)
+    except (TypeError, ValueError):
+        return int(datetime.fromisoformat(str(value).replace("Z", "+00:00")).timestamp() * 1000)
+    return int(number if number > 1e11 else number * 1000)
+
+
+def _nice_step(value: float) -> float:
+    """Round a bin size up to 1, 2 or 5 times a power of ten."""
+    if value <= 0 or not math.isfinite(value):
+        return 1.0
+    magnitude = 10 ** math.floor(math.log10(value))
+    for multiple in (1, 2, 5, 10):
+        if multiple * magnitude >= value:
+            return multiple * magnitude
+    return 10 * magnitude
+
+
+def bin_volume(lows: np.ndarray, highs: np.ndarray, volumes: np.ndarray, buy_volumes: np.ndarray,
+               bin_size: float) -> Tuple[int, np.ndarray, np.ndarray]:
+    """
+    Histogram candle volume over price bins.
+
+    Args:
+        lows, highs: Candle price ranges
+        volumes: Base asset volume per candle
+        buy_volumes: Taker buy base asset volume per candle
+        bin_size: Price bin width
+
+    Returns:
+        (first bin index, buy volume per bin, sell volume per bin); bin i
+        covers [(start + i) * bin_size, (start + i + 1) * bin_size)
+    """
+    if len(lows) == 0:
+        return 0, np.zeros(0), np.zeros(0)
+
+    hi = np.floor(highs / bin_size).astype(np.int64)
+    lo = np.minimum(np.floor(lows / bin_size).astype(np.int64), hi)
+    lo = np.maximum(lo, hi - (MAX_BINS_PER_CANDLE - 1))
+    counts = hi - lo + 1
+
+    start = int(lo.min())
+    offsets = np.arange(int(counts.sum())) - np.repeat(np.cumsum(counts) - counts, counts)
+    index = np.repeat(lo - start, counts) + offsets
+    size = int(hi.max()) - start + 1
+
+    buy = np.bincount(index, np.repeat(buy_volumes / counts, counts), size)
+    sell = np.bincount(index, np.repeat((volumes - buy_volumes) / counts, counts), size)
+    return start, buy, sell
+
+
+class VolumeProfile:
+    """
+    Rolling volume profile for one (symbol, interval, time_frame).
+    """
+
+    def __init__(self, window_ms: int, bin_size: float):
+        """
+        Initialize an empty profile.
+
+        Args:
+            window_ms: Time frame covered by the profile in milliseconds
+            bin_size: Price bin width
+        """
+        self.window_ms = window_ms
+        self.bin_size = bin_size
+
+        self._base = 0
+        self._buy = np.zeros(0)
+        self._sell = np.zeros(0)
+
+        # Candles currently inside the window, by open time (ms)
+        self._candles: Dict[int, Tuple[float, float, float, float]] = {}
+        self.last_timestamp: Optional[int] = None
+
+    def _accumulate(self, start: int, buy: np.ndarray, sell: np.ndarray, sign: float) -> None:
+        """Add (sign=1) or subtract (sign=-1) a histogram starting at bin `start`."""
+        if not len(buy):
+            return
+
+        if not len(self._buy):
+            self._base = start
+            self._buy = np.zeros(len(buy))
+            self._sell = np.zeros(len(sell))
+
+        end = max(self._base + len(self._buy), start + len(buy))
+        new_base = min(self._base, start)
+        if new_base != self._base or end != self._base + len(self._buy):
+            pad = (self._base - new_base, end - self._base - len(self._buy))
+            self._buy = np.pad(self._buy, pad)
+            self._sell = np.pad(self._sell, pad)
+            self._base = new_base
+
+        offset = start - self._base
+        self._buy[offset:offset + len(buy)] += sign * buy
+        self._sell[offset:offset + len(sell)] += sign * sell
+
+    def _apply(self, candles: List[Tuple[float, float, float, float]], sign: float) -> None:
+        """Bin a list of (low, high, volume, buy_volume) candles into the profile."""
+        if not candles:
+            return
+        lows, highs, volumes, buys = np.array(candles, dtype=np.float64).T
+        self._accumulate(*bin_volume(lows, highs, volumes, buys, self.bin_size), sign)
+
+    def update(self, timestamps: Sequence[int], lows: Sequence[float], highs: Sequence[float],
+               volumes: Sequence[float], buy_volumes: Sequence[float]) -> None:
+        """
+        Add candles and drop candles that left the time frame.
+
+        Candles with an open time already in the profile replace the earlier
+        version (e.g. the still-forming last candle).
+
+        Args:
+            timestamps: Candle open times in milliseconds
+            lows, highs, volumes, buy_volumes: Candle values
+        """
+        batch = set(timestamps)
+        removed, added = [], []
+        for ts, low, high, volume, buy in zip(timestamps, lows, highs, volumes, buy_volumes):
+            candle = (float(low), float(high), float(volume), float(buy))
+            previous = self._candles.get(ts)
+            if previous is not None:
+                removed.append(previous)
+            self._candles[ts] = candle
+            added.append(candle)
+
+        if self._candles:
+            self.last_timestamp = max(self._candles)
+            cutoff = self.last_timestamp - self.window_ms
+            for ts in [ts for ts in self._candles if ts <= cutoff]:
+                candle = self._candles.pop(ts)
+                if ts in batch:
+                    added.remove(candle)
+                else:
+                    removed.append(candle)
+
+        self._apply(removed, -1.0)
+        self._apply(added, 1.0)
+
+    @property
+    def candle_count(self) -> int:
+        """Number of candles inside the time frame."""
+        return len(self._candles)
+
+    def levels(self) -> Dict[str, np.ndarray]:
+        """
+        Non-empty price levels.
+
+        Returns:
+            Dictionary with "price_level" (bin lower edge), "buy_volume",
+            "sell_volume" and "volume" arrays
+        """
+        buy = np.clip(self._buy, 0.0, None)
+        sell = np.clip(self._sell, 0.0, None)
+        volume = buy + sell
+        mask = volume > 1e-12
+        prices = (np.arange(len(volume)) + self._base) * self.bin_size
+        return {
+            "price_level": np.round(prices[mask], 10),
+            "buy_volume": buy[mask],
+            "sell_volume": sell[mask],
+            "volume": volume[mask]
+        }
+
+    def point_of_control(self) -> Optional[float]:
+        """Price level with the highest volume."""
+        levels = self.levels()
+        if not len(levels["volume"]):
+            return None
+        return float(levels["price_level"][np.argmax(levels["volume"])])
+
+
+class VolumeProfileEngine:
+    """
+    Incrementally maintained volume profiles keyed by (symbol, interval, time_frame).
+    """
+
+    def __init__(self, bin_pct: float = 0.1):
+        """
+        Initialize the engine.
+
+        Args:
+            bin_pct: Target bin width as a percentage of price; rounded to a
+                1/2/5 step and fixed when a profile is first built
+        """
+        self.bin_pct = bin_pct
+        self.profiles: Dict[Tuple[str, str, str], VolumeProfile] = {}
+
+    def get(self, symbol: str, interval: str, time_frame: str) -> Optional[VolumeProfile]:
+        """Get an existing profile."""
+        return self.profiles.get((symbol, interval, time_frame))
+
+    def reset(self, symbol: str, interval: str, time_frame: str) -> None:
+        """Drop a profile so it is rebuilt from scratch."""
+        self.profiles.pop((symbol, interval, time_frame), None)
+
+    def update(self, symbol: str, interval: str, time_frame: str,
+               candles: List[Dict[str, Any]]) -> VolumeProfile:
+        """
+        Add klines to a profile, creating it on first use.
+
+        Args:
+            symbol: Trading symbol
+            interval: Candle interval
+            time_frame: Profile time frame (e.g., "24h", "7d")
+            candles: Kline dictionaries with timestamp, open, high, low,
+                close, volume and optionally taker_buy_base_asset_volume
+
+        Returns:
+            Updated VolumeProfile
+        """
+        key = (symbol, interval, time_frame)
+        profile = self.profiles.get(key)
+
+        rows = [c for c in candles if c.get("high") is not None and c.get("low") is not None]
+        if profile is None:
+            closes = [float(c["close"]) for c in rows if c.get("close")]
+            reference = float(np.median(closes)) if closes else 1.0
+            profile = VolumeProfile(parse_duration(time_frame), _nice_step(reference * self.bin_pct / 100))
+            self.profiles[key] = profile
+            logger.debug(f"Created {time_frame} volume profile for {symbol} {interval} (bin size {profile.bin_size})")
+        if not rows:
+            return profile
+
+        opens = np.array([float(c.get("open") or 0.0) for c in rows])
+        closes = np.array([float(c.get("close") or 0.0) for c in rows])
+        volumes = np.array([float(c.get("volume") or 0.0) for c in rows])
+        buys = np.array([
+            np.nan if c.get("taker_buy_base_asset_volume") is None else float(c["taker_buy_base_asset_volume"])
+            for c in rows
+        ])
+
+        # Without taker data, attribute the whole candle to its direction
+        missing = np.isnan(buys)
+        buys[missing] = np.where(closes[missing] >= opens[missing], volumes[missing], 0.0)
+
+        profile.update(
+            [_to_millis(c["timestamp"]) for c in rows],
+            [float(c["low"]) for c in rows],
+            [float(c["high"]) for c in rows],
+            volumes,
+            np.clip(buys, 0.0, volumes)
+        )
+        return profile
+
+    @staticmethod
+    def to_records(profile: VolumeProfile, limit: Optional[int] = None) -> List[Dict[str, Any]]:
+        """
+        Convert a profile to volume_profile records.
+
+        Each price level yields a buying and a selling record with
+        price_level, volume and is_buying fields, the format used by
+        LiquidityAnalystAgent.preprocess_data.
+
+        Args:
+            profile: Volume profile
+            limit: Keep only the highest-volume levels
+
+        Returns:
+            List of records ordered by price level
+        """
+        levels = profile.levels()
+        order = np.argsort(levels["volume"])[::-1]
+        if limit is not None:
+            order = order[:limit]
+        order = np.sort(order)
+
+        records = []
+        for i in order:
+            price = float(levels["price_level"][i])
+            records.append({"price_level": price, "volume": float(levels["buy_volume"][i]), "is_buying": True})
+            records.append({"price_level": price, "volume": float(levels["sell_volume"][i]), "is_buying": False})
+        return records
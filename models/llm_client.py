@@ -12,6 +12,9 @@ import requests
 import time
 from typing import Dict, Any, List, Optional, Union, Tuple
 
+from utils.metrics import llm_fallbacks
+from utils.tracing import traced, set_attributes, LLM
+
 # Configure logging
 logging.basicConfig(
     level=logging.INFO,
@@ -295,6 +298,7 @@ class LLMClient:
                 
             return False
             
+    @traced(kind=LLM)
     def query(self, 
               prompt: str, 
               provider: Optional[str] = None,
@@ -322,12 +326,14 @@ class LLMClient:
         # Select provider
         provider_to_use = provider or self.provider
         model_to_use = model or self.model or "mistral"  # Changed from mixtral to mistral
+        set_attributes(provider=provider_to_use, model=model_to_use)
         
         # If local is requested but not available, fall back
         if provider_to_use == 'local' and not self._test_ollama_connection():
             fallbacks = [p for p, key in self.api_keys.items() if key and p != 'local']
             if fallbacks:
                 logger.warning(f"Ollama not available, falling back to {fallbacks[0]}")
+                llm_fallbacks.labels("local", fallbacks[0], "unavailable").inc()
                 provider_to_use = fallbacks[0]
                 model_to_use = self.default_models.get(provider_to_use, "mistral")  # Changed from mixtral to mistral
             else:
@@ -350,6 +356,7 @@ class LLMClient:
                 }
             
             logger.warning(f"Provider {provider_to_use} not available. Falling back to {available[0]}")
+            llm_fallbacks.labels(provider_to_use, available[0], "no_api_key").inc()
             provider_to_use = available[0]
             model_to_use = self.default_models.get(provider_to_use, "mistral")  # Changed from mixtral to mistral
             
@@ -384,6 +391,7 @@ class LLMClient:
                 fallbacks = [p for p, key in self.api_keys.items() if key and p != 'local']
                 if fallbacks:
                     logger.warning(f"Ollama query failed, trying fallback: {fallbacks[0]}")
+                    llm_fallbacks.labels("local", fallbacks[0], "error").inc()
                     return self.query(
                         prompt=prompt,
                         provider=fallbacks[0],
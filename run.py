@@ -34,23 +34,23 @@ except ImportError:
     except:
         print("Could not auto-install python-dotenv. Continuing without it.")
 
-# Import the data providers
-from agents.data_providers.binance_data_provider import BinanceDataProvider
-
-# Import the analyst agents
-from agents.base_agent import BaseAnalystAgent
-from agents.technical_analyst_agent import TechnicalAnalystAgent
-from agents.sentiment_aggregator_agent import SentimentAggregatorAgent
-from agents.liquidity_analyst_agent import LiquidityAnalystAgent
-from agents.funding_rate_analyst_agent import FundingRateAnalystAgent
-from agents.open_interest_analyst_agent import OpenInterestAnalystAgent
-from agents.decision_agent import DecisionAgent
+# Agents are registered lazily: their modules (and pandas, numpy, requests,
+# yaml behind them) are imported and the agents constructed on first use only
+from core.agent_registry import AgentRegistry
+from utils.config import config_cache, load_cached_config
+from utils.tracing import traced, set_attributes, current_trace_id, CYCLE
+from utils.metrics import trigger_delay, open_positions, start_http_server
 
 # Import the decision logger
 from core.logging.decision_logger import DecisionLogger, decision_logger
 
-# Import the performance tracker
-from analytics.performance_tracker import PerformanceTracker
+AGENTS = AgentRegistry()
+AGENTS.register("technical_analyst", "agents.technical_analyst_agent:TechnicalAnalystAgent")
+AGENTS.register("sentiment_aggregator", "agents.sentiment_aggregator_agent:SentimentAggregatorAgent")
+AGENTS.register("liquidity_analyst", "agents.liquidity_analyst_agent:LiquidityAnalystAgent")
+AGENTS.register("funding_rate_analyst", "agents.funding_rate_analyst_agent:FundingRateAnalystAgent")
+AGENTS.register("open_interest_analyst", "agents.open_interest_analyst_agent:OpenInterestAnalystAgent")
+AGENTS.register("decision", "agents.decision_agent:DecisionAgent")
 
 def setup_logging(log_level=None):
     """Set up logging configuration."""
@@ -104,10 +104,18 @@ def parse_arguments():
 class TradeBookManager:
     """
     Manages trade recording and performance tracking.
+    
+    Open trades are kept in the shared PortfolioState, so the agents see the
+    trades recorded here.
     """
     
-    def __init__(self, log_dir="logs"):
+    def __init__(self, log_dir="logs", portfolio_state=None):
+        # Imported here so `run.py --help` stays free of numpy
+        from core.trading.portfolio_state import TRADE_BOOK, portfolio_state as shared_portfolio_state
+        
         self.log_dir = log_dir
+        self.state = portfolio_state or shared_portfolio_state
+        self.owner = TRADE_BOOK
         self.trade_book_path = os.path.join(log_dir, "trade_book.jsonl")
         self.trade_performance_path = os.path.join(log_dir, "trade_performance.jsonl")
         self.rejected_trades_path = os.path.join(log_dir, "rejected_trades.jsonl")
@@ -115,12 +123,15 @@ class TradeBookManager:
         # Ensure log directory exists
         os.makedirs(log_dir, exist_ok=True)
         
-        self.open_trades = []
-        self.closed_trades = []
         self.rejected_trades = []
         
         logging.info(f"TradeBookManager initialized with log dir: {log_dir}")
     
+    @property
+    def open_trades(self):
+        """Open trades (from the current portfolio snapshot)."""
+        return self.state.snapshot().open_positions(self.owner)
+    
     def record_trade(self, trade_data):
         """Record a new trade."""
         if not isinstance(trade_data, dict):
@@ -132,7 +143,7 @@ class TradeBookManager:
             trade_data["timestamp"] = datetime.now().isoformat()
         
         # Add to open trades
-        self.open_trades.append(trade_data)
+        self.state.open_position(trade_data, self.owner)
         
         # Record to trade book
         with open(self.trade_book_path, "a") as f:
@@ -213,8 +224,13 @@ class DecisionTriggerScheduler:
         
         for interval, triggers in self.scheduled_triggers.items():
             interval_seconds = self._interval_to_seconds(interval)
+            last_execution = self.last_execution.get(interval, 0)
             
-            if current_time - self.last_execution.get(interval, 0) >= interval_seconds:
+            if current_time - last_execution >= interval_seconds:
+                # Lateness of this run relative to its due time (the main loop polls)
+                if last_execution:
+                    trigger_delay.labels(interval).observe(current_time - last_execution - interval_seconds)
+                
                 # Execute all triggers for this interval
                 for trigger in triggers:
                     callback = trigger["callback"]
@@ -316,7 +332,7 @@ def run_sentiment_demo(symbol="BTC/USDT"):
     print(f"Running sentiment analysis for {symbol}...")
     
     # Create and run the SentimentAggregatorAgent
-    sentiment_agent = SentimentAggregatorAgent()
+    sentiment_agent = AGENTS.get("sentiment_aggregator")
     
     result = sentiment_agent.analyze(symbol=symbol)
     
@@ -360,8 +376,8 @@ def run_sentiment_demo(symbol="BTC/USDT"):
 def run_technical_analysis(symbol, interval, data_provider):
     """Run technical analysis and log the results."""
     try:
-        # Initialize the technical analyst agent
-        tech_agent = TechnicalAnalystAgent(data_fetcher=data_provider)
+        # Get the technical analyst agent (constructed on first use)
+        tech_agent = AGENTS.get("technical_analyst", data_fetcher=data_provider)
         
         # Get agent's configured timeframe from its initialization
         # We don't pass the system interval to respect the agent-specific timeframe
@@ -388,8 +404,8 @@ def run_sentiment_analysis(symbol, interval, data_provider=None):
             logging.warning("XAI_API_KEY not found, sentiment analysis will be skipped")
             return {"status": "skipped", "reason": "XAI_API_KEY not found"}
         
-        # Initialize the sentiment agent
-        sentiment_agent = SentimentAggregatorAgent()
+        # Get the sentiment agent (constructed on first use)
+        sentiment_agent = AGENTS.get("sentiment_aggregator")
         
         # Get agent's configured timeframe from its initialization
         # We don't pass the system interval to respect the agent-specific timeframe
@@ -411,8 +427,8 @@ def run_sentiment_analysis(symbol, interval, data_provider=None):
 def run_liquidity_analysis(symbol, interval, data_provider):
     """Run liquidity analysis and log the results."""
     try:
-        # Initialize the liquidity analyst agent - note that it doesn't need a data_provider in constructor
-        liquidity_agent = LiquidityAnalystAgent()
+        # Get the liquidity analyst agent - note that it doesn't need a data_provider in constructor
+        liquidity_agent = AGENTS.get("liquidity_analyst")
         
         # Get agent's configured timeframe from its initialization
         # We don't pass the system interval to respect the agent-specific timeframe
@@ -434,8 +450,8 @@ def run_liquidity_analysis(symbol, interval, data_provider):
 def run_funding_rate_analysis(symbol, interval, data_provider):
     """Run funding rate analysis and log the results."""
     try:
-        # Initialize the funding rate analyst agent
-        funding_agent = FundingRateAnalystAgent()
+        # Get the funding rate analyst agent (constructed on first use)
+        funding_agent = AGENTS.get("funding_rate_analyst")
         
         # Get agent's configured timeframe from its initialization
         # We don't pass the system interval to respect the agent-specific timeframe
@@ -457,8 +473,8 @@ def run_funding_rate_analysis(symbol, interval, data_provider):
 def run_open_interest_analysis(symbol, interval, data_provider):
     """Run open interest analysis and log the results."""
     try:
-        # Initialize the open interest analyst agent
-        oi_agent = OpenInterestAnalystAgent()
+        # Get the open interest analyst agent (constructed on first use)
+        oi_agent = AGENTS.get("open_interest_analyst")
         
         # Get agent's configured timeframe from its initialization
         # We don't pass the system interval to respect the agent-specific timeframe
@@ -477,11 +493,13 @@ def run_open_interest_analysis(symbol, interval, data_provider):
         logging.error(f"Error in open interest analysis: {str(e)}", exc_info=True)
         return {"error": str(e), "status": "error"}
 
+@traced("trading_cycle", kind=CYCLE)
 def process_trading_decision(symbol, interval, data_provider, trade_book_manager, risk_guard, performance_tracker=None):
     """Process trading decisions from all agents and execute trades if approved."""
     try:
         # Log the start of the decision process for validation detection
-        logging.info(f"Starting trading decision process for {symbol} at {interval}")
+        set_attributes(symbol=symbol, interval=interval)
+        logging.info(f"Starting trading decision process for {symbol} at {interval} (trace {current_trace_id()})")
         
         # Get current price
         current_price = data_provider.get_current_price(symbol.replace("/", ""))
@@ -516,8 +534,8 @@ def process_trading_decision(symbol, interval, data_provider, trade_book_manager
                          if isinstance(value, dict) and not value.get("error")]
         logging.info(f"✅ Decision using: {', '.join(active_agents)}")
         
-        # Initialize the DecisionAgent and make a decision
-        decision_agent = DecisionAgent()
+        # Get the DecisionAgent and make a decision
+        decision_agent = AGENTS.get("decision")
         decision = decision_agent.make_decision(agent_analyses, symbol=symbol, interval=interval)
         
         # Create trade proposal based on the integrated decision
@@ -736,6 +754,7 @@ def main():
         logger.info("Initializing system components...")
         
         # Initialize data provider
+        from agents.data_providers.binance_data_provider import BinanceDataProvider
         try:
             # Determine if we should use testnet based on env
             use_testnet = os.getenv("BINANCE_USE_TESTNET", "false").lower() == "true"
@@ -794,11 +813,23 @@ def main():
             else:
                 raise
         
+        # Serve every agent timeframe from one stream of base interval candles
+        market_data_config = load_cached_config("config/settings.yaml").get("market_data", {})
+        base_interval = market_data_config.get("resample_base_interval")
+        if base_interval:
+            from data.feed.resampler import CandleResampler
+            data_provider = CandleResampler(
+                data_provider,
+                base_interval=base_interval,
+                max_age_seconds=market_data_config.get("resample_max_age_seconds", 60)
+            )
+        
         # Initialize trade book manager
         trade_book_manager = TradeBookManager()
         logger.info("Trade Book Manager initialized")
         
         # Initialize performance tracker
+        from analytics.performance_tracker import PerformanceTracker
         performance_tracker = PerformanceTracker()
         logger.info("Performance Tracker initialized")
         
@@ -878,6 +909,21 @@ def main():
                 
             logger.info(f"Test will run for {duration_str} ({duration_seconds} seconds)")
             
+            # Hot-reload settings.yaml edits into subscribed agents (e.g. RiskGuardAgent)
+            config_cache.start_watching()
+            
+            # Refresh funding rates and premium index for all perpetuals after each funding epoch
+            from data.derivatives_service import derivatives_data
+            derivatives_data.start_scheduler()
+            
+            # Prometheus metrics on http://127.0.0.1:9108/metrics (METRICS_PORT, METRICS_HOST)
+            if os.environ.get("METRICS_ENABLED", "true").lower() == "true":
+                open_positions.labels("trade_book").set_function(lambda: len(trade_book_manager.open_trades))
+                try:
+                    start_http_server()
+                except OSError as e:
+                    logger.warning(f"Metrics endpoint not started: {str(e)}")
+            
             while time.time() - runtime_start < duration_seconds:
                 # Check scheduled triggers
                 scheduler.check_triggers()
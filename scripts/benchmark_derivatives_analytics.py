@@ -0,0 +1,221 @@
+#!/usr/bin/env python3
+"""
+aGENtrader v2 Derivatives Analytics Benchmark
+
+This script compares the array kernels in analytics.derivatives_analytics
+against the per-symbol pure-Python loops the funding rate and open interest
+analysts used before. Both paths compute the same metrics (trend slopes,
+recent changes, correlation, funding averages, z-scores and percentiles)
+for a seeded random universe; results are checked for equality before
+timings are reported. The vectorized path is timed end to end (including
+converting the per-symbol lists) and for the kernels alone, which is what
+callers holding arrays already pay.
+
+Example:
+    python scripts/benchmark_derivatives_analytics.py --symbols 200 --points 30
+"""
+
+import os
+import sys
+import time
+import random
+import argparse
+import statistics
+from typing import Dict, Any, List, Callable
+
+import numpy as np
+
+# Add parent directory to path to allow importing from other modules
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from analytics.derivatives_analytics import (
+    to_matrix,
+    series_lengths,
+    linear_slope,
+    trend_labels,
+    pearson_correlation,
+    latest_zscore,
+    latest_percentile,
+    oi_price_divergence
+)
+
+
+def parse_args() -> argparse.Namespace:
+    """Parse command line arguments."""
+    parser = argparse.ArgumentParser(description='Benchmark vectorized derivatives analytics')
+    parser.add_argument('--symbols', type=int, default=200, help='Number of symbols (default: 200)')
+    parser.add_argument('--points', type=int, default=30, help='Data points per symbol (default: 30)')
+    parser.add_argument('--repeat', type=int, default=20, help='Timed repetitions (default: 20)')
+    parser.add_argument('--seed', type=int, default=42, help='Random seed (default: 42)')
+    return parser.parse_args()
+
+
+def generate_universe(symbols: int, points: int, seed: int) -> Dict[str, Dict[str, List[float]]]:
+    """
+    Generate random funding rate, open interest and price series (newest first).
+
+    Series lengths vary between symbols so the ragged-input path is exercised.
+    """
+    rng = random.Random(seed)
+    universe = {}
+    for i in range(symbols):
+        n = rng.randint(max(2, points // 2), points)
+        price = rng.uniform(1, 50000)
+        oi = rng.uniform(1e5, 1e9)
+        prices, oi_values, rates = [], [], []
+        for _ in range(n):
+            price *= 1 + rng.gauss(0, 0.01)
+            oi *= 1 + rng.gauss(0, 0.02)
+            prices.append(price)
+            oi_values.append(oi)
+            rates.append(rng.gauss(0.0001, 0.0005))
+        universe[f"SYM{i}USDT"] = {"price": prices, "open_interest": oi_values, "funding_rate": rates}
+    return universe
+
+
+# Reference implementations (the previous per-symbol agent code)
+
+def reference_trend(values: List[float]) -> str:
+    """OpenInterestAnalystAgent.determine_trend before vectorization."""
+    if not values or len(values) < 2:
+        return "flat"
+    x = list(range(len(values)))
+    n = len(x)
+    sum_x = sum(x)
+    sum_y = sum(values)
+    sum_xy = sum(x_val * y_val for x_val, y_val in zip(x, values))
+    sum_xx = sum(x_val ** 2 for x_val in x)
+    if (n * sum_xx - sum_x ** 2) == 0:
+        return "flat"
+    slope = (n * sum_xy - sum_x * sum_y) / (n * sum_xx - sum_x ** 2)
+    if slope > 0.001:
+        return "rising"
+    elif slope < -0.001:
+        return "falling"
+    return "flat"
+
+
+def reference_correlation(series1: List[float], series2: List[float]) -> float:
+    """OpenInterestAnalystAgent.calculate_correlation before vectorization."""
+    min_len = min(len(series1), len(series2))
+    if min_len < 2:
+        return 0.0
+    series1, series2 = series1[:min_len], series2[:min_len]
+    mean1, mean2 = sum(series1) / min_len, sum(series2) / min_len
+    numerator = sum((series1[i] - mean1) * (series2[i] - mean2) for i in range(min_len))
+    denominator1 = sum((x - mean1) ** 2 for x in series1)
+    denominator2 = sum((x - mean2) ** 2 for x in series2)
+    if denominator1 == 0 or denominator2 == 0:
+        return 0.0
+    return max(-1.0, min(1.0, numerator / ((denominator1 ** 0.5) * (denominator2 ** 0.5))))
+
+
+def reference_analytics(universe: Dict[str, Dict[str, List[float]]]) -> Dict[str, Dict[str, Any]]:
+    """Per-symbol loop computing every metric."""
+    results = {}
+    for symbol, series in universe.items():
+        oi_values, prices, rates = series["open_interest"], series["price"], series["funding_rate"]
+        recent_oi_change = (oi_values[0] - oi_values[4]) / oi_values[4] if len(oi_values) > 4 and oi_values[4] > 0 else 0
+        recent_price_change = (prices[0] - prices[4]) / prices[4] if len(prices) > 4 and prices[4] > 0 else 0
+
+        mean = sum(rates) / len(rates)
+        std = (sum((r - mean) ** 2 for r in rates) / len(rates)) ** 0.5
+        results[symbol] = {
+            "oi_trend": reference_trend(oi_values[:5]),
+            "price_trend": reference_trend(prices[:5]),
+            "recent_oi_change": recent_oi_change,
+            "recent_price_change": recent_price_change,
+            "oi_price_correlation": reference_correlation(oi_values[:10], prices[:10]),
+            "average_rate": mean,
+            "rate_trend": rates[0] - rates[-1] if len(rates) > 1 else 0,
+            "rate_zscore": (rates[0] - mean) / std if std > 0 else 0.0,
+            "rate_percentile": sum(1 for r in rates if r <= rates[0]) / len(rates) * 100
+        }
+    return results
+
+
+def build_matrices(universe: Dict[str, Dict[str, List[float]]]) -> Dict[str, np.ndarray]:
+    """Stack the universe into NaN-padded matrices (one row per symbol)."""
+    return {
+        key: to_matrix([series[key] for series in universe.values()])
+        for key in ("open_interest", "price", "funding_rate")
+    }
+
+
+def vectorized_kernels(matrices: Dict[str, np.ndarray]) -> Dict[str, np.ndarray]:
+    """All symbols in one pass of the array kernels."""
+    oi_values, prices, rates = matrices["open_interest"], matrices["price"], matrices["funding_rate"]
+    divergence = oi_price_divergence(oi_values, prices, 0, 4)
+
+    lengths = series_lengths(rates)
+    last_rates = rates[np.arange(len(rates)), np.maximum(lengths - 1, 0)]
+    return {
+        "oi_trend": trend_labels(linear_slope(oi_values[:, :5])),
+        "price_trend": trend_labels(linear_slope(prices[:, :5])),
+        "recent_oi_change": divergence["oi_change"],
+        "recent_price_change": divergence["price_change"],
+        "oi_price_correlation": pearson_correlation(oi_values[:, :10], prices[:, :10]),
+        "average_rate": np.nansum(rates, axis=1) / np.maximum(lengths, 1),
+        "rate_trend": np.where(lengths > 1, rates[:, 0] - last_rates, 0.0),
+        "rate_zscore": latest_zscore(rates),
+        "rate_percentile": latest_percentile(rates)
+    }
+
+
+def vectorized_analytics(universe: Dict[str, Dict[str, List[float]]]) -> Dict[str, Dict[str, Any]]:
+    """Vectorized path end to end: list conversion, kernels and per-symbol results."""
+    metrics = vectorized_kernels(build_matrices(universe))
+    return {
+        symbol: {key: values[row].item() for key, values in metrics.items()}
+        for row, symbol in enumerate(universe)
+    }
+
+
+def check_equal(expected: Dict[str, Dict[str, Any]], actual: Dict[str, Dict[str, Any]]) -> List[str]:
+    """List mismatching (symbol, metric) pairs."""
+    mismatches = []
+    for symbol, metrics in expected.items():
+        for key, value in metrics.items():
+            other = actual[symbol][key]
+            if isinstance(value, str):
+                equal = value == other
+            else:
+                equal = abs(value - other) <= 1e-9 * max(1.0, abs(value))
+            if not equal:
+                mismatches.append(f"{symbol}.{key}: {value!r} != {other!r}")
+    return mismatches
+
+
+def time_it(func: Callable, argument: Any, repeat: int) -> float:
+    """Median wall time of func(argument) in milliseconds."""
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func(argument)
+        samples.append((time.perf_counter() - started) * 1000)
+    return statistics.median(samples)
+
+
+def main() -> None:
+    """Run the benchmark."""
+    args = parse_args()
+    universe = generate_universe(args.symbols, args.points, args.seed)
+
+    mismatches = check_equal(reference_analytics(universe), vectorized_analytics(universe))
+    if mismatches:
+        print(f"{len(mismatches)} mismatches between reference and vectorized results:")
+        for line in mismatches[:20]:
+            print(f"  {line}")
+        sys.exit(1)
+
+    reference_ms = time_it(reference_analytics, universe, args.repeat)
+    vectorized_ms = time_it(vectorized_analytics, universe, args.repeat)
+    kernels_ms = time_it(vectorized_kernels, build_matrices(universe), args.repeat)
+    print(f"{args.symbols} symbols x up to {args.points} points (median of {args.repeat} runs)")
+    print(f"  reference (per-symbol loops):  {reference_ms:>9.3f} ms")
+    print(f"  vectorized (end to end):       {vectorized_ms:>9.3f} ms  ({reference_ms / vectorized_ms:.1f}x)")
+    print(f"  vectorized (kernels only):     {kernels_ms:>9.3f} ms  ({reference_ms / kernels_ms:.1f}x)")
+
+
+if __name__ == "__main__":
+    main()
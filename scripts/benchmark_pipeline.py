@@ -0,0 +1,592 @@
+#!/usr/bin/env python3
+"""
+aGENtrader v2 Pipeline Benchmark
+
+This script times the decision pipeline on deterministic inputs: a seeded
+MockDataProvider, a seeded stand-in for the Binance futures endpoints and a
+stub LLM that answers instantly with a fixed decision. Nothing touches the
+network, and files the pipeline writes (sentiment feed, trade logs, SQLite
+database) go to a temporary directory.
+
+Cases:
+- agent.<name>.analyze: each analyst agent on warm caches
+- decision.make_decision.*: weighted and LLM-synthesis paths
+- orchestrator.process_market_event: one market event end to end
+- performance_tracker.process_trades.*: synthetic 10k and 100k trade logs
+- database.save_market_data: bulk ingest of klines into a fresh SQLite file
+
+Each case reports the median, min and max of --repeat timed runs after
+--warmup untimed ones. A case whose component cannot be built, raises or
+returns an error result ("status": "error" or an "error" key) is reported
+with its error instead of a timing, so the suite still covers the rest and
+never times an early-return failure path. Reports can be saved as a JSON baseline and later runs compared
+against it; a median slower than the baseline by more than --tolerance is a
+regression and makes the command exit with status 1.
+
+Example:
+    python scripts/benchmark_pipeline.py --save benchmarks/baselines/pipeline.json
+    python scripts/benchmark_pipeline.py --compare benchmarks/baselines/pipeline.json
+    python scripts/benchmark_pipeline.py --only decision --repeat 20
+"""
+
+import os
+import sys
+import json
+import time
+import random
+import shutil
+import logging
+import argparse
+import platform
+import tempfile
+import statistics
+from datetime import datetime, timedelta
+from typing import Dict, Any, List, Optional, Callable
+
+# Add parent directory to path to allow importing from other modules
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(ROOT_DIR)
+
+from agents.data_providers.mock_data_provider import MockDataProvider
+from core.backtest.stub_llm import StubLLMClient
+
+SYMBOL = "BTCUSDT"
+DISPLAY_SYMBOL = "BTC/USDT"
+INTERVAL = "1h"
+
+# Answer of the stub LLM to every prompt
+LLM_RESPONSE = {
+    "action": "HOLD",
+    "pair": DISPLAY_SYMBOL,
+    "confidence": 55,
+    "reason": "Benchmark stub response"
+}
+
+# Answer of the stub Grok client to SentimentAggregatorAgent
+GROK_RESPONSE = {
+    "rating": 4,
+    "confidence": 0.7,
+    "summary": "Benchmark stub sentiment",
+    "signals": ["Stub signal 1", "Stub signal 2", "Stub signal 3"]
+}
+
+
+def parse_args() -> argparse.Namespace:
+    """Parse command line arguments."""
+    parser = argparse.ArgumentParser(description='Benchmark the decision pipeline on deterministic inputs')
+    parser.add_argument('--repeat', type=int, default=5, help='Timed runs per case (default: 5)')
+    parser.add_argument('--warmup', type=int, default=1, help='Untimed runs before timing (default: 1)')
+    parser.add_argument('--seed', type=int, default=42, help='Random seed (default: 42)')
+    parser.add_argument('--ingest-rows', type=int, default=2000,
+                        help='Klines per save_market_data run (default: 2000)')
+    parser.add_argument('--only', action='append', default=None,
+                        help='Run only cases whose name contains this text (repeatable)')
+    parser.add_argument('--list', action='store_true', help='List case names and exit')
+    parser.add_argument('--save', default=None, help='Save the report as a JSON baseline')
+    parser.add_argument('--compare', default=None, help='Compare against a JSON baseline')
+    parser.add_argument('--tolerance', type=float, default=0.25,
+                        help='Allowed relative slowdown when comparing (default: 0.25)')
+    parser.add_argument('--verbose', action='store_true', help='Keep pipeline logging enabled')
+    return parser.parse_args()
+
+
+# Deterministic stand-ins
+
+class SyntheticFuturesProvider:
+    """
+    Answers the Binance futures endpoints used by DerivativesDataService
+    (premium index, funding rate history, open interest history) from a
+    seeded random generator.
+    """
+
+    FUNDING_EPOCH_MS = 8 * 3_600_000
+    PERIOD_MS = {"5m": 300_000, "15m": 900_000, "30m": 1_800_000, "1h": 3_600_000, "2h": 7_200_000,
+                 "4h": 14_400_000, "6h": 21_600_000, "12h": 43_200_000, "1d": 86_400_000}
+
+    def __init__(self, seed: int, symbols: List[str]):
+        """
+        Initialize the provider.
+
+        Args:
+            seed: Random seed
+            symbols: Perpetual symbols to list
+        """
+        self.random = random.Random(seed)
+        self.symbols = symbols
+
+    def _make_request(self, endpoint: str, method: str = "GET", params: Optional[Dict[str, Any]] = None,
+                      signed: bool = False, use_futures_api: bool = False) -> Any:
+        """Serve a futures endpoint."""
+        params = params or {}
+        now = int(time.time() * 1000)
+        if endpoint == "/fapi/v1/premiumIndex":
+            next_funding = (now // self.FUNDING_EPOCH_MS + 1) * self.FUNDING_EPOCH_MS
+            return [{
+                "symbol": symbol,
+                "markPrice": str(self.random.uniform(1, 50000)),
+                "indexPrice": str(self.random.uniform(1, 50000)),
+                "lastFundingRate": str(self.random.gauss(0.0001, 0.0003)),
+                "interestRate": "0.0001",
+                "nextFundingTime": next_funding,
+                "time": now
+            } for symbol in self.symbols]
+
+        if endpoint == "/fapi/v1/fundingRate":
+            start = int(params.get("startTime", now - 30 * self.FUNDING_EPOCH_MS))
+            first = (start // self.FUNDING_EPOCH_MS + 1) * self.FUNDING_EPOCH_MS
+            return [{
+                "symbol": symbol,
+                "fundingTime": funding_time,
+                "fundingRate": str(self.random.gauss(0.0001, 0.0003))
+            } for funding_time in range(first, now, self.FUNDING_EPOCH_MS) for symbol in self.symbols][:1000]
+
+        if endpoint == "/futures/data/openInterestHist":
+            return self.fetch_futures_open_interest(params["symbol"], params.get("period", "4h"),
+                                                    int(params.get("limit", 30)), params.get("startTime"))
+
+        raise ValueError(f"Endpoint not simulated: {endpoint}")
+
+    def fetch_futures_open_interest(self, symbol: str, interval: str = "4h", limit: int = 30,
+                                    start_time: Optional[int] = None) -> List[Dict[str, Any]]:
+        """Open interest history, oldest first."""
+        period = self.PERIOD_MS.get(interval, self.PERIOD_MS["4h"])
+        last = int(time.time() * 1000) // period * period
+        times = [last - i * period for i in range(limit)][::-1]
+        if start_time is not None:
+            times = [t for t in times if t >= int(start_time)]
+        oi = self.random.uniform(1e5, 1e9)
+        records = []
+        for timestamp in times:
+            oi *= 1 + self.random.gauss(0, 0.02)
+            records.append({
+                "symbol": symbol,
+                "sumOpenInterest": str(oi),
+                "sumOpenInterestValue": str(oi * 50000),
+                "timestamp": timestamp
+            })
+        return records
+
+
+class BenchmarkContext:
+    """
+    Shared inputs for all cases, built once from the seed.
+    """
+
+    def __init__(self, seed: int, ingest_rows: int, work_dir: str):
+        """
+        Build the fixtures.
+
+        Args:
+            seed: Random seed
+            ingest_rows: Klines per save_market_data run
+            work_dir: Directory for files written by the pipeline
+        """
+        self.seed = seed
+        self.ingest_rows = ingest_rows
+        self.work_dir = work_dir
+        self.random = random.Random(seed)
+        self.provider = MockDataProvider(symbol=SYMBOL, seed=seed)
+        self.futures = SyntheticFuturesProvider(seed, [SYMBOL, "ETHUSDT", "SOLUSDT", "BNBUSDT"])
+        self.llm = StubLLMClient(LLM_RESPONSE, agent_name="benchmark")
+        self.ohlcv = self.provider.fetch_ohlcv(SYMBOL, INTERVAL, limit=200)
+        self.order_book = self.make_order_book(self.provider.base_price, levels=100)
+        self._derivatives = None
+
+    def make_order_book(self, mid_price: float, levels: int) -> Dict[str, Any]:
+        """Depth snapshot in the fetch_market_depth format."""
+        tick = mid_price * 0.0001
+        bids = [[mid_price - tick * (i + 1), self.random.uniform(0.01, 5.0)] for i in range(levels)]
+        asks = [[mid_price + tick * (i + 1), self.random.uniform(0.01, 5.0)] for i in range(levels)]
+        return {"symbol": SYMBOL, "bids": bids, "asks": asks, "timestamp": int(time.time() * 1000)}
+
+    def market_event(self) -> Dict[str, Any]:
+        """Market event as produced by the live feed."""
+        return {
+            "symbol": DISPLAY_SYMBOL,
+            "timestamp": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+            "price": self.ohlcv[-1]["close"],
+            "ohlcv": self.ohlcv,
+            "orderbook": self.order_book
+        }
+
+    @property
+    def derivatives(self) -> Any:
+        """DerivativesDataService backed by the synthetic futures provider."""
+        if self._derivatives is None:
+            from data.derivatives_service import DerivativesDataService
+            self._derivatives = DerivativesDataService(provider=self.futures)
+        return self._derivatives
+
+    def use_fixtures(self, agent: Any) -> Any:
+        """Point an agent's data sources and LLM at the deterministic stand-ins."""
+        if hasattr(agent, "llm_client"):
+            agent.llm_client = self.llm
+        for attribute in ("data_provider", "data_fetcher"):
+            if hasattr(agent, attribute):
+                setattr(agent, attribute, self.provider)
+        if hasattr(agent, "sentiment_store"):
+            from data.sentiment_store import SentimentHistoryStore
+            agent.sentiment_store = SentimentHistoryStore(
+                os.path.join(self.work_dir, "sentiment_feed.jsonl"),
+                max_recent=getattr(agent, "max_history_size", 100)
+            )
+        if hasattr(agent, "fetch_price_data"):
+            candles = [dict(candle, timestamp=candle["time"]) for candle in self.ohlcv]
+            agent.fetch_price_data = lambda symbol, interval: candles
+        return agent
+
+
+class Benchmark:
+    """
+    One timed case: run() is timed, reset() (if any) runs untimed before
+    each run.
+    """
+
+    def __init__(self, run: Callable[[], Any], reset: Optional[Callable[[], None]] = None,
+                 params: Optional[Dict[str, Any]] = None):
+        self.run = run
+        self.reset = reset
+        self.params = params or {}
+
+
+# Cases
+
+def analyst_case(module: str, class_name: str, **kwargs) -> Callable[[BenchmarkContext], Benchmark]:
+    """Case timing an analyst agent's analyze(SYMBOL, INTERVAL, **kwargs)."""
+    def build(ctx: BenchmarkContext) -> Benchmark:
+        import importlib
+        agent_module = importlib.import_module(module)
+        if hasattr(agent_module, "derivatives_data"):
+            agent_module.derivatives_data = ctx.derivatives
+        agent = ctx.use_fixtures(getattr(agent_module, class_name)())
+        arguments = {key: value(ctx) if callable(value) else value for key, value in kwargs.items()}
+        return Benchmark(lambda: agent.analyze(SYMBOL, INTERVAL, **arguments))
+    return build
+
+
+def technical_analyst_case(ctx: BenchmarkContext) -> Benchmark:
+    """TechnicalAnalystAgent.analyze on the seeded candles."""
+    from agents.technical_analyst_agent import TechnicalAnalystAgent
+    agent = ctx.use_fixtures(TechnicalAnalystAgent(data_fetcher=ctx.provider))
+    return Benchmark(lambda: agent.analyze(SYMBOL, INTERVAL, market_data={"ohlcv": ctx.ohlcv}))
+
+
+def sentiment_aggregator_case(ctx: BenchmarkContext) -> Benchmark:
+    """SentimentAggregatorAgent.analyze with a stub Grok client."""
+    from agents.sentiment_aggregator_agent import SentimentAggregatorAgent
+    agent = ctx.use_fixtures(SentimentAggregatorAgent(data_fetcher=ctx.provider))
+    agent.llm_client = StubLLMClient(GROK_RESPONSE, agent_name="benchmark")
+    agent.llm_client.api_keys = {"grok": "benchmark"}
+    agent.sentiment_log_path = os.path.join(ctx.work_dir, "sentiment_aggregator.jsonl")
+    return Benchmark(lambda: agent.analyze(SYMBOL, INTERVAL))
+
+
+def agent_analyses() -> Dict[str, Any]:
+    """Fixed analyst outputs covering all agents."""
+    return {
+        "technical_analysis": {"signal": "BUY", "confidence": 72, "reason": "Trend up"},
+        "sentiment_analysis": {"signal": "NEUTRAL", "confidence": 55, "reason": "Mixed"},
+        "liquidity_analysis": {"signal": "BUY", "confidence": 64, "reason": "Bid support"},
+        "funding_rate_analysis": {"signal": "SELL", "confidence": 58, "reason": "Crowded longs"},
+        "open_interest_analysis": {"signal": "BUY", "confidence": 61, "reason": "OI rising with price"}
+    }
+
+
+def decision_weighted_case(ctx: BenchmarkContext) -> Benchmark:
+    """DecisionAgent.make_decision with all analysts (weighted path)."""
+    from agents.decision_agent import DecisionAgent
+    agent = ctx.use_fixtures(DecisionAgent())
+    analyses = agent_analyses()
+    return Benchmark(lambda: agent.make_decision(analyses, symbol=DISPLAY_SYMBOL, interval=INTERVAL))
+
+
+def decision_llm_case(ctx: BenchmarkContext) -> Benchmark:
+    """DecisionAgent.make_decision with one analyst (LLM synthesis path)."""
+    from agents.decision_agent import DecisionAgent
+    agent = ctx.use_fixtures(DecisionAgent())
+    analyses = {"technical_analysis": agent_analyses()["technical_analysis"]}
+    return Benchmark(lambda: agent.make_decision(analyses, symbol=DISPLAY_SYMBOL, interval=INTERVAL))
+
+
+def orchestrator_case(ctx: BenchmarkContext) -> Benchmark:
+    """CoreOrchestrator.process_market_event end to end."""
+    from core.core_orchestrator import CoreOrchestrator
+    orchestrator = CoreOrchestrator()
+    if not any(name.endswith("_analyst") for name in orchestrator.agents):
+        # Without configured analysts the decision would be the error fallback
+        from agents.technical_analyst_agent import TechnicalAnalystAgent
+        from agents.liquidity_analyst_agent import LiquidityAnalystAgent
+        orchestrator.agents["technical_analyst"] = TechnicalAnalystAgent()
+        orchestrator.agents["liquidity_analyst"] = LiquidityAnalystAgent()
+    for agent in orchestrator.agents.values():
+        ctx.use_fixtures(agent)
+    event = ctx.market_event()
+    return Benchmark(lambda: orchestrator.process_market_event(event))
+
+
+def write_trade_log(path: str, trades: int, seed: int) -> None:
+    """
+    Write a synthetic trade log in the TradePerformanceTracker format.
+
+    70% of the trades have a close event. Open trades are recent, with stop
+    and target levels around the tracker's reference prices so a share of
+    them closes on each pass.
+    """
+    rng = random.Random(seed)
+    pairs = {"BTC/USDT": 85000, "ETH/USDT": 3500, "BNB/USDT": 600, "SOL/USDT": 150}
+    start = datetime.now() - timedelta(days=90)
+    lines = []
+    for i in range(trades):
+        pair = rng.choice(list(pairs))
+        reference = pairs[pair]
+        action = rng.choice(["BUY", "SELL"])
+        closed = rng.random() < 0.7
+        opened = start + timedelta(minutes=i * 90 * 24 * 60 / trades) if closed \
+            else datetime.now() - timedelta(minutes=rng.uniform(1, 600))
+        entry = reference * (1 + rng.uniform(-0.01, 0.01))
+        direction = 1 if action == "BUY" else -1
+        trade_id = f"bench-{i:07d}"
+        lines.append(json.dumps({
+            "trade_id": trade_id,
+            "pair": pair,
+            "action": action,
+            "entry_price": entry,
+            "position_size": rng.uniform(0.01, 1.0),
+            "stop_loss": entry * (1 - direction * rng.uniform(0.004, 0.03)),
+            "take_profit": entry * (1 + direction * rng.uniform(0.004, 0.05)),
+            "confidence": rng.randint(50, 95),
+            "timestamp": opened.isoformat()
+        }))
+        if closed:
+            pnl = rng.gauss(0.2, 2.0)
+            lines.append(json.dumps({
+                "type": "trade_close",
+                "trade_id": trade_id,
+                "timestamp": (opened + timedelta(hours=rng.uniform(0.5, 48))).isoformat(),
+                "exit_price": entry * (1 + direction * pnl / 100),
+                "reason": rng.choice(["take_profit", "stop_loss", "timeout"]),
+                "pnl_percentage": pnl,
+                "pnl_absolute": pnl
+            }))
+    with open(path, 'w') as f:
+        f.write("\n".join(lines) + "\n")
+
+
+def process_trades_case(trades: int) -> Callable[[BenchmarkContext], Benchmark]:
+    """TradePerformanceTracker.process_trades over a synthetic trade log."""
+    def build(ctx: BenchmarkContext) -> Benchmark:
+        from analytics.trade_performance_tracker import TradePerformanceTracker
+        tracker = TradePerformanceTracker()
+        directory = os.path.join(ctx.work_dir, f"trades_{trades}")
+        os.makedirs(directory, exist_ok=True)
+        fixture = os.path.join(directory, "fixture.jsonl")
+        write_trade_log(fixture, trades, ctx.seed)
+
+        tracker.trade_log_file = os.path.join(directory, "trade_log.jsonl")
+        tracker.active_trades_file = os.path.join(directory, "active_trades.json")
+        tracker.closed_trades_file = os.path.join(directory, "closed_trades.jsonl")
+        tracker.performance_report_file = os.path.join(directory, "performance_report.json")
+
+        def reset() -> None:
+            # process_trades appends close events, so every run starts from the fixture
+            shutil.copyfile(fixture, tracker.trade_log_file)
+            for path in (tracker.active_trades_file, tracker.closed_trades_file):
+                if os.path.exists(path):
+                    os.remove(path)
+
+        return Benchmark(tracker.process_trades, reset, {"trades": trades})
+    return build
+
+
+def save_market_data_case(ctx: BenchmarkContext) -> Benchmark:
+    """DatabaseConnector.save_market_data bulk ingest into a fresh SQLite file."""
+    from data.database import DatabaseConnector
+
+    rows = ctx.ingest_rows
+    candles = MockDataProvider(symbol=SYMBOL, seed=ctx.seed).fetch_ohlcv(SYMBOL, "1m", limit=rows)
+    records = [{
+        "symbol": SYMBOL,
+        "interval": "1m",
+        "timestamp": datetime.fromtimestamp(candle["time"] / 1000).isoformat(),
+        "open": candle["open"],
+        "high": candle["high"],
+        "low": candle["low"],
+        "close": candle["close"],
+        "volume": candle["volume"],
+        "taker_buy_base_asset_volume": candle["taker_buy_base_asset_volume"],
+        "data_source": "benchmark"
+    } for candle in candles]
+
+    db_path = os.path.join(ctx.work_dir, "ingest.db")
+    state = {}
+
+    def reset() -> None:
+        if state.get("db") is not None:
+            state["db"].disconnect()
+        if os.path.exists(db_path):
+            os.remove(db_path)
+        state["db"] = DatabaseConnector({"db_type": "sqlite", "db_path": db_path})
+
+    def run() -> None:
+        if not state["db"].save_market_data(records):
+            raise RuntimeError("save_market_data returned False")
+
+    return Benchmark(run, reset, {"rows": rows})
+
+
+CASES = {
+    "agent.technical_analyst.analyze": technical_analyst_case,
+    "agent.sentiment_analyst.analyze": analyst_case("agents.sentiment_analyst_agent", "SentimentAnalystAgent"),
+    "agent.sentiment_aggregator.analyze": sentiment_aggregator_case,
+    "agent.liquidity_analyst.analyze": analyst_case(
+        "agents.liquidity_analyst_agent", "LiquidityAnalystAgent",
+        market_data=lambda ctx: {"orderbook": ctx.order_book}),
+    "agent.funding_rate_analyst.analyze": analyst_case("agents.funding_rate_analyst_agent", "FundingRateAnalystAgent"),
+    "agent.open_interest_analyst.analyze": analyst_case(
+        "agents.open_interest_analyst_agent", "OpenInterestAnalystAgent"),
+    "decision.make_decision.weighted": decision_weighted_case,
+    "decision.make_decision.llm": decision_llm_case,
+    "orchestrator.process_market_event": orchestrator_case,
+    "performance_tracker.process_trades.10k": process_trades_case(10_000),
+    "performance_tracker.process_trades.100k": process_trades_case(100_000),
+    "database.save_market_data": save_market_data_case
+}
+
+
+# Runner
+
+def result_error(result: Any) -> Optional[str]:
+    """Error reported by a case's result dictionary, or None."""
+    if not isinstance(result, dict):
+        return None
+    if result.get("status") == "error" or result.get("error"):
+        return f"{result.get('error') or 'error'}: {result.get('reason') or result.get('error_message', '')}"
+    return None
+
+
+def run_case(name: str, build: Callable[[BenchmarkContext], Benchmark], ctx: BenchmarkContext,
+             repeat: int, warmup: int) -> Dict[str, Any]:
+    """Build and time one case."""
+    random.seed(ctx.seed)
+    try:
+        import numpy as np
+        np.random.seed(ctx.seed)
+    except ImportError:
+        pass
+
+    try:
+        benchmark = build(ctx)
+        samples = []
+        for i in range(warmup + repeat):
+            if benchmark.reset is not None:
+                benchmark.reset()
+            started = time.perf_counter()
+            result = benchmark.run()
+            elapsed_ms = (time.perf_counter() - started) * 1000
+            error = result_error(result)
+            if error:
+                return {"status": "error", "error": error[:300]}
+            if i >= warmup:
+                samples.append(elapsed_ms)
+    except Exception as e:
+        return {"status": "error", "error": f"{type(e).__name__}: {str(e)}"[:300]}
+
+    return {
+        "status": "ok",
+        "median_ms": statistics.median(samples),
+        "min_ms": min(samples),
+        "max_ms": max(samples),
+        "runs": len(samples),
+        "params": benchmark.params
+    }
+
+
+def build_report(args: argparse.Namespace) -> Dict[str, Any]:
+    """Run the selected cases."""
+    names = [name for name in CASES if not args.only or any(text in name for text in args.only)]
+    work_dir = tempfile.mkdtemp(prefix="agentrader_bench_")
+    # Agents open their SQLite database on construction; keep it out of the repo
+    os.environ["DB_PATH"] = os.path.join(work_dir, "agentrader.db")
+
+    try:
+        ctx = BenchmarkContext(args.seed, args.ingest_rows, work_dir)
+        cases = {}
+        for name in names:
+            result = run_case(name, CASES[name], ctx, args.repeat, args.warmup)
+            cases[name] = result
+            if result["status"] == "ok":
+                print(f"  {name:<42} {result['median_ms']:>10.3f} ms  "
+                      f"(min {result['min_ms']:.3f}, max {result['max_ms']:.3f})")
+            else:
+                print(f"  {name:<42} {'ERROR':>10}     {result['error']}")
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+    return {
+        "command": "python scripts/benchmark_pipeline.py",
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "seed": args.seed,
+        "repeat": args.repeat,
+        "warmup": args.warmup,
+        "cases": cases
+    }
+
+
+def compare(report: Dict[str, Any], baseline: Dict[str, Any], tolerance: float) -> bool:
+    """Print a comparison against a baseline; returns False on regression."""
+    ok = True
+    if report["seed"] != baseline.get("seed"):
+        print(f"Note: seed {report['seed']} differs from the baseline's {baseline.get('seed')}")
+
+    for name, current in report["cases"].items():
+        previous = baseline.get("cases", {}).get(name)
+        if previous is None or previous.get("status") != "ok":
+            print(f"{name:<42} {'(no baseline)':>24}")
+            continue
+        if current["status"] != "ok":
+            ok = False
+            print(f"{name:<42} {previous['median_ms']:>10.3f} ->      ERROR  {current['error']}")
+            continue
+        if current.get("params") != previous.get("params"):
+            print(f"{name:<42} parameters changed ({previous.get('params')} -> {current.get('params')}), not compared")
+            continue
+
+        change = (current["median_ms"] - previous["median_ms"]) / previous["median_ms"] if previous["median_ms"] else 0.0
+        regressed = change > tolerance
+        ok = ok and not regressed
+        print(f"{name:<42} {previous['median_ms']:>10.3f} -> {current['median_ms']:>10.3f} ms  "
+              f"({change:+.1%}){'  REGRESSION' if regressed else ''}")
+    return ok
+
+
+def main() -> None:
+    """Run the benchmarks and optionally save or compare a baseline."""
+    args = parse_args()
+    if args.list:
+        print("\n".join(CASES))
+        return
+    if not args.verbose:
+        logging.disable(logging.WARNING)
+    # Span export would add file I/O to every timed run; opt in with TRACE_EXPORTER
+    os.environ.setdefault("TRACE_EXPORTER", "none")
+
+    print(f"Pipeline benchmark (seed {args.seed}, median of {args.repeat} runs after {args.warmup} warmup)")
+    report = build_report(args)
+
+    if args.save:
+        os.makedirs(os.path.dirname(os.path.abspath(args.save)), exist_ok=True)
+        with open(args.save, 'w') as f:
+            json.dump(report, f, indent=2)
+        print(f"\nBaseline written to {args.save}")
+
+    if args.compare:
+        with open(args.compare, 'r') as f:
+            baseline = json.load(f)
+        print()
+        if not compare(report, baseline, args.tolerance):
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,157 @@
+#!/usr/bin/env python3
+"""
+aGENtrader v2 Startup Profiler
+
+This script measures startup cost of run.py with `python -X importtime`:
+total import time, wall time of `run.py --help`, and the heaviest top-level
+imports. Reports can be saved as a baseline and later runs compared against
+it, so startup regressions (e.g. an agent import creeping back to module
+level) show up in review.
+
+Example:
+    python scripts/profile_startup.py --save benchmarks/baselines/startup_importtime.json
+    python scripts/profile_startup.py --compare benchmarks/baselines/startup_importtime.json
+"""
+
+import os
+import re
+import sys
+import json
+import time
+import argparse
+import platform
+import statistics
+import subprocess
+from typing import Dict, Any, List
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+IMPORTTIME_LINE = re.compile(r"^import time:\s+(\d+)\s+\|\s+(\d+)\s+\|(\s*)(\S+)")
+
+# Modules that must not be imported by `run.py --help`
+HEAVY_MODULES = ["pandas", "numpy", "requests", "yaml", "agents.technical_analyst_agent",
+                 "agents.decision_agent", "models.llm_client"]
+
+
+def parse_args() -> argparse.Namespace:
+    """Parse command line arguments."""
+    parser = argparse.ArgumentParser(description='Profile run.py startup time')
+    parser.add_argument('--runs', type=int, default=5, help='Number of measured runs (default: 5)')
+    parser.add_argument('--top', type=int, default=15, help='Number of top imports to report (default: 15)')
+    parser.add_argument('--save', default=None, help='Save the report as a JSON baseline')
+    parser.add_argument('--compare', default=None, help='Compare against a JSON baseline')
+    parser.add_argument('--tolerance', type=float, default=0.25,
+                        help='Allowed relative slowdown when comparing (default: 0.25)')
+    return parser.parse_args()
+
+
+def parse_importtime(stderr: str) -> List[Dict[str, Any]]:
+    """
+    Parse `-X importtime` output.
+
+    Returns:
+        List of entries with module, self_us, cumulative_us and depth
+    """
+    entries = []
+    for line in stderr.splitlines():
+        match = IMPORTTIME_LINE.match(line)
+        if match:
+            self_us, cumulative_us, indent, module = match.groups()
+            entries.append({
+                "module": module,
+                "self_us": int(self_us),
+                "cumulative_us": int(cumulative_us),
+                "depth": (len(indent) - 1) // 2
+            })
+    return entries
+
+
+def profile_once() -> Dict[str, Any]:
+    """Run `run.py --help` once under -X importtime."""
+    env = dict(os.environ, PYTHONDONTWRITEBYTECODE="1")
+    started = time.perf_counter()
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", os.path.join(ROOT_DIR, "run.py"), "--help"],
+        cwd=ROOT_DIR, env=env, capture_output=True, text=True
+    )
+    wall_ms = (time.perf_counter() - started) * 1000
+
+    entries = parse_importtime(result.stderr)
+    top_level = [e for e in entries if e["depth"] == 0]
+    return {
+        "returncode": result.returncode,
+        "wall_ms": wall_ms,
+        "import_us": sum(e["cumulative_us"] for e in top_level),
+        "modules": {e["module"] for e in entries},
+        "top_level": top_level
+    }
+
+
+def build_report(runs: int, top: int) -> Dict[str, Any]:
+    """Profile several runs and summarize them (medians)."""
+    samples = [profile_once() for _ in range(runs)]
+    failed = [s for s in samples if s["returncode"] != 0]
+    if failed:
+        raise SystemExit(f"run.py --help exited with code {failed[0]['returncode']}")
+
+    last = samples[-1]
+    heaviest = sorted(last["top_level"], key=lambda e: e["cumulative_us"], reverse=True)[:top]
+
+    return {
+        "command": "python -X importtime run.py --help",
+        "python": platform.python_version(),
+        "runs": runs,
+        "wall_ms": statistics.median(s["wall_ms"] for s in samples),
+        "import_ms": statistics.median(s["import_us"] for s in samples) / 1000,
+        "modules_imported": len(last["modules"]),
+        "heavy_modules_imported": sorted(m for m in HEAVY_MODULES if m in last["modules"]),
+        "top_imports": [
+            {"module": e["module"], "cumulative_ms": e["cumulative_us"] / 1000}
+            for e in heaviest
+        ]
+    }
+
+
+def compare(report: Dict[str, Any], baseline: Dict[str, Any], tolerance: float) -> bool:
+    """Print a comparison against a baseline; returns False on regression."""
+    ok = True
+    for metric in ("wall_ms", "import_ms", "modules_imported"):
+        current, previous = report[metric], baseline[metric]
+        change = (current - previous) / previous if previous else 0.0
+        regressed = change > tolerance
+        ok = ok and not regressed
+        print(f"{metric:<18} {previous:>10.1f} -> {current:>10.1f}  ({change:+.1%}){'  REGRESSION' if regressed else ''}")
+
+    new_heavy = set(report["heavy_modules_imported"]) - set(baseline["heavy_modules_imported"])
+    if new_heavy:
+        ok = False
+        print(f"Newly imported at startup: {', '.join(sorted(new_heavy))}")
+    return ok
+
+
+def main() -> None:
+    """Profile startup and optionally save or compare a baseline."""
+    args = parse_args()
+    report = build_report(args.runs, args.top)
+
+    print(f"run.py --help: {report['wall_ms']:.1f} ms wall, {report['import_ms']:.1f} ms in imports, "
+          f"{report['modules_imported']} modules")
+    for entry in report["top_imports"]:
+        print(f"  {entry['cumulative_ms']:>8.1f} ms  {entry['module']}")
+
+    if args.save:
+        os.makedirs(os.path.dirname(os.path.abspath(args.save)), exist_ok=True)
+        with open(args.save, 'w') as f:
+            json.dump(report, f, indent=2)
+        print(f"\nBaseline written to {args.save}")
+
+    if args.compare:
+        with open(args.compare, 'r') as f:
+            baseline = json.load(f)
+        print()
+        if not compare(report, baseline, args.tolerance):
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
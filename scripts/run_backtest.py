@@ -0,0 +1,159 @@
+#!/usr/bin/env python3
+"""
+aGENtrader v2 Backtest Runner
+
+This script replays stored candles through the v2 agent pipeline with the
+event-driven BacktestEngine and prints performance and throughput metrics.
+
+Example:
+    python scripts/run_backtest.py --candles BTCUSDT=data/btc_1h.json --interval 1h
+    python scripts/run_backtest.py --synthetic BTCUSDT=normal,volatile --bars 5000 --seed 7
+"""
+
+import os
+import sys
+import json
+import argparse
+from typing import Dict, List, Any
+
+# Add parent directory to path to allow importing from other modules
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from core.backtest.backtest_engine import BacktestEngine
+from core.backtest.replay_feed import load_candles, load_candles_from_db, load_records, normalize_candle
+
+
+def parse_args() -> argparse.Namespace:
+    """Parse command line arguments."""
+    parser = argparse.ArgumentParser(description='Backtest the v2 agent pipeline on stored candles')
+    parser.add_argument('--candles', action='append', default=[], metavar='SYMBOL=PATH',
+                        help='Candle file (JSON/JSONL/CSV) for a symbol; repeat for more symbols')
+    parser.add_argument('--db-symbol', action='append', default=[], metavar='SYMBOL',
+                        help='Load candles for a symbol from the market_data table')
+    parser.add_argument('--depth', action='append', default=[], metavar='SYMBOL=PATH',
+                        help='Order book snapshot file for a symbol')
+    parser.add_argument('--funding', action='append', default=[], metavar='SYMBOL=PATH',
+                        help='Funding rate history file for a symbol')
+    parser.add_argument('--open-interest', action='append', default=[], metavar='SYMBOL=PATH',
+                        help='Open interest history file for a symbol')
+    parser.add_argument('--synthetic', action='append', default=[], metavar='SYMBOL=PRESET[,PRESET...]',
+                        help='Generate seeded candles, depth, funding and open interest for a symbol; '
+                             'several presets switch regimes (normal, bullish, bearish, volatile, low_liquidity)')
+    parser.add_argument('--bars', type=int, default=2000, help='Bars per synthetic symbol (default: 2000)')
+    parser.add_argument('--seed', type=int, default=42, help='Seed for synthetic data (default: 42)')
+    parser.add_argument('-i', '--interval', default='1h', help='Candle interval (default: 1h)')
+    parser.add_argument('--start', default=None, help='First bar time (ISO or epoch)')
+    parser.add_argument('--end', default=None, help='Last bar time (ISO or epoch)')
+    parser.add_argument('--capital', type=float, default=10000.0, help='Initial capital (default: 10000)')
+    parser.add_argument('--warmup', type=int, default=50, help='Warmup bars before the first decision (default: 50)')
+    parser.add_argument('--every', type=int, default=1, help='Run the agent pipeline every N bars (default: 1)')
+    parser.add_argument('--fee-pct', type=float, default=0.1, help='Fee per fill in percent (default: 0.1)')
+    parser.add_argument('--slippage-pct', type=float, default=0.05, help='Slippage per fill in percent (default: 0.05)')
+    parser.add_argument('-o', '--output', default=None, help='Write the full report to this JSON file')
+    return parser.parse_args()
+
+
+def parse_sources(values: List[str]) -> Dict[str, List[Dict[str, Any]]]:
+    """Load SYMBOL=PATH pairs into a symbol -> records mapping."""
+    sources = {}
+    for value in values:
+        symbol, _, path = value.partition('=')
+        if not path:
+            raise SystemExit(f"Expected SYMBOL=PATH, got: {value}")
+        sources[symbol.replace('/', '').upper()] = load_records(path)
+    return sources
+
+
+def generate_sources(values: List[str], interval: str, bars: int, seed: int) -> Dict[str, Dict[str, Any]]:
+    """Generate synthetic data for SYMBOL=PRESET[,PRESET...] pairs."""
+    from data.simulated.market_generator import MarketGenerator, to_records
+
+    generator = MarketGenerator(seed=seed)
+    sources = {"candles": {}, "depth": {}, "funding_rates": {}, "open_interest": {}}
+    for value in values:
+        symbol, _, presets = value.partition('=')
+        symbol = symbol.replace('/', '').upper()
+        regimes = [preset.strip() for preset in (presets or 'normal').split(',') if preset.strip()]
+        try:
+            candles = generator.generate_candles(bars, interval, regimes=regimes, symbol=symbol)
+        except ValueError as e:
+            raise SystemExit(str(e))
+
+        sources["candles"][symbol] = [normalize_candle(c) for c in to_records(candles)]
+        sources["depth"][symbol] = [
+            generator.order_book(price, levels=20, preset=regimes[regime], timestamp=close_time + 1,
+                                 symbol=symbol).to_dict()
+            for price, regime, close_time in zip(candles["close"].tolist(), candles["regime"].tolist(),
+                                                 candles["close_time"].tolist())
+        ]
+        sources["funding_rates"][symbol] = generator.funding_rates(candles, symbol, regimes[0])
+        sources["open_interest"][symbol] = generator.open_interest(candles, symbol, interval, regimes[0])
+    return sources
+
+
+def main() -> None:
+    """Run a backtest from the command line."""
+    args = parse_args()
+
+    candles = {}
+    for value in args.candles:
+        symbol, _, path = value.partition('=')
+        if not path:
+            raise SystemExit(f"Expected SYMBOL=PATH, got: {value}")
+        candles[symbol.replace('/', '').upper()] = load_candles(path)
+
+    if args.db_symbol:
+        from data.database import DatabaseConnector
+        db = DatabaseConnector()
+        for symbol in args.db_symbol:
+            candles[symbol.replace('/', '').upper()] = load_candles_from_db(db, symbol, args.interval)
+
+    depth = parse_sources(args.depth)
+    funding_rates = parse_sources(args.funding)
+    open_interest = parse_sources(args.open_interest)
+
+    if args.synthetic:
+        synthetic = generate_sources(args.synthetic, args.interval, args.bars, args.seed)
+        candles.update(synthetic["candles"])
+        for sources, key in ((depth, "depth"), (funding_rates, "funding_rates"), (open_interest, "open_interest")):
+            for symbol, records in synthetic[key].items():
+                sources.setdefault(symbol, records)
+
+    if not candles:
+        raise SystemExit("No candles given; use --candles SYMBOL=PATH, --db-symbol SYMBOL or --synthetic SYMBOL=PRESET")
+
+    engine = BacktestEngine(
+        candles,
+        interval=args.interval,
+        depth=depth,
+        funding_rates=funding_rates,
+        open_interest=open_interest,
+        executor_config={'fee_pct': args.fee_pct, 'slippage_pct': args.slippage_pct},
+        initial_capital=args.capital,
+        warmup_bars=args.warmup,
+        decision_interval=args.every,
+        start=args.start,
+        end=args.end
+    )
+    report = engine.run()
+
+    performance = report['performance']
+    throughput = report['throughput']
+    print("\nBacktest Results")
+    print(f"Symbols:        {', '.join(report['symbols'])} ({report['interval']})")
+    print(f"Final equity:   {performance['final_equity']:.2f} ({performance['total_return_pct']:+.2f}%)")
+    print(f"Max drawdown:   {performance['max_drawdown_pct']:.2f}%")
+    print(f"Sharpe ratio:   {performance['sharpe_ratio']:.2f}")
+    print(f"Trades:         {performance['total_trades']} (win rate {performance['win_rate']:.1f}%)")
+    print(f"Throughput:     {throughput['bars_per_second']:.1f} bars/s "
+          f"({throughput['bars']} bars in {throughput['elapsed_seconds']:.2f}s, "
+          f"{throughput['avg_decision_ms']:.1f} ms/decision)")
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2, default=str)
+        print(f"\nReport written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,130 @@
+#!/usr/bin/env python3
+"""
+aGENtrader v2 Parameter Sweep Runner
+
+This script runs a grid or random search over agent weights, technical
+indicator settings and risk/sizing thresholds, backtesting every parameter
+set in parallel on a shared memory-mapped candle store.
+
+Example search space (YAML):
+
+    agent_weights:
+      TechnicalAnalystAgent: [0.8, 1.2, 1.6]
+    technical:
+      sma:
+        short_period: [7, 9, 12]
+      rsi:
+        oversold: {min: 20, max: 35}
+    risk_guard:
+      max_volatility: [0.05, 0.07]
+    executor:
+      stop_loss_pct: [3.0, 5.0]
+
+Example:
+    python scripts/run_parameter_sweep.py --candles BTCUSDT=data/btc_1h.json \\
+        --space config/sweep.yaml --mode random --samples 200
+"""
+
+import os
+import sys
+import json
+import argparse
+import importlib
+from typing import Callable
+
+import yaml
+
+# Add parent directory to path to allow importing from other modules
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from core.backtest.candle_store import CandleStore
+from core.backtest.parameter_sweep import (
+    ParameterSweep,
+    default_orchestrator_factory,
+    grid_search,
+    random_search
+)
+from core.backtest.replay_feed import load_candles
+
+
+def parse_args() -> argparse.Namespace:
+    """Parse command line arguments."""
+    parser = argparse.ArgumentParser(description='Parallel parameter sweep over backtests')
+    parser.add_argument('--candles', action='append', default=[], metavar='SYMBOL=PATH',
+                        help='Candle file (JSON/JSONL/CSV) for a symbol; repeat for more symbols')
+    parser.add_argument('--store', default='data/backtest_store',
+                        help='Candle store directory (default: data/backtest_store)')
+    parser.add_argument('-i', '--interval', default='1h', help='Candle interval (default: 1h)')
+    parser.add_argument('--space', required=True, help='YAML file describing the search space')
+    parser.add_argument('--mode', choices=['grid', 'random'], default='grid', help='Search mode (default: grid)')
+    parser.add_argument('--samples', type=int, default=100, help='Random search samples (default: 100)')
+    parser.add_argument('--seed', type=int, default=None, help='Random search seed')
+    parser.add_argument('--workers', type=int, default=None, help='Worker processes (default: all cores)')
+    parser.add_argument('--warmup', type=int, default=50, help='Warmup bars before the first decision (default: 50)')
+    parser.add_argument('--every', type=int, default=1, help='Run the agent pipeline every N bars (default: 1)')
+    parser.add_argument('--capital', type=float, default=10000.0, help='Initial capital (default: 10000)')
+    parser.add_argument('--orchestrator', default=None, metavar='MODULE:FUNCTION',
+                        help='Factory returning the orchestrator (default: CoreOrchestrator)')
+    parser.add_argument('--top', type=int, default=10, help='Number of results to print (default: 10)')
+    parser.add_argument('-o', '--output', default=None, help='Write all ranked results to this JSON file')
+    return parser.parse_args()
+
+
+def load_factory(spec: str) -> Callable:
+    """Resolve a MODULE:FUNCTION orchestrator factory."""
+    module_name, _, function_name = spec.partition(':')
+    return getattr(importlib.import_module(module_name), function_name)
+
+
+def main() -> None:
+    """Run a parameter sweep from the command line."""
+    args = parse_args()
+
+    if args.candles:
+        candles = {}
+        for value in args.candles:
+            symbol, _, path = value.partition('=')
+            if not path:
+                raise SystemExit(f"Expected SYMBOL=PATH, got: {value}")
+            candles[symbol] = load_candles(path)
+        CandleStore.write(args.store, candles, args.interval)
+    elif not os.path.exists(os.path.join(args.store, 'manifest.json')):
+        raise SystemExit(f"No candle store at {args.store}; pass --candles SYMBOL=PATH to build one")
+
+    with open(args.space, 'r') as f:
+        space = yaml.safe_load(f)
+
+    if args.mode == 'grid':
+        param_sets = grid_search(space)
+    else:
+        param_sets = random_search(space, args.samples, seed=args.seed)
+
+    sweep = ParameterSweep(
+        args.store,
+        engine_options={
+            'warmup_bars': args.warmup,
+            'decision_interval': args.every,
+            'initial_capital': args.capital
+        },
+        orchestrator_factory=load_factory(args.orchestrator) if args.orchestrator else default_orchestrator_factory,
+        max_workers=args.workers
+    )
+    results = sweep.run(param_sets)
+
+    print(f"\nTop {min(args.top, len(results))} of {len(results)} parameter sets")
+    for result in results[:args.top]:
+        if 'error' in result:
+            print(f"  failed: {result['error']} {result['params']}")
+            continue
+        print(f"#{result['rank']:<4} pnl {result['total_pnl']:>10.2f}  "
+              f"dd {result['max_drawdown_pct']:>6.2f}%  sharpe {result['sharpe_ratio']:>6.2f}  "
+              f"trades {result['total_trades']:>4}  {result['params']}")
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2, default=str)
+        print(f"\nResults written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
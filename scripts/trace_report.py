@@ -0,0 +1,160 @@
+#!/usr/bin/env python3
+"""
+aGENtrader v2 Trace Report
+
+This script reads spans written by utils.tracing (logs/traces.jsonl) and
+renders the slowest cycles as flame-style timelines: one row per span,
+indented by depth, with a bar placed at the span's offset within the cycle.
+A summary of self time by span kind (agent, data_fetch, compute, llm, db,
+log) shows where the selected cycles spent their time.
+
+Example:
+    python scripts/trace_report.py --top 3
+    python scripts/trace_report.py --trace 4bf92f3577b34da6a3ce929d0e0e4736
+"""
+
+import os
+import sys
+import json
+import argparse
+from collections import defaultdict
+from typing import Dict, Any, List, Optional
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DEFAULT_TRACE_FILE = os.path.join(ROOT_DIR, "logs", "traces.jsonl")
+
+
+def parse_args() -> argparse.Namespace:
+    """Parse command line arguments."""
+    parser = argparse.ArgumentParser(description='Render the slowest traced cycles')
+    parser.add_argument('--file', default=DEFAULT_TRACE_FILE, help='Trace file (default: logs/traces.jsonl)')
+    parser.add_argument('--top', type=int, default=5, help='Number of slowest cycles to show (default: 5)')
+    parser.add_argument('--trace', default=None, help='Show a single trace id')
+    parser.add_argument('--name', default=None, help='Only consider root spans with this name')
+    parser.add_argument('--min-ms', type=float, default=0.0, help='Hide spans shorter than this (default: 0)')
+    parser.add_argument('--width', type=int, default=40, help='Timeline width in characters (default: 40)')
+    return parser.parse_args()
+
+
+def load_traces(path: str) -> Dict[str, List[Dict[str, Any]]]:
+    """
+    Load spans grouped by trace id.
+
+    Returns:
+        Dictionary of trace id -> spans
+    """
+    traces = defaultdict(list)
+    with open(path, 'r') as f:
+        for line in f:
+            try:
+                span = json.loads(line)
+            except ValueError:
+                continue
+            if span.get("duration_ns") is not None:
+                traces[span["trace_id"]].append(span)
+    return traces
+
+
+def find_root(spans: List[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+    """Root span of a trace (None if it was not exported)."""
+    roots = [span for span in spans if not span.get("parent_id")]
+    return max(roots, key=lambda span: span["duration_ns"]) if roots else None
+
+
+def build_children(spans: List[Dict[str, Any]]) -> Dict[str, List[Dict[str, Any]]]:
+    """Child spans by parent span id, in start order."""
+    children = defaultdict(list)
+    for span in spans:
+        if span.get("parent_id"):
+            children[span["parent_id"]].append(span)
+    for siblings in children.values():
+        siblings.sort(key=lambda span: span["start_ns"])
+    return children
+
+
+def self_time(span: Dict[str, Any], children: Dict[str, List[Dict[str, Any]]]) -> int:
+    """Span duration minus the time covered by its children (ns)."""
+    covered = sum(child["duration_ns"] for child in children.get(span["span_id"], []))
+    return max(span["duration_ns"] - covered, 0)
+
+
+def render_trace(spans: List[Dict[str, Any]], min_ms: float, width: int) -> List[str]:
+    """Render one trace as an indented timeline."""
+    root = find_root(spans)
+    if root is None:
+        return []
+    children = build_children(spans)
+    total = max(root["duration_ns"], 1)
+
+    attributes = " ".join(f"{k}={v}" for k, v in root.get("attributes", {}).items())
+    lines = [f"trace {root['trace_id']}  {root['name']}  {root['duration_ns'] / 1e6:.1f} ms  {attributes}".rstrip()]
+
+    def walk(span: Dict[str, Any], depth: int) -> None:
+        duration_ms = span["duration_ns"] / 1e6
+        if duration_ms < min_ms and depth > 0:
+            return
+        offset = int((span["start_ns"] - root["start_ns"]) / total * width)
+        offset = min(max(offset, 0), width - 1)
+        length = max(1, int(round(span["duration_ns"] / total * width)))
+        length = min(length, width - offset)
+        bar = " " * offset + "#" * length + " " * (width - offset - length)
+
+        status = "  ERROR" if span.get("status") == "error" else ""
+        label = span["name"]
+        detail = span.get("attributes", {}).get("endpoint")
+        if detail:
+            label += f" {detail}"
+        lines.append(f"  |{bar}| {duration_ms:>9.1f} ms {self_time(span, children) / 1e6:>9.1f} self  "
+                     f"{'  ' * depth}{label} [{span['kind']}]{status}")
+        for child in children.get(span["span_id"], []):
+            walk(child, depth + 1)
+
+    walk(root, 0)
+    return lines
+
+
+def kind_summary(traces: List[List[Dict[str, Any]]]) -> List[str]:
+    """Self time by span kind across traces."""
+    totals = defaultdict(int)
+    for spans in traces:
+        children = build_children(spans)
+        for span in spans:
+            totals[span["kind"]] += self_time(span, children)
+
+    grand_total = sum(totals.values()) or 1
+    lines = ["self time by kind:"]
+    for kind, ns in sorted(totals.items(), key=lambda item: item[1], reverse=True):
+        lines.append(f"  {kind:<12} {ns / 1e6:>10.1f} ms  {ns / grand_total:>6.1%}")
+    return lines
+
+
+def main() -> None:
+    """Print the report."""
+    args = parse_args()
+    if not os.path.exists(args.file):
+        print(f"No trace file at {args.file} (set TRACE_EXPORTER=jsonl and run a cycle first)")
+        sys.exit(1)
+
+    traces = load_traces(args.file)
+    if args.trace:
+        selected = [traces[args.trace]] if args.trace in traces else []
+    else:
+        rooted = [(find_root(spans), spans) for spans in traces.values()]
+        rooted = [(root, spans) for root, spans in rooted
+                  if root is not None and (args.name is None or root["name"] == args.name)]
+        rooted.sort(key=lambda item: item[0]["duration_ns"], reverse=True)
+        selected = [spans for _, spans in rooted[:args.top]]
+
+    if not selected:
+        print("No matching traces")
+        sys.exit(1)
+
+    print(f"{len(selected)} of {len(traces)} traces from {args.file}\n")
+    for spans in selected:
+        print("\n".join(render_trace(spans, args.min_ms, args.width)))
+        print()
+    print("\n".join(kind_summary(selected)))
+
+
+if __name__ == "__main__":
+    main()
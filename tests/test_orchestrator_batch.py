@@ -0,0 +1,114 @@
+#!/usr/bin/env python3
+"""
+End-to-end check of one orchestrator trading cycle
+
+Runs a batch of market events through CoreOrchestrator.process_market_events
+with the real pipeline agents (portfolio manager, risk guard, position sizer,
+trade executor) on a fresh PortfolioState, the technical analyst on the mock
+data provider, and a fixed BUY decision per symbol.
+"""
+
+import os
+import sys
+import logging
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from core.core_orchestrator import CoreOrchestrator
+from core.trading.portfolio_state import PortfolioState
+from agents.technical_analyst_agent import TechnicalAnalystAgent
+from agents.portfolio_manager_agent import PortfolioManagerAgent
+from agents.risk_guard_agent import RiskGuardAgent
+from agents.trade_book_manager import TradeBookManager
+from agents.trade_executor_agent import TradeExecutorAgent
+from agents.data_providers.mock_data_provider import MockDataProvider
+
+logger = logging.getLogger('aGENtrader')
+
+SYMBOLS = ("BTC/USDT", "ETH/USDT", "SOL/USDT")
+
+
+class FixedDecisionAgent:
+    """Decision agent that buys every symbol with high confidence."""
+
+    def make_decision(self, analyses, symbol, interval, agent_weights_override=None):
+        return {"action": "BUY", "pair": symbol, "confidence": 80, "reason": "batch check"}
+
+    def log_decision(self, decision):
+        pass
+
+
+def build_orchestrator(trade_log_path):
+    """Orchestrator whose pipeline agents share one fresh portfolio state."""
+    orchestrator = CoreOrchestrator()
+    provider = MockDataProvider(seed=7)
+    state = PortfolioState(name="batch-check")
+
+    risk_guard = RiskGuardAgent(portfolio_state=state)
+    trade_book = TradeBookManager(trade_log_path=trade_log_path, portfolio_state=state)
+    orchestrator.agents["technical_analyst"] = TechnicalAnalystAgent(data_fetcher=provider)
+    orchestrator.agents["decision"] = FixedDecisionAgent()
+    orchestrator.agents["portfolio_manager"] = PortfolioManagerAgent(portfolio_state=state)
+    orchestrator.agents["risk_guard"] = risk_guard
+    orchestrator.agents["trade_executor"] = TradeExecutorAgent(
+        trade_book_manager=trade_book,
+        risk_guard_agent=risk_guard
+    )
+    events = [
+        {"symbol": symbol, "interval": "1h", "ohlcv": provider.fetch_ohlcv(symbol, "1h", 50)}
+        for symbol in SYMBOLS
+    ]
+    return orchestrator, state, events
+
+
+def test_market_event_batch():
+    """Approved trades execute once and are recorded once with the risk guard."""
+    with tempfile.TemporaryDirectory() as tmp:
+        orchestrator, state, events = build_orchestrator(os.path.join(tmp, "trade_book.jsonl"))
+        results = orchestrator.process_market_events(events)
+
+        assert [results["symbol"] for results in results] == list(SYMBOLS)
+        executions = [results["trade_execution"] for results in results]
+        executed = [execution for execution in executions if execution["status"] == "success"]
+        assert executed, f"No trade executed: {executions}"
+
+        for execution in executed:
+            steps = [step["step"] for step in execution["pipeline_steps"]]
+            assert steps == ["batch_evaluation", "position_sizing", "trade_execution"]
+            assert execution["trade_id"]
+        for execution in executions:
+            if execution["status"] != "success":
+                assert execution["status"].startswith("rejected_by_"), execution
+
+        # The batch evaluation admits and records each trade; the executor must not re-run it
+        assert len(state.snapshot().history) == len(executed)
+        assert len(orchestrator.agents["trade_executor"].trade_book.list_open_trades()) == len(executed)
+
+        # Results are separate objects per decision
+        assert len({id(execution) for execution in executions}) == len(executions)
+
+
+def test_batch_error_results_are_distinct():
+    """A failing batch yields one error result per decision, not a shared dict."""
+    with tempfile.TemporaryDirectory() as tmp:
+        orchestrator, _, events = build_orchestrator(os.path.join(tmp, "trade_book.jsonl"))
+
+        def fail(decisions, market_data=None):
+            raise RuntimeError("batch failure")
+        orchestrator._execute_trade_batch = fail
+
+        executions = [results["trade_execution"] for results in orchestrator.process_market_events(events)]
+        assert all(execution["status"] == "error" for execution in executions)
+        executions[0]["status"] = "handled"
+        assert executions[1]["status"] == "error"
+
+
+if __name__ == "__main__":
+    logging.basicConfig(
+        level=logging.INFO,
+        format='%(asctime)s - aGENtrader - %(levelname)s - %(message)s'
+    )
+    test_market_event_batch()
+    test_batch_error_results_are_distinct()
+    logger.info("✅ Orchestrator batch check passed")
@@ -0,0 +1,51 @@
+#!/usr/bin/env python3
+"""
+Parameter sweep worker check
+
+Runs parameter sets in-process the way a sweep worker does (one shared
+orchestrator over a memory-mapped CandleStore) and checks that the private
+portfolio of each risk_guard run is closed afterwards.
+"""
+
+import os
+import sys
+import logging
+import tempfile
+import threading
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from core.backtest import parameter_sweep
+from core.backtest.candle_store import CandleStore
+from agents.data_providers.mock_data_provider import MockDataProvider
+
+logger = logging.getLogger('aGENtrader')
+
+
+def sweep_writers():
+    return [thread for thread in threading.enumerate() if thread.name == "sweep-state-writer"]
+
+
+def test_risk_guard_runs_release_their_portfolio():
+    """Each risk_guard run stops the writer of its private portfolio state."""
+    with tempfile.TemporaryDirectory() as tmp:
+        candles = MockDataProvider(seed=5).fetch_ohlcv("BTC/USDT", "1h", 80)
+        CandleStore.write(tmp, {"BTCUSDT": candles}, "1h")
+        parameter_sweep._init_worker(tmp, {"warmup_bars": 20},
+                                     parameter_sweep.default_orchestrator_factory)
+        try:
+            for max_positions in (1, 2, 3):
+                result = parameter_sweep._run_param_set({"risk_guard.max_concurrent_positions": max_positions})
+                assert "error" not in result, result
+            assert not sweep_writers()
+        finally:
+            parameter_sweep._WORKER.clear()
+
+
+if __name__ == "__main__":
+    logging.basicConfig(
+        level=logging.INFO,
+        format='%(asctime)s - aGENtrader - %(levelname)s - %(message)s'
+    )
+    test_risk_guard_runs_release_their_portfolio()
+    logger.info("✅ Parameter sweep worker check passed")
@@ -0,0 +1,126 @@
+#!/usr/bin/env python3
+"""
+PortfolioState writer checks
+
+A command that raises must leave no trace in the published snapshot or the
+trade rate windows, whether it runs alone or in a batch with other
+commands, and a journal replay that fails part way can be retried.
+Closing a state stops its writer thread.
+"""
+
+import os
+import sys
+import logging
+import threading
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from core.trading.portfolio_state import PortfolioState
+
+logger = logging.getLogger('aGENtrader')
+
+
+def failing_command(book):
+    book.open({"symbol": "BTCUSDT", "action": "BUY", "position_value": 500.0})
+    book.record({"symbol": "BTCUSDT", "timestamp": 1000.0})
+    raise ValueError("command failed")
+
+
+def test_failed_command_is_not_published():
+    """Partial changes of a failing command are discarded."""
+    state = PortfolioState(name="rollback-check")
+    try:
+        state.execute(failing_command)
+        assert False, "command should raise"
+    except ValueError:
+        pass
+
+    snapshot = state.snapshot()
+    assert snapshot.count() == 0
+    assert snapshot.total_exposure == 0.0
+    assert snapshot.history == ()
+    assert state.trade_count("1h", 1001.0) == 0
+
+
+def test_failed_command_in_batch():
+    """Commands batched with a failing one keep their changes and results."""
+    state = PortfolioState(name="batch-rollback-check")
+    release = threading.Event()
+    blocker = state.submit(lambda book: release.wait(5))
+
+    # Queued while the writer is busy, so they are applied as one batch
+    first = state.submit(lambda book: book.open({"symbol": "ETHUSDT", "position_value": 300.0}))
+    failed = state.submit(failing_command)
+    last = state.submit(lambda book: book.record({"symbol": "ETHUSDT", "timestamp": 1000.0}))
+    release.set()
+    blocker.result()
+
+    assert first.result()["symbol"] == "ETHUSDT"
+    assert isinstance(failed.exception(), ValueError)
+    assert last.result() is None
+
+    snapshot = state.snapshot()
+    assert snapshot.symbols() == ["ETHUSDT"]
+    assert snapshot.total_exposure == 300.0
+    assert len(snapshot.history) == 1
+    assert state.trade_count("1h", 1001.0) == 1
+
+
+def test_failed_journal_replay_can_be_retried():
+    """A replay that fails part way leaves nothing behind, so retrying does not duplicate."""
+    state = PortfolioState(name="journal-check")
+    attempts = []
+
+    def replay(book):
+        attempts.append(len(attempts))
+        book.open({"symbol": "BTCUSDT", "trade_id": "t-1"})
+        book.archive({"symbol": "BTCUSDT", "trade_id": "t-0", "status": "closed"})
+        if len(attempts) == 1:
+            raise IOError("journal truncated")
+        book.open({"symbol": "ETHUSDT", "trade_id": "t-2"})
+
+    try:
+        state.load_journal("journal.jsonl", replay)
+        assert False, "replay should raise"
+    except IOError:
+        pass
+    assert state.snapshot().count() == 0
+
+    assert state.load_journal("journal.jsonl", replay)
+    assert not state.load_journal("journal.jsonl", replay)
+    snapshot = state.snapshot()
+    assert snapshot.count() == 2
+    assert len(snapshot.closed) == 1
+
+
+def test_close_stops_writer():
+    """close() applies queued commands, stops the writer and rejects later commands."""
+    states = [PortfolioState(name="close-check") for _ in range(20)]
+    for state in states:
+        state.submit(lambda book: book.open({"symbol": "BTCUSDT"}))
+    for state in states:
+        state.close()
+
+    assert not [thread for thread in threading.enumerate() if thread.name == "close-check-state-writer"]
+    assert all(state.snapshot().count() == 1 for state in states)
+    try:
+        states[0].record_trade({"symbol": "BTCUSDT"})
+        assert False, "closed state should reject commands"
+    except RuntimeError:
+        pass
+
+    # Closing twice, or a state that never started its writer, is a no-op
+    states[0].close()
+    PortfolioState(name="unused").close()
+
+
+if __name__ == "__main__":
+    logging.basicConfig(
+        level=logging.INFO,
+        format='%(asctime)s - aGENtrader - %(levelname)s - %(message)s'
+    )
+    test_failed_command_is_not_published()
+    test_failed_command_in_batch()
+    test_failed_journal_replay_can_be_retried()
+    test_close_stops_writer()
+    logger.info("✅ Portfolio state writer check passed")
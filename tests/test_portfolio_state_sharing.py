@@ -0,0 +1,129 @@
+#!/usr/bin/env python3
+"""
+Portfolio manager, trade book and risk guard on one PortfolioState
+
+The managers keep different position records (the portfolio manager's
+pair/base/position_value entries, the trade book's one trade per symbol);
+each must only see, replace and close its own positions, while trade
+history and exposure are shared.
+"""
+
+import os
+import sys
+import json
+import logging
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from core.trading.portfolio_state import PortfolioState, TRADE_BOOK, PORTFOLIO_BOOK
+from agents.portfolio_manager_agent import PortfolioManagerAgent
+from agents.risk_guard_agent import RiskGuardAgent
+from agents.trade_book_manager import TradeBookManager
+
+logger = logging.getLogger('aGENtrader')
+
+
+def pm_trade(trade_id, pair, entry_price, position_size=0.01):
+    return {"trade_id": trade_id, "pair": pair, "action": "BUY", "status": "open",
+            "entry_price": entry_price, "position_size": position_size,
+            "timestamp": "2025-01-01T00:00:00"}
+
+
+def tb_trade(symbol, entry_price):
+    return {"symbol": symbol, "action": "BUY", "confidence": 80, "entry_price": entry_price,
+            "position_size": 0.01}
+
+
+def build_agents(directory):
+    state = PortfolioState(name="sharing-check")
+    portfolio_manager = PortfolioManagerAgent(portfolio_state=state)
+    portfolio_manager.snapshot_active = False
+    trade_book = TradeBookManager(trade_log_path=os.path.join(directory, "trade_book.jsonl"),
+                                  portfolio_state=state)
+    risk_guard = RiskGuardAgent(portfolio_state=state)
+    return state, portfolio_manager, trade_book, risk_guard
+
+
+def test_managers_keep_their_own_positions():
+    """Trade book closes and replacements leave the portfolio manager's positions alone."""
+    with tempfile.TemporaryDirectory() as tmp:
+        state, portfolio_manager, trade_book, risk_guard = build_agents(tmp)
+
+        portfolio_manager.process_trade(pm_trade("t-1", "BTC/USDT", 50000.0))
+        assert trade_book.get_open_trade("BTCUSDT") is None
+        assert trade_book.close_trade("BTCUSDT") is None
+        assert state.snapshot().count(PORTFOLIO_BOOK) == 1
+
+        # Recording the same symbol in the trade book replaces nothing of the portfolio manager's
+        trade_book.record_trade(tb_trade("BTCUSDT", 50100.0))
+        trade_book.record_trade(tb_trade("BTCUSDT", 50200.0))
+        snapshot = state.snapshot()
+        assert snapshot.count(PORTFOLIO_BOOK) == 1
+        assert snapshot.count(TRADE_BOOK) == 1
+        assert list(portfolio_manager.open_positions) == ["t-1"]
+        assert [trade["entry_price"] for trade in trade_book.list_open_trades()] == [50200.0]
+        assert len(trade_book.closed_trades) == 1
+
+        closed = trade_book.close_trade("BTCUSDT", exit_price=51000.0)
+        assert closed is not None and closed["symbol"] == "BTCUSDT"
+        assert state.snapshot().count(TRADE_BOOK) == 0
+        assert list(portfolio_manager.open_positions) == ["t-1"]
+
+        # The portfolio manager closes its own position by trade id
+        portfolio_manager.process_trade(dict(pm_trade("t-1", "BTC/USDT", 50000.0),
+                                             status="closed", exit_price=51000.0, pnl_percentage=2.0))
+        assert state.snapshot().count(PORTFOLIO_BOOK) == 0
+        assert len(trade_book.closed_trades) == 2
+
+
+def test_one_trade_is_counted_once():
+    """Position limits count one manager's entries, exposure comes from the portfolio manager."""
+    with tempfile.TemporaryDirectory() as tmp:
+        state, portfolio_manager, trade_book, risk_guard = build_agents(tmp)
+
+        # The same BTC trade known to both managers
+        portfolio_manager.process_trade(pm_trade("t-1", "BTC/USDT", 50000.0))
+        trade_book.record_trade(tb_trade("BTCUSDT", 50000.0))
+
+        snapshot = state.snapshot()
+        assert snapshot.total_exposure == 500.0
+        assert snapshot.asset_exposure("BTC") == 500.0
+
+        risk_guard.max_concurrent_positions = 2
+        accepted, reason = risk_guard._check_concurrent_positions("ETHUSDT")
+        assert accepted, reason
+
+        portfolio_manager.max_open_trades = 2
+        validation = portfolio_manager.validate_trade({"pair": "ETH/USDT", "action": "BUY",
+                                                       "entry_price": 3000.0, "position_size": 0.01})
+        assert validation["status"] == "APPROVED", validation
+
+
+def test_journal_replay_keeps_other_positions():
+    """Replaying the trade book journal does not remove the portfolio manager's positions."""
+    with tempfile.TemporaryDirectory() as tmp:
+        state, portfolio_manager, trade_book, risk_guard = build_agents(tmp)
+        portfolio_manager.process_trade(pm_trade("t-1", "BTC/USDT", 50000.0))
+
+        journal = os.path.join(tmp, "replayed.jsonl")
+        with open(journal, "w") as f:
+            f.write(json.dumps(dict(tb_trade("BTCUSDT", 50000.0), status="open")) + "\n")
+            f.write(json.dumps(dict(tb_trade("BTCUSDT", 50000.0), status="closed", exit_price=50500.0)) + "\n")
+            f.write(json.dumps(dict(tb_trade("ETHUSDT", 3000.0), status="open")) + "\n")
+
+        replayed = TradeBookManager(trade_log_path=journal, portfolio_state=state)
+        assert [trade["symbol"] for trade in replayed.list_open_trades()] == ["ETHUSDT"]
+        assert list(portfolio_manager.open_positions) == ["t-1"]
+        assert state.snapshot().position_for("BTCUSDT", PORTFOLIO_BOOK)["trade_id"] == "t-1"
+
+
+if __name__ == "__main__":
+    logging.basicConfig(
+        level=logging.INFO,
+        format='%(asctime)s - aGENtrader - %(levelname)s - %(message)s'
+    )
+    test_managers_keep_their_own_positions()
+    test_one_trade_is_counted_once()
+    test_journal_replay_keeps_other_positions()
+    logger.info("✅ Shared portfolio state check passed")
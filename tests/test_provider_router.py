@@ -0,0 +1,145 @@
+#!/usr/bin/env python3
+"""
+Provider router checks
+
+ProviderRouter.call against fake providers: a slow one that is hedged
+after a fixed delay, a failing one and one returning empty data that fail
+over at once, and ranking by measured health around a preferred provider.
+Statistics are process-wide by name, so every check uses its own names.
+"""
+
+import os
+import sys
+import time
+import logging
+import threading
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.provider_router import ProviderRouter, provider_stats
+
+logger = logging.getLogger('aGENtrader')
+
+
+class FakeProvider:
+    """Returns `candles` from fetch(), after `release` is set if given, or raises `error`."""
+
+    def __init__(self, candles=None, error=None, release=None):
+        self.candles = candles
+        self.error = error
+        self.release = release
+        self.calls = 0
+
+    def fetch(self):
+        self.calls += 1
+        if self.release is not None:
+            self.release.wait(5)
+        if self.error is not None:
+            raise self.error
+        return self.candles
+
+
+def fetch(provider):
+    return provider.fetch()
+
+
+def test_slow_provider_is_hedged():
+    """The next provider is asked after hedge_delay and the first valid answer wins."""
+    release = threading.Event()
+    slow = FakeProvider([{"close": 1.0}], release=release)
+    fast = FakeProvider([{"close": 2.0}])
+    router = ProviderRouter(hedge_delay=0.05)
+    router.register("hedge-slow", slow)
+    router.register("hedge-fast", fast)
+
+    try:
+        started = time.perf_counter()
+        name, candles = router.call(fetch, "klines", preferred="hedge-slow")
+        elapsed = time.perf_counter() - started
+    finally:
+        release.set()
+
+    assert (name, candles) == ("hedge-fast", [{"close": 2.0}])
+    assert slow.calls == 1 and fast.calls == 1
+    assert 0.05 <= elapsed < 1.0
+
+    # Without hedging the slow provider is waited for
+    release = threading.Event()
+    slow = FakeProvider([{"close": 1.0}], release=release)
+    fast = FakeProvider([{"close": 2.0}])
+    router = ProviderRouter(hedge=False, hedge_delay=0.05)
+    router.register("no-hedge-slow", slow)
+    router.register("no-hedge-fast", fast)
+    threading.Timer(0.2, release.set).start()
+    assert router.call(fetch, "klines")[0] == "no-hedge-slow"
+    assert fast.calls == 0
+
+
+def test_failover_on_errors_and_empty_data():
+    """Errors and empty results fail over without waiting for the hedge delay."""
+    failing = FakeProvider(error=ConnectionError("connection reset"))
+    empty = FakeProvider([])
+    good = FakeProvider([{"close": 3.0}])
+    router = ProviderRouter(hedge_delay=2.0)
+    router.register("failover-failing", failing)
+    router.register("failover-empty", empty)
+    router.register("failover-good", good)
+
+    started = time.perf_counter()
+    name, candles = router.call(fetch, "klines")
+    assert (name, candles) == ("failover-good", [{"close": 3.0}])
+    assert time.perf_counter() - started < 1.0
+    assert failing.calls == empty.calls == good.calls == 1
+
+    # Both failures count against their providers
+    assert provider_stats("failover-failing").errors == 1
+    assert provider_stats("failover-empty").errors == 1
+    assert provider_stats("failover-good").errors == 0
+
+    # The caller's validity check decides what is usable
+    name, candles = router.call(fetch, "klines", validate=lambda result: result is not None,
+                                supports=lambda provider: provider is empty)
+    assert (name, candles) == ("failover-empty", [])
+
+    # Providers that cannot serve the request are skipped; with none left the default is returned
+    name, candles = router.call(fetch, "klines", default=[],
+                                supports=lambda provider: provider is not good)
+    assert (name, candles) == (None, [])
+    assert router.call(fetch, "klines", default="none", supports=lambda provider: False) == (None, "none")
+
+
+def test_preferred_provider_ranking():
+    """The preferred provider goes first unless it scores worse than the margin allows."""
+    router = ProviderRouter(hedge_delay=2.0, preference_margin=2.0)
+    providers = {name: FakeProvider([{"close": 4.0}]) for name in ("rank-a", "rank-b", "rank-c", "rank-new")}
+    for name, provider in providers.items():
+        router.register(name, provider)
+    for name, latency in (("rank-a", 0.1), ("rank-b", 0.15), ("rank-c", 0.5)):
+        provider_stats(name).record(latency, True)
+
+    assert router.ranked() == ["rank-a", "rank-b", "rank-c", "rank-new"]
+    assert router.ranked(preferred="rank-b") == ["rank-b", "rank-a", "rank-c", "rank-new"]
+    assert router.ranked(preferred="rank-c") == ["rank-a", "rank-b", "rank-c", "rank-new"]
+    # A provider without measurements may still be tried first when preferred
+    assert router.ranked(preferred="rank-new")[0] == "rank-new"
+
+    assert router.call(fetch, "klines", preferred="rank-c")[0] == "rank-a"
+    assert router.call(fetch, "klines", preferred="rank-b")[0] == "rank-b"
+    assert providers["rank-c"].calls == 0
+
+    # Errors inflate a provider's score and move it down the ranking
+    for _ in range(5):
+        provider_stats("rank-a").record(0.1, False)
+    assert router.ranked() == ["rank-b", "rank-a", "rank-c", "rank-new"]
+    assert router.ranked(preferred="rank-a")[0] == "rank-b"
+
+
+if __name__ == "__main__":
+    logging.basicConfig(
+        level=logging.INFO,
+        format='%(asctime)s - aGENtrader - %(levelname)s - %(message)s'
+    )
+    test_slow_provider_is_hedged()
+    test_failover_on_errors_and_empty_data()
+    test_preferred_provider_ranking()
+    logger.info("✅ Provider router check passed")
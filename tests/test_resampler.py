@@ -0,0 +1,155 @@
+#!/usr/bin/env python3
+"""
+Candle resampler checks
+
+A fake exchange serves base candles up to a fake clock, with the last one
+still forming. As the clock advances, the candles CandleResampler derives
+incrementally must match resample_klines run over the exchange's whole
+history and over the stored base candles, including after the stored
+candles are trimmed to capacity and for Monday-aligned weekly candles.
+"""
+
+import os
+import sys
+import logging
+from datetime import datetime, timezone
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from data.klines import KLINE_DTYPE
+from data.volume_profile import parse_duration
+from data.feed.resampler import CandleResampler, resample_klines
+
+logger = logging.getLogger('aGENtrader')
+
+MINUTE_MS = 60_000
+# A Monday, 00:00 UTC
+START_MS = 1_699_833_600_000
+
+
+class FakeClock:
+    def __init__(self, now_ms):
+        self.now_ms = now_ms
+
+    def __call__(self):
+        return self.now_ms / 1000
+
+
+class FakeExchange:
+    """Serves base candles opened since START_MS up to the clock, the last one forming."""
+
+    def __init__(self, clock, base_interval):
+        self.clock = clock
+        self.base_interval = base_interval
+        self.base_ms = parse_duration(base_interval)
+        self.requests = 0
+
+    def history(self):
+        count = (self.clock.now_ms - START_MS) // self.base_ms + 1
+        klines = np.zeros(count, dtype=KLINE_DTYPE)
+        index = np.arange(count)
+        elapsed = np.minimum(self.clock.now_ms - (START_MS + index * self.base_ms), self.base_ms) // MINUTE_MS
+        klines["timestamp"] = START_MS + index * self.base_ms
+        klines["close_time"] = klines["timestamp"] + self.base_ms - 1
+        klines["open"] = 100.0 + index % 17
+        klines["high"] = klines["open"] + 5.0 + elapsed % 3
+        klines["low"] = klines["open"] - 5.0 - index % 4
+        klines["close"] = klines["open"] + elapsed % 5 - 2.0
+        klines["volume"] = elapsed
+        klines["quote_asset_volume"] = elapsed * 100.0
+        klines["number_of_trades"] = elapsed * 3
+        klines["taker_buy_base_asset_volume"] = elapsed // 2
+        klines["taker_buy_quote_asset_volume"] = (elapsed // 2) * 100.0
+        return klines
+
+    def fetch_klines(self, symbol, interval, limit, start_time=None, end_time=None):
+        assert interval == self.base_interval
+        self.requests += 1
+        klines = self.history()
+        if end_time is not None:
+            klines = klines[klines["timestamp"] <= end_time]
+        if start_time is not None:
+            return klines[klines["timestamp"] >= start_time][:limit]
+        return klines[-limit:]
+
+
+def check(resampler, exchange, interval, limit):
+    """Fetch through the resampler and compare with full recomputes."""
+    interval_ms = parse_duration(interval)
+    candles = resampler.fetch_klines("BTC/USDT", interval, limit)
+    assert len(candles) == limit
+
+    expected = resample_klines(exchange.history(), interval_ms)[-limit:]
+    assert np.array_equal(candles, expected), (interval, exchange.clock.now_ms)
+
+    stored = resample_klines(resampler._series["BTCUSDT"].klines, interval_ms)[-limit:]
+    assert np.array_equal(candles, stored)
+    return candles
+
+
+def test_refreshes_match_full_recompute():
+    """Derived candles stay equal to a full recompute as base candles form and close."""
+    clock = FakeClock(START_MS + 3000 * 3_600_000 + 7 * MINUTE_MS)
+    exchange = FakeExchange(clock, "1h")
+    resampler = CandleResampler(exchange, "1h", max_base_candles=400, max_age_seconds=60, clock=clock)
+
+    for interval in ("2h", "4h", "1d"):
+        check(resampler, exchange, interval, 12)
+    generation, requests = resampler._series["BTCUSDT"].generation, exchange.requests
+
+    for step in range(1, 400):
+        clock.now_ms += 17 * MINUTE_MS
+        for interval in ("2h", "4h", "1d"):
+            check(resampler, exchange, interval, 12)
+
+    # Every later refresh was incremental, with one request each
+    assert resampler._series["BTCUSDT"].generation == generation
+    assert exchange.requests == requests + step
+
+
+def test_capacity_trimming():
+    """Trimming the stored candles to capacity, mid-bucket, keeps derived candles correct."""
+    clock = FakeClock(START_MS + 500 * 3_600_000)
+    exchange = FakeExchange(clock, "1h")
+    resampler = CandleResampler(exchange, "1h", max_base_candles=30, max_age_seconds=60, clock=clock)
+
+    generation = None
+    for step in range(300):
+        check(resampler, exchange, "4h", 6)
+        if step % 3 == 0:
+            check(resampler, exchange, "8h", 3)
+        clock.now_ms += 45 * MINUTE_MS
+
+        series = resampler._series["BTCUSDT"]
+        assert len(series.klines) == series.capacity == 31
+        derived = resampler._derived[("BTCUSDT", "4h")][2]
+        assert len(derived) <= len(series.klines) // 4 + 1
+        generation = generation or series.generation
+    assert resampler._series["BTCUSDT"].generation == generation
+
+
+def test_weekly_alignment():
+    """Weekly candles open on Mondays and match a full recompute."""
+    clock = FakeClock(START_MS + 400 * 86_400_000 + 5 * 3_600_000)
+    exchange = FakeExchange(clock, "1d")
+    resampler = CandleResampler(exchange, "1d", max_base_candles=60, max_age_seconds=60, clock=clock)
+
+    for _ in range(40):
+        candles = check(resampler, exchange, "1w", 5)
+        for timestamp in candles["timestamp"]:
+            assert datetime.fromtimestamp(timestamp / 1000, timezone.utc).weekday() == 0
+        assert candles["close_time"][-1] == candles["timestamp"][-1] + 7 * 86_400_000 - 1
+        clock.now_ms += 19 * 3_600_000
+
+
+if __name__ == "__main__":
+    logging.basicConfig(
+        level=logging.INFO,
+        format='%(asctime)s - aGENtrader - %(levelname)s - %(message)s'
+    )
+    test_refreshes_match_full_recompute()
+    test_capacity_trimming()
+    test_weekly_alignment()
+    logger.info("✅ Candle resampler check passed")
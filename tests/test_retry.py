@@ -0,0 +1,257 @@
+#!/usr/bin/env python3
+"""
+Retry policy checks
+
+Runs RetryPolicy against a fake clock whose sleep only advances the time,
+covering the jittered delays, error classification, Retry-After handling,
+the per-endpoint retry budget and the throttle cooldown after 429/418.
+"""
+
+import os
+import sys
+import random
+import logging
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils import retry
+from utils.retry import (Classification, RetryBudget, RetryPolicy, ThrottledError,
+                         classify_error, cooldown_remaining, parse_retry_after)
+
+logger = logging.getLogger('aGENtrader')
+
+
+class FakeClock:
+    """Stands in for the time module in utils.retry; sleeping advances the clock."""
+
+    def __init__(self):
+        self.now = 1_000.0
+        self.sleeps = []
+        self._time = None
+
+    def monotonic(self):
+        return self.now
+
+    def time(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.sleeps.append(seconds)
+        self.now += seconds
+
+    def __enter__(self):
+        self._time, retry.time = retry.time, self
+        return self
+
+    def __exit__(self, *exc):
+        retry.time = self._time
+
+
+class Response:
+    def __init__(self, status_code, headers=None):
+        self.status_code = status_code
+        self.headers = headers or {}
+
+
+class HTTPError(Exception):
+    """Client error carrying a response, as requests raises."""
+
+    def __init__(self, status_code, headers=None):
+        super().__init__(f"HTTP {status_code}")
+        self.response = Response(status_code, headers)
+
+
+class Flaky:
+    """Callable failing with the given errors before returning "ok"."""
+
+    def __init__(self, *errors):
+        self.errors = list(errors)
+        self.calls = 0
+
+    def __call__(self):
+        self.calls += 1
+        if self.errors:
+            raise self.errors.pop(0)
+        return "ok"
+
+
+def test_classify_error():
+    """Transient and throttling failures are retryable, others are not."""
+    assert classify_error(TimeoutError()) == Classification(True)
+    assert classify_error(ConnectionError()) == Classification(True)
+    assert classify_error(HTTPError(503)) == Classification(True, False, None)
+    assert classify_error(HTTPError(429, {"Retry-After": "7"})) == Classification(True, True, 7.0)
+    assert classify_error(HTTPError(418)).throttled
+    assert classify_error(HTTPError(400)) == Classification(False, False, None)
+    assert classify_error(ValueError("bad symbol")) == Classification(False)
+
+    # Re-raised errors are classified by their cause
+    try:
+        try:
+            raise HTTPError(429, {"Retry-After": "2"})
+        except HTTPError as e:
+            raise Exception("fetch failed") from e
+    except Exception as e:
+        assert classify_error(e) == Classification(True, True, 2.0)
+
+
+def test_parse_retry_after():
+    """Retry-After is read as seconds or an HTTP date relative to now."""
+    with FakeClock() as clock:
+        clock.now = 1_700_000_000.0
+        assert parse_retry_after("3") == 3.0
+        assert parse_retry_after("-1") == 0.0
+        assert parse_retry_after("Tue, 14 Nov 2023 22:13:50 GMT") == 30.0
+        assert parse_retry_after("soon") is None
+        assert parse_retry_after(None) is None
+
+
+def test_jitter_bounds():
+    """Each delay lies between the base delay and three times the previous one, capped."""
+    random.seed(7)
+    policy = RetryPolicy("retry-jitter-check", max_attempts=6, base_delay=0.2, max_delay=2.0,
+                         budget_burst=1000.0)
+    for _ in range(200):
+        with FakeClock() as clock:
+            attempt = Flaky(*[TimeoutError()] * 5)
+            assert policy.run(attempt) == "ok"
+        assert attempt.calls == 6
+        previous = policy.base_delay
+        for delay in clock.sleeps:
+            assert policy.base_delay <= delay <= min(policy.max_delay, previous * 3)
+            previous = delay
+
+
+def test_gives_up():
+    """Non-retryable errors raise at once; retryable ones after max_attempts."""
+    policy = RetryPolicy("retry-give-up-check", max_attempts=3)
+    with FakeClock() as clock:
+        attempt = Flaky(HTTPError(400))
+        try:
+            policy.run(attempt)
+            assert False, "400 should not be retried"
+        except HTTPError:
+            pass
+        assert attempt.calls == 1 and clock.sleeps == []
+
+        attempt = Flaky(*[HTTPError(502)] * 3)
+        try:
+            policy.run(attempt)
+            assert False, "retries should be exhausted"
+        except HTTPError:
+            pass
+        assert attempt.calls == 3 and len(clock.sleeps) == 2
+
+    # retry_on adds exception types to the classifier's transient errors
+    policy = RetryPolicy("retry-on-check", retry_on=[KeyError])
+    with FakeClock():
+        assert policy.run(Flaky(KeyError("price"))) == "ok"
+
+
+def test_budget_exhaustion():
+    """Once the burst is spent, retries are limited to the deposit ratio of calls."""
+    budget = RetryBudget(ratio=0.5, burst=2.0)
+    assert budget.withdraw() and budget.withdraw()
+    assert not budget.withdraw()
+    budget.deposit()
+    assert not budget.withdraw()
+    budget.deposit()
+    assert budget.withdraw()
+    for _ in range(10):
+        budget.deposit()
+    assert budget.tokens == 2.0
+
+    policy = RetryPolicy("retry-budget-check", max_attempts=10, budget_ratio=0.0, budget_burst=3.0)
+    with FakeClock() as clock:
+        attempt = Flaky(*[TimeoutError()] * 10)
+        try:
+            policy.run(attempt, budget_key="retry-budget-check:/api/v3/klines")
+            assert False, "budget should be exhausted"
+        except TimeoutError:
+            pass
+        assert attempt.calls == 4 and len(clock.sleeps) == 3
+
+        # The budget is per key: another endpoint still retries
+        assert policy.run(Flaky(TimeoutError()), budget_key="retry-budget-check:/api/v3/depth") == "ok"
+        attempt = Flaky(TimeoutError())
+        try:
+            policy.run(attempt, budget_key="retry-budget-check:/api/v3/klines")
+            assert False, "budget should still be exhausted"
+        except TimeoutError:
+            pass
+        assert attempt.calls == 1
+
+
+def test_retry_after_is_honored():
+    """The delay is at least the server's Retry-After; longer than max_delay is not waited for."""
+    random.seed(7)
+    policy = RetryPolicy("retry-after-check", max_delay=10.0)
+    with FakeClock() as clock:
+        assert policy.run(Flaky(HTTPError(503, {"Retry-After": "4"}))) == "ok"
+        assert clock.sleeps == [4.0]
+
+        attempt = Flaky(HTTPError(503, {"Retry-After": "60"}))
+        try:
+            policy.run(attempt)
+            assert False, "Retry-After above max_delay should not be waited for"
+        except HTTPError:
+            pass
+        assert attempt.calls == 1 and clock.sleeps == [4.0]
+
+
+def test_cooldown_after_throttling():
+    """A 429/418 holds every call of the throttle group until its cooldown ends."""
+    binance = RetryPolicy("retry-cooldown-check", throttle_key="retry-cooldown-group", max_delay=10.0)
+    other = RetryPolicy("retry-cooldown-other", throttle_key="retry-cooldown-group", max_delay=10.0)
+    with FakeClock() as clock:
+        assert binance.run(Flaky(HTTPError(429, {"Retry-After": "5"}))) == "ok"
+        assert clock.sleeps == [5.0]
+        assert cooldown_remaining("retry-cooldown-group") == 0.0
+
+        # A failed 418 with no retries left still sets the cooldown for the group
+        single = RetryPolicy("retry-cooldown-single", max_attempts=1,
+                             throttle_key="retry-cooldown-group", max_delay=10.0)
+        try:
+            single.run(Flaky(HTTPError(418, {"Retry-After": "8"})))
+            assert False, "max_attempts=1 should not retry"
+        except HTTPError:
+            pass
+        assert cooldown_remaining("retry-cooldown-group") == 8.0
+
+        # The next call in the group waits the cooldown out before sending
+        clock.now += 3.0
+        attempt = Flaky()
+        assert other.run(attempt) == "ok"
+        assert clock.sleeps[-1] == 5.0 and attempt.calls == 1
+
+        # A cooldown longer than max_delay raises without sending
+        try:
+            single.run(Flaky(HTTPError(429, {"Retry-After": "30"})))
+            assert False, "max_attempts=1 should not retry"
+        except HTTPError:
+            pass
+        attempt = Flaky()
+        try:
+            other.run(attempt)
+            assert False, "a long cooldown should raise"
+        except ThrottledError:
+            pass
+        assert attempt.calls == 0
+
+        # Policies without a throttle key ignore the group
+        assert RetryPolicy("retry-cooldown-free").run(Flaky()) == "ok"
+
+
+if __name__ == "__main__":
+    logging.basicConfig(
+        level=logging.INFO,
+        format='%(asctime)s - aGENtrader - %(levelname)s - %(message)s'
+    )
+    test_classify_error()
+    test_parse_retry_after()
+    test_jitter_bounds()
+    test_gives_up()
+    test_budget_exhaustion()
+    test_retry_after_is_honored()
+    test_cooldown_after_throttling()
+    logger.info("✅ Retry policy check passed")
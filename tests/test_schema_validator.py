@@ -0,0 +1,91 @@
+#!/usr/bin/env python3
+"""
+Kline validation checks
+
+validate_klines checks every row unless a sample size is asked for, so a
+single broken row in a long response is reported by default. Sampling
+through sample_size or SampledValidator stays opt-in.
+"""
+
+import os
+import sys
+import logging
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from data.klines import parse_klines
+from utils.error_handler import ValidationError
+from utils.schema_validator import SampledValidator, validate_api_response, validate_klines
+
+logger = logging.getLogger('aGENtrader')
+
+
+def make_klines(count, broken=None):
+    """Binance kline rows one minute apart, with the high below the low at row `broken`."""
+    klines = []
+    for i in range(count):
+        open_time = 1_700_000_000_000 + i * 60_000
+        high, low = ("99.0", "101.0") if i == broken else ("101.0", "99.0")
+        klines.append([open_time, "100.0", high, low, "100.5", "12.5", open_time + 59_999,
+                       "1250.0", 42, "6.0", "600.0", "0"])
+    return klines
+
+
+def test_every_row_is_validated_by_default():
+    """One broken row among 1000 is reported without a sample size."""
+    assert validate_klines(make_klines(1000)) == []
+
+    errors = validate_klines(make_klines(1000, broken=517))
+    assert len(errors) == 1
+    assert "row 517" in errors[0]
+
+    try:
+        validate_api_response(make_klines(1000, broken=517), "klines")
+        assert False, "broken row should fail validation"
+    except ValidationError:
+        pass
+
+
+def test_sample_size_is_opt_in():
+    """A sample checks the first, last and sample_size - 2 random rows."""
+    assert validate_klines(make_klines(1000, broken=999), sample_size=10)
+    assert validate_klines(make_klines(1000, broken=0), sample_size=10)
+
+    # With only the two ends sampled, a broken middle row passes
+    assert validate_klines(make_klines(1000, broken=517), sample_size=2) == []
+    validate_api_response(make_klines(1000, broken=517), "klines", sample_size=2)
+
+
+def test_parsed_klines_are_validated_in_full():
+    """Arrays returned by parse_klines are checked without conversion."""
+    assert validate_klines(parse_klines(make_klines(1000))) == []
+    assert validate_klines(parse_klines(make_klines(1000, broken=3)), sample_size=2)
+
+
+def test_sampled_validator():
+    """SampledValidator validates the first message and every n-th after it."""
+    validator = SampledValidator("klines", every=3)
+    checked = [validator(make_klines(50)) for _ in range(7)]
+    assert checked == [True, False, False, True, False, False, True]
+    assert validator.validated == 3
+
+    # Skipped messages pass unchecked; validated ones still raise
+    assert not validator(make_klines(50, broken=10))
+    assert not validator(make_klines(50, broken=10))
+    try:
+        validator(make_klines(50, broken=10))
+        assert False, "validated message should raise"
+    except ValidationError:
+        pass
+
+
+if __name__ == "__main__":
+    logging.basicConfig(
+        level=logging.INFO,
+        format='%(asctime)s - aGENtrader - %(levelname)s - %(message)s'
+    )
+    test_every_row_is_validated_by_default()
+    test_sample_size_is_opt_in()
+    test_parsed_klines_are_validated_in_full()
+    test_sampled_validator()
+    logger.info("✅ Kline validation check passed")
@@ -0,0 +1,160 @@
+#!/usr/bin/env python3
+"""
+StopEngine checks
+
+Stop loss and take profit hits for long and short positions against last
+prices and bar ranges, a bar spanning both levels, the trailing stop
+ratchet, and positions added into slots freed by earlier exits.
+"""
+
+import os
+import sys
+import logging
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from core.trading.stop_engine import StopEngine
+
+logger = logging.getLogger('aGENtrader')
+
+
+def by_id(events):
+    return {event["position_id"]: event for event in events}
+
+
+def test_evaluate_prices():
+    """Long and short positions hit their levels at the last price, filled at that price."""
+    engine = StopEngine()
+    engine.add_position("long-sl", "BTCUSDT", "BUY", 100.0, stop_loss=95.0, take_profit=110.0)
+    engine.add_position("long-tp", "ETHUSDT", "BUY", 100.0, stop_loss=95.0, take_profit=110.0)
+    engine.add_position("short-sl", "ETHUSDT", "SELL", 100.0, stop_loss=105.0, take_profit=90.0)
+    engine.add_position("short-tp", "BTCUSDT", "SELL", 100.0, stop_loss=105.0, take_profit=90.0)
+    engine.add_position("idle", "SOLUSDT", "BUY", 100.0, stop_loss=95.0, take_profit=110.0)
+
+    # Nothing triggers between the levels
+    assert engine.evaluate({"BTCUSDT": 100.0, "ETHUSDT": 100.0, "SOLUSDT": 100.0}) == []
+
+    events = by_id(engine.evaluate({"BTCUSDT": 80.0, "ETHUSDT": 112.0}))
+    assert set(events) == {"long-sl", "long-tp", "short-sl", "short-tp"}
+    assert events["long-sl"]["reason"] == "Stop loss"
+    assert events["long-tp"]["reason"] == "Take profit"
+    assert events["short-sl"]["reason"] == "Stop loss"
+    assert events["short-tp"]["reason"] == "Take profit"
+
+    # A price that gaps through a level fills at the price
+    assert events["long-sl"]["exit_price"] == 80.0
+    assert events["long-sl"]["pnl_pct"] == -20.0
+    assert events["short-tp"]["exit_price"] == 80.0
+    assert events["short-tp"]["pnl_pct"] == 20.0
+    assert events["short-sl"]["action"] == "SELL"
+    assert events["short-sl"]["pnl_pct"] == -12.0
+
+    # Triggered positions are removed; a symbol without a price is skipped
+    assert len(engine) == 1 and "idle" in engine
+    assert engine.evaluate({"BTCUSDT": 1.0}) == []
+
+
+def test_evaluate_bars():
+    """Bar ranges trigger at the stop or target level, filled at that level."""
+    engine = StopEngine()
+    engine.add_position("long", "BTCUSDT", "BUY", 100.0, stop_loss=95.0, take_profit=110.0)
+    engine.add_position("short", "ETHUSDT", "SELL", 100.0, stop_loss=105.0, take_profit=90.0)
+
+    assert engine.evaluate_bars({"BTCUSDT": 109.0, "ETHUSDT": 104.0}, {"BTCUSDT": 96.0, "ETHUSDT": 91.0}) == []
+
+    events = by_id(engine.evaluate_bars({"BTCUSDT": 111.0, "ETHUSDT": 107.0},
+                                        {"BTCUSDT": 99.0, "ETHUSDT": 98.0}))
+    assert events["long"]["reason"] == "Take profit"
+    assert events["long"]["exit_price"] == 110.0
+    assert events["long"]["pnl_pct"] == 10.0
+    assert events["short"]["reason"] == "Stop loss"
+    assert events["short"]["exit_price"] == 105.0
+    assert events["short"]["pnl_pct"] == -5.0
+    assert len(engine) == 0
+
+
+def test_bar_spanning_both_levels():
+    """When a bar reaches both the stop and the target, the stop fills first."""
+    engine = StopEngine()
+    engine.add_position("long", "BTCUSDT", "BUY", 100.0, stop_loss=95.0, take_profit=110.0)
+    engine.add_position("short", "ETHUSDT", "SELL", 100.0, stop_loss=105.0, take_profit=90.0)
+
+    events = by_id(engine.evaluate_bars({"BTCUSDT": 115.0, "ETHUSDT": 115.0},
+                                        {"BTCUSDT": 85.0, "ETHUSDT": 85.0}))
+    assert events["long"]["reason"] == "Stop loss" and events["long"]["exit_price"] == 95.0
+    assert events["short"]["reason"] == "Stop loss" and events["short"]["exit_price"] == 105.0
+
+
+def test_trailing_stop_ratchet():
+    """Trailing stops follow the best price, never loosen, and trigger as trailing stops."""
+    engine = StopEngine()
+    engine.add_position("long", "BTCUSDT", "BUY", 100.0, stop_loss=90.0, trailing_stop_pct=5.0)
+    engine.add_position("short", "ETHUSDT", "SELL", 100.0, trailing_stop_pct=5.0)
+
+    # Starts at the trailing distance from entry when that is tighter
+    assert engine.get_levels("long")["stop_loss"] == 95.0
+    assert engine.get_levels("short")["stop_loss"] == 105.0
+
+    # The bar is checked against the old level before the ratchet
+    assert engine.evaluate_bars({"BTCUSDT": 120.0, "ETHUSDT": 101.0}, {"BTCUSDT": 96.0, "ETHUSDT": 80.0}) == []
+    assert engine.get_levels("long") == {"stop_loss": 114.0, "take_profit": 0.0, "best_price": 120.0}
+    assert engine.get_levels("short") == {"stop_loss": 84.0, "take_profit": 0.0, "best_price": 80.0}
+
+    # A pullback does not move the stops back
+    assert engine.evaluate({"BTCUSDT": 115.0, "ETHUSDT": 83.0}) == []
+    assert engine.get_levels("long")["stop_loss"] == 114.0
+    assert engine.get_levels("short")["stop_loss"] == 84.0
+
+    events = by_id(engine.evaluate_bars({"BTCUSDT": 116.0, "ETHUSDT": 85.0}, {"BTCUSDT": 113.0, "ETHUSDT": 82.0}))
+    assert events["long"]["reason"] == "Trailing stop"
+    assert events["long"]["exit_price"] == 114.0
+    assert events["short"]["reason"] == "Trailing stop"
+    assert events["short"]["exit_price"] == 84.0
+    assert events["short"]["pnl_pct"] == 16.0
+
+
+def test_freed_slots_are_reused():
+    """Positions added into freed slots carry none of the previous occupant's state."""
+    engine = StopEngine(initial_capacity=2)
+    engine.add_position("a", "BTCUSDT", "BUY", 100.0, stop_loss=95.0, trailing_stop_pct=5.0)
+    engine.add_position("b", "ETHUSDT", "SELL", 100.0, stop_loss=105.0, take_profit=90.0)
+    engine.evaluate_bars({"BTCUSDT": 130.0, "ETHUSDT": 100.0}, {"BTCUSDT": 125.0, "ETHUSDT": 100.0})
+    assert engine.get_levels("a")["stop_loss"] == 123.5
+
+    assert engine.remove_position("a")
+    assert not engine.remove_position("a")
+    engine.add_position("c", "SOLUSDT", "SELL", 50.0, take_profit=40.0)
+    assert len(engine._entry) == 2
+    assert engine.get_levels("c") == {"stop_loss": 0.0, "take_profit": 40.0, "best_price": 50.0}
+
+    # The reused slot has neither the old trailing stop nor the old symbol
+    assert engine.evaluate({"BTCUSDT": 10.0, "SOLUSDT": 60.0}) == []
+    events = engine.evaluate({"SOLUSDT": 39.0, "ETHUSDT": 106.0})
+    assert sorted(event["position_id"] for event in events) == ["b", "c"]
+    assert by_id(events)["c"]["reason"] == "Take profit"
+
+    # Growing past the capacity keeps existing positions and adds new slots
+    for n in range(5):
+        engine.add_position(f"p{n}", "BTCUSDT", "BUY", 100.0 + n, stop_loss=90.0)
+    assert len(engine) == 5 and len(engine._entry) == 8
+    events = engine.evaluate({"BTCUSDT": 89.0})
+    assert sorted(event["entry_price"] for event in events) == [100.0, 101.0, 102.0, 103.0, 104.0]
+
+    # Re-adding an id replaces the position instead of adding a second one
+    engine.add_position("x", "BTCUSDT", "BUY", 100.0, stop_loss=90.0)
+    engine.add_position("x", "BTCUSDT", "SELL", 100.0, stop_loss=110.0)
+    assert len(engine) == 1
+    assert engine.evaluate({"BTCUSDT": 89.0}) == []
+
+
+if __name__ == "__main__":
+    logging.basicConfig(
+        level=logging.INFO,
+        format='%(asctime)s - aGENtrader - %(levelname)s - %(message)s'
+    )
+    test_evaluate_prices()
+    test_evaluate_bars()
+    test_bar_spanning_both_levels()
+    test_trailing_stop_ratchet()
+    test_freed_slots_are_reused()
+    logger.info("✅ Stop engine check passed")
@@ -5,10 +5,16 @@ This module provides utilities for loading and managing configuration settings.
 """
 
 import os
+import copy
 import json
+import inspect
 import logging
+import threading
+import weakref
 from typing import Dict, Any, Optional, Union, List
 
+from utils.metrics import track_cache
+
 logger = logging.getLogger('aGENtrader.utils.config')
 
 class Config:
@@ -98,6 +104,18 @@ class Config:
         """
         return self.get_value(section, {})
     
+    def is_agent_active(self, agent_name: str) -> bool:
+        """
+        Check whether an agent is enabled.
+        
+        Args:
+            agent_name: Agent section name (e.g., 'risk_guard')
+            
+        Returns:
+            Value of agents.<agent_name>.enabled (True if not configured)
+        """
+        return bool(self.get_value(f"agents.{agent_name}.enabled", True))
+    
     def to_dict(self) -> Dict[str, Any]:
         """
         Convert the configuration to a dictionary.
@@ -137,4 +155,198 @@ def get_config(config_path: Optional[str] = None) -> Config:
             path = env_var[11:].lower().replace('_', '.')
             config.set_value(path, value)
     
-    return config
\ No newline at end of file
+    return config
+
+class ConfigCache:
+    """
+    Process-wide cache of parsed configuration files.
+    
+    Each file is parsed once and re-parsed only when its modification time
+    or size changes. Callers get a deep copy of the cached tree, so they can
+    modify it freely. Subscribers are notified when a file changes, either
+    when a load notices the change or from the optional polling watcher.
+    """
+    
+    def __init__(self):
+        """Initialize an empty cache."""
+        self._entries: Dict[str, Dict[str, Any]] = {}
+        self._subscribers: Dict[str, List[Any]] = {}
+        self._lock = threading.RLock()
+        self._watcher: Optional[threading.Thread] = None
+        self._stop_event = threading.Event()
+        self.stats = {"hits": 0, "parses": 0, "reloads": 0}
+    
+    @staticmethod
+    def _key(file_path: str) -> str:
+        """Normalize a path for use as a cache key."""
+        return os.path.abspath(file_path)
+    
+    @staticmethod
+    def _parse(file_path: str) -> Dict[str, Any]:
+        """Parse a YAML or JSON file."""
+        with open(file_path, 'r') as f:
+            if file_path.endswith(('.yaml', '.yml')):
+                import yaml
+                data = yaml.safe_load(f)
+            else:
+                data = json.load(f)
+        return data if data is not None else {}
+    
+    def load(self, file_path: str) -> Dict[str, Any]:
+        """
+        Get the parsed contents of a configuration file.
+        
+        Args:
+            file_path: Path to a YAML or JSON file
+            
+        Returns:
+            Deep copy of the parsed configuration
+            
+        Raises:
+            FileNotFoundError: If the file does not exist
+            ImportError: If a YAML file is requested and PyYAML is not installed
+        """
+        key = self._key(file_path)
+        stat = os.stat(key)
+        signature = (stat.st_mtime_ns, stat.st_size)
+        
+        changed = False
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry["signature"] == signature:
+                self.stats["hits"] += 1
+                data = entry["data"]
+            else:
+                data = self._parse(key)
+                changed = entry is not None
+                self._entries[key] = {"signature": signature, "data": data}
+                self.stats["parses"] += 1
+        
+        if changed:
+            logger.info(f"Configuration file changed: {file_path}")
+            self._notify(key)
+        return copy.deepcopy(data)
+    
+    def invalidate(self, file_path: Optional[str] = None) -> None:
+        """
+        Drop cached contents so the next load re-parses.
+        
+        Args:
+            file_path: File to drop (all files if None)
+        """
+        with self._lock:
+            if file_path is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(self._key(file_path), None)
+    
+    def subscribe(self, file_path: str, callback: Any) -> None:
+        """
+        Call `callback()` whenever a configuration file changes.
+        
+        Bound methods are held weakly, so subscribing an agent does not keep
+        it alive.
+        
+        Args:
+            file_path: Configuration file to watch
+            callback: Callable taking no arguments (e.g., agent.reload_config)
+        """
+        ref = weakref.WeakMethod(callback) if inspect.ismethod(callback) else (lambda: callback)
+        with self._lock:
+            self._subscribers.setdefault(self._key(file_path), []).append(ref)
+    
+    def unsubscribe(self, file_path: str, callback: Any) -> None:
+        """
+        Stop notifying a callback.
+        
+        Args:
+            file_path: Configuration file
+            callback: Previously subscribed callable
+        """
+        with self._lock:
+            refs = self._subscribers.get(self._key(file_path), [])
+            self._subscribers[self._key(file_path)] = [ref for ref in refs if ref() not in (None, callback)]
+    
+    def _notify(self, key: str) -> None:
+        """Call the live subscribers of a file (outside the lock)."""
+        with self._lock:
+            refs = self._subscribers.get(key, [])
+            live = [ref for ref in refs if ref() is not None]
+            self._subscribers[key] = live
+            callbacks = [ref() for ref in live]
+        
+        self.stats["reloads"] += 1
+        for callback in callbacks:
+            try:
+                callback()
+            except Exception as e:
+                logger.error(f"Error in config reload callback {callback}: {str(e)}", exc_info=True)
+    
+    def check_for_changes(self) -> List[str]:
+        """
+        Re-load every cached file whose modification time or size changed.
+        
+        Returns:
+            Paths of the files that changed
+        """
+        with self._lock:
+            entries = list(self._entries.items())
+        
+        changed = []
+        for key, entry in entries:
+            try:
+                stat = os.stat(key)
+            except OSError:
+                continue
+            if (stat.st_mtime_ns, stat.st_size) != entry["signature"]:
+                try:
+                    self.load(key)
+                    changed.append(key)
+                except Exception as e:
+                    logger.error(f"Error reloading configuration {key}: {str(e)}")
+        return changed
+    
+    def start_watching(self, interval: float = 2.0) -> None:
+        """
+        Poll cached files for changes in a daemon thread.
+        
+        Args:
+            interval: Seconds between checks
+        """
+        if self._watcher is not None and self._watcher.is_alive():
+            return
+        
+        self._stop_event.clear()
+        
+        def watch():
+            while not self._stop_event.wait(interval):
+                self.check_for_changes()
+        
+        self._watcher = threading.Thread(target=watch, name="config-watcher", daemon=True)
+        self._watcher.start()
+        logger.info(f"Watching configuration files for changes every {interval}s")
+    
+    def stop_watching(self) -> None:
+        """Stop the polling thread."""
+        self._stop_event.set()
+        if self._watcher is not None:
+            self._watcher.join(timeout=5)
+            self._watcher = None
+
+
+# Process-wide configuration cache
+config_cache = ConfigCache()
+track_cache("config", lambda: config_cache.stats, misses="parses")
+
+
+def load_cached_config(file_path: str) -> Dict[str, Any]:
+    """
+    Load a YAML or JSON configuration file through the process-wide cache.
+    
+    Args:
+        file_path: Path to configuration file
+        
+    Returns:
+        Parsed configuration (a copy the caller may modify)
+    """
+    return config_cache.load(file_path)
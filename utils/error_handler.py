@@ -11,6 +11,8 @@ import functools
 from typing import Dict, Any, Optional, Callable, List, Type, Union, Tuple
 from functools import wraps
 
+from utils.retry import RetryPolicy
+
 # Configure logging
 logging.basicConfig(
     level=logging.INFO,
@@ -34,46 +36,49 @@ class LLMError(Exception):
     """Exception raised for errors related to language model usage."""
     pass
 
+class TradeExecutionError(Exception):
+    """Exception raised for errors in the trade execution pipeline."""
+    pass
+
+class MockDataFallbackError(Exception):
+    """Exception raised when falling back to mock data is not allowed."""
+    pass
+
+class RetryExhaustedError(Exception):
+    """Exception raised when all retry attempts of an operation failed."""
+    pass
+
 def retry_with_backoff(max_retries: int = 3, 
                       initial_backoff: float = 1.0, 
                       backoff_factor: float = 2.0,
                       exceptions_to_retry: Optional[List[Type[Exception]]] = None) -> Callable:
     """
-    Decorator to retry functions with exponential backoff.
+    Decorator to retry functions with jittered backoff (sync or async).
+    
+    Built on utils.retry.RetryPolicy: delays use decorrelated jitter capped
+    at initial_backoff * backoff_factor ** max_retries, only transient errors
+    (timeouts, connection errors, HTTP 429/418/5xx) and exceptions_to_retry
+    are retried, Retry-After is honored and retries share a budget per
+    decorated function.
     
     Args:
         max_retries: Maximum number of retries
         initial_backoff: Initial backoff time in seconds
         backoff_factor: Factor to increase backoff time with each retry
-        exceptions_to_retry: List of exception types to retry on
+        exceptions_to_retry: Additional exception types to retry on
         
     Returns:
         Decorated function
     """
-    if exceptions_to_retry is None:
-        exceptions_to_retry = [Exception]
-        
     def decorator(func: Callable) -> Callable:
-        @wraps(func)
-        def wrapper(*args, **kwargs):
-            retries = 0
-            backoff = initial_backoff
-            
-            while retries <= max_retries:
-                try:
-                    return func(*args, **kwargs)
-                except tuple(exceptions_to_retry) as e:
-                    retries += 1
-                    if retries > max_retries:
-                        logger.error(f"Max retries reached for {func.__name__}: {str(e)}")
-                        raise
-                        
-                    logger.warning(f"Retry {retries}/{max_retries} for {func.__name__} after error: {str(e)}")
-                    logger.warning(f"Backing off for {backoff} seconds...")
-                    time.sleep(backoff)
-                    backoff *= backoff_factor
-        
-        return wrapper
+        policy = RetryPolicy(
+            f"{func.__module__}.{func.__qualname__}",
+            max_attempts=max_retries + 1,
+            base_delay=initial_backoff,
+            max_delay=initial_backoff * backoff_factor ** max_retries,
+            retry_on=exceptions_to_retry
+        )
+        return policy(func)
     
     return decorator
 
@@ -98,6 +103,31 @@ def handle_api_errors(func: Callable) -> Callable:
     
     return wrapper
 
+def handle_trade_execution_error(func: Callable) -> Callable:
+    """
+    Decorator turning an exception in a trade pipeline step into an error result.
+    
+    Args:
+        func: Function to decorate (returns a trade execution result dictionary)
+        
+    Returns:
+        Decorated function
+    """
+    @wraps(func)
+    def wrapper(*args, **kwargs):
+        try:
+            return func(*args, **kwargs)
+        except Exception as e:
+            logger.error(f"Trade execution error in {func.__name__}: {str(e)}")
+            return {
+                "status": "error",
+                "error": True,
+                "message": f"Trade execution error: {str(e)}",
+                "timestamp": time.strftime("%Y-%m-%d %H:%M:%S")
+            }
+    
+    return wrapper
+
 def check_api_keys(required_keys: List[str]) -> bool:
     """
     Check if required API keys are present in environment variables.
@@ -0,0 +1,498 @@
+"""
+Metrics for aGENtrader v2
+
+This module keeps an in-process registry of counters, gauges and histograms
+and serves them in the Prometheus text format on a local /metrics endpoint.
+
+Recording is an increment under a per-series lock; nothing is formatted or
+aggregated until the endpoint is scraped. Values that already live elsewhere
+(cache statistics, queue lengths, open positions) are not copied on every
+change: a callback is attached to the series with set_function() and read
+at scrape time only.
+
+Timings of cycles, agents, API requests and LLM calls come from the spans
+of utils.tracing: start_http_server() registers a span listener, so the
+histograms are filled only while the endpoint is being served.
+
+Example:
+    from utils.metrics import start_http_server
+    start_http_server(9108)   # curl http://127.0.0.1:9108/metrics
+"""
+
+import os
+import math
+import bisect
+import logging
+import threading
+from typing import Dict, Any, List, Optional, Callable, Sequence, Tuple
+
+from utils.tracing import tracer, Span, CYCLE, AGENT, DATA_FETCH, LLM, DB
+
+# Setup logger
+logger = logging.getLogger("aGENtrader.metrics")
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# Latency buckets in seconds, from a cached lookup to a slow LLM call
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0)
+
+
+def _format_value(value: float) -> str:
+    """Format a sample value as Prometheus expects."""
+    if math.isnan(value):
+        return "NaN"
+    if math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    if value == int(value) and abs(value) < 1e15:
+        return str(int(value))
+    return repr(float(value))
+
+
+def _escape(value: str) -> str:
+    """Escape a label value."""
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _label_string(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    """Render {name="value",...} (empty string when there are no labels)."""
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+class _Series:
+    """
+    One labelled series of a counter or gauge.
+    """
+
+    __slots__ = ("_value", "_lock", "_function")
+
+    def __init__(self):
+        self._value = 0.0
+        self._lock = threading.Lock()
+        self._function: Optional[Callable[[], float]] = None
+
+    def inc(self, amount: float = 1.0) -> None:
+        """Add to the value."""
+        with self._lock:
+            self._value += amount
+
+    def dec(self, amount: float = 1.0) -> None:
+        """Subtract from the value."""
+        with self._lock:
+            self._value -= amount
+
+    def set(self, value: float) -> None:
+        """Set the value."""
+        with self._lock:
+            self._value = float(value)
+
+    def set_function(self, function: Callable[[], float]) -> None:
+        """Read the value from a callback at scrape time instead."""
+        self._function = function
+
+    def get(self) -> float:
+        """Current value (NaN if the callback fails)."""
+        if self._function is not None:
+            try:
+                return float(self._function())
+            except Exception as e:
+                logger.debug(f"Metric callback failed: {str(e)}")
+                return math.nan
+        return self._value
+
+
+class _HistogramSeries:
+    """
+    One labelled series of a histogram.
+    """
+
+    __slots__ = ("_upper_bounds", "_counts", "_sum", "_lock")
+
+    def __init__(self, upper_bounds: Tuple[float, ...]):
+        self._upper_bounds = upper_bounds
+        self._counts = [0] * (len(upper_bounds) + 1)
+        self._sum = 0.0
+        self._lock = threading.Lock()
+
+    def observe(self, value: float) -> None:
+        """Record one observation."""
+        index = bisect.bisect_left(self._upper_bounds, value)
+        with self._lock:
+            self._counts[index] += 1
+            self._sum += value
+
+    def snapshot(self) -> Tuple[List[int], float]:
+        """Per-bucket counts (not cumulative, +Inf last) and the sum."""
+        with self._lock:
+            return list(self._counts), self._sum
+
+
+class Metric:
+    """
+    A named metric family with zero or more label dimensions.
+
+    Series are created on first use of a label combination; a metric without
+    labels can be recorded on directly (inc/set/observe).
+    """
+
+    type = "untyped"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        """
+        Initialize the metric.
+
+        Args:
+            name: Metric name
+            documentation: HELP text
+            labelnames: Label dimensions
+        """
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._series: Dict[Tuple[str, ...], Any] = {}
+        self._lock = threading.Lock()
+
+    def _new_series(self) -> Any:
+        return _Series()
+
+    def labels(self, *values: Any, **labels: Any) -> Any:
+        """
+        Get the series for a label combination.
+
+        Args:
+            *values: Label values in labelnames order
+            **labels: Label values by name
+
+        Returns:
+            The series (created on first use)
+        """
+        if labels:
+            values = tuple(str(labels[name]) for name in self.labelnames)
+        else:
+            values = tuple(str(value) for value in values)
+        series = self._series.get(values)
+        if series is None:
+            if len(values) != len(self.labelnames):
+                raise ValueError(f"{self.name} expects labels {self.labelnames}, got {values}")
+            with self._lock:
+                series = self._series.setdefault(values, self._new_series())
+        return series
+
+    def _samples(self) -> List[str]:
+        lines = []
+        for values, series in list(self._series.items()):
+            lines.append(f"{self.name}{_label_string(self.labelnames, values)} {_format_value(series.get())}")
+        return lines
+
+    def render(self) -> List[str]:
+        """Lines of the text exposition format for this family."""
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.type}"]
+        lines.extend(self._samples())
+        return lines
+
+
+class Counter(Metric):
+    """
+    Monotonically increasing count.
+    """
+
+    type = "counter"
+
+    def inc(self, amount: float = 1.0) -> None:
+        """Increment the unlabelled series."""
+        self.labels().inc(amount)
+
+
+class Gauge(Metric):
+    """
+    Value that can go up and down.
+    """
+
+    type = "gauge"
+
+    def inc(self, amount: float = 1.0) -> None:
+        """Increment the unlabelled series."""
+        self.labels().inc(amount)
+
+    def dec(self, amount: float = 1.0) -> None:
+        """Decrement the unlabelled series."""
+        self.labels().dec(amount)
+
+    def set(self, value: float) -> None:
+        """Set the unlabelled series."""
+        self.labels().set(value)
+
+    def set_function(self, function: Callable[[], float]) -> None:
+        """Read the unlabelled series from a callback at scrape time."""
+        self.labels().set_function(function)
+
+
+class Histogram(Metric):
+    """
+    Distribution of observations in cumulative buckets.
+    """
+
+    type = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                 buckets: Sequence[float] = DEFAULT_BUCKETS):
+        """
+        Initialize the histogram.
+
+        Args:
+            name: Metric name
+            documentation: HELP text
+            labelnames: Label dimensions
+            buckets: Bucket upper bounds (+Inf is implied)
+        """
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(float(b) for b in buckets if not math.isinf(b)))
+
+    def _new_series(self) -> _HistogramSeries:
+        return _HistogramSeries(self.buckets)
+
+    def observe(self, value: float) -> None:
+        """Observe on the unlabelled series."""
+        self.labels().observe(value)
+
+    def _samples(self) -> List[str]:
+        lines = []
+        for values, series in list(self._series.items()):
+            counts, total = series.snapshot()
+            cumulative = 0
+            for bound, count in zip(self.buckets + (math.inf,), counts):
+                cumulative += count
+                le = 'le="' + _format_value(bound) + '"'
+                lines.append(f"{self.name}_bucket{_label_string(self.labelnames, values, le)} {cumulative}")
+            labels = _label_string(self.labelnames, values)
+            lines.append(f"{self.name}_sum{labels} {_format_value(total)}")
+            lines.append(f"{self.name}_count{labels} {cumulative}")
+        return lines
+
+
+class MetricsRegistry:
+    """
+    Collection of metric families rendered together on scrape.
+    """
+
+    def __init__(self):
+        """Initialize an empty registry."""
+        self._metrics: Dict[str, Metric] = {}
+        self._lock = threading.Lock()
+
+    def _register(self, metric: Metric) -> Metric:
+        with self._lock:
+            existing = self._metrics.get(metric.name)
+            if existing is not None:
+                if type(existing) is not type(metric) or existing.labelnames != metric.labelnames:
+                    raise ValueError(f"Metric {metric.name} already registered with a different type or labels")
+                return existing
+            self._metrics[metric.name] = metric
+            return metric
+
+    def counter(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Counter:
+        """Get or create a counter."""
+        return self._register(Counter(name, documentation, labelnames))
+
+    def gauge(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Gauge:
+        """Get or create a gauge."""
+        return self._register(Gauge(name, documentation, labelnames))
+
+    def histogram(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                  buckets: Sequence[float] = DEFAULT_BUCKETS) -> Histogram:
+        """Get or create a histogram."""
+        return self._register(Histogram(name, documentation, labelnames, buckets))
+
+    def get(self, name: str) -> Optional[Metric]:
+        """Look up a metric family by name."""
+        return self._metrics.get(name)
+
+    def render(self) -> str:
+        """The whole registry in the Prometheus text format."""
+        lines = []
+        for metric in list(self._metrics.values()):
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+# Process-wide registry and the trading loop's metrics
+registry = MetricsRegistry()
+
+cycle_seconds = registry.histogram(
+    "agentrader_cycle_duration_seconds", "Duration of trading and analysis cycles", ["cycle", "status"])
+agent_seconds = registry.histogram(
+    "agentrader_agent_duration_seconds", "Duration of agent analyze/decision calls", ["agent", "status"])
+api_request_seconds = registry.histogram(
+    "agentrader_api_request_duration_seconds", "Duration of exchange API requests", ["endpoint"])
+api_requests = registry.counter(
+    "agentrader_api_requests_total", "Exchange API requests by HTTP status", ["provider", "endpoint", "code"])
+api_weight_used = registry.gauge(
+    "agentrader_api_weight_used", "Request weight used in the current minute (X-MBX-USED-WEIGHT-1M)", ["provider", "api"])
+llm_seconds = registry.histogram(
+    "agentrader_llm_request_duration_seconds", "Duration of LLM queries", ["provider", "model", "status"])
+llm_fallbacks = registry.counter(
+    "agentrader_llm_fallbacks_total", "LLM queries re-routed to another provider", ["from_provider", "to_provider", "reason"])
+db_seconds = registry.histogram(
+    "agentrader_db_operation_duration_seconds", "Duration of database operations", ["operation", "status"])
+retries = registry.counter(
+    "agentrader_retries_total", "Retry decisions by policy and outcome", ["policy", "outcome"])
+provider_latency = registry.gauge(
+    "agentrader_provider_latency_ewma_seconds", "Moving average latency of market data providers", ["provider"])
+provider_error_rate = registry.gauge(
+    "agentrader_provider_error_rate", "Moving average error rate of market data providers", ["provider"])
+hedged_requests = registry.counter(
+    "agentrader_hedged_requests_total", "Market data requests hedged to a second provider, by winner",
+    ["method", "winner"])
+cache_hits = registry.counter(
+    "agentrader_cache_hits_total", "Cache lookups served from the cache", ["cache"])
+cache_misses = registry.counter(
+    "agentrader_cache_misses_total", "Cache lookups that had to load or fetch", ["cache"])
+cache_hit_ratio = registry.gauge(
+    "agentrader_cache_hit_ratio", "Share of cache lookups served from the cache", ["cache"])
+queue_depth = registry.gauge(
+    "agentrader_queue_depth", "Items waiting in internal queues and buffers", ["queue"])
+open_positions = registry.gauge(
+    "agentrader_open_positions", "Open positions", ["book"])
+unrealized_pnl = registry.gauge(
+    "agentrader_unrealized_pnl", "Unrealized PnL of open positions in quote currency", ["book"])
+trigger_delay = registry.histogram(
+    "agentrader_trigger_delay_seconds", "Delay between a scheduled decision trigger and its execution",
+    ["interval"], buckets=(0.01, 0.05, 0.1, 0.5, 1.0, 5.0, 15.0, 30.0, 60.0, 300.0))
+
+
+def record_api_response(provider: str, endpoint: str, response: Any, api: str = "spot") -> None:
+    """
+    Count an API response and track the weight the exchange reports as used.
+
+    Args:
+        provider: Data provider name (e.g. "binance")
+        endpoint: Request path
+        response: requests.Response
+        api: "spot" or "futures" (weights are tracked per API)
+    """
+    api_requests.labels(provider, endpoint, response.status_code).inc()
+    used = response.headers.get("X-MBX-USED-WEIGHT-1M") or response.headers.get("x-mbx-used-weight-1m")
+    if used is not None:
+        try:
+            api_weight_used.labels(provider, api).set(float(used))
+        except ValueError:
+            pass
+
+
+def track_cache(name: str, stats: Callable[[], Dict[str, Any]], hits: str = "hits",
+                misses: str = "misses") -> None:
+    """
+    Expose a cache's own hit/miss statistics (read at scrape time).
+
+    Args:
+        name: Cache label value
+        stats: Callable returning the cache's statistics dictionary
+        hits: Key of the hit count
+        misses: Key of the miss count
+    """
+    def ratio() -> float:
+        current = stats()
+        total = current[hits] + current[misses]
+        return current[hits] / total if total else 0.0
+
+    cache_hits.labels(name).set_function(lambda: stats()[hits])
+    cache_misses.labels(name).set_function(lambda: stats()[misses])
+    cache_hit_ratio.labels(name).set_function(ratio)
+
+
+def observe_span(span: Span) -> None:
+    """Tracer listener turning finished spans into latency metrics."""
+    seconds = (span.duration_ns or 0) / 1e9
+    kind = span.kind
+    if kind == CYCLE:
+        cycle_seconds.labels(span.name, span.status).observe(seconds)
+    elif kind == AGENT:
+        agent_seconds.labels(span.name, span.status).observe(seconds)
+    elif kind == DATA_FETCH:
+        endpoint = span.attributes.get("endpoint")
+        if endpoint:
+            api_request_seconds.labels(endpoint).observe(seconds)
+    elif kind == LLM:
+        attributes = span.attributes
+        llm_seconds.labels(attributes.get("provider", ""), attributes.get("model", ""), span.status).observe(seconds)
+    elif kind == DB:
+        db_seconds.labels(span.name, span.status).observe(seconds)
+
+
+def _pending_spans() -> int:
+    """Spans buffered by the tracer for traces that have not finished."""
+    return sum(len(spans) for spans in list(tracer._pending.values()))
+
+
+def _handler_class(metrics_registry: MetricsRegistry) -> type:
+    """Request handler serving a registry on GET /metrics."""
+    from http.server import BaseHTTPRequestHandler
+
+    class MetricsHandler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path.split("?", 1)[0] not in ("/metrics", "/"):
+                self.send_error(404)
+                return
+            body = metrics_registry.render().encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", CONTENT_TYPE)
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            logger.debug(f"{self.address_string()} - {format % args}")
+
+    return MetricsHandler
+
+
+_server: Optional[Any] = None
+_server_lock = threading.Lock()
+
+
+def start_http_server(port: Optional[int] = None, host: Optional[str] = None,
+                      metrics_registry: MetricsRegistry = registry) -> Any:
+    """
+    Serve /metrics from a daemon thread and start recording span timings.
+
+    Args:
+        port: TCP port (default: METRICS_PORT or 9108; 0 picks a free port)
+        host: Bind address (default: METRICS_HOST or 127.0.0.1)
+        metrics_registry: Registry to serve
+
+    Returns:
+        The running ThreadingHTTPServer (server_address holds the bound port)
+    """
+    from http.server import ThreadingHTTPServer
+
+    global _server
+    with _server_lock:
+        if _server is not None:
+            return _server
+
+        port = int(os.environ.get("METRICS_PORT", 9108)) if port is None else port
+        host = host or os.environ.get("METRICS_HOST", "127.0.0.1")
+        server = ThreadingHTTPServer((host, port), _handler_class(metrics_registry))
+        server.daemon_threads = True
+        threading.Thread(target=server.serve_forever, name="metrics-server", daemon=True).start()
+
+        tracer.add_listener(observe_span)
+        queue_depth.labels("pending_trace_spans").set_function(_pending_spans)
+        _server = server
+
+    logger.info(f"Serving metrics on http://{server.server_address[0]}:{server.server_address[1]}/metrics")
+    return server
+
+
+def stop_http_server() -> None:
+    """Stop the server and the span listener."""
+    global _server
+    with _server_lock:
+        if _server is None:
+            return
+        tracer.remove_listener(observe_span)
+        _server.shutdown()
+        _server.server_close()
+        _server = None
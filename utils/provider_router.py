@@ -0,0 +1,298 @@
+"""
+Provider Router for aGENtrader v2
+
+This module routes market data requests across interchangeable providers
+(Binance, CoinAPI, ...) by observed health instead of a fixed order:
+- each provider's latency and error rate are tracked as exponentially
+  weighted moving averages, plus a window of recent latencies for p95
+- providers are ranked by latency inflated by error rate; the caller's
+  preferred provider keeps first place unless it is clearly worse
+- a request is hedged: if the first provider has not answered within its
+  p95 latency, the next one is asked as well, and the first valid response
+  wins. A loser that has not started is cancelled; one already in flight
+  cannot be interrupted (requests has no cancellation), so its response is
+  discarded and only its latency is recorded.
+
+Errors and invalid responses (empty candles, zero prices) fail over to the
+next provider immediately. Health is tracked process-wide by provider name,
+so short-lived factories share what earlier requests learned.
+"""
+
+import os
+import time
+import logging
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, Future, wait, FIRST_COMPLETED
+from typing import Dict, Any, List, Optional, Callable, Tuple
+
+from utils.tracing import propagate
+from utils.metrics import hedged_requests, provider_latency, provider_error_rate
+
+# Setup logger
+logger = logging.getLogger("aGENtrader.provider_router")
+
+DEFAULT_ALPHA = 0.2
+LATENCY_WINDOW = 200
+
+# Hedge delay until a provider has MIN_SAMPLES_FOR_P95 successful responses
+DEFAULT_HEDGE_DELAY = 1.0
+MIN_HEDGE_DELAY = 0.05
+MIN_SAMPLES_FOR_P95 = 20
+
+# Error rates are weighted this much against latency when ranking
+ERROR_PENALTY = 4.0
+
+
+class ProviderStats:
+    """
+    Latency and error-rate tracking for one provider.
+    """
+
+    def __init__(self, name: str, alpha: float = DEFAULT_ALPHA):
+        """
+        Initialize empty statistics.
+
+        Args:
+            name: Provider name
+            alpha: EWMA weight of the newest observation
+        """
+        self.name = name
+        self.alpha = alpha
+        self.latency: Optional[float] = None
+        self.error_rate = 0.0
+        self.requests = 0
+        self.errors = 0
+        self._latencies = deque(maxlen=LATENCY_WINDOW)
+        self._lock = threading.Lock()
+
+    def record(self, latency: float, ok: bool) -> None:
+        """
+        Record the outcome of a request.
+
+        Args:
+            latency: Seconds until the provider answered (or failed)
+            ok: Whether the answer was valid
+        """
+        with self._lock:
+            self.requests += 1
+            self.errors += 0 if ok else 1
+            self.error_rate += self.alpha * ((0.0 if ok else 1.0) - self.error_rate)
+            if ok:
+                self.latency = latency if self.latency is None else self.latency + self.alpha * (latency - self.latency)
+                self._latencies.append(latency)
+
+    def p95(self) -> Optional[float]:
+        """95th percentile of recent successful latencies (None until enough samples)."""
+        with self._lock:
+            if len(self._latencies) < MIN_SAMPLES_FOR_P95:
+                return None
+            ordered = sorted(self._latencies)
+        return ordered[min(len(ordered) - 1, int(0.95 * len(ordered)))]
+
+    @property
+    def score(self) -> Optional[float]:
+        """Ranking score in seconds (lower is better; None before the first request)."""
+        if self.requests == 0:
+            return None
+        latency = self.latency if self.latency is not None else DEFAULT_HEDGE_DELAY
+        return latency * (1.0 + ERROR_PENALTY * self.error_rate)
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Snapshot for status output."""
+        return {
+            "latency_ewma": self.latency,
+            "latency_p95": self.p95(),
+            "error_rate": self.error_rate,
+            "requests": self.requests,
+            "errors": self.errors
+        }
+
+
+_stats: Dict[str, ProviderStats] = {}
+_stats_lock = threading.Lock()
+_executor: Optional[ThreadPoolExecutor] = None
+
+
+def provider_stats(name: str) -> ProviderStats:
+    """Process-wide statistics for a provider name."""
+    with _stats_lock:
+        stats = _stats.get(name)
+        if stats is None:
+            stats = _stats[name] = ProviderStats(name)
+            provider_latency.labels(name).set_function(lambda: stats.latency or 0.0)
+            provider_error_rate.labels(name).set_function(lambda: stats.error_rate)
+        return stats
+
+
+def _get_executor() -> ThreadPoolExecutor:
+    """Shared pool running provider requests."""
+    global _executor
+    with _stats_lock:
+        if _executor is None:
+            workers = int(os.environ.get("PROVIDER_ROUTER_WORKERS", "16"))
+            _executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="provider-router")
+        return _executor
+
+
+def has_data(result: Any) -> bool:
+    """Default validity check: not None, not empty and not a zero or negative number."""
+    if result is None or (isinstance(result, (int, float)) and result <= 0):
+        return False
+    return not (hasattr(result, "__len__") and len(result) == 0)
+
+
+class ProviderRouter:
+    """
+    Sends requests to the healthiest of several providers, hedging slow
+    ones.
+    """
+
+    def __init__(self, hedge: bool = True, preference_margin: float = 2.0,
+                 hedge_delay: Optional[float] = None):
+        """
+        Initialize the router.
+
+        Args:
+            hedge: Ask the next provider when the first is slower than its p95
+            preference_margin: How many times worse than the best provider the
+                preferred provider may score and still be tried first
+            hedge_delay: Fixed hedge delay in seconds (default: the provider's p95)
+        """
+        self.hedge = hedge
+        self.preference_margin = preference_margin
+        self.fixed_hedge_delay = hedge_delay
+        self.providers: Dict[str, Any] = {}
+
+    def register(self, name: str, provider: Any) -> None:
+        """
+        Add a provider.
+
+        Args:
+            name: Provider name (statistics are shared by name)
+            provider: Provider instance
+        """
+        self.providers[name] = provider
+        provider_stats(name)
+
+    def stats(self) -> Dict[str, Dict[str, Any]]:
+        """Statistics of the registered providers."""
+        return {name: provider_stats(name).to_dict() for name in self.providers}
+
+    def ranked(self, preferred: Optional[str] = None, names: Optional[List[str]] = None) -> List[str]:
+        """
+        Provider names in the order they should be tried.
+
+        Args:
+            preferred: Provider to try first unless it is clearly worse
+            names: Candidate names (default: all registered, in registration order)
+
+        Returns:
+            Ordered provider names
+        """
+        names = list(names if names is not None else self.providers)
+        scores = {name: provider_stats(name).score for name in names}
+
+        # Measured providers by score, then unmeasured ones in registration order
+        order = sorted((name for name in names if scores[name] is not None), key=scores.get)
+        best = scores[order[0]] if order else None
+        order += [name for name in names if scores[name] is None]
+
+        if preferred in scores:
+            if scores[preferred] is None or best is None or scores[preferred] <= best * self.preference_margin:
+                order.remove(preferred)
+                order.insert(0, preferred)
+        return order
+
+    def hedge_delay(self, name: str) -> float:
+        """Seconds to wait for a provider before hedging to the next one."""
+        if self.fixed_hedge_delay is not None:
+            return self.fixed_hedge_delay
+        p95 = provider_stats(name).p95()
+        return max(p95 if p95 is not None else DEFAULT_HEDGE_DELAY, MIN_HEDGE_DELAY)
+
+    def _submit(self, name: str, request: Callable[[Any], Any], validate: Callable[[Any], bool]) -> Future:
+        """Start a request on the pool, recording its outcome when it finishes."""
+        provider = self.providers[name]
+        started = time.perf_counter()
+
+        def run() -> Any:
+            try:
+                result = request(provider)
+            except Exception:
+                provider_stats(name).record(time.perf_counter() - started, False)
+                raise
+            provider_stats(name).record(time.perf_counter() - started, validate(result))
+            return result
+
+        return _get_executor().submit(propagate(run))
+
+    def call(self, request: Callable[[Any], Any], method: str = "request", preferred: Optional[str] = None,
+             validate: Callable[[Any], bool] = has_data, default: Any = None,
+             supports: Optional[Callable[[Any], bool]] = None) -> Tuple[Optional[str], Any]:
+        """
+        Run a request against the providers until one gives a valid result.
+
+        Args:
+            request: Function taking a provider and returning its result
+            method: Request name for logs and metrics
+            preferred: Provider to try first unless it is clearly worse
+            validate: Returns whether a result is usable
+            default: Result when every provider fails
+            supports: Returns whether a provider can serve the request
+
+        Returns:
+            Tuple of (winning provider name or None, result)
+        """
+        candidates = [name for name in self.providers
+                      if supports is None or supports(self.providers[name])]
+        queue = self.ranked(preferred, candidates)
+        if not queue:
+            logger.error(f"No provider available for {method}")
+            return None, default
+
+        pending: Dict[Future, str] = {}
+        hedged = False
+
+        def start_next() -> None:
+            name = queue.pop(0)
+            pending[self._submit(name, request, validate)] = name
+
+        start_next()
+        while pending:
+            # Hedge a slow provider once; errors fail over without waiting
+            timeout = None
+            if self.hedge and queue and not hedged and len(pending) == 1:
+                timeout = self.hedge_delay(next(iter(pending.values())))
+
+            done, _ = wait(list(pending), timeout=timeout, return_when=FIRST_COMPLETED)
+            if not done:
+                hedged = True
+                logger.info(f"{pending[next(iter(pending))]} slow on {method}, hedging to {queue[0]}")
+                start_next()
+                continue
+
+            for future in done:
+                name = pending.pop(future)
+                try:
+                    result = future.result()
+                except Exception as e:
+                    logger.warning(f"Provider {name} failed on {method}: {str(e)}")
+                    continue
+                if not validate(result):
+                    logger.warning(f"Provider {name} returned no data for {method}")
+                    continue
+
+                for loser in pending:
+                    loser.cancel()
+                if hedged:
+                    hedged_requests.labels(method, name).inc()
+                return name, result
+
+            if not pending and queue:
+                start_next()
+
+        if hedged:
+            hedged_requests.labels(method, "none").inc()
+        logger.error(f"All providers failed on {method}")
+        return None, default
@@ -0,0 +1,371 @@
+"""
+Retry Policies for aGENtrader v2
+
+This module retries failed calls without turning an outage into a retry
+storm:
+- delays use decorrelated jitter (each delay is drawn between the base
+  delay and three times the previous one, capped), so concurrent callers
+  that failed together do not retry together
+- only transient errors are retried: timeouts, connection errors, HTTP 429
+  and 418 (rate limited / banned) and 5xx; other errors are raised at once
+- Retry-After is honored. A 429/418 also puts the whole throttle group
+  (e.g. every Binance endpoint, since weight limits are per IP) into a
+  cooldown that later calls wait out before sending, and a Retry-After
+  longer than max_delay is not waited for in-line at all
+- retries are paid from a per-endpoint budget that earns a fraction of a
+  token per call, capping retries at about that share of traffic (10% by
+  default) once the initial burst is spent
+
+The same policy serves synchronous and asyncio callers: run() sleeps with
+time.sleep, run_async() with asyncio.sleep, and the decorator picks one
+based on the decorated function.
+
+Example:
+    policy = RetryPolicy("binance", max_attempts=4, throttle_key="binance")
+    data = policy.run(lambda: session.get(url, timeout=10), budget_key="binance:/api/v3/klines")
+
+    @RetryPolicy("coinapi", base_delay=0.5)
+    async def fetch(...): ...
+"""
+
+import sys
+import time
+import random
+import asyncio
+import logging
+import functools
+import threading
+from email.utils import parsedate_to_datetime
+from typing import Dict, Any, Optional, Callable, Awaitable, NamedTuple, Sequence, Type, TypeVar
+
+from utils.metrics import retries as retry_counter
+
+# Setup logger
+logger = logging.getLogger("aGENtrader.retry")
+
+T = TypeVar("T")
+
+RETRYABLE_STATUS = {408, 425, 429, 418, 500, 502, 503, 504}
+THROTTLE_STATUS = {429, 418}
+
+# Exception class names of HTTP clients treated as transient (checked only
+# when the client module is already imported)
+TRANSIENT_ERRORS = {
+    "requests": ("Timeout", "ConnectionError", "ChunkedEncodingError"),
+    "aiohttp": ("ServerTimeoutError", "ClientConnectionError", "ClientPayloadError")
+}
+
+
+class ThrottledError(RuntimeError):
+    """Raised instead of sending while a throttle group cools down for longer than max_delay."""
+    pass
+
+
+class Classification(NamedTuple):
+    """How a failure should be handled."""
+    retryable: bool
+    throttled: bool = False
+    retry_after: Optional[float] = None
+
+
+def parse_retry_after(value: Any) -> Optional[float]:
+    """
+    Parse a Retry-After header value (seconds or an HTTP date).
+
+    Returns:
+        Seconds to wait, or None if missing or unparseable
+    """
+    if value is None:
+        return None
+    try:
+        return max(float(value), 0.0)
+    except (TypeError, ValueError):
+        pass
+    try:
+        return max(parsedate_to_datetime(str(value)).timestamp() - time.time(), 0.0)
+    except (TypeError, ValueError, IndexError, OverflowError):
+        return None
+
+
+def _http_status(error: BaseException) -> Optional[int]:
+    """HTTP status carried by a client error (requests or aiohttp), if any."""
+    response = getattr(error, "response", None)
+    status = getattr(response, "status_code", None) or getattr(error, "status", None)
+    return int(status) if isinstance(status, int) else None
+
+
+def _headers(error: BaseException) -> Dict[str, Any]:
+    """Response headers carried by a client error, if any."""
+    response = getattr(error, "response", None)
+    return getattr(response, "headers", None) or getattr(error, "headers", None) or {}
+
+
+def _is_transient(error: BaseException) -> bool:
+    """Whether an error is a timeout or connection failure."""
+    if isinstance(error, (TimeoutError, ConnectionError, asyncio.TimeoutError)):
+        return True
+    for module_name, class_names in TRANSIENT_ERRORS.items():
+        module = sys.modules.get(module_name)
+        if module is None:
+            continue
+        exceptions = getattr(module, "exceptions", module)
+        classes = tuple(getattr(exceptions, name) for name in class_names if hasattr(exceptions, name))
+        if classes and isinstance(error, classes):
+            return True
+    return False
+
+
+def classify_error(error: BaseException) -> Classification:
+    """
+    Decide whether a failure is worth retrying.
+
+    Follows the exception chain, so an error re-raised as a generic
+    Exception (as the data providers do) is classified by its cause.
+
+    Args:
+        error: Raised exception
+
+    Returns:
+        Classification of the error
+    """
+    seen = set()
+    while error is not None and id(error) not in seen:
+        seen.add(id(error))
+        status = _http_status(error)
+        if status is not None:
+            retry_after = parse_retry_after(_headers(error).get("Retry-After"))
+            return Classification(status in RETRYABLE_STATUS, status in THROTTLE_STATUS, retry_after)
+        if _is_transient(error):
+            return Classification(True)
+        error = error.__cause__ or error.__context__
+    return Classification(False)
+
+
+class RetryBudget:
+    """
+    Token bucket limiting retries to a share of calls.
+
+    Each call deposits `ratio` tokens and each retry withdraws one; the
+    bucket starts full at `burst` tokens, which is also its cap.
+    """
+
+    def __init__(self, ratio: float = 0.1, burst: float = 10.0):
+        """
+        Initialize the budget.
+
+        Args:
+            ratio: Retries allowed per call in the long run
+            burst: Retries allowed before the ratio applies
+        """
+        self.ratio = ratio
+        self.burst = burst
+        self.tokens = burst
+        self._lock = threading.Lock()
+
+    def deposit(self) -> None:
+        """Credit one call."""
+        with self._lock:
+            self.tokens = min(self.burst, self.tokens + self.ratio)
+
+    def withdraw(self) -> bool:
+        """Take a token for a retry; False if the budget is spent."""
+        with self._lock:
+            if self.tokens < 1.0:
+                return False
+            self.tokens -= 1.0
+            return True
+
+
+_budgets: Dict[str, RetryBudget] = {}
+_cooldowns: Dict[str, float] = {}
+_registry_lock = threading.Lock()
+
+
+def retry_budget(key: str, ratio: float = 0.1, burst: float = 10.0) -> RetryBudget:
+    """Process-wide retry budget for a key (created with ratio/burst on first use)."""
+    with _registry_lock:
+        budget = _budgets.get(key)
+        if budget is None:
+            budget = _budgets[key] = RetryBudget(ratio, burst)
+        return budget
+
+
+def set_cooldown(key: str, seconds: float) -> None:
+    """Hold calls in a throttle group for at least `seconds`."""
+    until = time.monotonic() + seconds
+    with _registry_lock:
+        if until > _cooldowns.get(key, 0.0):
+            _cooldowns[key] = until
+
+
+def cooldown_remaining(key: Optional[str]) -> float:
+    """Seconds left in a throttle group's cooldown (0 if none)."""
+    if key is None:
+        return 0.0
+    with _registry_lock:
+        until = _cooldowns.get(key)
+    return max(until - time.monotonic(), 0.0) if until is not None else 0.0
+
+
+class RetryPolicy:
+    """
+    Retry rules for a family of calls.
+    """
+
+    def __init__(self,
+                 name: str,
+                 max_attempts: int = 4,
+                 base_delay: float = 0.2,
+                 max_delay: float = 10.0,
+                 throttle_key: Optional[str] = None,
+                 budget_ratio: float = 0.1,
+                 budget_burst: float = 10.0,
+                 retry_on: Optional[Sequence[Type[BaseException]]] = None,
+                 classifier: Callable[[BaseException], Classification] = classify_error):
+        """
+        Initialize the policy.
+
+        Args:
+            name: Policy name (default budget key, logs and metrics)
+            max_attempts: Attempts including the first call
+            base_delay: Smallest delay between attempts in seconds
+            max_delay: Largest delay between attempts in seconds
+            throttle_key: Group sharing 429/418 cooldowns (None: no cooldown)
+            budget_ratio: Retries allowed per call in the long run
+            budget_burst: Retries allowed before the ratio applies
+            retry_on: Exception types always retried in addition to the
+                classifier's transient errors
+            classifier: Maps an exception to a Classification
+        """
+        self.name = name
+        self.max_attempts = max(1, max_attempts)
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.throttle_key = throttle_key
+        self.budget_ratio = budget_ratio
+        self.budget_burst = budget_burst
+        self.retry_on = tuple(retry_on or ())
+        self.classifier = classifier
+
+    def _classify(self, error: BaseException) -> Classification:
+        classification = self.classifier(error)
+        if not classification.retryable and self.retry_on and isinstance(error, self.retry_on):
+            return Classification(True)
+        return classification
+
+    def _next_delay(self, previous: float, error: BaseException, attempt: int,
+                    budget: RetryBudget) -> Optional[float]:
+        """
+        Delay before the next attempt, or None to give up.
+
+        Records throttling cooldowns as a side effect.
+        """
+        classification = self._classify(error)
+        if not classification.retryable:
+            return None
+
+        delay = min(self.max_delay, random.uniform(self.base_delay, max(self.base_delay, previous * 3)))
+        if classification.retry_after is not None:
+            delay = max(delay, classification.retry_after)
+        if classification.throttled and self.throttle_key:
+            set_cooldown(self.throttle_key, delay)
+
+        if attempt >= self.max_attempts:
+            retry_counter.labels(self.name, "exhausted").inc()
+            return None
+        if delay > self.max_delay:
+            retry_counter.labels(self.name, "retry_after_too_long").inc()
+            logger.warning(f"{self.name}: server asked to wait {delay:.1f}s, not retrying")
+            return None
+        if not budget.withdraw():
+            retry_counter.labels(self.name, "budget_exhausted").inc()
+            logger.warning(f"{self.name}: retry budget exhausted, not retrying: {str(error)}")
+            return None
+
+        retry_counter.labels(self.name, "throttled" if classification.throttled else "retried").inc()
+        logger.warning(f"{self.name}: attempt {attempt}/{self.max_attempts} failed ({str(error)}), "
+                       f"retrying in {delay:.2f}s")
+        return delay
+
+    def _wait_for_cooldown(self) -> float:
+        """Seconds to wait before sending, raising if the cooldown is too long."""
+        remaining = cooldown_remaining(self.throttle_key)
+        if remaining > self.max_delay:
+            retry_counter.labels(self.name, "cooling_down").inc()
+            raise ThrottledError(f"{self.name}: throttled by the server for another {remaining:.1f}s")
+        return remaining
+
+    def run(self, attempt: Callable[[], T], budget_key: Optional[str] = None) -> T:
+        """
+        Call `attempt` until it succeeds or the policy gives up.
+
+        Args:
+            attempt: Zero-argument callable
+            budget_key: Retry budget to draw from (default: the policy name)
+
+        Returns:
+            Result of the first successful attempt
+
+        Raises:
+            The last error when it is not retryable or retries are exhausted
+        """
+        budget = retry_budget(budget_key or self.name, self.budget_ratio, self.budget_burst)
+        budget.deposit()
+        delay = self.base_delay
+        number = 0
+        while True:
+            number += 1
+            wait = self._wait_for_cooldown()
+            if wait > 0:
+                time.sleep(wait)
+            try:
+                return attempt()
+            except Exception as e:
+                delay = self._next_delay(delay, e, number, budget)
+                if delay is None:
+                    raise
+            time.sleep(delay)
+
+    async def run_async(self, attempt: Callable[[], Awaitable[T]], budget_key: Optional[str] = None) -> T:
+        """
+        Await `attempt()` until it succeeds or the policy gives up.
+
+        Args:
+            attempt: Zero-argument callable returning an awaitable
+            budget_key: Retry budget to draw from (default: the policy name)
+
+        Returns:
+            Result of the first successful attempt
+
+        Raises:
+            The last error when it is not retryable or retries are exhausted
+        """
+        budget = retry_budget(budget_key or self.name, self.budget_ratio, self.budget_burst)
+        budget.deposit()
+        delay = self.base_delay
+        number = 0
+        while True:
+            number += 1
+            wait = self._wait_for_cooldown()
+            if wait > 0:
+                await asyncio.sleep(wait)
+            try:
+                return await attempt()
+            except Exception as e:
+                delay = self._next_delay(delay, e, number, budget)
+                if delay is None:
+                    raise
+            await asyncio.sleep(delay)
+
+    def __call__(self, func: Callable) -> Callable:
+        """Decorate a function or coroutine function with this policy."""
+        if asyncio.iscoroutinefunction(func):
+            @functools.wraps(func)
+            async def async_wrapper(*args, **kwargs):
+                return await self.run_async(lambda: func(*args, **kwargs))
+            return async_wrapper
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            return self.run(lambda: func(*args, **kwargs))
+        return wrapper
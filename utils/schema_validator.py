@@ -3,16 +3,28 @@ API Response Schema Validation Module
 
 This module provides tools for validating API responses against defined schemas.
 It ensures data integrity and consistent structure before passing data to agents.
+
+Schemas are compiled once into specialized validator functions (generated
+source with one inline type check per field) and cached, so validating a
+response does not walk the schema or dispatch per field. Error messages are
+only built, by the interpreted checks, when a compiled check fails. Binance
+kline and depth arrays are validated column-wise with NumPy, and
+SampledValidator checks only a share of a high-volume stream.
 """
 
 import re
 import json
+import random
 import logging
 import datetime
-from typing import Any, Dict, List, Optional, Union, Callable, TypeVar, Type
+import itertools
+from typing import Any, Dict, List, Optional, Union, Callable, TypeVar, Type, Sequence, Tuple
+
+import numpy as np
 
-from aGENtrader_v2.utils.logger import get_logger
-from aGENtrader_v2.utils.error_handler import ValidationError
+from data.klines import parse_klines
+from utils.logger import get_logger
+from utils.error_handler import ValidationError
 
 # Setup logger
 logger = get_logger("schema_validator")
@@ -55,51 +67,34 @@ def is_null(value: Any) -> bool:
     """Check if value is None."""
     return value is None
 
+# CoinAPI format which includes the trailing zeroes and Z
+# Example: "2025-04-20T15:00:00.0000000Z"
+COINAPI_TIMESTAMP = re.compile(r'^\d{4}-\d{2}-\d{2}T\d{2}:\d{2}:\d{2}\.\d+Z$')
+
+# Basic ISO8601 regex pattern for other cases
+ISO8601_TIMESTAMP = re.compile(r'^(\d{4})-(\d{2})-(\d{2})T(\d{2}):(\d{2}):(\d{2})(\.\d+)?(Z|[+-]\d{2}:\d{2})?$')
+
 def is_iso8601_timestamp(value: Any) -> bool:
     """Check if value is a valid ISO8601 timestamp string."""
     if not isinstance(value, str):
         return False
     
-    # Handle CoinAPI format which includes the trailing zeroes and Z
-    # Example: "2025-04-20T15:00:00.0000000Z"
-    if re.match(r'^\d{4}-\d{2}-\d{2}T\d{2}:\d{2}:\d{2}\.\d+Z$', value):
+    if COINAPI_TIMESTAMP.match(value):
         return True
     
-    # Basic ISO8601 regex pattern for other cases
-    iso8601_pattern = r'^(\d{4})-(\d{2})-(\d{2})T(\d{2}):(\d{2}):(\d{2})(\.\d+)?(Z|[+-]\d{2}:\d{2})?$'
-    
-    if not re.match(iso8601_pattern, value):
+    match = ISO8601_TIMESTAMP.match(value)
+    if not match:
         return False
     
-    # Try to parse the timestamp
-    try:
-        # Remove trailing Z if present
-        if value.endswith('Z'):
-            value = value[:-1]
-        
-        # Handle timezone offset
-        if '+' in value:
-            value = value.split('+')[0]
-        elif '-' in value and value.count('-') > 2:  # Account for date separators
-            # Find the last occurrence of '-'
-            last_dash = value.rindex('-')
-            value = value[:last_dash]
-        
-        # Try parsing with different formats
-        formats = [
-            "%Y-%m-%dT%H:%M:%S",
-            "%Y-%m-%dT%H:%M:%S.%f",
-        ]
-        
-        for fmt in formats:
-            try:
-                datetime.datetime.strptime(value, fmt)
-                return True
-            except ValueError:
-                continue
-                
+    # Check the date and time fields are in range (strptime's %f takes at
+    # most 6 fraction digits)
+    year, month, day, hour, minute, second, fraction = match.groups()[:7]
+    if fraction is not None and len(fraction) > 7:
         return False
-    except Exception:
+    try:
+        datetime.datetime(int(year), int(month), int(day), int(hour), int(minute), int(second))
+        return True
+    except ValueError:
         return False
 
 # Type mapping for validation
@@ -140,6 +135,134 @@ def validate_field(field_name: str, value: Any, field_type: str) -> List[str]:
     
     return errors
 
+# Inline check per type, with {v} standing for the value
+TYPE_EXPRESSIONS = {
+    "STRING": "isinstance({v}, str)",
+    "NUMBER": "(isinstance({v}, (int, float)) and not isinstance({v}, bool))",
+    "INTEGER": "(isinstance({v}, int) and not isinstance({v}, bool))",
+    "FLOAT": "isinstance({v}, float)",
+    "BOOLEAN": "isinstance({v}, bool)",
+    "ARRAY": "isinstance({v}, list)",
+    "OBJECT": "isinstance({v}, dict)",
+    "NULL": "{v} is None",
+    "ISO8601_TIMESTAMP": "_is_iso8601_timestamp({v})",
+}
+
+_MISSING = object()
+
+def _type_expression(field_type: str, var: str) -> str:
+    """Inline check for a field type such as "FLOAT|INTEGER"."""
+    checks = [TYPE_EXPRESSIONS.get(t, "False").format(v=var) for t in field_type.split("|")]
+    return "(" + " or ".join(checks) + ")"
+
+class CompiledSchema:
+    """
+    Validator generated for one schema and set of options.
+    
+    `check` and `check_list` are generated functions returning only whether
+    the data is valid; calling the compiled schema returns error messages.
+    """
+    
+    def __init__(self, schema: Dict[str, str], ignore_extra: bool = False, partial: bool = False):
+        """
+        Generate the validator functions.
+        
+        Args:
+            schema: Schema to compile
+            ignore_extra: Whether to ignore extra fields in the data
+            partial: Whether to allow missing fields in the data
+        """
+        self.schema = dict(schema)
+        self.ignore_extra = ignore_extra
+        self.partial = partial
+        
+        body = []
+        for name, field_type in self.schema.items():
+            body.append(f"v = data.get({name!r}, _MISSING)")
+            expression = _type_expression(field_type, "v")
+            if partial:
+                body.append(f"if v is not _MISSING and not {expression}: return False")
+            else:
+                body.append(f"if v is _MISSING or not {expression}: return False")
+        if not ignore_extra:
+            if partial:
+                body.append("if not _KEYS.issuperset(data): return False")
+            else:
+                # Every schema field is present, so any other key makes the count differ
+                body.append(f"if len(data) != {len(self.schema)}: return False")
+        
+        lines = ["def check(data):", "    if not isinstance(data, dict): return False"]
+        lines += ["    " + line for line in body]
+        lines += ["    return True", "",
+                  "def check_list(items):",
+                  "    if not isinstance(items, list): return False",
+                  "    for data in items:",
+                  "        if not isinstance(data, dict): return False"]
+        lines += ["        " + line for line in body]
+        lines += ["    return True"]
+        self.source = "\n".join(lines)
+        
+        namespace = {
+            "_MISSING": _MISSING,
+            "_KEYS": frozenset(self.schema),
+            "_is_iso8601_timestamp": is_iso8601_timestamp
+        }
+        exec(compile(self.source, "<schema>", "exec"), namespace)
+        self.check: Callable[[Any], bool] = namespace["check"]
+        self.check_list: Callable[[Any], bool] = namespace["check_list"]
+    
+    def __call__(self, data: Any) -> List[str]:
+        """Error messages for a data structure (empty if validation passed)."""
+        if self.check(data):
+            return []
+        return _schema_errors(data, self.schema, self.ignore_extra, self.partial)
+    
+    def validate_list(self, data_list: Any, indices: Optional[Sequence[int]] = None) -> List[str]:
+        """
+        Error messages for a list of data structures.
+        
+        Args:
+            data_list: List of items to validate
+            indices: Only validate the items at these positions
+            
+        Returns:
+            List of error messages (empty if validation passed)
+        """
+        if not isinstance(data_list, list):
+            return [f"Expected list, got {type(data_list).__name__}"]
+        if indices is None:
+            if self.check_list(data_list):
+                return []
+            indices = range(len(data_list))
+        
+        errors = []
+        check = self.check
+        for i in indices:
+            if not check(data_list[i]):
+                for error in _schema_errors(data_list[i], self.schema, self.ignore_extra, self.partial):
+                    errors.append(f"Item {i}: {error}")
+        return errors
+
+_compiled: Dict[Tuple[Any, ...], CompiledSchema] = {}
+
+def compile_schema(schema: Dict[str, str], ignore_extra: bool = False, partial: bool = False) -> CompiledSchema:
+    """
+    Compiled validator for a schema, generated on first use and cached.
+    
+    Args:
+        schema: Schema to validate against
+        ignore_extra: Whether to ignore extra fields in the data
+        partial: Whether to allow missing fields in the data
+        
+    Returns:
+        The compiled schema
+    """
+    key = (tuple(schema.items()), ignore_extra, partial)
+    compiled = _compiled.get(key)
+    if compiled is None:
+        compiled = _compiled[key] = CompiledSchema(schema, ignore_extra, partial)
+    return compiled
+
 def validate_schema(data: Dict[str, Any], schema: Dict[str, str], 
                    ignore_extra: bool = False, 
                    partial: bool = False) -> List[str]:
@@ -155,6 +278,10 @@ def validate_schema(data: Dict[str, Any], schema: Dict[str, str],
     Returns:
         List of error messages (empty if validation passed)
     """
+    return compile_schema(schema, ignore_extra, partial)(data)
+
+def _schema_errors(data: Any, schema: Dict[str, str], ignore_extra: bool, partial: bool) -> List[str]:
+    """Interpreted check of a data structure, building every error message."""
     if not isinstance(data, dict):
         return [f"Expected dictionary, got {type(data).__name__}"]
     
@@ -193,16 +320,158 @@ def validate_list_items(data_list: List[Any], item_schema: Dict[str, str],
     Returns:
         List of error messages (empty if validation passed)
     """
-    if not isinstance(data_list, list):
-        return [f"Expected list, got {type(data_list).__name__}"]
+    return compile_schema(item_schema, ignore_extra, partial).validate_list(data_list)
+
+def sample_indices(length: int, sample_size: int) -> List[int]:
+    """
+    Positions to validate in a long list: the first, the last and a random sample.
+    
+    Args:
+        length: List length
+        sample_size: Number of positions to pick
+        
+    Returns:
+        Sorted positions (all of them if the list is not longer than sample_size)
+    """
+    if length <= sample_size:
+        return list(range(length))
+    middle = random.sample(range(1, length - 1), max(sample_size - 2, 0))
+    return sorted({0, length - 1, *middle})
+
+# Binance kline array columns
+KLINE_COLUMNS = ("open_time", "open", "high", "low", "close", "volume", "close_time",
+                 "quote_asset_volume", "number_of_trades", "taker_buy_base_asset_volume",
+                 "taker_buy_quote_asset_volume", "ignore")
+KLINE_PRICE_COLUMNS = (1, 2, 3, 4)
+KLINE_VOLUME_COLUMNS = (5, 7, 9, 10)
+
+def validate_klines(klines: Any, sample_size: Optional[int] = None) -> List[str]:
+    """
+    Validate Binance kline arrays column-wise.
     
+    Rows are converted once with data.klines.parse_klines and the columns
+    checked by validate_kline_columns: positive finite prices, non-negative
+    volumes, a high/low range that contains the open and close, and
+    strictly increasing open times. Arrays already returned by parse_klines
+    are checked without conversion.
+    
+    Args:
+        klines: List of kline arrays as returned by /api/v3/klines, or a
+            KLINE_DTYPE array
+        sample_size: Only validate the first, last and a random sample of
+            rows when there are more than this many (default: every row)
+        
+    Returns:
+        List of error messages (empty if validation passed)
+    """
+    if isinstance(klines, np.ndarray) and klines.dtype.names:
+        return validate_kline_columns(klines)
+    if not isinstance(klines, list):
+        return [f"Expected list, got {type(klines).__name__}"]
+    if not klines:
+        return []
+    
+    rows = klines
+    if sample_size is not None and len(klines) > sample_size:
+        rows = [klines[i] for i in sample_indices(len(klines), sample_size)]
+    
+    try:
+        widths = set(map(len, rows))
+    except TypeError:
+        return ["Kline rows must be arrays"]
+    if widths != {len(KLINE_COLUMNS)}:
+        return [f"Kline rows must have {len(KLINE_COLUMNS)} columns, got {sorted(widths)}"]
+    
+    try:
+        columns = parse_klines(rows)
+    except (TypeError, ValueError) as e:
+        return [f"Kline columns expected NUMBER values: {e}"]
+    
+    return validate_kline_columns(columns)
+
+def validate_kline_columns(columns: Any) -> List[str]:
+    """
+    Check already converted kline columns.
+    
+    Args:
+        columns: Mapping or structured array with numeric KLINE_COLUMNS
+            fields (at least open_time, open, high, low, close and volume;
+            the open time may also be named "timestamp")
+        
+    Returns:
+        List of error messages (empty if validation passed)
+    """
     errors = []
+    names = getattr(getattr(columns, "dtype", None), "names", None) or columns.keys()
+    
+    for i in KLINE_PRICE_COLUMNS + KLINE_VOLUME_COLUMNS:
+        name = KLINE_COLUMNS[i]
+        if name not in names:
+            continue
+        column = columns[name]
+        if not np.isfinite(column).all():
+            errors.append(f"Column '{name}' has non-finite values")
+        elif i in KLINE_PRICE_COLUMNS and (column <= 0).any():
+            errors.append(f"Column '{name}' has non-positive prices")
+        elif i in KLINE_VOLUME_COLUMNS and (column < 0).any():
+            errors.append(f"Column '{name}' has negative volumes")
+    if errors:
+        return errors
     
-    # Validate each item
-    for i, item in enumerate(data_list):
-        item_errors = validate_schema(item, item_schema, ignore_extra, partial)
-        for error in item_errors:
-            errors.append(f"Item {i}: {error}")
+    open_, high, low, close = (columns[KLINE_COLUMNS[i]] for i in KLINE_PRICE_COLUMNS)
+    bad = np.flatnonzero((high < low) | (high < open_) | (high < close) | (low > open_) | (low > close))
+    if len(bad):
+        errors.append(f"{len(bad)} klines have a high/low range not containing open and close "
+                      f"(first at row {int(bad[0])})")
+    
+    open_time = columns["open_time" if "open_time" in names else "timestamp"]
+    if len(open_time) > 1 and (np.diff(open_time) <= 0).any():
+        errors.append("Kline open times are not strictly increasing")
+    if "close_time" in names and (columns["close_time"] < open_time).any():
+        errors.append("Kline close times precede open times")
+    
+    return errors
+
+def validate_depth(depth: Any, sample_size: Optional[int] = None) -> List[str]:
+    """
+    Validate a Binance order book (/api/v3/depth) column-wise.
+    
+    Each side is converted to a (levels, 2) float array; prices must be
+    positive, quantities non-negative, bids descending and asks ascending.
+    
+    Args:
+        depth: Order book with "bids" and "asks" lists of [price, quantity]
+        sample_size: Unused for order books (kept for a uniform signature);
+            depth sides are always validated in full since ordering is checked
+        
+    Returns:
+        List of error messages (empty if validation passed)
+    """
+    if not isinstance(depth, dict):
+        return [f"Expected dictionary, got {type(depth).__name__}"]
+    
+    errors = []
+    for side, descending in (("bids", True), ("asks", False)):
+        levels = depth.get(side)
+        if not isinstance(levels, list):
+            errors.append(f"Missing required field: {side}")
+            continue
+        if not levels:
+            continue
+        try:
+            array = np.asarray(levels, dtype=np.float64)
+        except (TypeError, ValueError):
+            errors.append(f"Field '{side}' expected [price, quantity] NUMBER pairs")
+            continue
+        if array.ndim != 2 or array.shape[1] != 2:
+            errors.append(f"Field '{side}' expected [price, quantity] NUMBER pairs")
+            continue
+        prices, quantities = array[:, 0], array[:, 1]
+        if not np.isfinite(array).all() or (prices <= 0).any() or (quantities < 0).any():
+            errors.append(f"Field '{side}' has invalid prices or quantities")
+        steps = np.diff(prices)
+        if len(steps) and ((steps >= 0).any() if descending else (steps <= 0).any()):
+            errors.append(f"Field '{side}' is not sorted {'descending' if descending else 'ascending'}")
     
     return errors
 
@@ -257,6 +526,12 @@ SCHEMA_REGISTRY = {
     "market_event": MARKET_EVENT_SCHEMA,
 }
 
+# Array payloads validated column-wise instead of against a field schema
+COLUMNAR_VALIDATORS = {
+    "klines": validate_klines,
+    "depth": validate_depth,
+}
+
 def get_schema(schema_name: str) -> Dict[str, str]:
     """
     Get a schema by name from the registry.
@@ -277,25 +552,34 @@ def get_schema(schema_name: str) -> Dict[str, str]:
 
 def validate_api_response(response_data: Any, schema_name: str,
                          ignore_extra: bool = False,
-                         partial: bool = False) -> None:
+                         partial: bool = False,
+                         sample_size: Optional[int] = None) -> None:
     """
     Validate an API response against a named schema.
     
     Args:
         response_data: The API response data to validate
-        schema_name: The name of the schema to validate against
+        schema_name: The name of the schema (or columnar validator, e.g.
+            "klines" or "depth") to validate against
         ignore_extra: Whether to ignore extra fields
         partial: Whether to allow missing fields
+        sample_size: Only validate the first, last and a random sample of
+            items of list responses longer than this (default: every item)
         
     Raises:
         ValidationError: If validation fails
     """
-    schema = get_schema(schema_name)
-    
-    if isinstance(response_data, list):
-        errors = validate_list_items(response_data, schema, ignore_extra, partial)
+    if schema_name in COLUMNAR_VALIDATORS:
+        errors = COLUMNAR_VALIDATORS[schema_name](response_data, sample_size)
     else:
-        errors = validate_schema(response_data, schema, ignore_extra, partial)
+        compiled = compile_schema(get_schema(schema_name), ignore_extra, partial)
+        if isinstance(response_data, list):
+            indices = None
+            if sample_size is not None and len(response_data) > sample_size:
+                indices = sample_indices(len(response_data), sample_size)
+            errors = compiled.validate_list(response_data, indices)
+        else:
+            errors = compiled(response_data)
     
     if errors:
         error_message = f"API response validation failed for schema '{schema_name}':\n" + "\n".join(errors)
@@ -342,4 +626,54 @@ def validate_market_event(event: Dict[str, Any]) -> None:
         logger.error(error_message)
         raise ValidationError(error_message)
     
-    logger.debug(f"Market event validation passed for {event.get('symbol')}")
\ No newline at end of file
+    logger.debug(f"Market event validation passed for {event.get('symbol')}")
+
+class SampledValidator:
+    """
+    Validates a share of the messages of a high-volume stream.
+    
+    The first message and every `every`-th one after it are validated in
+    full; the rest pass through unchecked. A failing message still raises.
+    """
+    
+    def __init__(self, schema_name: str, every: int = 100,
+                 ignore_extra: bool = False, partial: bool = False,
+                 sample_size: Optional[int] = None):
+        """
+        Initialize the validator.
+        
+        Args:
+            schema_name: Schema or columnar validator name (see validate_api_response)
+            every: Validate one message in this many
+            ignore_extra: Whether to ignore extra fields
+            partial: Whether to allow missing fields
+            sample_size: Item sample size within each validated list message
+        """
+        if schema_name not in COLUMNAR_VALIDATORS:
+            get_schema(schema_name)
+        self.schema_name = schema_name
+        self.every = max(1, every)
+        self.ignore_extra = ignore_extra
+        self.partial = partial
+        self.sample_size = sample_size
+        self.validated = 0
+        self._counter = itertools.count()
+    
+    def __call__(self, message: Any) -> bool:
+        """
+        Validate the message if it is due.
+        
+        Args:
+            message: Stream message
+            
+        Returns:
+            True if the message was validated, False if it was skipped
+            
+        Raises:
+            ValidationError: If a validated message fails
+        """
+        if next(self._counter) % self.every:
+            return False
+        validate_api_response(message, self.schema_name, self.ignore_extra, self.partial, self.sample_size)
+        self.validated += 1
+        return True
@@ -0,0 +1,386 @@
+"""
+Tracing for aGENtrader v2
+
+This module records where the time of a trading cycle goes as a tree of
+spans: cycle -> agent -> data fetch / indicator compute / LLM call / DB
+write / log write. The active span is held in a context variable, so nested
+calls join the trace without passing ids around (wrap callables with
+propagate() when handing work to another thread).
+
+A trace is exported when its root span ends:
+- "jsonl" (default): one span per line in logs/traces.jsonl
+- "otlp": OTLP/HTTP JSON to an OpenTelemetry collector
+- "none": tracing disabled; spans cost a context variable lookup
+
+The exporter is chosen with TRACE_EXPORTER, TRACE_FILE and
+OTEL_EXPORTER_OTLP_ENDPOINT, or configure(). scripts/trace_report.py renders
+a breakdown of the slowest cycles from the JSONL file.
+
+Listeners added with add_listener() see every span as it ends (utils.metrics
+uses this for latency histograms); spans are recorded while an exporter or a
+listener is present.
+"""
+
+import os
+import json
+import time
+import logging
+import functools
+import threading
+import contextvars
+from contextlib import contextmanager
+from typing import Dict, Any, List, Optional, Callable, Iterator
+
+# Setup logger
+logger = logging.getLogger("aGENtrader.tracing")
+
+# Span kinds
+CYCLE = "cycle"
+AGENT = "agent"
+DATA_FETCH = "data_fetch"
+COMPUTE = "compute"
+LLM = "llm"
+DB = "db"
+LOG = "log"
+INTERNAL = "internal"
+
+DEFAULT_TRACE_FILE = os.path.join("logs", "traces.jsonl")
+DEFAULT_MAX_FILE_BYTES = 50 * 1024 * 1024
+
+# Spans buffered per unfinished trace before further spans are dropped
+MAX_SPANS_PER_TRACE = 5000
+
+_current_span: contextvars.ContextVar = contextvars.ContextVar("agentrader_current_span", default=None)
+
+
+class Span:
+    """
+    One timed operation within a trace.
+    """
+
+    __slots__ = ("name", "kind", "trace_id", "span_id", "parent_id", "start_ns",
+                 "duration_ns", "attributes", "status", "_started")
+
+    def __init__(self, name: str, kind: str, parent: Optional["Span"] = None,
+                 attributes: Optional[Dict[str, Any]] = None):
+        """
+        Start a span.
+
+        Args:
+            name: Operation name
+            kind: Span kind (CYCLE, AGENT, DATA_FETCH, ...)
+            parent: Enclosing span (None starts a new trace)
+            attributes: Initial attributes
+        """
+        self.name = name
+        self.kind = kind
+        self.trace_id = parent.trace_id if parent is not None else os.urandom(16).hex()
+        self.span_id = os.urandom(8).hex()
+        self.parent_id = parent.span_id if parent is not None else None
+        self.start_ns = time.time_ns()
+        self.duration_ns: Optional[int] = None
+        self.attributes = attributes or {}
+        self.status = "ok"
+        self._started = time.perf_counter_ns()
+
+    def finish(self, error: Optional[BaseException] = None) -> None:
+        """End the span, recording an exception if one escaped it."""
+        self.duration_ns = time.perf_counter_ns() - self._started
+        if error is not None:
+            self.status = "error"
+            self.attributes["error.type"] = type(error).__name__
+            self.attributes["error.message"] = str(error)[:500]
+
+    @property
+    def duration_ms(self) -> float:
+        """Duration in milliseconds (0.0 while running)."""
+        return (self.duration_ns or 0) / 1e6
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Convert to the JSONL record format."""
+        return {
+            "trace_id": self.trace_id,
+            "span_id": self.span_id,
+            "parent_id": self.parent_id,
+            "name": self.name,
+            "kind": self.kind,
+            "start_ns": self.start_ns,
+            "duration_ns": self.duration_ns,
+            "status": self.status,
+            "attributes": self.attributes
+        }
+
+
+class JsonlSpanExporter:
+    """
+    Appends finished spans to a JSONL file, rotating it to <file>.1 when large.
+    """
+
+    def __init__(self, path: str = DEFAULT_TRACE_FILE, max_bytes: int = DEFAULT_MAX_FILE_BYTES):
+        """
+        Initialize the exporter.
+
+        Args:
+            path: Output file
+            max_bytes: Size at which the file is rotated
+        """
+        self.path = path
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+
+    def export(self, spans: List[Span]) -> None:
+        """Write spans, one JSON object per line."""
+        lines = "".join(json.dumps(span.to_dict(), default=str) + "\n" for span in spans)
+        with self._lock:
+            os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+            if os.path.exists(self.path) and os.path.getsize(self.path) > self.max_bytes:
+                os.replace(self.path, self.path + ".1")
+            with open(self.path, "a") as f:
+                f.write(lines)
+
+
+class OtlpSpanExporter:
+    """
+    Sends spans to an OpenTelemetry collector over OTLP/HTTP with JSON encoding.
+    """
+
+    OTLP_KINDS = {DATA_FETCH: 3, LLM: 3, DB: 3}  # SPAN_KIND_CLIENT; everything else INTERNAL (1)
+
+    def __init__(self, endpoint: str = "http://localhost:4318", service_name: str = "aGENtrader",
+                 timeout: float = 2.0):
+        """
+        Initialize the exporter.
+
+        Args:
+            endpoint: Collector base URL (spans are posted to <endpoint>/v1/traces)
+            service_name: service.name resource attribute
+            timeout: Request timeout in seconds
+        """
+        self.url = endpoint.rstrip("/") + "/v1/traces"
+        self.service_name = service_name
+        self.timeout = timeout
+
+    @staticmethod
+    def _attribute(key: str, value: Any) -> Dict[str, Any]:
+        """Encode an attribute as an OTLP KeyValue."""
+        if isinstance(value, bool):
+            encoded = {"boolValue": value}
+        elif isinstance(value, int):
+            encoded = {"intValue": str(value)}
+        elif isinstance(value, float):
+            encoded = {"doubleValue": value}
+        else:
+            encoded = {"stringValue": str(value)}
+        return {"key": key, "value": encoded}
+
+    def _encode(self, span: Span) -> Dict[str, Any]:
+        """Encode a span as an OTLP JSON span."""
+        attributes = dict(span.attributes, **{"agentrader.kind": span.kind})
+        encoded = {
+            "traceId": span.trace_id,
+            "spanId": span.span_id,
+            "name": span.name,
+            "kind": self.OTLP_KINDS.get(span.kind, 1),
+            "startTimeUnixNano": str(span.start_ns),
+            "endTimeUnixNano": str(span.start_ns + (span.duration_ns or 0)),
+            "attributes": [self._attribute(k, v) for k, v in attributes.items()],
+            "status": {"code": 2 if span.status == "error" else 1}
+        }
+        if span.parent_id:
+            encoded["parentSpanId"] = span.parent_id
+        return encoded
+
+    def export(self, spans: List[Span]) -> None:
+        """Post spans to the collector (errors are logged, not raised)."""
+        import requests
+
+        payload = {
+            "resourceSpans": [{
+                "resource": {"attributes": [self._attribute("service.name", self.service_name)]},
+                "scopeSpans": [{
+                    "scope": {"name": "aGENtrader.tracing"},
+                    "spans": [self._encode(span) for span in spans]
+                }]
+            }]
+        }
+        try:
+            response = requests.post(self.url, json=payload, timeout=self.timeout)
+            response.raise_for_status()
+        except Exception as e:
+            logger.warning(f"Error exporting {len(spans)} spans to {self.url}: {str(e)}")
+
+
+class Tracer:
+    """
+    Creates spans and exports finished traces.
+    """
+
+    def __init__(self, exporter: Optional[Any] = None):
+        """
+        Initialize the tracer.
+
+        Args:
+            exporter: Object with export(spans); configured from the
+                environment on first use if None
+        """
+        self._exporter = exporter
+        self._configured = exporter is not None
+        self._lock = threading.Lock()
+        self._pending: Dict[str, List[Span]] = {}
+        self._listeners: List[Callable[[Span], None]] = []
+
+    def configure(self, exporter: Optional[Any] = None, kind: Optional[str] = None) -> None:
+        """
+        Set the exporter.
+
+        Args:
+            exporter: Exporter instance (takes precedence over kind)
+            kind: "jsonl", "otlp" or "none", read from TRACE_EXPORTER if neither is given
+        """
+        if exporter is None:
+            kind = (kind or os.environ.get("TRACE_EXPORTER", "jsonl")).lower()
+            if kind == "jsonl":
+                exporter = JsonlSpanExporter(os.environ.get("TRACE_FILE", DEFAULT_TRACE_FILE))
+            elif kind == "otlp":
+                exporter = OtlpSpanExporter(os.environ.get("OTEL_EXPORTER_OTLP_ENDPOINT", "http://localhost:4318"))
+            elif kind != "none":
+                logger.warning(f"Unknown TRACE_EXPORTER '{kind}', tracing disabled")
+        self._exporter = exporter
+        self._configured = True
+
+    def add_listener(self, listener: Callable[[Span], None]) -> None:
+        """Call listener(span) whenever a span ends."""
+        with self._lock:
+            if listener not in self._listeners:
+                self._listeners = self._listeners + [listener]
+
+    def remove_listener(self, listener: Callable[[Span], None]) -> None:
+        """Stop calling a listener."""
+        with self._lock:
+            self._listeners = [l for l in self._listeners if l is not listener]
+
+    @property
+    def enabled(self) -> bool:
+        """Whether spans are recorded."""
+        if not self._configured:
+            self.configure()
+        return self._exporter is not None or bool(self._listeners)
+
+    @contextmanager
+    def span(self, name: str, kind: str = INTERNAL, **attributes: Any) -> Iterator[Optional[Span]]:
+        """
+        Time a block as a child of the current span (or as a new trace).
+
+        Args:
+            name: Operation name
+            kind: Span kind
+            **attributes: Span attributes
+
+        Yields:
+            The span (None when tracing is disabled)
+        """
+        if not self.enabled:
+            yield None
+            return
+
+        parent = _current_span.get()
+        span = Span(name, kind, parent, attributes)
+        token = _current_span.set(span)
+        if parent is None and self._exporter is not None:
+            with self._lock:
+                self._pending[span.trace_id] = []
+
+        try:
+            yield span
+        except BaseException as e:
+            span.finish(e)
+            raise
+        else:
+            span.finish()
+        finally:
+            _current_span.reset(token)
+            self._end(span, parent is None)
+
+    def _end(self, span: Span, is_root: bool) -> None:
+        """Buffer a finished span, exporting the whole trace when its root ends."""
+        for listener in self._listeners:
+            try:
+                listener(span)
+            except Exception as e:
+                logger.warning(f"Error in span listener: {str(e)}")
+        if self._exporter is None:
+            return
+
+        with self._lock:
+            if is_root:
+                spans = self._pending.pop(span.trace_id, [])
+                spans.append(span)
+            else:
+                pending = self._pending.get(span.trace_id)
+                if pending is None:
+                    # Root already exported (e.g. a thread outlived the cycle)
+                    spans = [span]
+                else:
+                    if len(pending) < MAX_SPANS_PER_TRACE:
+                        pending.append(span)
+                    return
+
+        try:
+            self._exporter.export(spans)
+        except Exception as e:
+            logger.warning(f"Error exporting trace {span.trace_id}: {str(e)}")
+
+    def traced(self, name: Optional[str] = None, kind: str = INTERNAL) -> Callable:
+        """
+        Decorator running a function inside a span.
+
+        Args:
+            name: Span name (default: the function's qualified name)
+            kind: Span kind
+        """
+        def decorator(func: Callable) -> Callable:
+            span_name = name or func.__qualname__
+
+            @functools.wraps(func)
+            def wrapper(*args, **kwargs):
+                with self.span(span_name, kind):
+                    return func(*args, **kwargs)
+            return wrapper
+        return decorator
+
+
+def current_span() -> Optional[Span]:
+    """The active span in this context."""
+    return _current_span.get()
+
+
+def current_trace_id() -> Optional[str]:
+    """Trace id of the active span (None outside a trace)."""
+    span = _current_span.get()
+    return span.trace_id if span is not None else None
+
+
+def set_attributes(**attributes: Any) -> None:
+    """Add attributes to the active span (no-op outside a trace)."""
+    span = _current_span.get()
+    if span is not None:
+        span.attributes.update(attributes)
+
+
+def propagate(func: Callable) -> Callable:
+    """
+    Bind a callable to the current context so spans it opens in another
+    thread join the current trace. Wrap once per task.
+    """
+    context = contextvars.copy_context()
+
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        return context.run(func, *args, **kwargs)
+    return wrapper
+
+
+# Process-wide tracer
+tracer = Tracer()
+span = tracer.span
+traced = tracer.traced